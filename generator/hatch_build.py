@@ -0,0 +1,30 @@
+"""Hatch build hook: pack ../template into create_elcs/template.bundle and
+ship ../protocol/schemas as create_elcs/schemas."""
+
+import sys
+import tempfile
+from pathlib import Path
+
+from hatchling.builders.hooks.plugin.interface import BuildHookInterface
+
+
+class CustomBuildHook(BuildHookInterface):
+    def initialize(self, version, build_data):
+        schema_dir = Path(self.root).parent / "protocol" / "schemas"
+        if schema_dir.is_dir():
+            build_data["force_include"][str(schema_dir)] = "create_elcs/schemas"
+
+        template_dir = Path(self.root).parent / "template"
+        if not template_dir.is_dir():
+            # No template to pack (e.g. building from an sdist)
+            return
+
+        sys.path.insert(0, str(Path(self.root) / "src"))
+        try:
+            from create_elcs.bundle import build_bundle
+        finally:
+            sys.path.pop(0)
+
+        bundle_path = Path(tempfile.mkdtemp()) / "template.bundle"
+        build_bundle(template_dir, bundle_path)
+        build_data["force_include"][str(bundle_path)] = "create_elcs/template.bundle"
@@ -5,3 +5,20 @@ Creates new ELCS (Epistemic Light-Cone Swarm) projects from template.
 """
 
 __version__ = "1.0.0"
+
+
+def main():
+    """Entry point for the create-elcs script.
+
+    Plain ``--quiet`` runs are handled by create_elcs.quiet without loading
+    click or rich; everything else goes to the click CLI.
+    """
+    import sys
+
+    from create_elcs.quiet import run
+
+    if run(sys.argv[1:]):
+        return
+    from create_elcs.cli import main as cli_main
+
+    cli_main()
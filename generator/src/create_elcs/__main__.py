@@ -1,5 +1,5 @@
 """Allow running as `python -m create_elcs`."""
-from create_elcs.cli import main
+from create_elcs import main
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,177 @@
+"""
+Batch project generation for create-elcs.
+
+The template is loaded once (the bundle is mapped, or the directory is
+scanned for placeholders) and shared by every project, which are then
+generated concurrently.
+
+A batch file is either plain text, one project name per line (``#`` starts
+a comment), or JSON: a list whose items are names or objects
+
+    {"name": "billing", "path": "services", "objective": "...",
+     "values": {"PERSONA": "reviewer"}}
+
+Relative ``path`` values are resolved against the batch file's folder.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from create_elcs.bundle import TemplateBundle
+from create_elcs.materialize import materialize
+from create_elcs.project import PLACEHOLDER_NAME_RE
+from create_elcs.render import Renderer, default_values, scan_template
+
+_SEPARATORS = {"/", "\\", os.sep} | ({os.altsep} if os.altsep else set())
+
+
+class BatchProject(NamedTuple):
+    name: str
+    target_dir: Path
+    values: dict[str, str]
+
+
+class BatchResult(NamedTuple):
+    project: BatchProject
+    files: int
+    error: str | None
+
+
+class PreparedTemplate:
+    """A template discovered and compiled once, for rendering many projects."""
+
+    def __init__(self, template: Path, hardlink: bool = False):
+        self.hardlink = hardlink
+        self.bundle = TemplateBundle(template) if template.is_file() else None
+        self.files = None if self.bundle else scan_template(template)
+
+    def close(self) -> None:
+        if self.bundle is not None:
+            self.bundle.close()
+
+    def materialize(self, target_dir: Path, renderer: Renderer) -> int:
+        # One project per thread; files within a project are written in order
+        if self.bundle is not None:
+            return self.bundle.materialize(target_dir, renderer, workers=1)
+        return materialize(self.files, target_dir, renderer, hardlink=self.hardlink, workers=1)
+
+
+def _entry_project(
+    entry: Any,
+    base_dir: Path,
+    default_parent: Path,
+    defaults: dict[str, Any],
+    now: datetime,
+) -> BatchProject:
+    if isinstance(entry, str):
+        entry = {"name": entry}
+    if not isinstance(entry, dict) or not isinstance(entry.get("name"), str) or not entry["name"]:
+        raise ValueError(f"invalid batch entry: {entry!r}")
+    name = entry["name"]
+    if name in (".", "..") or any(sep in name for sep in _SEPARATORS):
+        raise ValueError(f"invalid batch entry: project name {name!r} must be a single folder name")
+    for key in ("path", "objective"):
+        if entry.get(key) is not None and not isinstance(entry[key], str):
+            raise ValueError(f"invalid batch entry: {key!r} of {name!r} must be a string")
+    entry_values = entry.get("values")
+    if entry_values is None:
+        entry_values = {}
+    if not isinstance(entry_values, dict):
+        raise ValueError(f"invalid batch entry: 'values' of {name!r} must be an object")
+    for key in entry_values:
+        if not PLACEHOLDER_NAME_RE.fullmatch(key):
+            raise ValueError(f"invalid batch entry: placeholder name {key!r} in {name!r}")
+
+    parent = default_parent
+    if entry.get("path"):
+        parent = (base_dir / Path(entry["path"]).expanduser()).resolve()
+    extra = dict(defaults.get("extra") or {})
+    extra.update(entry_values)
+    values = default_values(
+        name,
+        objective=entry.get("objective") or defaults.get("objective"),
+        extra={key: str(value) for key, value in extra.items()},
+        now=now,
+    )
+    return BatchProject(name, parent / name, values)
+
+
+def load_batch(
+    batch_file: Path,
+    default_parent: Path,
+    objective: str | None = None,
+    extra: dict[str, str] | None = None,
+) -> list[BatchProject]:
+    """Read a batch file. ``objective``/``extra`` are per-project defaults."""
+    text = batch_file.read_text(encoding="utf-8")
+    if batch_file.suffix == ".json":
+        entries = json.loads(text)
+        if not isinstance(entries, list):
+            raise ValueError(f"{batch_file}: expected a JSON list of projects")
+    else:
+        entries = [line.split("#", 1)[0].strip() for line in text.splitlines()]
+        entries = [entry for entry in entries if entry]
+
+    base_dir = batch_file.resolve().parent
+    defaults = {"objective": objective, "extra": extra}
+    now = datetime.now()
+    projects = [_entry_project(entry, base_dir, default_parent, defaults, now) for entry in entries]
+
+    seen = set()
+    for project in projects:
+        if project.target_dir in seen:
+            raise ValueError(f"{batch_file}: '{project.target_dir}' is listed more than once")
+        seen.add(project.target_dir)
+    return projects
+
+
+def generate_batch(
+    template: Path,
+    projects: list[BatchProject],
+    hardlink: bool = False,
+    jobs: int | None = None,
+    on_result: Callable[[BatchResult], None] | None = None,
+) -> list[BatchResult]:
+    """Generate all projects from one prepared template.
+
+    A failing project doesn't stop the others; its error is reported in its
+    result. ``on_result`` is called from the calling thread as each
+    project finishes.
+    """
+    prepared = PreparedTemplate(template, hardlink=hardlink)
+
+    def generate(project: BatchProject) -> BatchResult:
+        try:
+            project.target_dir.mkdir(parents=True)
+        except FileExistsError:
+            return BatchResult(project, 0, f"Directory '{project.target_dir}' already exists.")
+        except OSError as e:
+            return BatchResult(project, 0, str(e))
+        try:
+            return BatchResult(project, prepared.materialize(project.target_dir, Renderer(project.values)), None)
+        except Exception as e:
+            return BatchResult(project, 0, str(e))
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=jobs or min(32, (os.cpu_count() or 1) * 4)) as executor:
+            futures = [executor.submit(generate, project) for project in projects]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+    finally:
+        prepared.close()
+
+    order = {project.target_dir: i for i, project in enumerate(projects)}
+    results.sort(key=lambda result: order[result.project.target_dir])
+    return results
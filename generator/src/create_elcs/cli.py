@@ -4,107 +4,193 @@ ELCS Project Generator CLI
 Usage:
     create-elcs myproject
     create-elcs myproject --path /custom/path
+    create-elcs myproject --objective "Ship the billing API" --set PERSONA=reviewer
+    create-elcs --batch projects.json
     uvx create-elcs myproject
 """
 
-import os
-import shutil
-from datetime import datetime
 from pathlib import Path
 
 import click
-from rich.console import Console
-from rich.panel import Panel
 
-console = Console()
+from create_elcs.project import (
+    PLACEHOLDER_NAME_RE,
+    copy_template,
+    get_template,
+    verify_project,
+)
+from create_elcs.render import default_values
 
-# Template directory (relative to this package)
-TEMPLATE_DIR = Path(__file__).parent.parent.parent.parent / "template"
+# rich is imported on first use, so --quiet runs never load it
+_console = None
 
 
-def get_template_dir() -> Path:
-    """Get the template directory, handling installed package case."""
-    # When installed as package, template is in package data
-    pkg_template = Path(__file__).parent / "template"
-    if pkg_template.exists():
-        return pkg_template
-    
-    # When running from repo
-    if TEMPLATE_DIR.exists():
-        return TEMPLATE_DIR
-    
-    raise FileNotFoundError(
-        "ELCS template not found. Please reinstall the package."
-    )
+def get_console():
+    """The shared rich Console, created on first use."""
+    global _console
+    if _console is None:
+        from rich.console import Console
 
+        _console = Console()
+    return _console
 
-def replace_placeholders(content: str, project_name: str) -> str:
-    """Replace template placeholders with actual values."""
-    now = datetime.now().isoformat()
-    
-    replacements = {
-        "{{PROJECT_NAME}}": project_name,
-        "{{PROJECT_OBJECTIVE}}": f"Build {project_name}",
-        "{{CREATED_DATE}}": now,
-    }
-    
-    for placeholder, value in replacements.items():
-        content = content.replace(placeholder, value)
-    
-    return content
 
+def parse_placeholder_values(pairs: tuple[str, ...]) -> dict[str, str]:
+    """Parse repeated ``--set NAME=VALUE`` options."""
+    values = {}
+    for pair in pairs:
+        name, sep, value = pair.partition("=")
+        if not sep or not PLACEHOLDER_NAME_RE.fullmatch(name):
+            raise click.BadParameter(f"expected NAME=VALUE, got '{pair}'", param_hint="--set")
+        values[name.upper()] = value
+    return values
+
+
+def run_batch(
+    batch_file: Path,
+    parent_dir: Path,
+    objective: str | None,
+    extra: dict[str, str],
+    hardlink: bool,
+    jobs: int | None,
+    verify: bool,
+    quiet: bool,
+) -> None:
+    """Generate every project in a batch file and print one summary."""
+    from create_elcs.batch import generate_batch, load_batch
+
+    try:
+        projects = load_batch(batch_file, parent_dir, objective=objective, extra=extra)
+        template = get_template()
+    except (OSError, ValueError) as e:
+        get_console().print(f"[red]Error:[/red] {e}")
+        raise SystemExit(1)
+
+    if quiet:
+        results = generate_batch(template, projects, hardlink=hardlink, jobs=jobs)
+    else:
+        from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn
 
-def copy_template(template_dir: Path, target_dir: Path, project_name: str) -> int:
-    """Copy template to target directory, replacing placeholders."""
-    files_copied = 0
+        with Progress(
+            TextColumn("[blue]Creating projects"),
+            BarColumn(),
+            MofNCompleteColumn(),
+            console=get_console(),
+            transient=True,
+        ) as progress:
+            task = progress.add_task("batch", total=len(projects))
+            results = generate_batch(
+                template, projects, hardlink=hardlink, jobs=jobs,
+                on_result=lambda _: progress.advance(task),
+            )
     
-    for src_path in template_dir.rglob("*"):
-        if src_path.is_file():
-            # Calculate relative path
-            rel_path = src_path.relative_to(template_dir)
-            dest_path = target_dir / rel_path
-            
-            # Create parent directories
-            dest_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Check if it's a text file we should process
-            if src_path.suffix in ('.md', '.json', '.txt', '') or src_path.name in ('CLAUDE.md', '.cursorrules', '.windsurfrules'):
-                try:
-                    content = src_path.read_text(encoding='utf-8')
-                    content = replace_placeholders(content, project_name)
-                    dest_path.write_text(content, encoding='utf-8')
-                except UnicodeDecodeError:
-                    # Binary file, just copy
-                    shutil.copy2(src_path, dest_path)
+    if verify:
+        for i, result in enumerate(results):
+            if not result.error:
+                problems = verify_project(template, result.project.target_dir, result.project.values)
+                if problems:
+                    results[i] = result._replace(error=f"{len(problems)} files don't match the template")
+    
+    failed = [result for result in results if result.error]
+    if quiet:
+        for result in results:
+            if result.error:
+                click.echo(f"{result.project.target_dir}: {result.error}", err=True)
             else:
-                # Copy as-is
-                shutil.copy2(src_path, dest_path)
-            
-            files_copied += 1
+                click.echo(result.project.target_dir)
+    else:
+        from rich.table import Table
+
+        table = Table(title="ELCS Projects", title_justify="left")
+        table.add_column("")
+        table.add_column("Project")
+        table.add_column("Location", style="dim")
+        table.add_column("Result")
+        for result in results:
+            table.add_row(
+                "[red]✗[/red]" if result.error else "[green]✓[/green]",
+                result.project.name,
+                str(result.project.target_dir),
+                f"[red]{result.error}[/red]" if result.error else f"{result.files} files",
+            )
+        console = get_console()
+        console.print(table)
+        console.print(f"\n{len(results) - len(failed)} created, {len(failed)} failed")
     
-    return files_copied
+    if failed:
+        raise SystemExit(1)
 
 
 @click.command()
-@click.argument("project_name")
+@click.argument("project_name", required=False)
 @click.option(
     "--path", "-p",
     type=click.Path(),
     default=None,
     help="Parent directory for the project (default: current directory)"
 )
+@click.option(
+    "--objective", "-o",
+    default=None,
+    help="Project objective (default: \"Build <project_name>\")"
+)
+@click.option(
+    "--set", "-s", "placeholders",
+    multiple=True,
+    metavar="NAME=VALUE",
+    help="Fill a {{NAME}} placeholder in the template (repeatable)"
+)
+@click.option(
+    "--hardlink",
+    is_flag=True,
+    help="Hardlink files that need no substitution instead of copying them "
+         "(faster for large templates; edits then also change the template)"
+)
+@click.option(
+    "--jobs", "-j",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Parallel file writers (default: based on CPU count)"
+)
+@click.option(
+    "--verify",
+    is_flag=True,
+    help="Check every generated file against the template afterwards"
+)
+@click.option(
+    "--batch", "-b", "batch_file",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="Create every project listed in a file (one name per line, or JSON)"
+)
 @click.option(
     "--quiet", "-q",
     is_flag=True,
     help="Minimal output"
 )
-def main(project_name: str, path: str | None, quiet: bool):
+def main(
+    project_name: str | None,
+    path: str | None,
+    objective: str | None,
+    placeholders: tuple[str, ...],
+    hardlink: bool,
+    jobs: int | None,
+    verify: bool,
+    batch_file: Path | None,
+    quiet: bool,
+):
     """Create a new ELCS project.
     
     Example:
         create-elcs myproject
         create-elcs myproject --path ~/projects
+        create-elcs myproject --objective "Ship the billing API" --set PERSONA=reviewer
+        create-elcs --batch projects.txt --path ~/services
     """
+    if (project_name is None) == (batch_file is None):
+        raise click.UsageError("Give either PROJECT_NAME or --batch FILE.")
+    
+    extra = parse_placeholder_values(placeholders)
     
     # Determine target directory
     if path:
@@ -112,22 +198,29 @@ def main(project_name: str, path: str | None, quiet: bool):
     else:
         parent_dir = Path.cwd()
     
+    if batch_file is not None:
+        run_batch(batch_file, parent_dir, objective, extra, hardlink, jobs, verify, quiet)
+        return
+    
+    values = default_values(project_name, objective=objective, extra=extra)
     target_dir = parent_dir / project_name
     
     # Check if directory exists
     if target_dir.exists():
-        console.print(f"[red]Error:[/red] Directory '{target_dir}' already exists.")
+        get_console().print(f"[red]Error:[/red] Directory '{target_dir}' already exists.")
         raise SystemExit(1)
     
     # Get template
     try:
-        template_dir = get_template_dir()
+        template_dir = get_template()
     except FileNotFoundError as e:
-        console.print(f"[red]Error:[/red] {e}")
+        get_console().print(f"[red]Error:[/red] {e}")
         raise SystemExit(1)
     
     if not quiet:
-        console.print(Panel.fit(
+        from rich.panel import Panel
+
+        get_console().print(Panel.fit(
             f"[bold blue]ELCS Project Generator[/bold blue]\n\n"
             f"Creating: [green]{project_name}[/green]\n"
             f"Location: [dim]{target_dir}[/dim]",
@@ -137,12 +230,40 @@ def main(project_name: str, path: str | None, quiet: bool):
     # Create project
     try:
         target_dir.mkdir(parents=True, exist_ok=True)
-        files_copied = copy_template(template_dir, target_dir, project_name)
+        if quiet:
+            files_copied = copy_template(
+                template_dir, target_dir, project_name, values, hardlink=hardlink, workers=jobs
+            )
+        else:
+            from rich.progress import BarColumn, MofNCompleteColumn, Progress, TextColumn
+
+            with Progress(
+                TextColumn("[blue]Writing files"),
+                BarColumn(),
+                MofNCompleteColumn(),
+                console=get_console(),
+                transient=True,
+            ) as progress:
+                task = progress.add_task("write", total=None)
+                files_copied = copy_template(
+                    template_dir, target_dir, project_name, values,
+                    hardlink=hardlink, workers=jobs,
+                    on_progress=lambda done, total: progress.update(task, completed=done, total=total),
+                )
     except Exception as e:
-        console.print(f"[red]Error creating project:[/red] {e}")
+        get_console().print(f"[red]Error creating project:[/red] {e}")
         raise SystemExit(1)
     
+    if verify:
+        problems = verify_project(template_dir, target_dir, values)
+        if problems:
+            get_console().print(f"[red]Error:[/red] {len(problems)} files don't match the template:")
+            for problem in problems:
+                get_console().print(f"  {problem}")
+            raise SystemExit(1)
+    
     if not quiet:
+        console = get_console()
         console.print(f"\n[green]✓[/green] Created {files_copied} files")
         console.print(f"\n[bold]Next steps:[/bold]")
         console.print(f"  1. [cyan]cd {project_name}[/cyan]")
@@ -150,7 +271,7 @@ def main(project_name: str, path: str | None, quiet: bool):
         console.print(f"  3. Your agent will read ELCS protocol automatically")
         console.print(f"\n[dim]Learn more: elcs/QUICKSTART.md[/dim]")
     else:
-        console.print(target_dir)
+        click.echo(target_dir)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+"""
+Project materialization for create-elcs.
+
+Writes a template into a target directory: the directory skeleton is created
+in one pass, then files are written by a thread pool. Rendered files are
+written from memory; files known to need no substitution are copied with the
+cheapest mechanism the filesystem offers (reflink, then ``copy_file_range``,
+then a regular copy), or hardlinked when explicitly requested. Text files
+that were not scanned up front are read once and rendered on the way out.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import TypeVar
+
+from create_elcs.render import Renderer, TemplateFile
+
+# Linux FICLONE ioctl: share extents copy-on-write (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+# Below this many files a thread pool costs more than it saves
+PARALLEL_MIN_FILES = 64
+
+T = TypeVar("T")
+
+
+# Cleared after the first FICLONE failure so unsupported filesystems
+# don't pay for a failing ioctl per file
+_reflink_supported = sys.platform.startswith("linux")
+
+
+def _copy_data(src: Path, dest: Path) -> None:
+    global _reflink_supported
+    with open(src, "rb") as fsrc, open(dest, "wb") as fdest:
+        if _reflink_supported:
+            import fcntl
+
+            try:
+                fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+                return
+            except OSError:
+                _reflink_supported = False
+
+        if hasattr(os, "copy_file_range"):
+            remaining = os.fstat(fsrc.fileno()).st_size
+            try:
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdest.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                if remaining <= 0:
+                    return
+            except OSError:
+                pass
+            fsrc.seek(0)
+            fdest.seek(0)
+            fdest.truncate()
+
+        shutil.copyfileobj(fsrc, fdest)
+
+
+def copy_file(src: Path, dest: Path, hardlink: bool = False) -> None:
+    """Copy one file (data and permissions) by the fastest available path."""
+    if hardlink:
+        try:
+            os.link(src, dest)
+            return
+        except OSError:
+            # Different filesystem or no link support; copy instead
+            pass
+    _copy_data(src, dest)
+    shutil.copystat(src, dest)
+
+
+def create_skeleton(target_dir: Path, rel_paths: Iterable[Path]) -> None:
+    """Create every parent directory of rel_paths in one pass."""
+    directories = {target_dir}
+    for rel_path in rel_paths:
+        directories.update((target_dir / rel_path).parents)
+    # Parents sort before their children
+    for directory in sorted(d for d in directories if target_dir in d.parents or d == target_dir):
+        directory.mkdir(exist_ok=True)
+
+
+def write_parallel(
+    write: Callable[[T], None],
+    items: list[T],
+    workers: int | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> int:
+    """Run write(item) on a thread pool. Returns the number of items.
+
+    Small batches (or ``workers=1``) are written on the calling thread.
+    """
+    if workers == 1 or len(items) < PARALLEL_MIN_FILES:
+        for done, item in enumerate(items, 1):
+            write(item)
+            if on_progress is not None:
+                on_progress(done, len(items))
+        return len(items)
+
+    # Imported here: concurrent.futures pulls in logging
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS) as executor:
+        for done, _ in enumerate(executor.map(write, items), 1):
+            if on_progress is not None:
+                on_progress(done, len(items))
+    return len(items)
+
+
+def materialize(
+    files: list[TemplateFile],
+    target_dir: Path,
+    renderer: Renderer,
+    hardlink: bool = False,
+    workers: int | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> int:
+    """Write template files into target_dir. Returns the number of files.
+
+    ``hardlink`` links unrendered files to the template instead of copying
+    them; only use it when the template is never edited in place.
+    ``on_progress(done, total)`` is called from the calling thread after
+    each file.
+    """
+    create_skeleton(target_dir, (template_file.rel_path for template_file in files))
+
+    def write(template_file: TemplateFile) -> None:
+        dest_path = target_dir / template_file.rel_path
+        if template_file.render is False:
+            copy_file(template_file.path, dest_path, hardlink=hardlink)
+        else:
+            # Rendered, or unscanned: read once and write the result
+            dest_path.write_bytes(renderer.render_file(template_file.path))
+            shutil.copymode(template_file.path, dest_path)
+
+    return write_parallel(write, files, workers, on_progress)
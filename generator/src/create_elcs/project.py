@@ -0,0 +1,94 @@
+"""
+Template lookup, copying and verification for create-elcs.
+
+Kept free of click and rich so the ``--quiet`` fast path (create_elcs.quiet)
+can create a project without loading either.
+"""
+
+import re
+from collections.abc import Callable
+from pathlib import Path
+
+from create_elcs.bundle import TemplateBundle
+from create_elcs.materialize import materialize
+from create_elcs.render import Renderer, default_values, list_template, scan_template
+
+# Template directory (relative to this package)
+TEMPLATE_DIR = Path(__file__).parent.parent.parent.parent / "template"
+
+# Precompiled template, packed at build time by hatch_build.py
+TEMPLATE_BUNDLE = Path(__file__).parent / "template.bundle"
+
+# Names accepted for --set NAME=VALUE and batch "values"
+PLACEHOLDER_NAME_RE = re.compile(r"[A-Za-z][A-Za-z0-9_]*")
+
+
+def get_template_dir() -> Path:
+    """Get the template directory, handling installed package case."""
+    # When installed as package, template is in package data
+    pkg_template = Path(__file__).parent / "template"
+    if pkg_template.exists():
+        return pkg_template
+    
+    # When running from repo
+    if TEMPLATE_DIR.exists():
+        return TEMPLATE_DIR
+    
+    raise FileNotFoundError(
+        "ELCS template not found. Please reinstall the package."
+    )
+
+
+def get_template() -> Path:
+    """Get the template bundle when installed, else the template directory."""
+    if TEMPLATE_BUNDLE.exists():
+        return TEMPLATE_BUNDLE
+    return get_template_dir()
+
+
+def replace_placeholders(content: str, project_name: str) -> str:
+    """Replace template placeholders with actual values."""
+    return Renderer(default_values(project_name)).render_text(content)
+
+
+def copy_template(
+    template_dir: Path,
+    target_dir: Path,
+    project_name: str,
+    values: dict[str, str] | None = None,
+    hardlink: bool = False,
+    workers: int | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+) -> int:
+    """Copy template to target directory, replacing placeholders.
+
+    ``template_dir`` may also be a template bundle file.
+    """
+    renderer = Renderer(values or default_values(project_name))
+    if template_dir.is_file():
+        with TemplateBundle(template_dir) as bundle:
+            return bundle.materialize(target_dir, renderer, workers=workers, on_progress=on_progress)
+    # Hardlinking needs to know up front which text files are unchanged
+    files = scan_template(template_dir, workers) if hardlink else list_template(template_dir)
+    return materialize(
+        files, target_dir, renderer, hardlink=hardlink, workers=workers, on_progress=on_progress
+    )
+
+
+def verify_project(template: Path, target_dir: Path, values: dict[str, str]) -> list[str]:
+    """Paths in a generated project that don't match the template."""
+    renderer = Renderer(values)
+    if template.is_file():
+        with TemplateBundle(template) as bundle:
+            return bundle.verify_project(target_dir, renderer)
+
+    problems = []
+    for template_file in list_template(template):
+        dest_path = target_dir / template_file.rel_path
+        expected = (
+            template_file.path.read_bytes() if template_file.render is False
+            else renderer.render_file(template_file.path)
+        )
+        if not dest_path.is_file() or dest_path.read_bytes() != expected:
+            problems.append(template_file.rel_path.as_posix())
+    return problems
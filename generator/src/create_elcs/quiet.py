@@ -0,0 +1,98 @@
+"""
+Fast path for ``create-elcs NAME --quiet``.
+
+Scripts that create many projects one at a time pay the interpreter's start-up
+for every call, and importing click costs more than creating the project. A
+plain quiet run is parsed here with argparse and never loads click or rich.
+Anything else (--batch, --help, a bad option, an existing target) is left to
+the click CLI, so errors and help read the same either way.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from create_elcs.project import PLACEHOLDER_NAME_RE, copy_template, get_template, verify_project
+from create_elcs.render import default_values
+
+
+class _Declined(Exception):
+    """The arguments are for the full CLI."""
+
+
+class _Parser(argparse.ArgumentParser):
+    def error(self, message):
+        raise _Declined(message)
+
+
+def _positive_int(text: str) -> int:
+    value = int(text)
+    if value < 1:
+        raise ValueError(text)
+    return value
+
+
+def _parser() -> argparse.ArgumentParser:
+    # Mirrors the options of create_elcs.cli.main, less --batch and --help
+    parser = _Parser(prog="create-elcs", add_help=False, allow_abbrev=False)
+    parser.add_argument("project_name")
+    parser.add_argument("--path", "-p")
+    parser.add_argument("--objective", "-o")
+    parser.add_argument("--set", "-s", dest="placeholders", action="append", default=[])
+    parser.add_argument("--hardlink", action="store_true")
+    parser.add_argument("--jobs", "-j", type=_positive_int)
+    parser.add_argument("--verify", action="store_true")
+    parser.add_argument("--quiet", "-q", action="store_true")
+    return parser
+
+
+def run(argv: list[str]) -> bool:
+    """Create the project if ``argv`` is a plain quiet run.
+
+    Returns False, having done nothing, when the click CLI should handle
+    ``argv`` instead.
+    """
+    if "--quiet" not in argv and "-q" not in argv:
+        return False
+    try:
+        args = _parser().parse_args(argv)
+    except _Declined:
+        return False
+
+    extra = {}
+    for pair in args.placeholders:
+        name, sep, value = pair.partition("=")
+        if not sep or not PLACEHOLDER_NAME_RE.fullmatch(name):
+            return False
+        extra[name.upper()] = value
+
+    parent_dir = Path(args.path).expanduser().resolve() if args.path else Path.cwd()
+    target_dir = parent_dir / args.project_name
+    if target_dir.exists():
+        return False
+    try:
+        template = get_template()
+    except FileNotFoundError:
+        return False
+
+    values = default_values(args.project_name, objective=args.objective, extra=extra)
+    try:
+        target_dir.mkdir(parents=True, exist_ok=True)
+        copy_template(
+            template, target_dir, args.project_name, values,
+            hardlink=args.hardlink, workers=args.jobs,
+        )
+    except Exception as e:
+        print(f"Error creating project: {e}", file=sys.stderr)
+        raise SystemExit(1)
+
+    if args.verify:
+        problems = verify_project(template, target_dir, values)
+        if problems:
+            print(f"Error: {len(problems)} files don't match the template:", file=sys.stderr)
+            for problem in problems:
+                print(f"  {problem}", file=sys.stderr)
+            raise SystemExit(1)
+
+    print(target_dir)
+    return True
@@ -0,0 +1,116 @@
+"""
+Template rendering for create-elcs.
+
+Placeholders look like ``{{NAME}}``. All of them are substituted in a single
+regex pass per file, so adding placeholders (``--set PERSONA=...``) costs
+nothing extra per file. Files without any placeholder are found once by
+``scan_template`` (or while writing, for a single project) and copied
+byte-for-byte (see ``materialize``).
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+# Matches {{NAME}}; NAME is upper-case letters, digits and underscores
+PLACEHOLDER_RE = re.compile(rb"\{\{([A-Z][A-Z0-9_]*)\}\}")
+
+# Only these files are rendered; everything else is always copied as-is
+TEXT_SUFFIXES = (".md", ".json", ".txt", "")
+TEXT_NAMES = ("CLAUDE.md", ".cursorrules", ".windsurfrules")
+
+
+class TemplateFile(NamedTuple):
+    """One file of the template and whether it needs rendering.
+
+    ``render`` is None for text files that haven't been scanned yet.
+    """
+
+    path: Path
+    rel_path: Path
+    render: bool | None
+
+
+def is_text_file(path: Path) -> bool:
+    """True if placeholders in this file should be substituted."""
+    return path.suffix in TEXT_SUFFIXES or path.name in TEXT_NAMES
+
+
+def list_template(template_dir: Path) -> list[TemplateFile]:
+    """List template files without reading them.
+
+    Non-text files are marked as never rendered; text files are left
+    unscanned so a single project can check them while writing.
+    """
+    return [
+        TemplateFile(path, path.relative_to(template_dir), None if is_text_file(path) else False)
+        for path in sorted(template_dir.rglob("*"))
+        if path.is_file()
+    ]
+
+
+def _scanned(template_file: TemplateFile) -> TemplateFile:
+    if template_file.render is not None:
+        return template_file
+    render = PLACEHOLDER_RE.search(template_file.path.read_bytes()) is not None
+    return TemplateFile(template_file.path, template_file.rel_path, render)
+
+
+def scan_template(template_dir: Path, workers: int | None = None) -> list[TemplateFile]:
+    """List template files, marking the ones that contain placeholders.
+
+    Text files are read on a thread pool. Worth it when the same template
+    is rendered more than once.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_scanned, list_template(template_dir)))
+
+
+def default_values(
+    project_name: str,
+    objective: str | None = None,
+    extra: dict[str, str] | None = None,
+    now: datetime | None = None,
+) -> dict[str, str]:
+    """Placeholder values for a project; one timestamp for every file."""
+    values = {
+        "PROJECT_NAME": project_name,
+        "PROJECT_OBJECTIVE": objective or f"Build {project_name}",
+        "CREATED_DATE": (now or datetime.now()).isoformat(),
+    }
+    for name, value in (extra or {}).items():
+        values[name.upper()] = value
+    return values
+
+
+class Renderer:
+    """Substitutes every known placeholder in one pass.
+
+    Unknown placeholders are left untouched. In ``.json`` files values are
+    escaped as JSON string content, so quotes in an objective can't break
+    ``spec.json``.
+    """
+
+    def __init__(self, values: dict[str, str]):
+        self.values = {name.encode("ascii"): value.encode("utf-8") for name, value in values.items()}
+        self.json_values = {
+            name.encode("ascii"): json.dumps(value, ensure_ascii=False)[1:-1].encode("utf-8")
+            for name, value in values.items()
+        }
+
+    def render(self, data: bytes, json_escape: bool = False) -> bytes:
+        values = self.json_values if json_escape else self.values
+        return PLACEHOLDER_RE.sub(lambda match: values.get(match.group(1), match.group(0)), data)
+
+    def render_file(self, path: Path) -> bytes:
+        """Rendered contents of a template file."""
+        return self.render(path.read_bytes(), json_escape=path.suffix == ".json")
+
+    def render_text(self, content: str) -> str:
+        return self.render(content.encode("utf-8")).decode("utf-8")
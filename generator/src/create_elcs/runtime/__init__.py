@@ -0,0 +1,43 @@
+"""
+ELCS runtime - libraries and the ``elcs`` CLI for working inside an ELCS project.
+
+Each module operates on a project's ``elcs/`` folder; use ``find_elcs_dir``
+to locate it from the current directory.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+
+def find_elcs_dir(start: Path | None = None) -> Path | None:
+    """Find the elcs/ folder in ``start`` (default: cwd) or up to 3 parent levels."""
+    cwd = start or Path.cwd()
+
+    # Check current directory and up to 3 parent levels
+    for _ in range(4):
+        elcs_dir = cwd / "elcs"
+        if elcs_dir.is_dir():
+            return elcs_dir
+
+        parent = cwd.parent
+        if parent == cwd:  # Reached root
+            break
+        cwd = parent
+
+    return None
+
+
+def write_json_atomic(path: Path, data: Any, indent: int | None = 2) -> None:
+    """Write JSON to a temp file next to ``path`` and rename it into place."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        # dumps() encodes compact output in C; dump() always streams through the Python encoder
+        f.write(json.dumps(data, indent=indent, separators=None if indent else (",", ":")))
+        if indent:
+            f.write("\n")
+    os.replace(tmp_path, path)
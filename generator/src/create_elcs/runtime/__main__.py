@@ -0,0 +1,411 @@
+"""Command-line tools for working inside an ELCS project.
+
+Usage (from the project folder, or pass --elcs path/to/elcs):
+    elcs tokens list --ready
+    elcs tokens claim --agent code-agent-1
+    elcs tokens close <token_id> --outcome "Implemented"
+    elcs schedule plan --agent a1 --agent a2 --budget time_seconds=3600 --claim
+    elcs schedule route --agent code-agent-1 --claim
+    elcs validate
+    elcs distance
+    elcs state record --agent code-agent-1 -m "Added H3"
+    elcs resume
+    elcs lenses --target spec
+    elcs gates
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from create_elcs.runtime import find_elcs_dir
+
+
+def _elcs_dir(args: argparse.Namespace) -> Path:
+    if args.elcs:
+        return Path(args.elcs)
+    elcs_dir = find_elcs_dir()
+    if elcs_dir is None:
+        raise SystemExit("Error: no elcs/ folder found; pass --elcs path/to/elcs")
+    return elcs_dir
+
+
+def _print_json(data) -> None:
+    sys.stdout.write(json.dumps(data, indent=2) + "\n")
+
+
+def _cmd_tokens(args: argparse.Namespace) -> None:
+    from create_elcs.runtime.tokens import TokenConflict, TokenStore
+
+    store = TokenStore.for_project(_elcs_dir(args))
+    try:
+        if args.action == "list":
+            if args.ready:
+                tokens = store.ready()
+            elif args.blocked:
+                tokens = store.blocked()
+            else:
+                tokens = store.tokens(args.folder)
+            for token in tokens:
+                print(f"{token['priority']:>5.2f}  {token['status']:<11} {token['type'] or '-':<12} "
+                      f"{token['token_id']}  {token['summary'] or ''}")
+        elif args.action == "claim":
+            if args.token:
+                token = store.claim(args.token, args.agent)
+            else:
+                token = store.claim_next(args.agent, token_type=args.type)
+            if token is None:
+                raise SystemExit("No ready tokens.")
+            _print_json(token)
+        elif args.action == "release":
+            _print_json(store.release(args.token))
+        elif args.action == "close":
+            _print_json(store.close(args.token, args.outcome, notes=args.notes, status=args.status))
+        elif args.action == "reindex":
+            store.refresh(full=True)
+            print(f"Indexed {len(store.tokens())} tokens")
+    except TokenConflict as e:
+        raise SystemExit(f"Error: {e}")
+    finally:
+        store.save()
+
+
+def _parse_budget(pairs: list[str]) -> dict[str, float]:
+    from create_elcs.runtime.scheduler import BUDGET_FIELDS
+
+    budget = {}
+    for pair in pairs:
+        name, sep, value = pair.partition("=")
+        if not sep or name not in BUDGET_FIELDS:
+            raise SystemExit(f"Error: expected --budget NAME=N with NAME one of {', '.join(BUDGET_FIELDS)}")
+        try:
+            budget[name] = float(value)
+        except ValueError:
+            raise SystemExit(f"Error: budget {name} must be a number, got '{value}'")
+    return budget
+
+
+def _cmd_schedule(args: argparse.Namespace) -> None:
+    from create_elcs.runtime.scheduler import Scheduler
+    from create_elcs.runtime.tokens import TokenStore
+
+    elcs_dir = _elcs_dir(args)
+    store = TokenStore.for_project(elcs_dir)
+    scheduler = Scheduler(store)
+    try:
+        if args.action == "status":
+            ready = scheduler.ready()
+            path = scheduler.critical_path()
+            print(f"Ready: {len(ready)}")
+            for token in ready[:args.top]:
+                print(f"  {scheduler.tail(token['token_id']) / 3600:>7.2f}h  {token['token_id']}  {token['summary'] or ''}")
+            print(f"Critical path: {len(path)} tokens, {scheduler.tail(path[0]) / 3600 if path else 0:.2f}h")
+            for token_id in path[:args.top]:
+                print(f"  {token_id}")
+            for group in scheduler.cycles():
+                print(f"Cycle: {' -> '.join(group)}")
+            for token_id, waiting in scheduler.missing().items():
+                print(f"Missing: {token_id} (needed by {', '.join(waiting)})")
+        elif args.action == "plan":
+            budget = _parse_budget(args.budget)
+            agents = {agent_id: budget for agent_id in args.agent}
+            if args.claim:
+                plans = scheduler.dispatch(agents, max_tokens=args.max_tokens)
+            else:
+                plans = scheduler.assign(agents, max_tokens=args.max_tokens)
+            _print_json({
+                plan.agent_id: {"tokens": [token["token_id"] for token in plan.tokens], "budget_used": plan.used}
+                for plan in plans
+            })
+        elif args.action == "route":
+            from create_elcs.runtime.cones import ConeRouter
+
+            router = ConeRouter(elcs_dir, store)
+            if args.token:
+                _print_json([{"agent": agent_id, "score": round(value, 3)} for agent_id, value in router.candidates(args.token)])
+            elif args.agent:
+                token = router.claim_next(args.agent) if args.claim else router.next_for(args.agent)
+                if token is None:
+                    raise SystemExit(f"No ready token matches the cone of {args.agent}.")
+                _print_json(token)
+            else:
+                plans = router.dispatch(args.max_tokens) if args.claim else router.assign(args.max_tokens)
+                routes = {
+                    plan.agent_id: {"tokens": [token["token_id"] for token in plan.tokens], "budget_used": plan.used}
+                    for plan in plans
+                }
+                routes["unroutable"] = [token["token_id"] for token in router.unroutable()]
+                _print_json(routes)
+    finally:
+        store.save()
+
+
+def _cmd_validate(args: argparse.Namespace) -> None:
+    from create_elcs.runtime.validation import TreeValidator
+
+    elcs_dir = _elcs_dir(args)
+    rel_paths = None
+    if args.paths:
+        root = elcs_dir.resolve()
+        rel_paths = []
+        for path in args.paths:
+            try:
+                rel_paths.append(Path(path).resolve().relative_to(root).as_posix())
+            except ValueError:
+                raise SystemExit(f"Error: {path} is not inside {elcs_dir}")
+    try:
+        validator = TreeValidator(elcs_dir, use_cache=not args.no_cache)
+    except FileNotFoundError as e:
+        raise SystemExit(f"Error: {e}")
+    results = validator.validate(rel_paths, workers=args.jobs)
+
+    invalid = [result for result in results if result.issues]
+    for result in invalid:
+        for issue in result.issues:
+            print(f"{result.path}: {issue.location or '/'}: {issue.message} ({result.schema})")
+    if not args.quiet:
+        print(f"{len(results)} files, {len(invalid)} invalid ({validator.checked} checked, "
+              f"{len(results) - validator.checked} unchanged)", file=sys.stderr)
+    if invalid:
+        raise SystemExit(1)
+
+
+def _cmd_distance(args: argparse.Namespace) -> None:
+    from create_elcs.runtime.distance import DistanceEngine
+
+    engine = DistanceEngine(_elcs_dir(args), computed_by=args.agent)
+    if args.dry_run:
+        vector, written = engine.compute(), False
+    else:
+        vector, written = engine.update()
+    if args.json:
+        _print_json(vector)
+        return
+    print(f"Total distance: {vector['total_distance']:g} ({vector['trend']})")
+    for component, count in vector["components"].items():
+        print(f"  {component:<28} {count}")
+    for hotspot in vector["hotspots"]:
+        print(f"Hotspot {hotspot['component']}: {hotspot['reason']}")
+        print(f"  -> {hotspot['suggested_action']}")
+    if written:
+        print(f"Wrote {engine.vector_path}", file=sys.stderr)
+
+
+def _cmd_state(args: argparse.Namespace) -> None:
+    from create_elcs.runtime.state_store import StateStore
+
+    store = StateStore.for_project(_elcs_dir(args))
+    try:
+        if args.action == "log":
+            for info in store.versions()[-args.limit:]:
+                print(f"{info.version:>6}  {info.at[:19]}  {info.author or '-':<16} {info.ops:>4} ops  {info.message or ''}")
+        elif args.action == "show":
+            _print_json(store.get(args.version))
+        elif args.action == "diff":
+            new = args.new if args.new is not None else store.head_version
+            _print_json(store.diff(args.old, new))
+        elif args.action == "record":
+            version = store.record(author=args.agent, message=args.message)
+            print(f"Recorded version {version}" if version is not None else "No changes since the last recorded version")
+        elif args.action == "rollback":
+            version = store.rollback(args.version, author=args.agent)
+            print(f"Restored version {args.version} as version {version}")
+    except (KeyError, ValueError) as e:
+        raise SystemExit(f"Error: {e.args[0] if e.args else e}")
+    except FileNotFoundError as e:
+        raise SystemExit(f"Error: {e.filename} not found")
+
+
+def _cmd_resume(args: argparse.Namespace) -> None:
+    from create_elcs.runtime.resume import ResumeBuilder, render
+
+    builder = ResumeBuilder(_elcs_dir(args), max_items=args.max_items, use_cache=not args.no_cache)
+    bundle = builder.build()
+    if args.json:
+        _print_json(bundle)
+    else:
+        sys.stdout.write(render(bundle))
+
+
+def _cmd_lenses(args: argparse.Namespace) -> None:
+    from create_elcs.runtime.lenses import LensRunner, file_tokens, findings_to_tokens, load_evaluator, load_target
+
+    elcs_dir = _elcs_dir(args)
+    try:
+        evaluator = load_evaluator(args.evaluator)
+        target = load_target(elcs_dir, args.target)
+        runner = LensRunner(elcs_dir, evaluator, use_cache=not args.no_cache)
+        results = runner.run(target, args.lens or None, workers=args.jobs, write=not args.dry_run)
+    except (ImportError, AttributeError, ValueError) as e:
+        raise SystemExit(f"Error: {e}")
+    except FileNotFoundError as e:
+        raise SystemExit(f"Error: {e.filename} not found")
+
+    tokens = findings_to_tokens(target, results)
+    created = [] if args.dry_run or args.no_tokens else file_tokens(elcs_dir, tokens)
+    if args.json:
+        _print_json({
+            "outputs": {result.lens_id: result.output for result in results},
+            "errors": {result.lens_id: result.error for result in results if result.error},
+            "tokens": created if not args.dry_run else tokens,
+        })
+    else:
+        for result in results:
+            if result.error:
+                print(f"{result.lens_id:<20} error: {result.error}")
+                continue
+            output = result.output
+            counts = ", ".join(f"{len(output.get(field) or [])} {field.replace('_', ' ')}" for field in (
+                "risk_flags", "questions", "tests_requested", "evidence_gaps",
+            ))
+            approved = "approved" if (output.get("approval") or {}).get("approved", True) else "not approved"
+            print(f"{result.lens_id:<20} {approved:<13} {counts}{' (cached)' if result.cached else ''}")
+        if not args.dry_run and not args.no_tokens:
+            print(f"{len(created)} new tokens ({len(tokens) - len(created)} already filed)", file=sys.stderr)
+    if any(result.error for result in results):
+        raise SystemExit(1)
+
+
+def _cmd_gates(args: argparse.Namespace) -> None:
+    from create_elcs.runtime.gates import GateEngine
+
+    engine = GateEngine(_elcs_dir(args), use_cache=not args.no_cache)
+    try:
+        report = engine.evaluate()
+    except FileNotFoundError as e:
+        raise SystemExit(f"Error: {e.filename} not found")
+    except ValueError as e:
+        raise SystemExit(f"Error: {e}")
+    written = engine.write_report(report) if not args.dry_run else False
+    stages, markers = engine.stages(report, write_markers=not args.dry_run)
+    if args.json:
+        _print_json({"report": report, "stages": stages})
+        return
+    for objective in report["objectives"]:
+        if args.failing and objective["overall"] != "FAILED":
+            continue
+        print(f"{objective['goal_id']:<10} {objective['overall']:<23} {objective['statement'][:60]}")
+        for gate in objective["failed_gates"]:
+            print(f"  {gate:<19} {objective['gates'][gate]['reason']}")
+        for condition in objective["conditions"]:
+            print(f"  condition: {condition}")
+    for stage in stages:
+        status = "complete" if stage["complete"] else f"open: {stage['blocker'] or 'waiting for the stage before'}"
+        print(f"Stage {stage['stage']} {stage['name']:<20} {status}{' (marker written)' if stage['stage'] in markers else ''}")
+    if written:
+        print(f"Wrote {engine.elcs_dir / 'spec' / 'gates.json'} ({engine.evaluated} gate checks run)", file=sys.stderr)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="elcs", description=__doc__.splitlines()[0])
+    parser.add_argument("--elcs", help="Project elcs/ folder (default: detect from cwd)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    tokens = commands.add_parser("tokens", help="List, claim and close work tokens")
+    actions = tokens.add_subparsers(dest="action", required=True)
+    list_cmd = actions.add_parser("list", help="List tokens, highest priority first with --ready")
+    list_cmd.add_argument("--folder", choices=("open", "claimed", "closed"), help="Only this folder")
+    mode = list_cmd.add_mutually_exclusive_group()
+    mode.add_argument("--ready", action="store_true", help="Open tokens that can start now")
+    mode.add_argument("--blocked", action="store_true", help="Open tokens waiting on others")
+    claim = actions.add_parser("claim", help="Claim a token (default: the best ready one)")
+    claim.add_argument("--agent", required=True, help="Agent or coalition ID")
+    claim.add_argument("--token", help="Claim this token instead of the best ready one")
+    claim.add_argument("--type", help="Only claim tokens of this type")
+    release = actions.add_parser("release", help="Return a claimed token to open/")
+    release.add_argument("token")
+    close = actions.add_parser("close", help="Close a claimed token with a resolution")
+    close.add_argument("token")
+    close.add_argument("--outcome", required=True, help="What was achieved")
+    close.add_argument("--notes", help="Resolution notes")
+    close.add_argument("--status", choices=("done", "cancelled"), default="done")
+    actions.add_parser("reindex", help="Re-check every token file")
+    tokens.set_defaults(func=_cmd_tokens)
+
+    schedule = commands.add_parser("schedule", help="Order tokens by dependencies and split them between agents")
+    actions = schedule.add_subparsers(dest="action", required=True)
+    status = actions.add_parser("status", help="Ready tokens, critical path, cycles and missing dependencies")
+    status.add_argument("--top", type=int, default=10, help="How many tokens to list (default: 10)")
+    plan = actions.add_parser("plan", help="Assign ready tokens to agents within their budgets")
+    plan.add_argument("--agent", action="append", required=True, help="Agent ID (repeatable)")
+    plan.add_argument("--budget", action="append", default=[], metavar="NAME=N",
+                      help="Per-agent budget: tool_calls, tokens or time_seconds (repeatable)")
+    plan.add_argument("--max-tokens", type=int, default=None, help="At most this many tokens per agent")
+    plan.add_argument("--claim", action="store_true", help="Claim the assigned tokens for their agents")
+    route = actions.add_parser("route", help="Match ready tokens to agents by their cones in elcs/cones/")
+    target = route.add_mutually_exclusive_group()
+    target.add_argument("--agent", help="The best ready token for this agent")
+    target.add_argument("--token", help="The agents that can take this token, best first")
+    route.add_argument("--max-tokens", type=int, default=None, help="At most this many tokens per agent")
+    route.add_argument("--claim", action="store_true", help="Claim the routed tokens")
+    schedule.set_defaults(func=_cmd_schedule)
+
+    validate = commands.add_parser("validate", help="Check elcs/ artifacts against the protocol schemas")
+    validate.add_argument("paths", nargs="*", help="Only these files (default: every artifact)")
+    validate.add_argument("--jobs", "-j", type=int, default=None, help="Worker processes (default: CPU count)")
+    validate.add_argument("--no-cache", action="store_true", help="Check every file and don't update the cache")
+    validate.add_argument("--quiet", "-q", action="store_true", help="Only print problems")
+    validate.set_defaults(func=_cmd_validate)
+
+    distance = commands.add_parser("distance", help="Compute the distance vector (state/distance-vector.json)")
+    distance.add_argument("--agent", help="Record this agent as computed_by")
+    distance.add_argument("--dry-run", action="store_true", help="Print the vector without writing it")
+    distance.add_argument("--json", action="store_true", help="Print the vector as JSON")
+    distance.set_defaults(func=_cmd_distance)
+
+    state = commands.add_parser("state", help="History of state/current.json: record, diff, rollback")
+    actions = state.add_subparsers(dest="action", required=True)
+    log = actions.add_parser("log", help="List recorded versions")
+    log.add_argument("--limit", type=int, default=20, help="Show the last N versions (default: 20)")
+    show = actions.add_parser("show", help="Print a recorded version")
+    show.add_argument("version", type=int)
+    diff = actions.add_parser("diff", help="JSON Patch between two versions")
+    diff.add_argument("old", type=int)
+    diff.add_argument("new", type=int, nargs="?", help="Default: the latest version")
+    record = actions.add_parser("record", help="Record current.json as a new version if it changed")
+    record.add_argument("--agent", help="Author of this version")
+    record.add_argument("--message", "-m", help="What changed")
+    rollback = actions.add_parser("rollback", help="Make an earlier version current again")
+    rollback.add_argument("version", type=int)
+    rollback.add_argument("--agent", help="Author of the rollback")
+    state.set_defaults(func=_cmd_state)
+
+    resume = commands.add_parser("resume", help="What changed since the last checkpoint, for picking work back up")
+    resume.add_argument("--max-items", type=int, default=20, help="Tokens, patch operations and state items listed per section (default: 20)")
+    resume.add_argument("--no-cache", action="store_true", help="Rebuild every section")
+    resume.add_argument("--json", action="store_true", help="Print the bundle as JSON")
+    resume.set_defaults(func=_cmd_resume)
+
+    lenses = commands.add_parser("lenses", help="Evaluate a target with the seven lenses and file their findings as tokens")
+    lenses.add_argument("--target", default="spec", help="spec, state or the path of an artifact (default: spec)")
+    lenses.add_argument("--lens", action="append", help="Only this lens (repeatable; default: all seven)")
+    lenses.add_argument("--evaluator", default="stub", help="stub, or module:attribute of an evaluator (default: stub)")
+    lenses.add_argument("--jobs", "-j", type=int, default=None, help="Lenses evaluated at once (default: all)")
+    lenses.add_argument("--no-cache", action="store_true", help="Evaluate every lens again")
+    lenses.add_argument("--no-tokens", action="store_true", help="Write lens outputs but don't create tokens")
+    lenses.add_argument("--dry-run", action="store_true", help="Print results without writing outputs or tokens")
+    lenses.add_argument("--json", action="store_true", help="Print outputs and tokens as JSON")
+    lenses.set_defaults(func=_cmd_lenses)
+
+    gates = commands.add_parser("gates", help="Check spec objectives against the six gates and mark complete stages")
+    gates.add_argument("--failing", action="store_true", help="Only list objectives that fail a gate")
+    gates.add_argument("--no-cache", action="store_true", help="Evaluate every objective and gate again")
+    gates.add_argument("--dry-run", action="store_true", help="Don't write spec/gates.json or stage markers")
+    gates.add_argument("--json", action="store_true", help="Print the report and stages as JSON")
+    gates.set_defaults(func=_cmd_gates)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    try:
+        args.func(args)
+    except BrokenPipeError:
+        # Output piped into head etc.; don't print a traceback on exit
+        sys.stdout = None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""
+Cone routing - match ready work tokens to agents by their cognitive cones.
+
+Each agent describes itself in ``elcs/cones/{agent}.json`` (cognitive-cone
+schema). A token may state what it needs in ``requires`` (``capabilities``,
+``tools``, ``spaces``). An agent can take a token when
+
+- its ``capabilities``, ``tools_allowed`` and ``cone.spaces`` cover all of it,
+- every field of the token's ``budget`` fits the cone's ``budgets``,
+- for a handoff from another agent (``created_by.agent``), the token's
+  priority reaches the agent's ``interaction_threshold``.
+
+Among those agents ``score`` prefers the ones that advocate the token's
+type, lens, gate or requirements and avoids the ones averse to them; then
+specialists (the token uses the largest share of their abilities), so
+versatile agents stay free; and it penalizes a token longer than the
+agent's ``horizon.time_scale``.
+
+The router keeps an inverted index from each capability, tool and space to
+the agents that have it, so a token's candidates are the intersection of a
+few posting lists rather than a scan of every agent. Candidates and scores
+are kept per ready token, and every agent has a heap of its ready tokens,
+best first. Both are maintained incrementally: when tokens open, close or
+are claimed only those tokens are matched again, and when a cone file
+changes only that agent is. ``next_for`` is then a heap peek.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import os
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from create_elcs.runtime.scheduler import BUDGET_FIELDS, AgentPlan, Scheduler, token_budget
+from create_elcs.runtime.tokens import (
+    CLAIM_REFRESH_AGE,
+    MTIME_SETTLE_NS,
+    TokenConflict,
+    TokenStore,
+    priority_key,
+)
+
+logger = logging.getLogger(__name__)
+
+CONES_DIR = "cones"
+
+# Token ``requires`` field -> cone feature prefix
+REQUIREMENT_FIELDS = (("capabilities", "capability"), ("tools", "tool"), ("spaces", "space"))
+
+# Longest token (budget.time_seconds) each planning horizon is meant for
+HORIZON_SECONDS = {"immediate": 900, "short": 4 * 3600, "medium": 3 * 86400, "long": float("inf")}
+
+ADVOCACY_WEIGHT = 1.0
+AVERSION_WEIGHT = 2.0
+SPECIFICITY_WEIGHT = 1.0
+HORIZON_PENALTY = 1.0
+
+# Decisions re-check the token folders and cones at most this often (seconds)
+ROUTE_REFRESH_AGE = 1.0
+
+
+@dataclass(frozen=True)
+class Cone:
+    """The parts of a cognitive cone that routing uses."""
+
+    agent_id: str
+    features: frozenset[str]  # "capability:...", "tool:..." and "space:..."
+    advocacies: frozenset[str]
+    aversions: frozenset[str]
+    budgets: dict[str, float]
+    time_scale: str | None
+    interaction_threshold: float
+
+
+def parse_cone(data: dict[str, Any]) -> Cone:
+    """A Cone from a cognitive-cone document."""
+    cone = data.get("cone") or {}
+    features = {f"capability:{name}" for name in data.get("capabilities") or []}
+    features.update(f"tool:{name}" for name in data.get("tools_allowed") or [])
+    features.update(f"space:{name}" for name in cone.get("spaces") or [])
+    budgets = cone.get("budgets") or {}
+    threshold = data.get("interaction_threshold")
+    return Cone(
+        agent_id=str(data["agent_id"]),
+        features=frozenset(features),
+        advocacies=frozenset(data.get("advocacies") or ()),
+        aversions=frozenset(data.get("aversions") or ()),
+        budgets={name: budgets[name] for name in BUDGET_FIELDS if isinstance(budgets.get(name), (int, float))},
+        time_scale=(cone.get("horizon") or {}).get("time_scale"),
+        interaction_threshold=float(threshold) if isinstance(threshold, (int, float)) else 0.0,
+    )
+
+
+def requirements(token: dict[str, Any]) -> frozenset[str]:
+    """The cone features a token needs."""
+    requires = token.get("requires") or {}
+    return frozenset(
+        f"{prefix}:{name}" for field, prefix in REQUIREMENT_FIELDS for name in requires.get(field) or []
+    )
+
+
+def token_tags(token: dict[str, Any]) -> set[str]:
+    """What advocacies and aversions are matched against."""
+    created_by = token.get("created_by") or {}
+    requires = token.get("requires") or {}
+    tags = {tag for tag in (token.get("type"), created_by.get("lens"), created_by.get("gate")) if tag}
+    for field, _ in REQUIREMENT_FIELDS:
+        tags.update(requires.get(field) or [])
+    return tags
+
+
+def eligible(cone: Cone, token: dict[str, Any], needs: frozenset[str]) -> bool:
+    """Whether the agent may take the token at all."""
+    if not needs <= cone.features:
+        return False
+    need = token_budget(token)
+    if any(need.get(name, 0) > limit for name, limit in cone.budgets.items()):
+        return False
+    creator = (token.get("created_by") or {}).get("agent")
+    return not creator or creator == cone.agent_id or token["priority"] >= cone.interaction_threshold
+
+
+def score(cone: Cone, token: dict[str, Any], needs: frozenset[str]) -> float:
+    """How well an eligible agent suits a token; higher is better."""
+    tags = token_tags(token)
+    value = ADVOCACY_WEIGHT * len(cone.advocacies & tags) - AVERSION_WEIGHT * len(cone.aversions & tags)
+    value += SPECIFICITY_WEIGHT * (len(needs) + 1) / (len(cone.features) + 1)
+    seconds = token_budget(token).get("time_seconds")
+    if seconds and seconds > HORIZON_SECONDS.get(cone.time_scale, float("inf")):
+        value -= HORIZON_PENALTY
+    return value
+
+
+ScoreFunction = Callable[[Cone, dict[str, Any], frozenset[str]], float]
+
+
+class ConeRouter:
+    """Inverted capability index over cones, matched incrementally against ready tokens."""
+
+    def __init__(self, elcs_dir: Path, store: TokenStore | None = None, score_fn: ScoreFunction = score):
+        self.elcs_dir = Path(elcs_dir)
+        self.cones_dir = self.elcs_dir / CONES_DIR
+        self.store = store or TokenStore.for_project(self.elcs_dir)
+        self.scheduler = Scheduler(self.store)
+        self.score = score_fn
+        self._last_refresh = float("-inf")
+        # Cones, and the files they came from: name -> (mtime_ns, size, agent_id)
+        self._cones: dict[str, Cone] = {}
+        self._cone_files: dict[str, tuple[int, int, str]] = {}
+        # Inverted indexes: feature -> agents having it / ready tokens needing it
+        self._agents_with: dict[str, set[str]] = {}
+        self._tokens_needing: dict[str, set[str]] = {}
+        self._unconstrained: set[str] = set()
+        # Ready tokens being routed
+        self._tokens: dict[str, dict[str, Any]] = {}
+        self._needs: dict[str, frozenset[str]] = {}
+        # token -> agent -> queue key (-score, *priority_key, token_id); agent -> its tokens
+        self._candidates: dict[str, dict[str, tuple]] = {}
+        self._matched: dict[str, set[str]] = {}
+        # agent -> heap of queue keys; entries no longer in _candidates are skipped
+        self._queues: dict[str, list[tuple]] = {}
+
+    # -- cones -------------------------------------------------------------
+
+    def cones(self) -> dict[str, Cone]:
+        """Every agent's cone, by agent ID."""
+        self.refresh(max_age=ROUTE_REFRESH_AGE)
+        return dict(self._cones)
+
+    def set_cone(self, cone: Cone) -> None:
+        """Add or update an agent's cone; only that agent is matched again."""
+        old = self._cones.get(cone.agent_id)
+        if old == cone:
+            return
+        if old is not None:
+            self._unindex_agent(old)
+        self._cones[cone.agent_id] = cone
+        for feature in cone.features:
+            self._agents_with.setdefault(feature, set()).add(cone.agent_id)
+
+        # Tokens it matched before, and tokens it can match now
+        affected = set(self._matched.get(cone.agent_id, ())) | self._unconstrained
+        for feature in cone.features:
+            affected |= self._tokens_needing.get(feature, set())
+        for token_id in affected:
+            self._match_pair(cone, token_id)
+        self._rebuild_queue(cone.agent_id)
+
+    def remove_cone(self, agent_id: str) -> None:
+        cone = self._cones.pop(agent_id, None)
+        if cone is None:
+            return
+        self._unindex_agent(cone)
+        for token_id in self._matched.pop(agent_id, set()):
+            self._candidates[token_id].pop(agent_id, None)
+        self._queues.pop(agent_id, None)
+
+    def _unindex_agent(self, cone: Cone) -> None:
+        for feature in cone.features:
+            agents = self._agents_with.get(feature)
+            if agents is not None:
+                agents.discard(cone.agent_id)
+                if not agents:
+                    del self._agents_with[feature]
+
+    def _refresh_cones(self) -> bool:
+        changed = False
+        seen = set()
+        try:
+            scan = os.scandir(self.cones_dir)
+        except FileNotFoundError:
+            scan = None
+        if scan is not None:
+            with scan:
+                for dir_entry in scan:
+                    if not dir_entry.name.endswith(".json") or not dir_entry.is_file():
+                        continue
+                    try:
+                        stat = dir_entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    seen.add(dir_entry.name)
+                    cached = self._cone_files.get(dir_entry.name)
+                    # A very recent mtime may hide a second write in the same tick
+                    settled = time.time_ns() - stat.st_mtime_ns > MTIME_SETTLE_NS
+                    if cached and settled and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                        continue
+                    try:
+                        with open(dir_entry.path, encoding="utf-8") as f:
+                            cone = parse_cone(json.load(f))
+                    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+                        logger.warning(f"Skipping unreadable cone {dir_entry.path}: {e}")
+                        if cached:
+                            del self._cone_files[dir_entry.name]
+                            self.remove_cone(cached[2])
+                            changed = True
+                        continue
+                    if cached and cached[2] != cone.agent_id:
+                        self.remove_cone(cached[2])
+                        changed = True
+                    self._cone_files[dir_entry.name] = (stat.st_mtime_ns, stat.st_size, cone.agent_id)
+                    if self._cones.get(cone.agent_id) != cone:
+                        self.set_cone(cone)
+                        changed = True
+        for name in [name for name in self._cone_files if name not in seen]:
+            self.remove_cone(self._cone_files.pop(name)[2])
+            changed = True
+        return changed
+
+    # -- tokens ------------------------------------------------------------
+
+    def refresh(self, max_age: float = 0.0) -> bool:
+        """Pick up changed cones and tokens. Returns True if anything changed.
+
+        Nothing is checked if the last refresh is younger than ``max_age``
+        seconds.
+        """
+        now = time.monotonic()
+        if now - self._last_refresh < max_age:
+            return False
+        self._last_refresh = now
+        changed = self._refresh_cones()
+        ready = self.scheduler.ready_tokens()
+        for token_id in [token_id for token_id in self._tokens if token_id not in ready]:
+            self._remove_token(token_id)
+            changed = True
+        for token_id, token in ready.items():
+            # The store replaces a token's dict whenever its file changes
+            if self._tokens.get(token_id) is not token:
+                self._remove_token(token_id)
+                self._add_token(token)
+                changed = True
+        return changed
+
+    def _add_token(self, token: dict[str, Any]) -> None:
+        token_id = token["token_id"]
+        needs = requirements(token)
+        self._tokens[token_id] = token
+        self._needs[token_id] = needs
+        self._candidates[token_id] = {}
+        if not needs:
+            self._unconstrained.add(token_id)
+            agents: set[str] | list[str] = list(self._cones)
+        else:
+            for feature in needs:
+                self._tokens_needing.setdefault(feature, set()).add(token_id)
+            # Intersect posting lists, smallest first
+            postings = sorted((self._agents_with.get(feature, set()) for feature in needs), key=len)
+            agents = postings[0].intersection(*postings[1:])
+        for agent_id in agents:
+            key = self._match_pair(self._cones[agent_id], token_id)
+            if key is not None:
+                self._push(agent_id, key)
+
+    def _remove_token(self, token_id: str) -> None:
+        if self._tokens.pop(token_id, None) is None:
+            return
+        for feature in self._needs.pop(token_id):
+            tokens = self._tokens_needing.get(feature)
+            if tokens is not None:
+                tokens.discard(token_id)
+                if not tokens:
+                    del self._tokens_needing[feature]
+        self._unconstrained.discard(token_id)
+        for agent_id in self._candidates.pop(token_id):
+            self._matched[agent_id].discard(token_id)
+        # Queue entries are skipped once the token has no candidates entry
+
+    def _match_pair(self, cone: Cone, token_id: str) -> tuple | None:
+        """(Re)score one agent for one token; returns its queue key, or None."""
+        token, needs = self._tokens[token_id], self._needs[token_id]
+        candidates = self._candidates[token_id]
+        if not eligible(cone, token, needs):
+            if candidates.pop(cone.agent_id, None) is not None:
+                self._matched[cone.agent_id].discard(token_id)
+            return None
+        key = (-self.score(cone, token, needs), *priority_key(token), token_id)
+        candidates[cone.agent_id] = key
+        self._matched.setdefault(cone.agent_id, set()).add(token_id)
+        return key
+
+    def _push(self, agent_id: str, key: tuple) -> None:
+        queue = self._queues.setdefault(agent_id, [])
+        heapq.heappush(queue, key)
+        if len(queue) > 2 * len(self._matched.get(agent_id, ())) + 64:
+            self._rebuild_queue(agent_id)
+
+    def _rebuild_queue(self, agent_id: str) -> None:
+        queue = [self._candidates[token_id][agent_id] for token_id in self._matched.get(agent_id, ())]
+        heapq.heapify(queue)
+        self._queues[agent_id] = queue
+
+    # -- decisions ---------------------------------------------------------
+
+    def candidates(self, token_id: str) -> list[tuple[str, float]]:
+        """Agents that can take a ready token, best first, with their scores."""
+        self.refresh(max_age=ROUTE_REFRESH_AGE)
+        keys = self._candidates.get(token_id, {})
+        return [(agent_id, -key[0]) for agent_id, key in sorted(keys.items(), key=lambda item: (item[1], item[0]))]
+
+    def best_agent(self, token_id: str) -> str | None:
+        """The best agent for a ready token, or None if no cone covers it."""
+        self.refresh(max_age=ROUTE_REFRESH_AGE)
+        keys = self._candidates.get(token_id)
+        if not keys:
+            return None
+        return min(keys.items(), key=lambda item: (item[1], item[0]))[0]
+
+    def next_for(self, agent_id: str) -> dict[str, Any] | None:
+        """The ready token an agent suits best (then by priority), or None."""
+        self.refresh(max_age=ROUTE_REFRESH_AGE)
+        queue = self._queues.get(agent_id)
+        while queue:
+            key = queue[0]
+            if self._candidates.get(key[-1], {}).get(agent_id) == key:
+                return self._tokens[key[-1]]
+            heapq.heappop(queue)
+        return None
+
+    def claim_next(self, agent_id: str) -> dict[str, Any] | None:
+        """Claim ``next_for(agent_id)``; tokens claimed by others are skipped."""
+        while True:
+            token = self.next_for(agent_id)
+            if token is None:
+                return None
+            self._remove_token(token["token_id"])
+            try:
+                return self.store.claim(token["token_id"], agent_id, max_age=CLAIM_REFRESH_AGE)
+            except TokenConflict:
+                continue
+
+    def unroutable(self) -> list[dict[str, Any]]:
+        """Ready tokens no agent's cone covers."""
+        self.refresh(max_age=ROUTE_REFRESH_AGE)
+        return [self._tokens[token_id] for token_id, keys in self._candidates.items() if not keys]
+
+    def assign(self, max_tokens: int | None = None) -> list[AgentPlan]:
+        """Split the ready tokens between agents by cone match.
+
+        Tokens are taken critical path first, like ``Scheduler.assign``, and
+        each goes to its best-scoring candidate whose cone ``budgets`` still
+        cover the batch (the least-loaded one on a tie), at most
+        ``max_tokens`` per agent. Unroutable tokens are left unassigned.
+        """
+        self.refresh()
+        plans = {agent_id: AgentPlan(agent_id, dict(cone.budgets)) for agent_id, cone in sorted(self._cones.items())}
+        for token in self.scheduler.ready():
+            keys = self._candidates.get(token["token_id"])
+            if not keys:
+                continue
+            need = token_budget(token)
+            fitting = [
+                (key[0], len(plans[agent_id].tokens), agent_id) for agent_id, key in keys.items()
+                if plans[agent_id].fits(need) and (max_tokens is None or len(plans[agent_id].tokens) < max_tokens)
+            ]
+            if fitting:
+                plans[min(fitting)[2]].add(token, need)
+        return list(plans.values())
+
+    def dispatch(self, max_tokens: int | None = None) -> list[AgentPlan]:
+        """``assign``, then claim each batch for its agent."""
+        plans = self.scheduler.claim_plans(self.assign(max_tokens=max_tokens))
+        self.refresh()
+        return plans
@@ -0,0 +1,353 @@
+"""
+Distance vector engine - how far a project is from done, per component.
+
+Components come from the sources listed in PROTOCOL.md (Stage D):
+
+==============================  ================================================
+success_criteria_remaining      ``spec/spec.json`` criteria not ``met``, else
+                                unchecked rows in ``spec/success-criteria.md``
+critical_risks / high_risks     unmitigated risks in ``state/current.json``
+                                (``risks``) and lens ``risk_flags``
+evidence_gaps                   unresolved hypotheses with no evidence
+                                (``state/current.json`` and ``state/hypotheses.md``)
+failing_tests                   failures + errors in ``state/junit.xml``
+                                (e.g. ``pytest --junitxml=elcs/state/junit.xml``)
+open_tokens / blocked_tokens    ``tokens/open/``, via the token index
+==============================  ================================================
+
+Each group of components is a partial result cached with the stat signature
+(mtime and size) of the files it reads, in memory and in
+``elcs/.cache/distance.json``; a query only re-reads the groups whose files
+changed. Token counts come from the incremental token index.
+
+``total_distance`` is the weighted sum of the components. Weights default to
+1 and are read back from the existing ``state/distance-vector.json``, so
+edit them there. Hotspots are the non-zero components ranked by weighted
+contribution. The vector is validated against the distance-vector schema
+before it's written, and only written when it changed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from create_elcs.runtime import write_json_atomic
+
+VECTOR_FILE = "state/distance-vector.json"
+CACHE_FILE = ".cache/distance.json"
+CACHE_VERSION = 1
+
+COMPONENTS = (
+    "success_criteria_remaining", "critical_risks", "high_risks", "evidence_gaps",
+    "failing_tests", "open_tokens", "blocked_tokens",
+)
+
+SUGGESTED_ACTIONS = {
+    "success_criteria_remaining": "Pick an unmet success criterion and work toward its target",
+    "critical_risks": "Mitigate the critical risks before other work",
+    "high_risks": "Add mitigations for the high risks",
+    "evidence_gaps": "Design a test or gather evidence for an untested hypothesis",
+    "failing_tests": "Fix the failing tests",
+    "open_tokens": "Claim and complete a ready token",
+    "blocked_tokens": "Close the tokens that others depend on",
+}
+
+UNMITIGATED_RISK_STATUSES = {"open", "active", "identified", None}
+# Markdown status cells that mean done
+MET_MARKERS = ("✅", "met", "done", "pass")
+RESOLVED_MARKERS = ("✅", "❌", "confirmed", "rejected")
+
+
+# -- sources ----------------------------------------------------------------
+
+
+def _read_json(path: Path) -> Any:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _read_text(path: Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8")
+    except OSError:
+        return ""
+
+
+def _table_rows(text: str, prefix: str) -> list[list[str]]:
+    """Cells of Markdown table rows whose first cell is an ID like SC1/H2, outside code blocks."""
+    id_re = re.compile(prefix + r"\d+")
+    rows = []
+    in_code = False
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped.startswith("```"):
+            in_code = not in_code
+            continue
+        if in_code or not stripped.startswith("|"):
+            continue
+        cells = [cell.strip() for cell in stripped.strip("|").split("|")]
+        if id_re.fullmatch(cells[0]):
+            rows.append(cells)
+    return rows
+
+
+def _has_marker(cell: str, markers: tuple[str, ...]) -> bool:
+    cell = cell.lower()
+    return any(marker in cell for marker in markers)
+
+
+def _criteria(elcs_dir: Path) -> dict[str, list[str]]:
+    spec = _read_json(elcs_dir / "spec/spec.json")
+    criteria = spec.get("success_criteria") if isinstance(spec, dict) else None
+    if criteria:
+        remaining = [
+            str(criterion.get("id", "?")) for criterion in criteria
+            if isinstance(criterion, dict) and criterion.get("status") != "met"
+        ]
+    else:
+        remaining = [
+            cells[0] for cells in _table_rows(_read_text(elcs_dir / "spec/success-criteria.md"), "SC")
+            if not _has_marker(cells[-1], MET_MARKERS)
+        ]
+    return {"success_criteria_remaining": remaining}
+
+
+def _risks(elcs_dir: Path) -> dict[str, list[str]]:
+    found: dict[str, list[str]] = {"critical": [], "high": []}
+    state = _read_json(elcs_dir / "state/current.json")
+    for risk in (state.get("risks") or []) if isinstance(state, dict) else []:
+        if isinstance(risk, dict) and risk.get("severity") in found and risk.get("status") in UNMITIGATED_RISK_STATUSES:
+            found[risk["severity"]].append(str(risk.get("id") or risk.get("text", "?")))
+    for path in _glob(elcs_dir, "lenses/*.json"):
+        lens = _read_json(path)
+        for flag in (lens.get("risk_flags") or []) if isinstance(lens, dict) else []:
+            if isinstance(flag, dict) and flag.get("severity") in found and not flag.get("mitigation"):
+                found[flag["severity"]].append(f"{lens.get('lens_id') or path.stem}: {flag.get('text', '?')}")
+    return {"critical_risks": found["critical"], "high_risks": found["high"]}
+
+
+def _evidence(elcs_dir: Path) -> dict[str, list[str]]:
+    gaps = []
+    seen = set()
+    state = _read_json(elcs_dir / "state/current.json")
+    for hypothesis in (state.get("hypotheses") or []) if isinstance(state, dict) else []:
+        if not isinstance(hypothesis, dict):
+            continue
+        seen.add(hypothesis.get("id"))
+        if (
+            hypothesis.get("status") not in ("confirmed", "rejected")
+            and not hypothesis.get("evidence_for") and not hypothesis.get("evidence_against")
+        ):
+            gaps.append(str(hypothesis.get("id", "?")))
+    for cells in _table_rows(_read_text(elcs_dir / "state/hypotheses.md"), "H"):
+        if cells[0] not in seen and not _has_marker(cells[-1], RESOLVED_MARKERS):
+            gaps.append(cells[0])
+    return {"evidence_gaps": gaps}
+
+
+def _tests(elcs_dir: Path) -> dict[str, list[str]]:
+    path = elcs_dir / "state/junit.xml"
+    if not path.exists():
+        return {"failing_tests": []}
+    import xml.etree.ElementTree as ET
+
+    try:
+        root = ET.parse(path).getroot()
+    except (OSError, ET.ParseError):
+        return {"failing_tests": []}
+    failing = []
+    for case in root.iter("testcase"):
+        if case.find("failure") is not None or case.find("error") is not None:
+            failing.append(f"{case.get('classname', '')}::{case.get('name', '?')}".lstrip(":"))
+    return {"failing_tests": failing}
+
+
+# Component group -> (files it reads, relative to elcs/; function)
+SOURCES: dict[str, tuple[tuple[str, ...], Callable[[Path], dict[str, list[str]]]]] = {
+    "criteria": (("spec/spec.json", "spec/success-criteria.md"), _criteria),
+    "risks": (("state/current.json", "lenses/*.json"), _risks),
+    "evidence": (("state/current.json", "state/hypotheses.md"), _evidence),
+    "tests": (("state/junit.xml",), _tests),
+}
+
+
+def _glob(elcs_dir: Path, pattern: str) -> list[Path]:
+    folder, _, name_pattern = pattern.rpartition("/")
+    suffix = name_pattern.lstrip("*")
+    try:
+        return sorted(
+            Path(entry.path) for entry in os.scandir(elcs_dir / folder)
+            if entry.name.endswith(suffix) and entry.is_file()
+        )
+    except FileNotFoundError:
+        return []
+
+
+def _signature(elcs_dir: Path, inputs: tuple[str, ...]) -> list:
+    """Stat fingerprint of a group's input files (changes when any of them does)."""
+    signature = []
+    for pattern in inputs:
+        paths = _glob(elcs_dir, pattern) if "*" in pattern else [elcs_dir / pattern]
+        for path in paths:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            signature.append([path.relative_to(elcs_dir).as_posix(), stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+# -- engine -----------------------------------------------------------------
+
+
+class DistanceEngine:
+    """Computes a project's distance vector, re-reading only what changed."""
+
+    def __init__(self, elcs_dir: Path, computed_by: str | None = None, use_cache: bool = True):
+        self.elcs_dir = Path(elcs_dir)
+        self.computed_by = computed_by
+        self.vector_path = self.elcs_dir / VECTOR_FILE
+        self.cache_path = self.elcs_dir / CACHE_FILE if use_cache else None
+        # group -> {"signature": [...], "details": {component: [...]}}
+        self._partials: dict[str, dict[str, Any]] = {}
+        self._cache_loaded = False
+        self._token_store = None
+        self.recomputed: list[str] = []  # Groups re-read by the last compute()
+
+    def _load_cache(self) -> None:
+        self._cache_loaded = True
+        if self.cache_path is None:
+            return
+        data = _read_json(self.cache_path)
+        if isinstance(data, dict) and data.get("version") == CACHE_VERSION:
+            self._partials = data.get("partials", {})
+
+    def _save_cache(self) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            write_json_atomic(self.cache_path, {"version": CACHE_VERSION, "partials": self._partials}, indent=None)
+        except OSError:
+            pass
+
+    def _token_details(self) -> dict[str, list[str]]:
+        from create_elcs.runtime.tokens import TokenStore
+
+        if self._token_store is None:
+            self._token_store = TokenStore.for_project(self.elcs_dir)
+        store = self._token_store
+        return {
+            "open_tokens": [token["token_id"] for token in store.tokens("open")],
+            "blocked_tokens": [token["token_id"] for token in store.blocked()],
+        }
+
+    def details(self) -> dict[str, list[str]]:
+        """What each component counts (criterion IDs, risk texts, token IDs...)."""
+        if not self._cache_loaded:
+            self._load_cache()
+        self.recomputed = []
+        details: dict[str, list[str]] = {}
+        for group, (inputs, compute) in SOURCES.items():
+            signature = _signature(self.elcs_dir, inputs)
+            partial = self._partials.get(group)
+            if partial is None or partial["signature"] != signature:
+                partial = self._partials[group] = {"signature": signature, "details": compute(self.elcs_dir)}
+                self.recomputed.append(group)
+            details.update(partial["details"])
+        if self.recomputed:
+            self._save_cache()
+        details.update(self._token_details())
+        return details
+
+    def compute(self) -> dict[str, Any]:
+        """The current distance vector (not written; see ``update``)."""
+        details = self.details()
+        previous = _read_json(self.vector_path)
+        previous = previous if isinstance(previous, dict) else {}
+
+        weights = {component: 1.0 for component in COMPONENTS}
+        if isinstance(previous.get("weights"), dict):
+            weights.update({
+                name: float(weight) for name, weight in previous["weights"].items()
+                if isinstance(weight, (int, float)) and not isinstance(weight, bool) and weight >= 0
+            })
+        components = {component: len(details.get(component, [])) for component in COMPONENTS}
+        contributions = {component: count * weights.get(component, 1.0) for component, count in components.items()}
+        total = round(sum(contributions.values()), 6)
+
+        previous_total = previous.get("total_distance")
+        if not isinstance(previous_total, (int, float)):
+            previous_total, trend = None, "unknown"
+        elif total < previous_total:
+            trend = "decreasing"
+        elif total > previous_total:
+            trend = "increasing"
+        else:
+            trend = "stable"
+
+        hotspots = []
+        for component in sorted(contributions, key=lambda c: (-contributions[c], c)):
+            if contributions[component] <= 0:
+                continue
+            items = details[component]
+            shown = ", ".join(items[:3]) + (f" and {len(items) - 3} more" if len(items) > 3 else "")
+            hotspots.append({
+                "component": component,
+                "reason": f"{components[component]} ({contributions[component]:g} of {total:g}): {shown}",
+                "suggested_action": SUGGESTED_ACTIONS[component],
+            })
+
+        spec = _read_json(self.elcs_dir / "spec/spec.json")
+        now = datetime.now(timezone.utc)
+        return {
+            "vector_id": _next_vector_id(previous.get("vector_id"), now),
+            "computed_at": now.isoformat(),
+            "spec_id": spec.get("spec_id") if isinstance(spec, dict) else None,
+            "components": components,
+            "total_distance": int(total) if total == int(total) else total,
+            "weights": {name: int(weight) if weight == int(weight) else weight for name, weight in weights.items()},
+            "trend": trend,
+            "previous_total": previous_total,
+            "hotspots": hotspots,
+            "computed_by": self.computed_by,
+        }
+
+    def update(self) -> tuple[dict[str, Any], bool]:
+        """Compute, validate and write the vector if it changed. Returns (vector, written)."""
+        vector = self.compute()
+        previous = _read_json(self.vector_path)
+        if isinstance(previous, dict) and all(
+            previous.get(key) == vector[key] for key in ("components", "weights", "hotspots", "spec_id")
+        ):
+            return previous, False
+
+        from create_elcs.runtime.validation import load_schemas
+
+        issues = load_schemas()["distance-vector"].validate(vector)
+        if issues:
+            raise ValueError(f"distance vector doesn't match its schema: {issues}")
+        self.vector_path.parent.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(self.vector_path, vector)
+        return vector, True
+
+
+def _next_vector_id(previous_id: Any, now: datetime) -> str:
+    # DV-2025-01-10-001, numbered within the day
+    prefix = f"DV-{now:%Y-%m-%d}-"
+    sequence = 1
+    if isinstance(previous_id, str) and previous_id.startswith(prefix):
+        try:
+            sequence = int(previous_id[len(prefix):]) + 1
+        except ValueError:
+            pass
+    return f"{prefix}{sequence:03d}"
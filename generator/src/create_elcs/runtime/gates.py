@@ -0,0 +1,522 @@
+"""
+Gate engine - the six goal gates of ``protocol/gates.md`` as rules.
+
+Every objective in ``spec/spec.json`` (its ``objectives`` list, or the
+spec's single ``objective`` with all its success criteria when there is
+no list) is checked against:
+
+====================  =====================================================
+observables           linked success criteria exist, each with an
+                      ``observable`` and a concrete ``target``
+testability           each linked criterion has a ``method`` and a
+                      threshold or pass/fail ``target``
+reversibility         a rollback plan for trivial/easy/hard changes;
+                      irreversible ones need ``human_approved``
+confidence            ``confidence`` (else the lowest of its hypotheses')
+                      at least ``confidence_threshold``
+lens_agreement        ``lens_votes`` (else the approvals in spec lens
+                      outputs): enough approvals, no critical rejection,
+                      no Safety/Risk veto
+evidence_grounding    evidence ids (its own and its hypotheses'
+                      ``evidence_for``) that exist in ``state/current.json``
+====================  =====================================================
+
+Each gate is a pure function of a small projection of the project (the
+objective's criteria for observables, its votes for lens agreement, ...).
+Results are memoized per objective and gate under a hash of that
+projection in ``elcs/.cache/gates.json``, so after an edit only the
+objective/gate pairs whose inputs changed are evaluated again. When none
+of the input files changed, the previous report is returned as is.
+
+The report is written to ``spec/gates.json``. The engine also writes the
+``.gates/stage-N.complete`` markers for the stages it can check (0 to 5;
+stage 6 needs a human) once the stage before is complete. Existing
+markers are never removed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from create_elcs.runtime import write_json_atomic
+
+REPORT_FILE = "spec/gates.json"
+CACHE_FILE = ".cache/gates.json"
+CACHE_VERSION = 1
+# Part of every memo key; bump when a rule changes
+RULES_VERSION = 1
+
+GATES = (
+    "observables", "testability", "reversibility", "confidence", "lens_agreement", "evidence_grounding",
+)
+DEFAULT_CONFIG = {
+    "confidence_threshold": 0.6,
+    "min_lens_approval": 3,
+    "safety_lens_veto": True,
+    "require_human_for_irreversible": True,
+}
+IMPLICIT_OBJECTIVE_ID = "objective"
+
+# Files whose stats decide whether anything needs re-evaluating
+INPUT_FILES = ("spec/spec.json", "state/current.json", "lenses/*.json")
+
+PLACEHOLDER_RE = re.compile(r"^\s*(\{\{.*\}\}|\(.*\)|\[.*\]|-|tbd|todo)?\s*$", re.IGNORECASE)
+VAGUE_RE = re.compile(
+    r"\b(better|good|nice|fast|faster|easy|easier|intuitive|seamless|feels?|love|well|improved?)\b", re.IGNORECASE,
+)
+THRESHOLD_RE = re.compile(
+    r"[0-9<>=≤≥%]|\b(pass(es|ing)?|fail(s|ing)?|zero|none|no|all|every|true|false|yes)\b", re.IGNORECASE,
+)
+REVERSIBLE_CATEGORIES = ("trivial", "easy", "hard")
+
+
+def _read_json(path: Path) -> Any:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _signature(elcs_dir: Path, patterns: tuple[str, ...]) -> list:
+    signature = []
+    for pattern in patterns:
+        folder, _, name = pattern.rpartition("/")
+        if "*" in name:
+            try:
+                paths = sorted(
+                    entry.path for entry in os.scandir(elcs_dir / folder) if entry.name.endswith(name.lstrip("*"))
+                )
+            except FileNotFoundError:
+                paths = []
+        else:
+            paths = [str(elcs_dir / pattern)]
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature.append([os.path.relpath(path, elcs_dir), stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def _key(gate: str, inputs: Any) -> str:
+    # Inputs are plain JSON data, whose repr is unambiguous and much cheaper than dumps()
+    return hashlib.blake2b(repr((RULES_VERSION, gate, inputs)).encode(), digest_size=16).hexdigest()
+
+
+def _passed(reason: str, **extra: Any) -> dict[str, Any]:
+    return {"passed": True, "reason": reason, **extra}
+
+
+def _failed(reason: str, **extra: Any) -> dict[str, Any]:
+    return {"passed": False, "reason": reason, **extra}
+
+
+# -- gate rules: inputs -> result ----------------------------------------------
+
+
+def _observables(inputs: dict[str, Any]) -> dict[str, Any]:
+    criteria = inputs["criteria"]
+    if not criteria:
+        return _failed("No success criteria linked")
+    missing = [criterion_id for criterion_id, criterion in criteria if criterion is None]
+    if missing:
+        return _failed(f"Unknown success criteria: {', '.join(missing)}")
+    vague = []
+    for criterion_id, criterion in criteria:
+        observable, target = str(criterion.get("observable") or ""), str(criterion.get("target") or "")
+        if PLACEHOLDER_RE.match(observable) or PLACEHOLDER_RE.match(target):
+            vague.append(f"{criterion_id} has no observable or target")
+        elif VAGUE_RE.search(target) and not THRESHOLD_RE.search(target):
+            vague.append(f"{criterion_id} target is subjective ({target})")
+    if vague:
+        return _failed("; ".join(vague))
+    return _passed(f"{len(criteria)} observable criteria", criteria=[criterion_id for criterion_id, _ in criteria])
+
+
+def _testability(inputs: dict[str, Any]) -> dict[str, Any]:
+    criteria = [(criterion_id, criterion) for criterion_id, criterion in inputs["criteria"] if criterion is not None]
+    if not criteria:
+        return _failed("No success criteria to test")
+    problems = []
+    for criterion_id, criterion in criteria:
+        if PLACEHOLDER_RE.match(str(criterion.get("method") or "")):
+            problems.append(f"{criterion_id} has no test method")
+        elif not THRESHOLD_RE.search(str(criterion.get("target") or "")):
+            problems.append(f"{criterion_id} target has no threshold or pass/fail condition")
+    if problems:
+        return _failed("; ".join(problems))
+    return _passed("Every criterion has a method and a threshold",
+                   test_plan=[f"{criterion_id}: {criterion['method']}" for criterion_id, criterion in criteria])
+
+
+def _reversibility(inputs: dict[str, Any]) -> dict[str, Any]:
+    plan = inputs["reversibility"] or {}
+    category = plan.get("category")
+    rollback = str(plan.get("rollback_plan") or "")
+    if category == "irreversible":
+        if inputs["require_human"] and not plan.get("human_approved"):
+            return _failed("Irreversible and not approved by a human", category=category)
+        return _passed("Irreversible, approved", category=category,
+                       conditions=["Irreversible: confirm with a human before acting"])
+    if category not in REVERSIBLE_CATEGORIES:
+        return _failed("No reversibility category (trivial, easy, hard or irreversible)")
+    if PLACEHOLDER_RE.match(rollback):
+        return _failed(f"No rollback plan for a {category} change", category=category)
+    return _passed(f"{category.capitalize()} to undo", category=category, rollback_plan=rollback)
+
+
+def _confidence(inputs: dict[str, Any]) -> dict[str, Any]:
+    threshold = inputs["threshold"]
+    score = inputs["confidence"]
+    source = "objective"
+    if score is None:
+        scores = [value for value in inputs["hypotheses"] if isinstance(value, (int, float))]
+        if not scores:
+            return _failed("No confidence score (objective or linked hypotheses)", threshold=threshold)
+        score, source = min(scores), "lowest linked hypothesis"
+    if score < threshold:
+        return _failed(f"Confidence {score:g} ({source}) below {threshold:g}", score=score, threshold=threshold)
+    return _passed(f"Confidence {score:g} ({source}) at least {threshold:g}", score=score, threshold=threshold)
+
+
+def _lens_agreement(inputs: dict[str, Any]) -> dict[str, Any]:
+    votes: dict[str, str] = inputs["votes"]
+    if not votes:
+        return _failed("No lens votes (add lens_votes or run the lenses on the spec)")
+    approvals = sorted(lens for lens, vote in votes.items() if vote in ("approve", "conditional_approve"))
+    abstentions = [lens for lens, vote in votes.items() if vote == "abstain"]
+    if inputs["safety_veto"] and votes.get("safety_risk") == "reject":
+        return _failed("Safety/Risk lens rejects (veto)", votes=votes)
+    critical = sorted(lens for lens in inputs["critical"] if votes.get(lens) == "reject")
+    if critical:
+        return _failed(f"Critical rejection by {', '.join(critical)}", votes=votes)
+    if len(abstentions) * 2 > len(votes):
+        return _failed("Majority abstain: evaluate with more lenses", votes=votes)
+    if len(approvals) < inputs["min_approval"]:
+        return _failed(f"{len(approvals)} of {inputs['min_approval']} required lens approvals", votes=votes)
+    return _passed(f"{len(approvals)} lenses approve", votes=votes, conditions=inputs["conditions"])
+
+
+def _evidence_grounding(inputs: dict[str, Any]) -> dict[str, Any]:
+    refs, known = inputs["refs"], inputs["known"]
+    if not refs:
+        return _failed("No linked evidence")
+    if not known:
+        return _failed(f"Evidence not found in the epistemic state: {', '.join(refs)}")
+    return _passed(f"{len(known)} of {len(refs)} evidence items found", supporting_evidence=known)
+
+
+RULES: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
+    "observables": _observables,
+    "testability": _testability,
+    "reversibility": _reversibility,
+    "confidence": _confidence,
+    "lens_agreement": _lens_agreement,
+    "evidence_grounding": _evidence_grounding,
+}
+
+
+# -- project context and gate inputs -----------------------------------------
+
+
+def _gate_config(spec: dict[str, Any]) -> dict[str, Any]:
+    """DEFAULT_CONFIG with the spec's ``gate_config`` on top; known settings must have the right type."""
+    overrides = spec.get("gate_config")
+    if overrides is None:
+        return dict(DEFAULT_CONFIG)
+    if not isinstance(overrides, dict):
+        raise ValueError(f"spec.json gate_config must be an object, got {overrides!r}")
+    config = {**DEFAULT_CONFIG, **overrides}
+    for name, default in DEFAULT_CONFIG.items():
+        value = config[name]
+        if isinstance(default, bool):
+            valid, kind = isinstance(value, bool), "true or false"
+        elif isinstance(default, int):
+            valid, kind = isinstance(value, int) and not isinstance(value, bool), "an integer"
+        else:
+            valid, kind = isinstance(value, (int, float)) and not isinstance(value, bool), "a number"
+            if valid:
+                config[name] = float(value)
+        if not valid:
+            raise ValueError(f"spec.json gate_config.{name} must be {kind}, got {value!r}")
+    return config
+
+
+class _Context:
+    """Lookups shared by every objective, built once per evaluation."""
+
+    def __init__(self, elcs_dir: Path, spec: dict[str, Any]):
+        state = _read_json(elcs_dir / "state" / "current.json")
+        state = state if isinstance(state, dict) else {}
+        self.config = _gate_config(spec)
+        self.criteria = {c["id"]: c for c in spec.get("success_criteria") or [] if isinstance(c, dict) and c.get("id")}
+        # Spec hypotheses carry confidence, state hypotheses carry evidence links
+        self.hypotheses: dict[str, dict[str, Any]] = {}
+        for source in (spec.get("hypotheses"), state.get("hypotheses")):
+            for hypothesis in source or []:
+                if isinstance(hypothesis, dict) and hypothesis.get("id"):
+                    self.hypotheses[hypothesis["id"]] = {**self.hypotheses.get(hypothesis["id"], {}), **hypothesis}
+        self.evidence_ids = {e["id"] for e in state.get("evidence") or [] if isinstance(e, dict) and e.get("id")}
+        self.votes, self.critical, self.conditions = self._lens_votes(elcs_dir, spec)
+
+    @staticmethod
+    def _lens_votes(elcs_dir: Path, spec: dict[str, Any]) -> tuple[dict[str, str], list[str], list[str]]:
+        """Votes from lens outputs that target this spec."""
+        votes, critical, conditions = {}, [], []
+        try:
+            paths = sorted(entry.path for entry in os.scandir(elcs_dir / "lenses") if entry.name.endswith(".json"))
+        except FileNotFoundError:
+            paths = []
+        for path in paths:
+            output = _read_json(Path(path))
+            if not isinstance(output, dict) or not output.get("lens_id"):
+                continue
+            target = output.get("target") or {}
+            if target.get("type") != "spec" or target.get("id") not in (None, spec.get("spec_id")):
+                continue
+            approval = output.get("approval")
+            if not isinstance(approval, dict) or "approved" not in approval:
+                vote = "abstain"
+            elif not approval["approved"]:
+                vote = "reject"
+            else:
+                vote = "conditional_approve" if approval.get("conditions") else "approve"
+                conditions.extend(approval.get("conditions") or [])
+            votes[output["lens_id"]] = vote
+            if any(flag.get("severity") == "critical" for flag in output.get("risk_flags") or [] if isinstance(flag, dict)):
+                critical.append(output["lens_id"])
+        return votes, sorted(critical), conditions
+
+    def inputs(self, objective: dict[str, Any], gate: str) -> dict[str, Any]:
+        """The projection of the project a gate reads for one objective."""
+        config = self.config
+        if gate in ("observables", "testability"):
+            ids = objective.get("success_criteria") or []
+            return {"criteria": [(criterion_id, self.criteria.get(criterion_id)) for criterion_id in ids]}
+        if gate == "reversibility":
+            return {
+                "reversibility": objective.get("reversibility"),
+                "require_human": config["require_human_for_irreversible"],
+            }
+        if gate == "confidence":
+            return {
+                "confidence": objective.get("confidence"),
+                "hypotheses": [
+                    self.hypotheses.get(hypothesis_id, {}).get("confidence")
+                    for hypothesis_id in objective.get("hypotheses") or []
+                ],
+                "threshold": config["confidence_threshold"],
+            }
+        if gate == "lens_agreement":
+            own = objective.get("lens_votes")
+            return {
+                "votes": own if own else self.votes,
+                "critical": [] if own else self.critical,
+                "conditions": [] if own else self.conditions,
+                "min_approval": config["min_lens_approval"],
+                "safety_veto": config["safety_lens_veto"],
+            }
+        if gate == "evidence_grounding":
+            refs = list(objective.get("evidence") or [])
+            for hypothesis_id in objective.get("hypotheses") or []:
+                refs.extend(self.hypotheses.get(hypothesis_id, {}).get("evidence_for") or [])
+            refs = list(dict.fromkeys(refs))
+            return {"refs": refs, "known": [ref for ref in refs if ref in self.evidence_ids]}
+        raise ValueError(f"unknown gate: {gate}")
+
+
+def objectives_of(spec: dict[str, Any]) -> list[dict[str, Any]]:
+    """The spec's candidate goals; without an ``objectives`` list, the spec objective itself."""
+    objectives = [o for o in spec.get("objectives") or [] if isinstance(o, dict) and o.get("id")]
+    if objectives or "objectives" in spec:
+        return objectives
+    return [{
+        "id": IMPLICIT_OBJECTIVE_ID,
+        "statement": spec.get("objective") or "",
+        "success_criteria": [c["id"] for c in spec.get("success_criteria") or [] if isinstance(c, dict) and c.get("id")],
+        "hypotheses": [h["id"] for h in spec.get("hypotheses") or [] if isinstance(h, dict) and h.get("id")],
+    }]
+
+
+# -- stages --------------------------------------------------------------------
+
+
+def _has_content(path: Path) -> bool:
+    try:
+        return path.stat().st_size > 0
+    except FileNotFoundError:
+        return False
+
+
+def _stage_checks(elcs_dir: Path, spec: dict[str, Any] | None, report: dict[str, Any]) -> list[tuple[int, str, str | None]]:
+    """(stage, name, why not complete or None) for the machine-checkable stages 0-5."""
+    state = _read_json(elcs_dir / "state" / "current.json")
+    lens_ids = set()
+    critical_open = []
+    try:
+        lens_paths = [entry.path for entry in os.scandir(elcs_dir / "lenses")]
+    except FileNotFoundError:
+        lens_paths = []
+    for path in lens_paths:
+        if path.endswith(".md"):
+            lens_ids.add(Path(path).stem)
+        elif path.endswith(".json"):
+            output = _read_json(Path(path))
+            if isinstance(output, dict) and output.get("lens_id"):
+                lens_ids.add(output["lens_id"])
+                critical_open.extend(
+                    flag.get("text", "?") for flag in output.get("risk_flags") or []
+                    if isinstance(flag, dict) and flag.get("severity") == "critical" and not flag.get("mitigation")
+                )
+    populated = isinstance(state, dict) and any(state.get(key) for key in ("assumptions", "hypotheses", "evidence"))
+    state_files = ("assumptions.md", "hypotheses.md", "evidence.md", "constraints.md")
+    missing_state = [name for name in state_files if not _has_content(elcs_dir / "state" / name)]
+    passing = [o["goal_id"] for o in report["objectives"] if o["overall"] != "FAILED"]
+
+    checks = [
+        (0, "Project Setup", None if (elcs_dir / "PROTOCOL.md").is_file() and isinstance(state, dict)
+         else "PROTOCOL.md or state/current.json missing"),
+        (1, "Epistemic State", "state/current.json has no assumptions, hypotheses or evidence" if not populated
+         else (f"empty or missing: {', '.join(missing_state)}" if missing_state else None)),
+        (2, "Lens Evaluation", None if len(lens_ids) >= 5 else f"{len(lens_ids)} of 5 lens evaluations"),
+        (3, "Gap Analysis", f"{len(critical_open)} critical risk flags without mitigation" if critical_open else None),
+        (4, "Goal Emergence", None if passing else "no objective passes all 6 gates"),
+    ]
+    if not isinstance(spec, dict):
+        checks.append((5, "Spec & MVP Planning", "spec/spec.json missing"))
+    else:
+        missing = [field for field in ("success_criteria", "phases") if not spec.get(field)]
+        checks.append((5, "Spec & MVP Planning", f"spec has no {' or '.join(missing)}" if missing else None))
+    return checks
+
+
+def _write_markers(elcs_dir: Path, stages: list[dict[str, Any]]) -> list[int]:
+    """Write markers for complete stages whose predecessor is complete. Returns the stages written."""
+    gates_dir = elcs_dir / ".gates"
+    written = []
+    previous_complete = True
+    for stage in stages:
+        marker = gates_dir / f"stage-{stage['stage']}.complete"
+        if marker.exists():
+            stage["complete"] = True
+        elif stage["blocker"] is None and previous_complete:
+            gates_dir.mkdir(parents=True, exist_ok=True)
+            marker.write_text(
+                f"Stage {stage['stage']}: {stage['name']}\n"
+                f"Completed: {datetime.now(timezone.utc).strftime('%Y-%m-%d')}\n\n"
+                "Checked by `elcs gates`.\n",
+                encoding="utf-8",
+            )
+            stage["complete"] = True
+            written.append(stage["stage"])
+        previous_complete = stage["complete"]
+    return written
+
+
+# -- engine --------------------------------------------------------------------
+
+
+class GateEngine:
+    """Evaluates every spec objective against the six gates, memoizing per pair."""
+
+    def __init__(self, elcs_dir: Path, use_cache: bool = True):
+        self.elcs_dir = Path(elcs_dir)
+        self.cache_path = self.elcs_dir / CACHE_FILE if use_cache else None
+        self._cache: dict[str, Any] | None = None
+        self.evaluated = 0  # Objective/gate pairs evaluated by the last run (not memoized)
+
+    def _load_cache(self) -> dict[str, Any]:
+        if self._cache is None:
+            data = _read_json(self.cache_path) if self.cache_path else None
+            if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+                data = {"version": CACHE_VERSION, "signature": None, "report": None, "keys": {}}
+            self._cache = data
+        return self._cache
+
+    def evaluate(self) -> dict[str, Any]:
+        """The gate report: every objective with its six gate results."""
+        cache = self._load_cache()
+        self.evaluated = 0
+        signature = json.loads(json.dumps(_signature(self.elcs_dir, INPUT_FILES)))
+        if cache["report"] is not None and cache["signature"] == signature:
+            return cache["report"]
+
+        spec = _read_json(self.elcs_dir / "spec" / "spec.json")
+        if not isinstance(spec, dict):
+            raise FileNotFoundError(2, "No such file", str(self.elcs_dir / "spec" / "spec.json"))
+        context = _Context(self.elcs_dir, spec)
+        # Memoized results live in the previous report; keys maps "goal/gate" to their input hash
+        previous = cache["report"]
+        old_results = {o["goal_id"]: o["gates"] for o in previous["objectives"]} if previous else {}
+        old_keys, keys = cache["keys"], {}
+        objectives = []
+        for objective in objectives_of(spec):
+            gates = {}
+            conditions = list(objective.get("conditions") or [])
+            for gate in GATES:
+                inputs = context.inputs(objective, gate)
+                pair = f"{objective['id']}/{gate}"
+                key = _key(gate, inputs)
+                if old_keys.get(pair) == key and gate in old_results.get(objective["id"], {}):
+                    result = old_results[objective["id"]][gate]
+                else:
+                    result = RULES[gate](inputs)
+                    self.evaluated += 1
+                keys[pair] = key
+                gates[gate] = result
+                conditions.extend(c for c in result.get("conditions") or [] if c not in conditions)
+            failed = [gate for gate, result in gates.items() if not result["passed"]]
+            objectives.append({
+                "goal_id": objective["id"],
+                "statement": objective.get("statement", ""),
+                "gates": gates,
+                "overall": "FAILED" if failed else ("PASSED_WITH_CONDITIONS" if conditions else "PASSED"),
+                "failed_gates": failed,
+                "conditions": conditions,
+            })
+
+        report = {
+            "spec_id": spec.get("spec_id"),
+            "spec_version": spec.get("version"),
+            "config": context.config,
+            "evaluated_at": datetime.now(timezone.utc).isoformat(),
+            "objectives": objectives,
+        }
+        if previous is not None and {**previous, "evaluated_at": None} == {**report, "evaluated_at": None}:
+            report = previous  # Same results; keep the report (and its file) untouched
+        cache.update(signature=signature, report=report, keys=keys)
+        if self.cache_path is not None:
+            try:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                write_json_atomic(self.cache_path, cache, indent=None)
+            except OSError:
+                pass
+        return report
+
+    def write_report(self, report: dict[str, Any]) -> bool:
+        """Write ``spec/gates.json`` if it changed. Returns whether it was written."""
+        path = self.elcs_dir / REPORT_FILE
+        if _read_json(path) == report:
+            return False
+        write_json_atomic(path, report)
+        return True
+
+    def stages(self, report: dict[str, Any], write_markers: bool = True) -> tuple[list[dict[str, Any]], list[int]]:
+        """Completion of stages 0-5, writing newly complete markers. Returns (stages, written)."""
+        spec = _read_json(self.elcs_dir / "spec" / "spec.json")
+        stages = [
+            {"stage": stage, "name": name, "complete": (self.elcs_dir / ".gates" / f"stage-{stage}.complete").exists(),
+             "blocker": blocker}
+            for stage, name, blocker in _stage_checks(self.elcs_dir, spec, report)
+        ]
+        written = _write_markers(self.elcs_dir, stages) if write_markers else []
+        return stages, written
@@ -0,0 +1,488 @@
+"""
+Lens runner - evaluate a target against the seven core lenses at once.
+
+Each lens (``protocol/lenses/README.md``) is run concurrently through an
+evaluator and produces a lens-output document in ``elcs/lenses/``.
+Evaluators are pluggable: anything with a ``name``, a ``version`` and
+``evaluate(lens, target) -> dict`` returning lens-output fields. The
+built-in ``stub`` evaluator applies each lens's red flags as fixed rules,
+so it works offline and gives reproducible results for tests. Load others
+with ``module:attribute``.
+
+A lens only sees the parts of the target it attends to (``Lens.attends``;
+e.g. Data Science reads a spec's success criteria and hypotheses). Its
+output is cached in ``elcs/.cache/lenses/`` under a hash of the lens
+definition, the evaluator and that projection, so after a small spec edit
+only the lenses whose inputs changed are evaluated again.
+
+The findings of all lenses are turned into work tokens in one batch:
+questions, requested tests, evidence gaps and high or critical risk flags.
+Token ids are derived from the finding, so re-running never files the
+same work twice.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+import re
+import uuid
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, NamedTuple, Protocol
+
+from create_elcs.runtime import write_json_atomic
+
+CACHE_DIR = ".cache/lenses"
+OUTPUT_DIR = "lenses"
+# Namespace for token ids derived from lens findings
+TOKEN_NAMESPACE = uuid.UUID("5d1f3c2a-8e4b-4f0e-9a67-3b2d1c0e9f84")
+
+FINDING_FIELDS = ("risk_flags", "questions", "tests_requested", "evidence_gaps", "constraints_delta")
+SEVERITY_PRIORITY = {"critical": 0.9, "high": 0.8, "medium": 0.6, "low": 0.4}
+TEST_PRIORITY = {"high": 0.7, "medium": 0.5, "low": 0.3}
+# Risk flags at or above this severity become tokens; the rest stay in the lens output
+TOKEN_SEVERITIES = ("high", "critical")
+
+
+class Lens(NamedTuple):
+    lens_id: str
+    name: str
+    domain: str
+    question: str
+    # Top-level fields read from each target type; other targets are read whole
+    attends: dict[str, tuple[str, ...]]
+
+
+LENSES = (
+    Lens("philosophy", "Philosophy", "Epistemic honesty", "Are we being honest about what we know?", {
+        "spec": ("objective", "hypotheses", "open_questions", "constraints"),
+        "state": ("assumptions", "hypotheses", "evidence"),
+    }),
+    Lens("data_science", "Data Science", "Measurement", "Can we measure and test this?", {
+        "spec": ("success_criteria", "hypotheses"),
+        "state": ("hypotheses", "evidence"),
+    }),
+    Lens("safety_risk", "Safety/Risk", "Failure modes", "What could go wrong?", {
+        "spec": ("objective", "constraints", "phases"),
+        "state": ("assumptions", "constraints"),
+    }),
+    Lens("topology", "Topology", "Structure", "Is the structure stable?", {
+        "spec": ("phases",),
+        "state": ("assumptions", "hypotheses"),
+    }),
+    Lens("theoretical_math", "Theoretical Math", "Consistency", "Is this logically sound?", {
+        "spec": ("constraints", "hypotheses", "success_criteria"),
+        "state": ("assumptions", "constraints"),
+    }),
+    Lens("systems_engineering", "Systems Engineering", "Buildability", "Can we actually build this?", {
+        "spec": ("phases", "constraints"),
+        "state": ("constraints",),
+    }),
+    Lens("product_ux", "Product/UX", "User value", "Does this help users?", {
+        "spec": ("title", "objective", "success_criteria", "open_questions"),
+        "state": ("preferences", "assumptions"),
+    }),
+)
+LENS_IDS = tuple(lens.lens_id for lens in LENSES)
+
+
+@dataclass
+class Target:
+    """What the lenses evaluate: the spec, the epistemic state or an artifact."""
+
+    type: str  # spec, state, proposal or artifact (lens-output target types)
+    id: str
+    content: Any
+    slug: str  # Names the output files: lenses/{slug}.{lens_id}.json
+
+    def view(self, lens: Lens) -> Any:
+        """The part of the target a lens attends to."""
+        fields = lens.attends.get(self.type)
+        if fields is None or not isinstance(self.content, dict):
+            return self.content
+        return {field: self.content.get(field) for field in fields}
+
+
+def load_target(elcs_dir: Path, name: str = "spec") -> Target:
+    """``spec``, ``state`` or the path of a JSON or text artifact."""
+    elcs_dir = Path(elcs_dir)
+    if name in ("spec", "state"):
+        path = elcs_dir / ("spec/spec.json" if name == "spec" else "state/current.json")
+        with open(path, encoding="utf-8") as f:
+            content = json.load(f)
+        target_id = str(content.get("spec_id" if name == "spec" else "state_id") or name)
+        return Target(name, target_id, content, name)
+    path = Path(name)
+    text = path.read_text(encoding="utf-8")
+    try:
+        content = json.loads(text) if path.suffix == ".json" else text
+    except json.JSONDecodeError:
+        content = text
+    target_type = "proposal" if "proposal" in path.stem.lower() else "artifact"
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "-", path.stem).strip("-") or "artifact"
+    return Target(target_type, str(path), content, slug)
+
+
+# -- evaluators ---------------------------------------------------------------
+
+
+class Evaluator(Protocol):
+    name: str
+    version: str
+
+    def evaluate(self, lens: Lens, target: Target) -> dict[str, Any]:
+        """Lens-output fields (risk_flags, questions, ...) for one lens."""
+        ...
+
+
+VAGUE_TERMS = (
+    "fast", "secure", "easy", "simple", "scalable", "intuitive", "robust", "seamless",
+    "reliable", "user-friendly", "efficient", "better",
+)
+PLACEHOLDER_RE = re.compile(r"^\s*(\{\{.*\}\}|\[.*\])?\s*$")
+
+
+def _items(content: Any, field: str) -> list[dict[str, Any]]:
+    value = content.get(field) if isinstance(content, dict) else None
+    if isinstance(value, dict):  # state constraints: {"hard": [...], "soft": [...]}
+        return [item for items in value.values() if isinstance(items, list) for item in items if isinstance(item, dict)]
+    return [item for item in value or [] if isinstance(item, dict)]
+
+
+def _label(item: dict[str, Any], *keys: str) -> str:
+    text = next((str(item[key]) for key in keys if item.get(key)), "")
+    return f"{item['id']} ({text})" if item.get("id") and text else str(item.get("id") or text or "?")
+
+
+class StubEvaluator:
+    """Offline evaluator: each lens's red flags from the lens guide, as fixed rules.
+
+    Deterministic, so results are reproducible; a real evaluator (an agent or
+    a model call) replaces it by implementing the same ``evaluate``.
+    """
+
+    name = "stub"
+    version = "1"
+
+    def evaluate(self, lens: Lens, target: Target) -> dict[str, Any]:
+        output: dict[str, Any] = {field: [] for field in FINDING_FIELDS}
+        content = target.view(lens)
+        check = getattr(self, f"_{lens.lens_id}", None)
+        if isinstance(content, dict) and check is not None:
+            check(content, output)
+        elif isinstance(content, str):
+            self._text(lens, content, output)
+        blocking = [flag for flag in output["risk_flags"] if flag["severity"] in TOKEN_SEVERITIES]
+        output["approval"] = {
+            "approved": not blocking,
+            "conditions": [flag["text"] for flag in blocking],
+        }
+        return output
+
+    @staticmethod
+    def _text(lens: Lens, text: str, output: dict[str, Any]) -> None:
+        if not text.strip():
+            output["risk_flags"].append({"severity": "high", "text": "Target is empty"})
+        elif lens.lens_id == "philosophy":
+            for term in VAGUE_TERMS:
+                if re.search(rf"\b{re.escape(term)}\b", text, re.IGNORECASE):
+                    output["questions"].append(f"What does '{term}' mean operationally?")
+
+    @staticmethod
+    def _philosophy(content: dict[str, Any], output: dict[str, Any]) -> None:
+        objective = str(content.get("objective") or "")
+        for term in VAGUE_TERMS:
+            if re.search(rf"\b{re.escape(term)}\b", objective, re.IGNORECASE):
+                output["questions"].append(f"What does '{term}' mean operationally?")
+        for hypothesis in _items(content, "hypotheses"):
+            if not hypothesis.get("falsification") and hypothesis.get("status", "untested") != "rejected":
+                output["risk_flags"].append({
+                    "severity": "medium",
+                    "text": f"Hypothesis {_label(hypothesis, 'claim', 'statement')} has no falsification criteria",
+                })
+        for assumption in _items(content, "assumptions"):
+            if (assumption.get("confidence") or 0) >= 0.8 and not assumption.get("evidence_for"):
+                output["risk_flags"].append({
+                    "severity": "medium",
+                    "text": f"High confidence in {_label(assumption, 'text', 'statement')} without linked evidence",
+                })
+
+    @staticmethod
+    def _data_science(content: dict[str, Any], output: dict[str, Any]) -> None:
+        criteria = _items(content, "success_criteria")
+        if "success_criteria" in content and not criteria:
+            output["risk_flags"].append({"severity": "high", "text": "No success metrics defined"})
+        for criterion in criteria:
+            if not criterion.get("method"):
+                output["tests_requested"].append({
+                    "id": f"T-{criterion.get('id', '?')}",
+                    "text": f"Define how to measure {_label(criterion, 'observable')} against target {criterion.get('target', '?')}",
+                    "priority": "medium",
+                })
+        for hypothesis in _items(content, "hypotheses"):
+            if (
+                hypothesis.get("status", "untested") in ("untested", "testing")
+                and not hypothesis.get("evidence_for") and not hypothesis.get("evidence_against")
+            ):
+                output["evidence_gaps"].append(f"No evidence for {_label(hypothesis, 'claim', 'statement')}")
+
+    @staticmethod
+    def _safety_risk(content: dict[str, Any], output: dict[str, Any]) -> None:
+        constraints = content.get("constraints")
+        if isinstance(constraints, dict):  # Epistemic state: {"hard": [...], "soft": [...]}
+            hard = constraints.get("hard")
+        else:
+            hard = [c for c in _items(content, "constraints") if c.get("type") == "hard"]
+        if "constraints" in content and not hard:
+            output["risk_flags"].append({"severity": "medium", "text": "No hard constraints: failure boundaries are undefined"})
+            output["questions"].append("What is the worst case, and can it be undone?")
+        for phase in _items(content, "phases"):
+            if phase.get("status") == "blocked":
+                output["risk_flags"].append({"severity": "high", "text": f"Phase {_label(phase, 'name')} is blocked"})
+
+    @staticmethod
+    def _topology(content: dict[str, Any], output: dict[str, Any]) -> None:
+        for phase in _items(content, "phases"):
+            tasks = [task for task in phase.get("tasks") or [] if isinstance(task, dict)]
+            blocked = [task for task in tasks if task.get("status") == "blocked"]
+            if blocked:
+                output["risk_flags"].append({
+                    "severity": "medium",
+                    "text": f"Phase {_label(phase, 'name')} has blocked tasks: {', '.join(_label(t, 'text') for t in blocked)}",
+                })
+        ids: dict[str, int] = {}
+        for field in ("assumptions", "hypotheses", "phases"):
+            for item in _items(content, field):
+                if item.get("id"):
+                    ids[item["id"]] = ids.get(item["id"], 0) + 1
+        for item_id in sorted(item_id for item_id, count in ids.items() if count > 1):
+            output["risk_flags"].append({"severity": "medium", "text": f"Id {item_id} is used more than once"})
+
+    @staticmethod
+    def _theoretical_math(content: dict[str, Any], output: dict[str, Any]) -> None:
+        seen: dict[str, str] = {}
+        for constraint in _items(content, "constraints"):
+            text = str(constraint.get("text") or "").strip().lower()
+            kind = str(constraint.get("type") or "")
+            if text in seen and seen[text] != kind:
+                output["risk_flags"].append({
+                    "severity": "high",
+                    "text": f"Constraint stated as both {seen[text]} and {kind}: {constraint.get('text')}",
+                })
+            seen.setdefault(text, kind)
+        for hypothesis in _items(content, "hypotheses"):
+            confidence = hypothesis.get("confidence")
+            if isinstance(confidence, (int, float)) and confidence in (0, 1):
+                output["risk_flags"].append({
+                    "severity": "low",
+                    "text": f"Hypothesis {_label(hypothesis, 'claim', 'statement')} has confidence {confidence:g}; "
+                            "certainty leaves no room for counterexamples",
+                })
+
+    @staticmethod
+    def _systems_engineering(content: dict[str, Any], output: dict[str, Any]) -> None:
+        phases = _items(content, "phases")
+        if "phases" in content and not phases:
+            output["risk_flags"].append({"severity": "medium", "text": "No build plan: the spec has no phases"})
+        for phase in phases:
+            if not phase.get("tasks"):
+                output["questions"].append(f"What are the tasks of phase {_label(phase, 'name')}?")
+
+    @staticmethod
+    def _product_ux(content: dict[str, Any], output: dict[str, Any]) -> None:
+        if "objective" in content and PLACEHOLDER_RE.match(str(content.get("objective") or "")):
+            output["risk_flags"].append({"severity": "high", "text": "No clear user benefit: the objective is not stated"})
+        if "success_criteria" in content and not _items(content, "success_criteria"):
+            output["questions"].append("Who is this for, and how will we know it helps them?")
+        for question in _items(content, "open_questions"):
+            if question.get("status", "open") == "open" and question.get("text"):
+                output["questions"].append(str(question["text"]))
+
+
+EVALUATORS = {"stub": StubEvaluator}
+
+
+def load_evaluator(spec: str = "stub") -> Evaluator:
+    """A registered evaluator by name, or ``module:attribute`` (a class or an instance)."""
+    if spec in EVALUATORS:
+        return EVALUATORS[spec]()
+    module_name, _, attribute = spec.partition(":")
+    if not attribute:
+        raise ValueError(f"unknown evaluator {spec!r} (use one of {', '.join(EVALUATORS)} or module:attribute)")
+    evaluator = getattr(importlib.import_module(module_name), attribute)
+    return evaluator() if isinstance(evaluator, type) else evaluator
+
+
+# -- runner -------------------------------------------------------------------
+
+
+class LensResult(NamedTuple):
+    lens_id: str
+    output: dict[str, Any] | None
+    cached: bool
+    error: str | None = None
+
+
+def _canonical(value: Any) -> bytes:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class LensRunner:
+    """Runs lenses concurrently over a target, with per-lens output caching."""
+
+    def __init__(self, elcs_dir: Path, evaluator: Evaluator | None = None, use_cache: bool = True):
+        self.elcs_dir = Path(elcs_dir)
+        self.evaluator = evaluator or StubEvaluator()
+        self.cache_dir = self.elcs_dir / CACHE_DIR if use_cache else None
+        self._schema = None
+
+    def input_hash(self, lens: Lens, target: Target) -> str:
+        """Hash of everything a lens output depends on."""
+        return hashlib.sha256(_canonical({
+            "lens": lens._asdict(),
+            "evaluator": [self.evaluator.name, getattr(self.evaluator, "version", None)],
+            "target": [target.type, target.id, target.view(lens)],
+        })).hexdigest()
+
+    def _validate(self, output: dict[str, Any]) -> None:
+        if self._schema is None:
+            from create_elcs.runtime.validation import load_schemas
+
+            self._schema = load_schemas()["lens-output"]
+        issues = self._schema.validate(output)
+        if issues:
+            raise ValueError("; ".join(f"{issue.location or '/'}: {issue.message}" for issue in issues[:3]))
+
+    def _evaluate(self, lens: Lens, target: Target) -> LensResult:
+        key = self.input_hash(lens, target)
+        cache_path = self.cache_dir / f"{lens.lens_id}-{key[:32]}.json" if self.cache_dir else None
+        if cache_path is not None:
+            try:
+                with open(cache_path, encoding="utf-8") as f:
+                    return LensResult(lens.lens_id, json.load(f), True)
+            except (OSError, json.JSONDecodeError):
+                pass
+        try:
+            findings = self.evaluator.evaluate(lens, target)
+            output = {
+                "output_id": str(uuid.uuid5(TOKEN_NAMESPACE, key)),
+                "lens_id": lens.lens_id,
+                "evaluated_at": _now(),
+                "target": {"type": target.type, "id": target.id},
+                **{field: value for field, value in findings.items() if field not in ("lens_id", "target")},
+            }
+            self._validate(output)
+        except Exception as e:  # An evaluator failing fails only its lens
+            return LensResult(lens.lens_id, None, False, f"{type(e).__name__}: {e}")
+        if cache_path is not None:
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                write_json_atomic(cache_path, output)
+            except OSError:
+                pass
+        return LensResult(lens.lens_id, output, False)
+
+    def run(
+        self,
+        target: Target,
+        lens_ids: Iterable[str] | None = None,
+        workers: int | None = None,
+        write: bool = True,
+    ) -> list[LensResult]:
+        """Evaluate the target with each lens (all seven by default), concurrently.
+
+        With ``write``, outputs are written to ``lenses/{slug}.{lens_id}.json``
+        when they differ from what is there.
+        """
+        wanted = set(lens_ids) if lens_ids is not None else set(LENS_IDS)
+        unknown = wanted - set(LENS_IDS)
+        if unknown:
+            raise ValueError(f"unknown lens: {', '.join(sorted(unknown))}")
+        lenses = [lens for lens in LENSES if lens.lens_id in wanted]
+        if workers == 1 or len(lenses) < 2:
+            results = [self._evaluate(lens, target) for lens in lenses]
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(max_workers=workers or len(lenses)) as executor:
+                results = list(executor.map(lambda lens: self._evaluate(lens, target), lenses))
+        if write:
+            for result in results:
+                if result.output is not None:
+                    self._write_output(target, result.output)
+        return results
+
+    def _write_output(self, target: Target, output: dict[str, Any]) -> None:
+        path = self.elcs_dir / OUTPUT_DIR / f"{target.slug}.{output['lens_id']}.json"
+        try:
+            with open(path, encoding="utf-8") as f:
+                if json.load(f) == output:
+                    return  # Unchanged; leave the mtime alone for mtime-keyed caches
+        except (OSError, json.JSONDecodeError):
+            pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(path, output)
+
+
+def findings_to_tokens(target: Target, results: Iterable[LensResult]) -> list[dict[str, Any]]:
+    """Work tokens for the actionable findings of each lens output.
+
+    Ids are uuid5s of target, lens and finding, so the same finding always
+    maps to the same token.
+    """
+    tokens = []
+    seen = set()
+
+    def add(lens_id: str, token_type: str, summary: str, priority: float, **extra: Any) -> None:
+        token_id = str(uuid.uuid5(TOKEN_NAMESPACE, f"{target.type}:{target.id}:{lens_id}:{token_type}:{summary}"))
+        if token_id in seen:
+            return
+        seen.add(token_id)
+        token = {
+            "token_id": token_id,
+            "type": token_type,
+            "summary": summary,
+            "priority": priority,
+            "created_by": {"lens": lens_id},
+            **extra,
+        }
+        if target.type == "spec":
+            token["spec_ref"] = {"spec_id": target.id}
+        tokens.append(token)
+
+    for result in results:
+        output = result.output
+        if output is None:
+            continue
+        lens_id = result.lens_id
+        for flag in output.get("risk_flags") or []:
+            if flag.get("severity") in TOKEN_SEVERITIES:
+                add(lens_id, "subtask", f"Mitigate {flag['severity']} risk: {flag['text']}",
+                    SEVERITY_PRIORITY[flag["severity"]])
+        for question in output.get("questions") or []:
+            add(lens_id, "question", question, 0.5)
+        for test in output.get("tests_requested") or []:
+            add(lens_id, "test", test["text"], TEST_PRIORITY.get(test.get("priority"), 0.5),
+                required_outputs=[{"kind": "measurement", "description": test["text"]}])
+        for gap in output.get("evidence_gaps") or []:
+            add(lens_id, "evidence_gap", gap, 0.6,
+                required_outputs=[{"kind": "evidence", "description": gap}])
+    return tokens
+
+
+def file_tokens(elcs_dir: Path, tokens: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Create the tokens in one batch; ones that already exist (any folder) are skipped."""
+    from create_elcs.runtime.tokens import TokenStore
+
+    store = TokenStore.for_project(elcs_dir)
+    created = store.create_many(tokens)
+    store.save()
+    return created
@@ -0,0 +1,503 @@
+"""
+Session resumption - what an agent needs to pick a project back up.
+
+Instead of re-reading every checkpoint, token and state file, the resume
+bundle holds:
+
+- the latest journal checkpoint only (``checkpoint-*.json`` per the
+  journal-checkpoint schema, else the newest ``checkpoint-*.md``): summary,
+  ``next_priorities``, blockers, ``tokens_resolved``;
+- its codec (``codec-*.json`` whose ``checkpoint_ref`` names it):
+  ``resumption_instructions`` and the ``decompression_hints`` worth
+  loading up front (glossary, critical/important artifacts, assumption
+  context, decision rationale);
+- what changed since that checkpoint: the state patch from the
+  checkpoint's ``state_version`` to the head (from ``state/history``),
+  tokens closed, created and claimed since, the spec if its version moved;
+- where things stand: completed gates, the best ready tokens and the
+  distance vector, if one has been written.
+
+Each section is cached in ``elcs/.cache/resume.json`` with the signature of
+its inputs and rebuilt only when those change. Only the newest checkpoint
+and codec are parsed, and long lists (token sections, patch operations, the
+state itself when there is no history) are capped at ``max_items`` with
+the rest counted, so resume time and bundle size stay flat however many
+checkpoints and state edits a project accumulates.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from collections.abc import Callable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from create_elcs.runtime import write_json_atomic
+
+CACHE_FILE = ".cache/resume.json"
+CACHE_VERSION = 2
+# Items listed per section; the rest are counted
+MAX_ITEMS = 20
+
+CHECKPOINT_NAME_RE = re.compile(r"^checkpoint-(\d+)(?:-[^.]*)?\.(json|md)$")
+CODEC_NAME_RE = re.compile(r"^codec-.*\.json$")
+MD_FIELD_RE = re.compile(r"^\*\*(Title|Created|Date|State Version|Spec Version)\*\*:\s*(.+?)\s*$", re.MULTILINE)
+MD_HEADING_RE = re.compile(r"^#\s+(.+?)\s*$", re.MULTILINE)
+MD_SECTION_RE = re.compile(r"^##\s+(.+?)\s*$", re.MULTILINE)
+
+# Codec hints loaded into the bundle; retrieval queries stay in the codec
+UPFRONT_HINTS = ("glossary", "assumption_context", "decision_rationale")
+UPFRONT_IMPORTANCE = ("critical", "important")
+
+
+def _read_json(path: Path) -> Any:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _stat_signature(*paths: Path) -> list:
+    signature = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            signature.append([path.name, stat.st_mtime_ns, stat.st_size])
+        except (FileNotFoundError, NotADirectoryError):
+            signature.append([path.name, None])
+    return signature
+
+
+def _timestamp(value: Any) -> float | None:
+    """Epoch seconds of an ISO 8601 date or datetime (naive ones taken as UTC)."""
+    if not value:
+        return None
+    text = str(value).strip()
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _capped(items: list[Any], limit: int) -> dict[str, Any]:
+    return {"count": len(items), "items": items[:limit]}
+
+
+def _capped_patch(patch: list[dict[str, Any]], limit: int) -> dict[str, Any]:
+    """The first ``limit`` operations, and how many of the rest touch each top-level key."""
+    capped = _capped(patch, limit)
+    remaining: dict[str, int] = {}
+    for op in patch[limit:]:
+        parts = str(op.get("path", "")).split("/")
+        key = parts[1].replace("~1", "/").replace("~0", "~") if len(parts) > 1 else ""
+        remaining[key] = remaining.get(key, 0) + 1
+    capped["remaining_by_key"] = remaining
+    return capped
+
+
+# -- checkpoints --------------------------------------------------------------
+
+
+def latest_checkpoint(journal_dir: Path) -> Path | None:
+    """Newest checkpoint file by number (JSON preferred over Markdown)."""
+    best = None
+    try:
+        entries = list(os.scandir(journal_dir))
+    except FileNotFoundError:
+        return None
+    for entry in entries:
+        match = CHECKPOINT_NAME_RE.match(entry.name)
+        if not match or int(match.group(1)) == 0 and entry.name.endswith("-template.md"):
+            continue
+        key = (int(match.group(1)), match.group(2) == "json", entry.name)
+        if best is None or key > best[0]:
+            best = (key, Path(entry.path))
+    return best[1] if best else None
+
+
+def _md_sections(text: str) -> dict[str, str]:
+    sections = {}
+    matches = list(MD_SECTION_RE.finditer(text))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body = text[match.end():end].strip().strip("-").strip()
+        sections[match.group(1).strip().lower()] = body
+    return sections
+
+
+def _md_list(body: str) -> list[str]:
+    items = []
+    for line in body.splitlines():
+        match = re.match(r"^\s*(?:[-*]|\d+\.)\s+(.+)$", line)
+        if match:
+            items.append(match.group(1).strip())
+    return items
+
+
+def parse_checkpoint(path: Path) -> dict[str, Any]:
+    """A checkpoint as journal-checkpoint fields (Markdown ones are parsed best-effort)."""
+    if path.suffix == ".json":
+        data = _read_json(path)
+        return data if isinstance(data, dict) else {}
+
+    text = path.read_text(encoding="utf-8")
+    fields = {name.lower(): value for name, value in MD_FIELD_RE.findall(text)}
+    heading = MD_HEADING_RE.search(text)
+    checkpoint: dict[str, Any] = {
+        "checkpoint_id": path.stem,
+        "title": fields.get("title") or (heading.group(1) if heading else path.stem),
+        "created_at": fields.get("created") or fields.get("date"),
+    }
+    for name, key in (("state version", "state_version"), ("spec version", "spec_version")):
+        number = re.match(r"\d+", fields.get(name, ""))
+        if number:
+            checkpoint[key] = int(number.group())
+    sections = _md_sections(text)
+    if sections.get("summary"):
+        checkpoint["summary"] = sections["summary"].split("\n\n")[0]
+    for section, key in (("next priorities", "next_priorities"), ("blockers", "blockers"),
+                         ("key learnings", "key_learnings")):
+        items = _md_list(sections.get(section, ""))
+        if items:
+            checkpoint[key] = items
+    resolved = re.search(r"(\d+)\s+tokens?\s+closed", sections.get("tokens resolved", ""))
+    if resolved:
+        checkpoint["tokens_resolved"] = int(resolved.group(1))
+    return checkpoint
+
+
+def find_codec(journal_dir: Path, checkpoint_path: Path, checkpoint: dict[str, Any]) -> Path | None:
+    """The codec accompanying a checkpoint (by checkpoint_ref), else the newest codec."""
+    refs = {checkpoint_path.name, checkpoint_path.stem, str(checkpoint.get("checkpoint_id"))}
+    codecs = sorted(
+        (entry.stat().st_mtime_ns, Path(entry.path)) for entry in os.scandir(journal_dir)
+        if CODEC_NAME_RE.match(entry.name)
+    )
+    for _, path in reversed(codecs):
+        codec = _read_json(path)
+        if isinstance(codec, dict) and str(codec.get("checkpoint_ref", "")).rsplit("/", 1)[-1] in refs:
+            return path
+    return codecs[-1][1] if codecs else None
+
+
+# -- bundle -------------------------------------------------------------------
+
+
+class ResumeBuilder:
+    """Builds the resume bundle, rebuilding only sections whose inputs changed."""
+
+    def __init__(self, elcs_dir: Path, max_items: int = MAX_ITEMS, use_cache: bool = True):
+        self.elcs_dir = Path(elcs_dir)
+        self.max_items = max_items
+        self.cache_path = self.elcs_dir / CACHE_FILE if use_cache else None
+        self._sections: dict[str, dict[str, Any]] = {}
+        self._cache_loaded = False
+        self.rebuilt: list[str] = []  # Sections rebuilt by the last build()
+        self._token_store = None
+
+    # Each section: (signature, content) functions
+
+    def _checkpoint_signature(self) -> list:
+        journal_dir = self.elcs_dir / "journal"
+        path = latest_checkpoint(journal_dir)
+        if path is None:
+            return []
+        codecs = []
+        try:
+            codecs = sorted(entry.name for entry in os.scandir(journal_dir) if CODEC_NAME_RE.match(entry.name))
+        except FileNotFoundError:
+            pass
+        return [_stat_signature(path), _stat_signature(*(journal_dir / name for name in codecs))]
+
+    def _checkpoint_content(self) -> dict[str, Any]:
+        journal_dir = self.elcs_dir / "journal"
+        path = latest_checkpoint(journal_dir)
+        if path is None:
+            return {}
+        checkpoint = parse_checkpoint(path)
+        content: dict[str, Any] = {"path": f"journal/{path.name}", "checkpoint": checkpoint}
+        codec_path = find_codec(journal_dir, path, checkpoint)
+        codec = _read_json(codec_path) if codec_path else None
+        if isinstance(codec, dict):
+            hints = codec.get("decompression_hints") or {}
+            upfront = {name: hints[name] for name in UPFRONT_HINTS if hints.get(name)}
+            artifacts = [
+                artifact for artifact in hints.get("artifact_index") or []
+                if isinstance(artifact, dict) and artifact.get("importance") in UPFRONT_IMPORTANCE
+            ]
+            if artifacts:
+                upfront["artifact_index"] = artifacts
+            content["codec"] = {
+                "path": f"journal/{codec_path.name}",
+                "resumption_instructions": codec.get("resumption_instructions"),
+                "decompression_hints": upfront,
+            }
+        return content
+
+    def _state_signature(self, since: int | None) -> list:
+        history = self.elcs_dir / "state" / "history" / "deltas.jsonl"
+        return [since, _stat_signature(self.elcs_dir / "state" / "current.json", history)]
+
+    def _state_content(self, since: int | None) -> dict[str, Any]:
+        from create_elcs.runtime.state_store import StateStore
+
+        store = StateStore.for_project(self.elcs_dir)
+        try:
+            head = store.head()
+        except (OSError, json.JSONDecodeError):
+            return {}
+        version = head.get("version")
+        content: dict[str, Any] = {"version": version, "checkpoint_version": since}
+        if since is not None and since == version:
+            content["changes"] = _capped_patch([], self.max_items)
+            return content
+        if since is not None:
+            try:
+                content["changes"] = _capped_patch(store.diff(since, store.head_version), self.max_items)
+                if store.head_version != version:
+                    content["unrecorded_edits"] = True
+                return content
+            except (KeyError, ValueError):
+                pass  # Checkpoint version isn't in the recorded history
+        # Without history the whole state is the change
+        content["state"] = {
+            key: _capped(head[key], self.max_items) if isinstance(head.get(key), list) else head.get(key)
+            for key in ("assumptions", "hypotheses", "evidence", "constraints")
+        }
+        return content
+
+    def _tokens(self):
+        from create_elcs.runtime.tokens import TokenStore
+
+        if self._token_store is None:
+            self._token_store = TokenStore.for_project(self.elcs_dir)
+        return self._token_store
+
+    def _tokens_signature(self, since: str | None) -> list:
+        digest = hashlib.sha1()
+        for folder, token in self._tokens().entries():
+            # Entries are replaced whenever their file changes
+            digest.update(f"{folder}/{token['token_id']}/{token['status']}/{token['claimed_by']}\n".encode())
+        return [since, digest.hexdigest()]
+
+    def _tokens_content(self, since: str | None) -> dict[str, Any]:
+        store = self._tokens()
+
+        def brief(token: dict[str, Any]) -> dict[str, Any]:
+            return {key: token[key] for key in ("token_id", "type", "summary", "priority", "claimed_by") if token.get(key) is not None}
+
+        closed, created = [], []
+        since_ts = _timestamp(since)
+        if since_ts is not None:
+            for token in store.tokens("closed"):
+                path = store.path(token["token_id"])
+                try:
+                    # Closing rewrites the file, so older files were closed before the checkpoint
+                    if path is None or path.stat().st_mtime < since_ts:
+                        continue
+                    document = store.load(token["token_id"]) or {}
+                except (OSError, json.JSONDecodeError):
+                    continue
+                completed = _timestamp(document.get("completed_at"))
+                if completed is not None and completed > since_ts:
+                    closed.append((completed, {**brief(token), "outcome": (document.get("resolution") or {}).get("outcome")}))
+            created = [
+                brief(token) for token in store.tokens()
+                if (_timestamp(token.get("created_at")) or 0) > since_ts
+            ]
+        return {
+            "closed_since_checkpoint": _capped([token for _, token in sorted(closed, key=lambda item: item[0])], self.max_items),
+            "created_since_checkpoint": _capped(created, self.max_items),
+            "claimed": _capped([brief(token) for token in store.tokens("claimed")], self.max_items),
+            "ready": _capped([brief(token) for token in store.ready()], self.max_items),
+            "blocked": len(store.blocked()),
+        }
+
+    def _project_signature(self, spec_version: int | None) -> list:
+        gates = self.elcs_dir / ".gates"
+        try:
+            gate_names = sorted(os.listdir(gates))
+        except FileNotFoundError:
+            gate_names = []
+        return [spec_version, gate_names, _stat_signature(
+            self.elcs_dir / "spec" / "spec.json", self.elcs_dir / "state" / "distance-vector.json",
+        )]
+
+    def _project_content(self, spec_version: int | None) -> dict[str, Any]:
+        content: dict[str, Any] = {}
+        try:
+            content["gates_complete"] = sorted(
+                name[:-len(".complete")] for name in os.listdir(self.elcs_dir / ".gates") if name.endswith(".complete")
+            )
+        except FileNotFoundError:
+            content["gates_complete"] = []
+        spec = _read_json(self.elcs_dir / "spec" / "spec.json")
+        if isinstance(spec, dict):
+            content["objective"] = spec.get("objective")
+            if spec.get("version") != spec_version:
+                # New, or moved since the checkpoint; include what agents select work by
+                content["spec"] = {
+                    "version": spec.get("version"),
+                    "changed": spec_version is not None,
+                    "success_criteria": spec.get("success_criteria") or [],
+                    "open_questions": [
+                        question for question in spec.get("open_questions") or []
+                        if isinstance(question, dict) and question.get("status", "open") == "open"
+                    ],
+                }
+        vector = _read_json(self.elcs_dir / "state" / "distance-vector.json")
+        if isinstance(vector, dict):
+            content["distance"] = {key: vector.get(key) for key in ("total_distance", "trend", "components", "hotspots")}
+        return content
+
+    def _load_cache(self) -> None:
+        self._cache_loaded = True
+        if self.cache_path is None:
+            return
+        data = _read_json(self.cache_path)
+        if isinstance(data, dict) and data.get("version") == CACHE_VERSION and data.get("max_items") == self.max_items:
+            self._sections = data.get("sections", {})
+
+    def _section(self, name: str, signature: list, build: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+        # Round-trip through JSON so cached and fresh signatures compare alike
+        signature = json.loads(json.dumps(signature))
+        cached = self._sections.get(name)
+        if cached is not None and cached["signature"] == signature:
+            return cached["content"]
+        content = build()
+        self._sections[name] = {"signature": signature, "content": content}
+        self.rebuilt.append(name)
+        return content
+
+    def build(self) -> dict[str, Any]:
+        """The resume bundle as a dict (see ``render`` for the text form)."""
+        if not self._cache_loaded:
+            self._load_cache()
+        self.rebuilt = []
+        checkpoint = self._section("checkpoint", self._checkpoint_signature(), self._checkpoint_content)
+        fields = checkpoint.get("checkpoint", {})
+        since_version = fields.get("state_version") if isinstance(fields.get("state_version"), int) else None
+        since_time = str(fields["created_at"]) if fields.get("created_at") else None
+        spec_version = fields.get("spec_version") if isinstance(fields.get("spec_version"), int) else None
+
+        bundle = {
+            "checkpoint": checkpoint,
+            "state": self._section("state", self._state_signature(since_version),
+                                   lambda: self._state_content(since_version)),
+            "tokens": self._section("tokens", self._tokens_signature(since_time),
+                                    lambda: self._tokens_content(since_time)),
+            "project": self._section("project", self._project_signature(spec_version),
+                                     lambda: self._project_content(spec_version)),
+        }
+        if self.rebuilt and self.cache_path is not None:
+            try:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                write_json_atomic(self.cache_path, {
+                    "version": CACHE_VERSION, "max_items": self.max_items, "sections": self._sections,
+                }, indent=None)
+            except OSError:
+                pass
+        if self._token_store is not None:
+            self._token_store.save()
+        return bundle
+
+
+def _json_line(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(", ", ": "))
+
+
+def render(bundle: dict[str, Any]) -> str:
+    """The bundle as compact Markdown for an agent's context."""
+    lines = ["# Resume", ""]
+    checkpoint = bundle["checkpoint"]
+    fields = checkpoint.get("checkpoint")
+    if fields:
+        lines.append(f"## Last checkpoint: {fields.get('title')} ({checkpoint['path']})")
+        lines.append(f"Created {fields.get('created_at') or '?'}, state version {fields.get('state_version', '?')}"
+                     + (f", {fields['tokens_resolved']} tokens resolved" if "tokens_resolved" in fields else ""))
+        if fields.get("summary"):
+            lines += ["", fields["summary"]]
+        for key, title in (("next_priorities", "Next priorities"), ("blockers", "Blockers")):
+            if fields.get(key):
+                lines += ["", f"{title}:"] + [f"- {item}" for item in fields[key]]
+    else:
+        lines.append("## No checkpoint yet - read elcs/PROTOCOL.md and elcs/QUICKSTART.md")
+    codec = checkpoint.get("codec")
+    if codec:
+        if codec.get("resumption_instructions"):
+            lines += ["", f"## Resumption instructions ({codec['path']})", codec["resumption_instructions"]]
+        for name, value in codec.get("decompression_hints", {}).items():
+            lines += ["", f"### {name.replace('_', ' ').capitalize()}"] + [f"- {_json_line(item)}" for item in value]
+
+    state = bundle["state"]
+    if state:
+        lines += ["", f"## State (version {state.get('version')})"]
+        if "changes" in state:
+            changes = state["changes"]
+            if changes["count"]:
+                shown = f", showing {len(changes['items'])} of {changes['count']}" if changes["remaining_by_key"] else ""
+                lines.append(f"Changes since version {state['checkpoint_version']} (JSON Patch{shown}):")
+                lines += [f"- {_json_line(op)}" for op in changes["items"]]
+                if changes["remaining_by_key"]:
+                    lines.append("Not shown: " + ", ".join(
+                        f"{count} on {key or '/'}" for key, count in sorted(changes["remaining_by_key"].items())
+                    ) + f" (see `elcs state diff {state['checkpoint_version']}`)")
+            else:
+                lines.append("Unchanged since the checkpoint.")
+            if state.get("unrecorded_edits"):
+                lines.append("current.json has unrecorded edits (run `elcs state record`).")
+        elif "state" in state:
+            lines.append("Current state (no recorded version to diff from):")
+            for key, value in state["state"].items():
+                if not isinstance(value, dict) or "count" not in value:
+                    if value is not None:
+                        lines.append(f"{key}: {_json_line(value)}")
+                    continue
+                more = value["count"] - len(value["items"])
+                lines.append(f"{key}: {value['count']}" + (f" (showing {len(value['items'])})" if more else ""))
+                lines += [f"- {_json_line(item)}" for item in value["items"]]
+
+    tokens = bundle["tokens"]
+    lines += ["", "## Tokens"]
+    for key, title in (("closed_since_checkpoint", "Closed since checkpoint"),
+                       ("created_since_checkpoint", "Created since checkpoint"),
+                       ("claimed", "Claimed (in progress)"), ("ready", "Ready, best first")):
+        section = tokens[key]
+        if not section["count"]:
+            continue
+        more = section["count"] - len(section["items"])
+        lines.append(f"{title}: {section['count']}" + (f" (showing {len(section['items'])})" if more else ""))
+        for token in section["items"]:
+            extra = f" [{token['claimed_by']}]" if token.get("claimed_by") else ""
+            outcome = f" -> {token['outcome']}" if token.get("outcome") else ""
+            lines.append(f"- {token['token_id']} ({token.get('type', '?')}){extra}: {token.get('summary', '')}{outcome}")
+    if tokens["blocked"]:
+        lines.append(f"Blocked: {tokens['blocked']}")
+
+    project = bundle["project"]
+    lines += ["", "## Project"]
+    if project.get("objective"):
+        lines.append(f"Objective: {project['objective']}")
+    lines.append(f"Gates complete: {', '.join(project.get('gates_complete', [])) or 'none'}")
+    if project.get("spec"):
+        spec = project["spec"]
+        lines.append(f"Spec changed since the checkpoint (now version {spec['version']}):" if spec["changed"]
+                     else f"Spec (version {spec['version']}):")
+        lines += [f"- {_json_line(criterion)}" for criterion in project["spec"]["success_criteria"]]
+        lines += [f"- open question: {_json_line(question)}" for question in project["spec"]["open_questions"]]
+    if project.get("distance"):
+        distance = project["distance"]
+        lines.append(f"Distance: {distance.get('total_distance')} ({distance.get('trend')})")
+        for hotspot in (distance.get("hotspots") or [])[:3]:
+            lines.append(f"- {hotspot.get('component')}: {hotspot.get('reason')}")
+    return "\n".join(lines) + "\n"
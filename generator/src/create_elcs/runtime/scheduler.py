@@ -0,0 +1,389 @@
+"""
+Dependency-aware scheduling of work tokens.
+
+The scheduler turns a project's tokens into a DAG: an edge runs from each
+token to everything that waits on it, whether declared as the waiter's
+``dependencies`` or the blocker's ``blocks``. For every token still to do it
+maintains
+
+- the number of unfinished predecessors (zero means ready, once open),
+- its tail: its own estimated cost plus the longest chain of work that
+  can only start after it. The token with the longest tail heads the
+  critical path, and starting it first shortens the project the most.
+
+Both are updated incrementally from the token store: closing a token
+decrements its successors' counts and, because everything before it is
+normally closed already, leaves every other tail alone. Adding tokens or
+changing edges marks the tails stale, and they are recomputed in one
+O(V + E) pass the next time they're needed.
+
+``assign`` hands out batches of ready tokens (ready tokens never depend on
+each other) to N agents: longest tail first, each to the least-loaded agent
+whose remaining budget covers the token's ``budget``.
+
+Cycles are reported by ``cycles()``; their tokens never become ready.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from create_elcs.runtime.tokens import CLOSED, OPEN, TokenConflict, TokenStore, priority_key
+
+BUDGET_FIELDS = ("tool_calls", "tokens", "time_seconds")
+
+# Cost of a token with no time_seconds budget, for critical-path estimates
+DEFAULT_COST_SECONDS = 900.0
+
+
+class _Node:
+    __slots__ = ("token_id", "token", "folder", "cost", "preds", "succs", "unmet", "tail")
+
+    def __init__(self, token_id: str):
+        self.token_id = token_id
+        self.token: dict[str, Any] | None = None  # None: referenced but not found
+        self.folder: str | None = None
+        self.cost = 0.0
+        self.preds: set[str] = set()
+        self.succs: set[str] = set()
+        self.unmet = 0
+        self.tail = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.folder == CLOSED
+
+
+@dataclass
+class AgentPlan:
+    """The batch of tokens assigned to one agent."""
+
+    agent_id: str
+    budget: dict[str, float]
+    tokens: list[dict[str, Any]] = field(default_factory=list)
+    used: dict[str, float] = field(default_factory=dict)
+
+    def fits(self, need: dict[str, float]) -> bool:
+        return all(
+            self.used.get(name, 0) + need.get(name, 0) <= limit
+            for name, limit in self.budget.items()
+        )
+
+    def add(self, token: dict[str, Any], need: dict[str, float]) -> None:
+        self.tokens.append(token)
+        for name, amount in need.items():
+            self.used[name] = self.used.get(name, 0) + amount
+
+
+def token_budget(token: dict[str, Any]) -> dict[str, float]:
+    """The resource budget a token asks for (missing fields count as zero)."""
+    budget = token.get("budget") or {}
+    return {name: budget[name] for name in BUDGET_FIELDS if isinstance(budget.get(name), (int, float))}
+
+
+class Scheduler:
+    """Token DAG with an incrementally maintained ready set and critical path."""
+
+    def __init__(self, store: TokenStore, default_cost: float = DEFAULT_COST_SECONDS):
+        self.store = store
+        self.default_cost = default_cost
+        self._nodes: dict[str, _Node] = {}
+        self._ready: set[str] = set()
+        self._tails_stale = True
+
+    # -- graph maintenance -------------------------------------------------
+
+    def _node(self, token_id: str) -> _Node:
+        node = self._nodes.get(token_id)
+        if node is None:
+            node = self._nodes[token_id] = _Node(token_id)
+        return node
+
+    def _link(self, pred: str, succ: str) -> None:
+        pred_node, succ_node = self._node(pred), self._node(succ)
+        if succ in pred_node.succs:
+            return
+        pred_node.succs.add(succ)
+        succ_node.preds.add(pred)
+        if not pred_node.done:
+            succ_node.unmet += 1
+
+    def _unlink(self, pred: str, succ: str) -> None:
+        pred_node, succ_node = self._nodes[pred], self._nodes[succ]
+        pred_node.succs.discard(succ)
+        succ_node.preds.discard(pred)
+        if not pred_node.done:
+            succ_node.unmet -= 1
+
+    def _declared(self, node: _Node) -> set[tuple[str, str]]:
+        if node.token is None:
+            return set()
+        edges = {(dep, node.token_id) for dep in node.token["dependencies"]}
+        edges.update((node.token_id, blocked) for blocked in node.token["blocks"])
+        return edges
+
+    def _set_done(self, node: _Node, done: bool) -> None:
+        if node.done == done:
+            return
+        delta = -1 if done else 1
+        for succ in node.succs:
+            self._nodes[succ].unmet += delta
+            self._update_ready(self._nodes[succ])
+        if not done or any(not self._nodes[pred].done for pred in node.preds):
+            # Reopened, or closed ahead of its own predecessors (whose
+            # tails include this token)
+            self._tails_stale = True
+        node.tail = 0.0
+
+    def _update_ready(self, node: _Node) -> None:
+        token = node.token
+        if (
+            token is not None and node.folder == OPEN and node.unmet == 0
+            and token["status"] != "blocked"
+        ):
+            self._ready.add(node.token_id)
+        else:
+            self._ready.discard(node.token_id)
+
+    def _upsert(self, token: dict[str, Any], folder: str) -> None:
+        node = self._node(token["token_id"])
+        old_edges = self._declared(node)
+        old_cost = node.cost
+        self._set_done(node, folder == CLOSED)
+        node.folder = folder
+        node.token = token
+        node.cost = self._cost(token)
+
+        new_edges = self._declared(node)
+        if new_edges != old_edges:
+            for pred, succ in old_edges - new_edges:
+                # Keep an edge the other end still declares
+                if (pred, succ) not in self._declared(self._nodes[succ if pred == token["token_id"] else pred]):
+                    self._unlink(pred, succ)
+            for pred, succ in new_edges - old_edges:
+                self._link(pred, succ)
+            self._tails_stale = True
+            for other_id in {pred for pred, _ in new_edges ^ old_edges} | {succ for _, succ in new_edges ^ old_edges}:
+                self._update_ready(self._nodes[other_id])
+        if node.cost != old_cost:
+            self._tails_stale = True
+        self._update_ready(node)
+
+    def _discard(self, token_id: str) -> None:
+        node = self._nodes[token_id]
+        # Tokens that waited on it now wait on a missing token
+        self._set_done(node, False)
+        node.folder = None
+        edges = self._declared(node)
+        # Cleared first, so a dependency on itself is dropped with the token
+        node.token = None
+        for pred, succ in edges:
+            other = self._nodes[succ if pred == token_id else pred]
+            if (pred, succ) not in self._declared(other):
+                self._unlink(pred, succ)
+                self._update_ready(other)
+        node.cost = 0.0
+        self._ready.discard(token_id)
+        self._tails_stale = True
+        if not node.preds and not node.succs:
+            del self._nodes[token_id]
+
+    def _cost(self, token: dict[str, Any]) -> float:
+        budget = token["budget"] or {}
+        seconds = budget.get("time_seconds")
+        return float(seconds) if isinstance(seconds, (int, float)) and seconds > 0 else self.default_cost
+
+    def sync(self) -> None:
+        """Apply every token change since the last sync."""
+        seen = set()
+        for folder, token in self.store.entries():
+            token_id = token["token_id"]
+            seen.add(token_id)
+            node = self._nodes.get(token_id)
+            # The store replaces a token's dict whenever its file changes
+            if node is None or node.token is not token or node.folder != folder:
+                self._upsert(token, folder)
+        for token_id in [token_id for token_id, node in self._nodes.items() if node.token and token_id not in seen]:
+            self._discard(token_id)
+
+    def _compute_tails(self) -> None:
+        """Longest remaining chain from each unfinished token (Kahn order, reversed)."""
+        pending = {token_id: 0 for token_id, node in self._nodes.items() if not node.done}
+        for token_id in pending:
+            for succ in self._nodes[token_id].succs:
+                if succ in pending:
+                    pending[succ] += 1
+        order = [token_id for token_id, count in pending.items() if count == 0]
+        for token_id in order:
+            for succ in self._nodes[token_id].succs:
+                if succ in pending:
+                    pending[succ] -= 1
+                    if pending[succ] == 0:
+                        order.append(succ)
+        for node in self._nodes.values():
+            node.tail = 0.0 if node.done else node.cost  # Tokens on cycles keep their own cost
+        for token_id in reversed(order):
+            node = self._nodes[token_id]
+            longest = max((self._nodes[succ].tail for succ in node.succs if succ in pending), default=0.0)
+            node.tail = node.cost + longest
+        self._tails_stale = False
+
+    def _refresh(self) -> None:
+        self.sync()
+        if self._tails_stale:
+            self._compute_tails()
+
+    # -- queries -----------------------------------------------------------
+
+    def _ready_key(self, node: _Node) -> tuple:
+        return (-node.tail, *priority_key(node.token), node.token_id)
+
+    def ready(self) -> list[dict[str, Any]]:
+        """Ready tokens, critical path first, then by priority."""
+        self._refresh()
+        nodes = sorted((self._nodes[token_id] for token_id in self._ready), key=self._ready_key)
+        return [node.token for node in nodes]
+
+    def ready_tokens(self) -> dict[str, dict[str, Any]]:
+        """Ready tokens by ID, unordered (skips the critical-path computation)."""
+        self.sync()
+        return {token_id: self._nodes[token_id].token for token_id in self._ready}
+
+    def tail(self, token_id: str) -> float:
+        """Estimated seconds from starting this token to finishing everything after it."""
+        self._refresh()
+        node = self._nodes.get(token_id)
+        return node.tail if node else 0.0
+
+    def critical_path(self) -> list[str]:
+        """The longest chain of unfinished tokens, first to last."""
+        self._refresh()
+        starts = [node for node in self._nodes.values() if not node.done and node.token is not None]
+        if not starts:
+            return []
+        node = max(starts, key=lambda node: node.tail)
+        path, visited = [node.token_id], {node.token_id}
+        while True:
+            following = [
+                self._nodes[succ] for succ in node.succs
+                if succ not in visited and not self._nodes[succ].done
+            ]
+            if not following:
+                return path
+            node = max(following, key=lambda succ: succ.tail)
+            path.append(node.token_id)
+            visited.add(node.token_id)
+
+    def missing(self) -> dict[str, list[str]]:
+        """Referenced token IDs with no token file -> the tokens waiting on them."""
+        self._refresh()
+        return {
+            token_id: sorted(node.succs)
+            for token_id, node in self._nodes.items() if node.token is None and node.succs
+        }
+
+    def cycles(self) -> list[list[str]]:
+        """Groups of unfinished tokens that (transitively) wait on each other."""
+        self.sync()
+        # Iterative Tarjan over unfinished tokens
+        index: dict[str, int] = {}
+        low: dict[str, int] = {}
+        on_stack: set[str] = set()
+        stack: list[str] = []
+        groups = []
+        for root in self._nodes:
+            if root in index or self._nodes[root].done:
+                continue
+            work = [(root, iter(self._nodes[root].succs))]
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                token_id, succs = work[-1]
+                for succ in succs:
+                    if self._nodes[succ].done:
+                        continue
+                    if succ not in index:
+                        index[succ] = low[succ] = len(index)
+                        stack.append(succ)
+                        on_stack.add(succ)
+                        work.append((succ, iter(self._nodes[succ].succs)))
+                        break
+                    if succ in on_stack:
+                        low[token_id] = min(low[token_id], index[succ])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[token_id])
+                    if low[token_id] == index[token_id]:
+                        group = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            group.append(member)
+                            if member == token_id:
+                                break
+                        if len(group) > 1 or token_id in self._nodes[token_id].succs:
+                            groups.append(sorted(group))
+        return groups
+
+    # -- assignment --------------------------------------------------------
+
+    def assign(
+        self,
+        agents: dict[str, dict[str, float]],
+        max_tokens: int | None = None,
+    ) -> list[AgentPlan]:
+        """Split the ready tokens between agents without exceeding their budgets.
+
+        ``agents`` maps agent IDs to budgets using the token budget fields
+        (``tool_calls``, ``tokens``, ``time_seconds``); a missing field is
+        unlimited. Tokens go longest tail first to the least-loaded agent
+        that can afford them, at most ``max_tokens`` each. Tokens nobody can
+        afford are left unassigned.
+        """
+        plans = [AgentPlan(agent_id, dict(budget)) for agent_id, budget in agents.items()]
+        load = {plan.agent_id: 0.0 for plan in plans}
+        for token in self.ready():
+            need = token_budget(token)
+            candidates = [
+                plan for plan in plans
+                if plan.fits(need) and (max_tokens is None or len(plan.tokens) < max_tokens)
+            ]
+            if not candidates:
+                continue
+            plan = min(candidates, key=lambda plan: load[plan.agent_id])
+            plan.add(token, need)
+            load[plan.agent_id] += self._nodes[token["token_id"]].cost
+        return plans
+
+    def dispatch(
+        self,
+        agents: dict[str, dict[str, float]],
+        max_tokens: int | None = None,
+    ) -> list[AgentPlan]:
+        """``assign``, then claim each batch for its agent.
+
+        Tokens another agent claimed in the meantime are dropped from the
+        returned plans.
+        """
+        return self.claim_plans(self.assign(agents, max_tokens=max_tokens))
+
+    def claim_plans(self, plans: list[AgentPlan]) -> list[AgentPlan]:
+        """Claim each plan's tokens for its agent, dropping the ones that lost the race."""
+        for plan in plans:
+            claimed = []
+            for token in plan.tokens:
+                try:
+                    self.store.claim(token["token_id"], plan.agent_id)
+                except TokenConflict:
+                    continue
+                claimed.append(self.store.get(token["token_id"]))
+            plan.tokens = claimed
+            plan.used = {}
+            for token in claimed:
+                for name, amount in token_budget(token).items():
+                    plan.used[name] = plan.used.get(name, 0) + amount
+        return plans
@@ -0,0 +1,360 @@
+"""
+Versioned epistemic state - ``state/current.json`` plus its history.
+
+``current.json`` stays the head: agents read and edit it as the protocol
+describes, so reading the head costs one file read. Every version is also
+recorded in ``state/history/``:
+
+- ``deltas.jsonl``: one line per version with its parent, author, time and
+  the JSON Patch (RFC 6902 ``add``/``remove``/``replace``) that turns the
+  parent into it. Lists of items with an ``id`` (assumptions, hypotheses,
+  evidence, constraints...) are diffed by id, so adding one item is one op.
+- ``snapshots/v000050.json``: the full document every ``snapshot_interval``
+  versions (and the first recorded one).
+
+Any version is rebuilt from the nearest snapshot at or before it plus at
+most ``snapshot_interval - 1`` deltas, so reconstruction cost is bounded and
+storage grows with the size of the changes, not with full copies.
+
+``record`` captures edits made to current.json by hand; ``commit`` writes a
+new document and records it; ``rollback`` makes an old version the head
+again as a new version, so history is never rewritten.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import copy
+import difflib
+import json
+import os
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from create_elcs.runtime import write_json_atomic
+
+HISTORY_DIR = "state/history"
+DELTAS_FILE = "deltas.jsonl"
+SNAPSHOT_INTERVAL = 50
+
+
+class VersionInfo(NamedTuple):
+    version: int
+    parent: int | None
+    at: str
+    author: str | None
+    message: str | None
+    ops: int  # Patch length (0 for a snapshot-only base version)
+
+
+# -- JSON Patch ---------------------------------------------------------------
+
+
+def _escape(key: Any) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def _item_key(item: Any) -> str:
+    if isinstance(item, dict) and isinstance(item.get("id"), (str, int)):
+        return f"id:{item['id']}"
+    return json.dumps(item, sort_keys=True)
+
+
+def make_patch(old: Any, new: Any, path: str = "") -> list[dict[str, Any]]:
+    """JSON Patch operations turning ``old`` into ``new``."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+            else:
+                ops.extend(make_patch(old[key], value, f"{path}/{_escape(key)}"))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        return _list_patch(old, new, path)
+    # Unlike ==, keeps 1, 1.0 and true apart
+    if type(old) is type(new) and old == new:
+        return []
+    return [{"op": "replace", "path": path, "value": new}]
+
+
+def _list_patch(old: list, new: list, path: str) -> list[dict[str, Any]]:
+    matcher = difflib.SequenceMatcher(None, [_item_key(x) for x in old], [_item_key(x) for x in new], autojunk=False)
+    ops: list[dict[str, Any]] = []
+    shift = 0  # Index change in the partly patched list
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            # Same ids; the items themselves may still differ
+            for offset in range(i2 - i1):
+                ops.extend(make_patch(old[i1 + offset], new[j1 + offset], f"{path}/{i1 + offset + shift}"))
+            continue
+        common = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+        for offset in range(common):
+            ops.extend(make_patch(old[i1 + offset], new[j1 + offset], f"{path}/{i1 + offset + shift}"))
+        for _ in range(i2 - i1 - common):
+            ops.append({"op": "remove", "path": f"{path}/{i1 + common + shift}"})
+        for offset in range(common, j2 - j1):
+            ops.append({"op": "add", "path": f"{path}/{i1 + offset + shift}", "value": new[j1 + offset]})
+        shift += (j2 - j1) - (i2 - i1)
+    return ops
+
+
+def _parse_pointer(pointer: str) -> list[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise ValueError(f"invalid JSON pointer: {pointer!r}")
+    return [part.replace("~1", "/").replace("~0", "~") for part in pointer[1:].split("/")]
+
+
+def apply_patch(document: Any, patch: list[dict[str, Any]], in_place: bool = False) -> Any:
+    """Apply JSON Patch ``add``/``remove``/``replace`` operations."""
+    if not in_place:
+        document = copy.deepcopy(document)
+    for op in patch:
+        parts = _parse_pointer(op["path"])
+        value = copy.deepcopy(op.get("value"))
+        if not parts:
+            if op["op"] == "remove":
+                raise ValueError("can't remove the whole document")
+            document = value
+            continue
+        parent = document
+        for part in parts[:-1]:
+            parent = parent[int(part)] if isinstance(parent, list) else parent[part]
+        last = parts[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if op["op"] == "add":
+                parent.insert(index, value)
+            elif op["op"] == "remove":
+                del parent[index]
+            elif op["op"] == "replace":
+                parent[index] = value
+            else:
+                raise ValueError(f"unsupported patch op: {op['op']}")
+        else:
+            if op["op"] in ("add", "replace"):
+                if op["op"] == "replace" and last not in parent:
+                    raise ValueError(f"replace of missing member {op['path']}")
+                parent[last] = value
+            elif op["op"] == "remove":
+                del parent[last]
+            else:
+                raise ValueError(f"unsupported patch op: {op['op']}")
+    return document
+
+
+# -- store ------------------------------------------------------------------
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class StateStore:
+    """current.json with delta-encoded history, snapshots and rollback."""
+
+    def __init__(self, elcs_dir: Path, snapshot_interval: int = SNAPSHOT_INTERVAL):
+        self.elcs_dir = Path(elcs_dir)
+        self.current_path = self.elcs_dir / "state" / "current.json"
+        self.history_dir = self.elcs_dir / HISTORY_DIR
+        self.deltas_path = self.history_dir / DELTAS_FILE
+        self.snapshot_dir = self.history_dir / "snapshots"
+        self.snapshot_interval = snapshot_interval
+        # version -> (offset, length) of its line in deltas.jsonl
+        self._offsets: dict[int, tuple[int, int]] = {}
+        self._scanned = 0
+        self._head_version: int | None = None
+        self._materialized: tuple[int, Any] | None = None  # Last rebuilt version
+
+    @classmethod
+    def for_project(cls, elcs_dir: Path) -> StateStore:
+        return cls(elcs_dir)
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Serialize writers across processes (where flock exists)."""
+        self.history_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+        with open(self.history_dir / ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _scan(self) -> None:
+        """Index lines appended to deltas.jsonl since the last scan."""
+        try:
+            with open(self.deltas_path, "rb") as f:
+                f.seek(self._scanned)
+                offset = self._scanned
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Being written
+                    entry = json.loads(line)
+                    self._offsets[entry["version"]] = (offset, len(line))
+                    self._head_version = entry["version"]
+                    offset += len(line)
+                self._scanned = offset
+        except FileNotFoundError:
+            pass
+
+    def _entry(self, version: int) -> dict[str, Any]:
+        offset, length = self._offsets[version]
+        with open(self.deltas_path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def _snapshot_path(self, version: int) -> Path:
+        return self.snapshot_dir / f"v{version:06d}.json"
+
+    def _snapshots(self) -> list[int]:
+        try:
+            return sorted(
+                int(entry.name[1:-5]) for entry in os.scandir(self.snapshot_dir)
+                if entry.name.startswith("v") and entry.name.endswith(".json")
+            )
+        except FileNotFoundError:
+            return []
+
+    # -- reading -----------------------------------------------------------
+
+    def head(self) -> dict[str, Any]:
+        """The current state document."""
+        with open(self.current_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    @property
+    def head_version(self) -> int | None:
+        """Latest recorded version (None before anything is recorded)."""
+        self._scan()
+        return self._head_version
+
+    def versions(self) -> list[VersionInfo]:
+        self._scan()
+        infos = []
+        for version in sorted(self._offsets):
+            entry = self._entry(version)
+            infos.append(VersionInfo(
+                version, entry.get("parent"), entry.get("at", ""), entry.get("author"),
+                entry.get("message"), len(entry.get("patch") or []),
+            ))
+        return infos
+
+    def get(self, version: int) -> dict[str, Any]:
+        """Rebuild a recorded version: nearest snapshot, then its deltas."""
+        self._scan()
+        if version not in self._offsets:
+            raise KeyError(f"state version {version} was not recorded")
+        if self._materialized and self._materialized[0] == version:
+            return copy.deepcopy(self._materialized[1])
+
+        start = max((v for v in self._snapshots() if v <= version), default=None)
+        if (
+            self._materialized and self._materialized[0] < version
+            and (start is None or self._materialized[0] >= start)
+        ):
+            # Continuing from the last rebuilt version is cheaper
+            base_version, document = self._materialized[0], copy.deepcopy(self._materialized[1])
+        elif start is not None:
+            base_version = start
+            with open(self._snapshot_path(start), encoding="utf-8") as f:
+                document = json.load(f)
+        else:
+            raise ValueError(f"no snapshot at or before version {version}")
+        for v in sorted(v for v in self._offsets if base_version < v <= version):
+            document = apply_patch(document, self._entry(v)["patch"], in_place=True)
+        self._materialized = (version, copy.deepcopy(document))
+        return document
+
+    def diff(self, old_version: int, new_version: int) -> list[dict[str, Any]]:
+        return make_patch(self.get(old_version), self.get(new_version))
+
+    # -- writing -----------------------------------------------------------
+
+    def _append(self, document: dict[str, Any], author: str | None, message: str | None, **extra: Any) -> int:
+        """Record document as the next version. Caller holds the lock."""
+        self._scan()
+        parent = self._head_version
+        claimed = document.get("version")
+        if parent is None:
+            version = claimed if isinstance(claimed, int) and claimed > 0 else 1
+            document["version"] = version
+            patch = None
+        else:
+            version = claimed if isinstance(claimed, int) and claimed > parent else parent + 1
+            document["version"] = version
+            document["parent_version"] = parent
+            patch = make_patch(self.get(parent), document)
+
+        entry = {"version": version, "parent": parent, "at": _now(), "author": author, "message": message, **extra}
+        if patch is not None:
+            entry["patch"] = patch
+        if parent is None or version // self.snapshot_interval != parent // self.snapshot_interval:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            write_json_atomic(self._snapshot_path(version), document)
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        with open(self.deltas_path, "ab") as f:
+            f.write(line)
+        self._scan()
+        self._materialized = (version, copy.deepcopy(document))
+        return version
+
+    def record(self, author: str | None = None, message: str | None = None) -> int | None:
+        """Record current.json as a new version if it changed. Returns the version, or None."""
+        with self._locked():
+            document = self.head()
+            parent = self.head_version
+            if parent is not None and _same_document(self.get(parent), document):
+                return None
+            numbering = (document.get("version"), document.get("parent_version"))
+            version = self._append(document, author, message)
+            if (document["version"], document.get("parent_version")) != numbering:
+                write_json_atomic(self.current_path, document)
+            return version
+
+    def commit(self, document: dict[str, Any], author: str | None = None, message: str | None = None) -> int:
+        """Make ``document`` the new head. Returns its version."""
+        document = copy.deepcopy(document)
+        document["last_updated"] = _now()
+        with self._locked():
+            if self.head_version is None and self.current_path.exists():
+                self._append(self.head(), author, "initial version")
+            version = self._append(document, author, message)
+            write_json_atomic(self.current_path, document)
+            return version
+
+    def rollback(self, version: int, author: str | None = None) -> int:
+        """Make an earlier version the head again (recorded as a new version)."""
+        with self._locked():
+            self._record_unsaved(author)
+            document = self.get(version)
+            document["last_updated"] = _now()
+            document["version"] = None  # Numbered after the current head
+            new_version = self._append(document, author, f"rollback to version {version}", rollback_of=version)
+            write_json_atomic(self.current_path, document)
+            return new_version
+
+    def _record_unsaved(self, author: str | None) -> None:
+        # Edits made to current.json since the last record aren't lost by a rollback
+        if not self.current_path.exists():
+            return
+        document = self.head()
+        parent = self.head_version
+        if parent is None or not _same_document(self.get(parent), document):
+            self._append(document, author, "unrecorded edits")
+
+
+def _same_document(a: dict[str, Any], b: dict[str, Any]) -> bool:
+    return not make_patch(a, b)
@@ -0,0 +1,493 @@
+"""
+Work-token store - an indexed view of ``elcs/tokens/{open,claimed,closed}``.
+
+Tokens stay one JSON file each, as the protocol describes. The store keeps a
+sidecar index (``elcs/tokens/.index.json``) of the fields agents select on:
+status, priority, type, deadline, dependencies, blocks, spec_ref, budget,
+created_by and requires. On refresh only files whose mtime or size changed
+are parsed again.
+
+The folder a token file sits in is authoritative for its coarse state, and
+moving between folders is how state changes:
+
+- claim:   open/    -> claimed/   (``os.rename``; exactly one agent wins)
+- release: claimed/ -> open/
+- close:   claimed/ -> closed/
+
+``claim_next`` hands out the highest-priority ready token (open, not
+explicitly blocked, every dependency closed, not listed in an unfinished
+token's ``blocks``). Open tokens sit in a heap that is maintained as files
+change, so a claim costs O(log n); if another agent renamed the file first,
+the claim falls through to the next candidate, so no token is claimed twice.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from create_elcs.runtime import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+OPEN = "open"
+CLAIMED = "claimed"
+CLOSED = "closed"
+TOKEN_DIRS = (OPEN, CLAIMED, CLOSED)
+
+# Schema status -> folder
+STATUS_DIRS = {
+    "open": OPEN,
+    "blocked": OPEN,
+    "claimed": CLAIMED,
+    "in_progress": CLAIMED,
+    "done": CLOSED,
+    "cancelled": CLOSED,
+}
+# Status a token gets when found in a folder its status doesn't belong to
+DIR_STATUS = {OPEN: "open", CLAIMED: "claimed", CLOSED: "done"}
+
+INDEX_FILE_NAME = ".index.json"
+INDEX_VERSION = 3
+DEFAULT_PRIORITY = 0.5
+
+# Re-stat every token file at least this often (seconds)
+FULL_REFRESH_INTERVAL = 5.0
+# Folder mtimes younger than this aren't trusted to be final
+MTIME_SETTLE_NS = 1_000_000_000
+# Persist the index once this many token files have been re-read
+SAVE_AFTER_READS = 32
+# claim_next re-scans the folders at most this often (seconds); a stale
+# candidate just loses the rename and the next one is tried
+CLAIM_REFRESH_AGE = 1.0
+
+# Fields copied from each token file into the index
+INDEXED_FIELDS = (
+    "token_id", "type", "summary", "status", "priority", "deadline", "created_at",
+    "claimed_by", "dependencies", "blocks", "spec_ref", "budget", "created_by", "requires",
+)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class TokenConflict(Exception):
+    """The token was moved by someone else (e.g. claimed by another agent)."""
+
+
+class TokenStore:
+    """Indexed, concurrency-safe access to a project's work tokens."""
+
+    def __init__(self, tokens_dir: Path):
+        self.tokens_dir = Path(tokens_dir)
+        self.index_path = self.tokens_dir / INDEX_FILE_NAME
+        self._lock = threading.RLock()
+        # "open/name.json" -> {"mtime_ns", "size", "token": {...indexed fields}}
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._dir_mtimes: dict[str, int] = {}
+        self._last_full = float("-inf")
+        self._last_refresh = float("-inf")
+        self._loaded = False
+        self._unsaved_reads = 0
+        # Derived, kept up to date entry by entry
+        self._by_id: dict[str, str] = {}
+        self._closed: set[str] = set()
+        self._blockers: dict[str, set[str]] = {}
+        self._heap: list[tuple] = []
+
+    @classmethod
+    def for_project(cls, elcs_dir: Path) -> TokenStore:
+        return cls(Path(elcs_dir) / "tokens")
+
+    # -- index -------------------------------------------------------------
+
+    def _load_index(self) -> None:
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        self._dir_mtimes = data.get("dir_mtimes", {})
+        for key, entry in data.get("entries", {}).items():
+            self._add(key, entry)
+
+    def save(self) -> None:
+        """Persist the index so the next process doesn't re-read unchanged tokens."""
+        with self._lock:
+            if not self._unsaved_reads:
+                return
+            data = {"version": INDEX_VERSION, "dir_mtimes": self._dir_mtimes, "entries": self._entries}
+            try:
+                write_json_atomic(self.index_path, data, indent=None)
+                self._unsaved_reads = 0
+            except OSError as e:
+                logger.warning(f"Could not save token index {self.index_path}: {e}")
+
+    def _add(self, key: str, entry: dict[str, Any]) -> None:
+        token = entry["token"]
+        token_id = token["token_id"]
+        self._entries[key] = entry
+        self._by_id[token_id] = key
+        folder = key.split("/", 1)[0]
+        if folder == CLOSED:
+            self._closed.add(token_id)
+        else:
+            for blocked in token["blocks"]:
+                self._blockers.setdefault(blocked, set()).add(token_id)
+        if folder == OPEN:
+            heapq.heappush(self._heap, (*priority_key(token), token_id, key))
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        token = entry["token"]
+        token_id = token["token_id"]
+        if self._by_id.get(token_id) == key:
+            del self._by_id[token_id]
+        if key.startswith(CLOSED + "/"):
+            self._closed.discard(token_id)
+        else:
+            for blocked in token["blocks"]:
+                blockers = self._blockers.get(blocked)
+                if blockers is not None:
+                    blockers.discard(token_id)
+                    if not blockers:
+                        del self._blockers[blocked]
+        # Stale heap entries are skipped when popped
+
+    def refresh(self, full: bool = False, max_age: float = 0.0) -> bool:
+        """Bring the index up to date with the token folders. Returns True if changed.
+
+        Folders whose mtime hasn't changed are skipped (renames and atomic
+        writes always change it); every file is re-checked at least every
+        FULL_REFRESH_INTERVAL seconds, or when ``full`` is set, to catch
+        in-place edits. Nothing is checked if the last refresh is younger
+        than ``max_age`` seconds.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load_index()
+                self._loaded = True
+
+            now = time.monotonic()
+            if not full and now - self._last_refresh < max_age:
+                return False
+            self._last_refresh = now
+            if now - self._last_full >= FULL_REFRESH_INTERVAL:
+                full = True
+                self._last_full = now
+
+            changed = False
+            for folder in TOKEN_DIRS:
+                folder_path = self.tokens_dir / folder
+                try:
+                    dir_mtime = folder_path.stat().st_mtime_ns
+                except FileNotFoundError:
+                    dir_mtime = None
+                # A very recent mtime may hide a second change in the same tick
+                settled = dir_mtime is not None and time.time_ns() - dir_mtime > MTIME_SETTLE_NS
+                if not full and settled and self._dir_mtimes.get(folder) == dir_mtime:
+                    continue
+                if self._scan(folder, folder_path):
+                    changed = True
+                if dir_mtime is None:
+                    self._dir_mtimes.pop(folder, None)
+                else:
+                    self._dir_mtimes[folder] = dir_mtime
+
+            if changed and len(self._heap) > 2 * len(self._entries) + 64:
+                # Drop stale heap entries left behind by claims and edits
+                self._heap = [
+                    (*priority_key(entry["token"]), entry["token"]["token_id"], key)
+                    for key, entry in self._entries.items() if key.startswith(OPEN + "/")
+                ]
+                heapq.heapify(self._heap)
+            # Claims and closes only re-read a file or two; don't rewrite the
+            # whole index for each of them
+            if self._unsaved_reads >= SAVE_AFTER_READS:
+                self.save()
+            return changed
+
+    def _scan(self, folder: str, folder_path: Path) -> bool:
+        changed = False
+        seen = set()
+        try:
+            scan = os.scandir(folder_path)
+        except FileNotFoundError:
+            scan = None
+        if scan is not None:
+            with scan:
+                for dir_entry in scan:
+                    if not dir_entry.name.endswith(".json") or not dir_entry.is_file():
+                        continue
+                    key = f"{folder}/{dir_entry.name}"
+                    try:
+                        stat = dir_entry.stat()
+                    except FileNotFoundError:
+                        continue  # Moved by another agent mid-scan
+                    seen.add(key)
+                    cached = self._entries.get(key)
+                    if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+                        continue
+                    if cached:
+                        self._remove(key)
+                    token = self._read_indexed(Path(dir_entry.path), folder)
+                    self._unsaved_reads += 1
+                    if token is not None:
+                        self._add(key, {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "token": token})
+                    changed = True
+
+        prefix = folder + "/"
+        for key in [key for key in self._entries if key.startswith(prefix) and key not in seen]:
+            self._remove(key)
+            changed = True
+        return changed
+
+    @classmethod
+    def _read_indexed(cls, path: Path, folder: str) -> dict[str, Any] | None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Skipping unreadable token {path}: {e}")
+            return None
+        if not isinstance(data, dict):
+            return None
+        return cls._indexed_fields(data, folder, path.stem)
+
+    @staticmethod
+    def _indexed_fields(data: dict[str, Any], folder: str, stem: str) -> dict[str, Any]:
+        token = {field: data.get(field) for field in INDEXED_FIELDS}
+        token["token_id"] = str(token["token_id"] or stem)
+        if STATUS_DIRS.get(token["status"]) != folder:
+            token["status"] = DIR_STATUS[folder]
+        # priority_key compares these across tokens, so they must have one type each
+        priority = token["priority"]
+        if isinstance(priority, bool) or not isinstance(priority, (int, float)) or not math.isfinite(priority):
+            token["priority"] = DEFAULT_PRIORITY
+        for field in ("deadline", "created_at"):
+            if token[field] is not None and not isinstance(token[field], str):
+                token[field] = str(token[field])
+        token["dependencies"] = token["dependencies"] or []
+        token["blocks"] = token["blocks"] or []
+        return token
+
+    # -- queries -----------------------------------------------------------
+
+    def tokens(self, folder: str | None = None) -> list[dict[str, Any]]:
+        """Indexed fields of every token, optionally only those in one folder."""
+        self.refresh()
+        return [
+            entry["token"] for key, entry in self._entries.items()
+            if folder is None or key.startswith(folder + "/")
+        ]
+
+    def entries(self) -> list[tuple[str, dict[str, Any]]]:
+        """(folder, indexed fields) of every token.
+
+        A token's dict is replaced, never modified, when its file changes, so
+        callers can detect changes by identity.
+        """
+        self.refresh()
+        return [(key.split("/", 1)[0], entry["token"]) for key, entry in self._entries.items()]
+
+    def get(self, token_id: str) -> dict[str, Any] | None:
+        """Indexed fields of one token."""
+        self.refresh()
+        key = self._by_id.get(token_id)
+        return self._entries[key]["token"] if key else None
+
+    def folder(self, token_id: str) -> str | None:
+        """open, claimed or closed."""
+        self.refresh()
+        key = self._by_id.get(token_id)
+        return key.split("/", 1)[0] if key else None
+
+    def path(self, token_id: str) -> Path | None:
+        """Current file of a token."""
+        self.refresh()
+        key = self._by_id.get(token_id)
+        return self.tokens_dir / key if key else None
+
+    def load(self, token_id: str) -> dict[str, Any] | None:
+        """The full token document."""
+        path = self.path(token_id)
+        if path is None:
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _is_ready(self, token: dict[str, Any]) -> bool:
+        return (
+            token["status"] != "blocked"
+            and not self._blockers.get(token["token_id"])
+            and all(dep in self._closed for dep in token["dependencies"])
+        )
+
+    def ready(self) -> list[dict[str, Any]]:
+        """Open, unblocked tokens, highest priority first."""
+        ready = [token for token in self.tokens(OPEN) if self._is_ready(token)]
+        ready.sort(key=priority_key)
+        return ready
+
+    def blocked(self) -> list[dict[str, Any]]:
+        """Open tokens that can't start: explicitly blocked or waiting on others."""
+        return [token for token in self.tokens(OPEN) if not self._is_ready(token)]
+
+    # -- transitions -------------------------------------------------------
+
+    def _move(
+        self,
+        token_id: str,
+        source: str,
+        dest: str,
+        updates: dict[str, Any],
+        max_age: float = 0.0,
+    ) -> dict[str, Any]:
+        """Rename a token file between folders, then record the new fields."""
+        with self._lock:
+            self.refresh(max_age=max_age)
+            key = self._by_id.get(token_id)
+            if key is None or not key.startswith(source + "/"):
+                raise TokenConflict(f"token {token_id} is not in {source}/")
+            name = key.split("/", 1)[1]
+            dest_key = f"{dest}/{name}"
+            dest_path = self.tokens_dir / dest_key
+            dest_path.parent.mkdir(exist_ok=True)
+            if dest_path.exists():
+                raise TokenConflict(f"{dest_key} already exists")
+            try:
+                # Atomic: of several agents renaming the same file, one wins
+                os.rename(self.tokens_dir / key, dest_path)
+            except FileNotFoundError:
+                self._remove(key)
+                raise TokenConflict(f"token {token_id} was moved by another agent") from None
+
+            with open(dest_path, encoding="utf-8") as f:
+                document = json.load(f)
+            document.update(updates)
+            write_json_atomic(dest_path, document)
+
+            # Record the move directly rather than re-scanning the folders
+            stat = dest_path.stat()
+            self._unsaved_reads += 1
+            self._remove(key)
+            self._add(dest_key, {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "token": self._indexed_fields(document, dest, dest_path.stem),
+            })
+            return document
+
+    def claim(self, token_id: str, agent_id: str, max_age: float = 0.0) -> dict[str, Any]:
+        """Claim one open token. Raises TokenConflict if someone else got it first."""
+        return self._move(token_id, OPEN, CLAIMED, {
+            "status": "claimed", "claimed_by": agent_id, "claimed_at": _now(),
+        }, max_age=max_age)
+
+    def claim_next(self, agent_id: str, token_type: str | None = None) -> dict[str, Any] | None:
+        """Claim the highest-priority ready token, or return None if there is none."""
+        with self._lock:
+            self.refresh(max_age=CLAIM_REFRESH_AGE)
+            deferred = []
+            try:
+                while self._heap:
+                    candidate = heapq.heappop(self._heap)
+                    token_id, key = candidate[-2], candidate[-1]
+                    entry = self._entries.get(key)
+                    if entry is None or (*priority_key(entry["token"]), token_id, key) != candidate:
+                        continue  # Claimed, closed or edited since it was pushed
+                    token = entry["token"]
+                    if not self._is_ready(token) or (token_type is not None and token["type"] != token_type):
+                        deferred.append(candidate)
+                        continue
+                    try:
+                        return self.claim(token_id, agent_id, max_age=CLAIM_REFRESH_AGE)
+                    except TokenConflict:
+                        continue
+                return None
+            finally:
+                for candidate in deferred:
+                    heapq.heappush(self._heap, candidate)
+
+    def release(self, token_id: str) -> dict[str, Any]:
+        """Return a claimed token to open/."""
+        return self._move(token_id, CLAIMED, OPEN, {
+            "status": "open", "claimed_by": None, "claimed_at": None,
+        })
+
+    def close(
+        self,
+        token_id: str,
+        outcome: str,
+        notes: str | None = None,
+        status: str = "done",
+    ) -> dict[str, Any]:
+        """Close a claimed token with a resolution (status ``done`` or ``cancelled``)."""
+        if STATUS_DIRS.get(status) != CLOSED:
+            raise ValueError(f"not a closing status: {status}")
+        resolution: dict[str, Any] = {"outcome": outcome}
+        if notes:
+            resolution["notes"] = notes
+        return self._move(token_id, CLAIMED, CLOSED, {
+            "status": status, "completed_at": _now(), "resolution": resolution,
+        })
+
+    def _write_new(self, token: dict[str, Any]) -> dict[str, Any]:
+        token = dict(token)
+        token.setdefault("token_id", str(uuid.uuid4()))
+        token.setdefault("status", "open")
+        token.setdefault("created_at", _now())
+        token.setdefault("priority", DEFAULT_PRIORITY)
+        token.setdefault("dependencies", [])
+        token.setdefault("blocks", [])
+        folder = STATUS_DIRS.get(token["status"], OPEN)
+        path = self.tokens_dir / folder / f"{token['token_id']}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            raise TokenConflict(f"token {token['token_id']} already exists")
+        write_json_atomic(path, token)
+        return token
+
+    def create(self, token: dict[str, Any]) -> dict[str, Any]:
+        """Write a new token into open/ (token_id, status and created_at are filled in)."""
+        token = self._write_new(token)
+        self.refresh()
+        return token
+
+    def create_many(self, tokens: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Write several new tokens, skipping ids that already exist in any folder.
+
+        The index is refreshed once for the whole batch. Returns the tokens written.
+        """
+        self.refresh()
+        created = []
+        for token in tokens:
+            if token.get("token_id") in self._by_id:
+                continue
+            try:
+                created.append(self._write_new(token))
+            except TokenConflict:
+                continue
+        if created:
+            self.refresh()
+        return created
+
+
+def priority_key(token: dict[str, Any]) -> tuple:
+    # Highest priority first, then earliest deadline, then oldest
+    return (-token["priority"], token["deadline"] or "\uffff", token["created_at"] or "")
@@ -0,0 +1,581 @@
+"""
+Validation of an ``elcs/`` tree against the protocol JSON Schemas.
+
+Each schema is compiled once into a Python module: one plain function per
+subschema, with type checks, required fields, enums, patterns and so on
+written out as straight-line code. Generating that source is cheap; turning
+it into bytecode is not, so the bytecode is cached in a per-user folder
+(``validator_cache_dir()``), never inside a project. A cache file is keyed by
+the SHA-256 of the generated source, the schema and the Python version, and
+only runs if the hash stored in it matches.
+
+``validate_tree`` maps files to schemas by location (``SCHEMA_FILES``) and
+remembers every file's result in ``elcs/.cache/validation.json``. A file is
+only validated again when its content hash or its schema changed; files
+whose mtime and size are unchanged aren't even read. Validation is pure
+Python, so threads would only contend for the GIL; large batches of changed
+files are split across worker processes instead, each loading the validators
+from the bytecode cache.
+
+Supported: the draft-07 validation keywords (``type``, ``enum``, ``const``,
+numeric and length bounds, ``pattern``, ``properties``,
+``patternProperties``, ``additionalProperties``, ``required``, ``items``,
+``minItems``/``maxItems``/``uniqueItems``, ``allOf``/``anyOf``/``oneOf``/
+``not`` and local ``$ref``). ``format`` is treated as an annotation, as
+draft-07 validators do by default. A schema using anything else is rejected
+rather than half-checked.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import json
+import marshal
+import os
+import re
+import sys
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from create_elcs.runtime import write_json_atomic
+
+# Schemas shipped inside the package (see hatch_build.py)
+PACKAGE_SCHEMA_DIR = Path(__file__).parent.parent / "schemas"
+# Schemas in a repository checkout
+REPO_SCHEMA_DIR = Path(__file__).parent.parent.parent.parent.parent / "protocol" / "schemas"
+
+# Artifact locations (relative to elcs/, fnmatch patterns) -> schema name
+SCHEMA_FILES = {
+    "state/current.json": "epistemic-state",
+    "state/distance-vector.json": "distance-vector",
+    "spec/spec.json": "spec",
+    "tokens/*/*.json": "work-token",
+    "lenses/*.json": "lens-output",
+    "journal/checkpoint-*.json": "journal-checkpoint",
+    "journal/codec-*.json": "codec",
+    "coalitions/*.json": "coalition-contract",
+    "cones/*.json": "cognitive-cone",
+}
+
+CACHE_DIR_NAME = ".cache"
+RESULTS_FILE_NAME = "validation.json"
+RESULTS_VERSION = 1
+# Below this many changed files, validate on the calling thread: starting
+# worker processes costs more than checking a few hundred files
+PARALLEL_MIN_FILES = 500
+# Files handed to a worker process at a time
+PARALLEL_CHUNK_SIZE = 64
+
+# Keywords that don't constrain the instance
+_ANNOTATIONS = {
+    "$schema", "$id", "$comment", "title", "description", "default", "examples",
+    "format", "definitions", "readOnly", "writeOnly", "contentMediaType", "contentEncoding",
+}
+
+_TYPE_CHECKS = {
+    "object": "isinstance({0}, dict)",
+    "array": "isinstance({0}, list)",
+    "string": "isinstance({0}, str)",
+    "boolean": "isinstance({0}, bool)",
+    "null": "{0} is None",
+    "number": "(isinstance({0}, (int, float)) and not isinstance({0}, bool))",
+    "integer": "_is_integer({0})",
+}
+
+
+class SchemaError(Exception):
+    """A schema uses something the compiler doesn't support."""
+
+
+class ValidationIssue(NamedTuple):
+    location: str  # JSON pointer into the document, "" for the whole file
+    message: str
+
+
+class FileResult(NamedTuple):
+    path: Path
+    schema: str
+    issues: list[ValidationIssue]
+
+
+def get_schema_dir() -> Path:
+    """Get the schema directory, handling installed package case."""
+    if PACKAGE_SCHEMA_DIR.is_dir():
+        return PACKAGE_SCHEMA_DIR
+    if REPO_SCHEMA_DIR.is_dir():
+        return REPO_SCHEMA_DIR
+    raise FileNotFoundError("ELCS schemas not found. Please reinstall the package.")
+
+
+# -- compiler ---------------------------------------------------------------
+
+
+def _is_integer(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, float) and value.is_integer())
+
+
+def _json_equal(a: Any, b: Any) -> bool:
+    # 1 == True in Python but not in JSON
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[key], b[key]) for key in a)
+    return a == b
+
+
+def _in_enum(value: Any, options: list[Any]) -> bool:
+    return any(_json_equal(value, option) for option in options)
+
+
+def _pointer(path: tuple) -> str:
+    return "".join("/" + str(part).replace("~", "~0").replace("/", "~1") for part in path)
+
+
+class _Compiler:
+    """Turns one schema document into Python source."""
+
+    def __init__(self, root: dict[str, Any]):
+        self.root = root
+        self.functions: list[str] = []
+        self.constants: list[str] = []
+        self._names: dict[int, str] = {}  # id(subschema) -> function name
+
+    def compile(self) -> str:
+        entry = self.function(self.root)
+        return "\n".join([
+            *self.constants,
+            *self.functions,
+            f"def validate(data):\n    errors = []\n    {entry}(data, (), errors)\n    return errors\n",
+        ])
+
+    def constant(self, expression: str) -> str:
+        name = f"_C{len(self.constants)}"
+        self.constants.append(f"{name} = {expression}")
+        return name
+
+    def resolve(self, ref: str) -> Any:
+        if not ref.startswith("#"):
+            raise SchemaError(f"only local $ref is supported, got {ref!r}")
+        node = self.root
+        for part in ref[1:].split("/")[1:]:
+            part = part.replace("~1", "/").replace("~0", "~")
+            try:
+                node = node[int(part)] if isinstance(node, list) else node[part]
+            except (KeyError, IndexError, ValueError):
+                raise SchemaError(f"unresolvable $ref {ref!r}") from None
+        return node
+
+    def function(self, schema: Any) -> str:
+        """Name of the function validating ``schema``, generating it on first use."""
+        if isinstance(schema, dict) and "$ref" in schema:
+            # draft-07: siblings of $ref are ignored
+            schema = self.resolve(schema["$ref"])
+        name = self._names.get(id(schema))
+        if name is not None:
+            return name
+        name = self._names[id(schema)] = f"_v{len(self._names)}"
+        body = self.body(schema)
+        self.functions.append(f"def {name}(data, path, errors):\n" + "\n".join(
+            "    " + line for line in (body or ["pass"])
+        ) + "\n")
+        return name
+
+    def body(self, schema: Any) -> list[str]:
+        if schema is True or schema == {}:
+            return []
+        if schema is False:
+            return [_fail("no value is allowed here")]
+        if not isinstance(schema, dict):
+            raise SchemaError(f"invalid schema: {schema!r}")
+
+        unknown = set(schema) - _ANNOTATIONS - _KEYWORDS
+        if unknown:
+            raise SchemaError(f"unsupported keywords: {', '.join(sorted(unknown))}")
+
+        lines = []
+        if "type" in schema:
+            types = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+            try:
+                check = " or ".join(_TYPE_CHECKS[t].format("data") for t in types)
+            except KeyError as e:
+                raise SchemaError(f"unknown type {e}") from None
+            lines += [f"if not ({check}):", "    " + _fail("is not of type " + " or ".join(types)), "    return"]
+        if "enum" in schema:
+            lines += [f"if not _in_enum(data, {self.constant(repr(schema['enum']))}):",
+                      "    " + _fail("is not one of " + json.dumps(schema["enum"]))]
+        if "const" in schema:
+            lines += [f"if not _json_equal(data, {self.constant(repr(schema['const']))}):",
+                      "    " + _fail("must be " + json.dumps(schema["const"]))]
+
+        number = []
+        for keyword, op in (("minimum", "<"), ("maximum", ">"), ("exclusiveMinimum", "<="), ("exclusiveMaximum", ">=")):
+            if keyword in schema:
+                number += [f"if data {op} {schema[keyword]!r}:", "    " + _fail(f"{keyword} is {schema[keyword]}")]
+        if "multipleOf" in schema:
+            number += [f"if (data / {schema['multipleOf']!r}) % 1:",
+                       "    " + _fail(f"is not a multiple of {schema['multipleOf']}")]
+        if number:
+            lines.append(f"if {_TYPE_CHECKS['number'].format('data')}:")
+            lines += _indent(number)
+
+        string = []
+        if "minLength" in schema:
+            string += [f"if len(data) < {schema['minLength']!r}:", "    " + _fail(f"is shorter than {schema['minLength']}")]
+        if "maxLength" in schema:
+            string += [f"if len(data) > {schema['maxLength']!r}:", "    " + _fail(f"is longer than {schema['maxLength']}")]
+        if "pattern" in schema:
+            pattern = self.constant(f"re.compile({schema['pattern']!r})")
+            string += [f"if not {pattern}.search(data):", "    " + _fail(f"does not match {schema['pattern']}")]
+        if string:
+            lines.append("if isinstance(data, str):")
+            lines += _indent(string)
+
+        array = []
+        if "minItems" in schema:
+            array += [f"if len(data) < {schema['minItems']!r}:", "    " + _fail(f"has fewer than {schema['minItems']} items")]
+        if "maxItems" in schema:
+            array += [f"if len(data) > {schema['maxItems']!r}:", "    " + _fail(f"has more than {schema['maxItems']} items")]
+        if schema.get("uniqueItems"):
+            array += ["if any(_json_equal(a, b) for i, a in enumerate(data) for b in data[i + 1:]):",
+                      "    " + _fail("has duplicate items")]
+        items = schema.get("items", True)
+        if isinstance(items, list):
+            for i, item in enumerate(items):
+                array += [f"if len(data) > {i}:", f"    {self.function(item)}(data[{i}], path + ({i},), errors)"]
+            additional = schema.get("additionalItems", True)
+            if additional is not True:
+                array += [f"for i in range({len(items)}, len(data)):",
+                          f"    {self.function(additional)}(data[i], path + (i,), errors)"]
+        elif items is not True and items != {}:
+            array += ["for i, item in enumerate(data):", f"    {self.function(items)}(item, path + (i,), errors)"]
+        if "contains" in schema:
+            array += [f"if all(_errors_of({self.function(schema['contains'])}, item) for item in data):",
+                      "    " + _fail("has no matching item")]
+        if array:
+            lines.append("if isinstance(data, list):")
+            lines += _indent(array)
+
+        obj = []
+        for name in schema.get("required", []):
+            obj += [f"if {name!r} not in data:", "    " + _fail(f"'{name}' is required")]
+        if "minProperties" in schema:
+            obj += [f"if len(data) < {schema['minProperties']!r}:",
+                    "    " + _fail(f"has fewer than {schema['minProperties']} properties")]
+        if "maxProperties" in schema:
+            obj += [f"if len(data) > {schema['maxProperties']!r}:",
+                    "    " + _fail(f"has more than {schema['maxProperties']} properties")]
+        properties = schema.get("properties", {})
+        for name, subschema in properties.items():
+            if subschema is True or subschema == {}:
+                continue
+            obj += [f"if {name!r} in data:", f"    {self.function(subschema)}(data[{name!r}], path + ({name!r},), errors)"]
+        pattern_properties = [
+            (self.constant(f"re.compile({pattern!r})"), self.function(subschema))
+            for pattern, subschema in schema.get("patternProperties", {}).items()
+        ]
+        additional = schema.get("additionalProperties", True)
+        if pattern_properties or (additional is not True and additional != {}):
+            obj += ["for key, value in data.items():",
+                    f"    matched = key in {self.constant(repr(frozenset(properties)))}"]
+            for pattern, function in pattern_properties:
+                obj += [f"    if {pattern}.search(key):",
+                        "        matched = True",
+                        f"        {function}(value, path + (key,), errors)"]
+            if additional is False:
+                obj += ["    if not matched:", "        errors.append((path + (key,), 'is not an allowed property'))"]
+            elif additional is not True and additional != {}:
+                obj += ["    if not matched:", f"        {self.function(additional)}(value, path + (key,), errors)"]
+        for name, dependency in schema.get("dependencies", {}).items():
+            if isinstance(dependency, list):
+                for other in dependency:
+                    obj += [f"if {name!r} in data and {other!r} not in data:",
+                            "    " + _fail(f"'{other}' is required with '{name}'")]
+            else:
+                obj += [f"if {name!r} in data:", f"    {self.function(dependency)}(data, path, errors)"]
+        if "propertyNames" in schema:
+            obj += ["for key in data:", f"    {self.function(schema['propertyNames'])}(key, path + (key,), errors)"]
+        if obj:
+            lines.append("if isinstance(data, dict):")
+            lines += _indent(obj)
+
+        for subschema in schema.get("allOf", []):
+            lines.append(f"{self.function(subschema)}(data, path, errors)")
+        if "anyOf" in schema:
+            functions = "".join(self.function(subschema) + ", " for subschema in schema["anyOf"])
+            lines += [f"if all(_errors_of(f, data) for f in ({functions})):", "    " + _fail("matches none of anyOf")]
+        if "oneOf" in schema:
+            functions = "".join(self.function(subschema) + ", " for subschema in schema["oneOf"])
+            lines += [f"if sum(not _errors_of(f, data) for f in ({functions})) != 1:",
+                      "    " + _fail("does not match exactly one of oneOf")]
+        if "not" in schema:
+            lines += [f"if not _errors_of({self.function(schema['not'])}, data):", "    " + _fail("matches a schema it must not")]
+        if "if" in schema:
+            lines += [f"if not _errors_of({self.function(schema['if'])}, data):",
+                      f"    {self.function(schema.get('then', True))}(data, path, errors)",
+                      "else:",
+                      f"    {self.function(schema.get('else', True))}(data, path, errors)"]
+        return lines
+
+
+def _fail(message: str) -> str:
+    return f"errors.append((path, {message!r}))"
+
+
+def _indent(lines: list[str]) -> list[str]:
+    return ["    " + line for line in lines]
+
+
+_KEYWORDS = {
+    "$ref", "type", "enum", "const", "minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum",
+    "multipleOf", "minLength", "maxLength", "pattern", "items", "additionalItems", "minItems",
+    "maxItems", "uniqueItems", "contains", "required", "properties", "patternProperties",
+    "additionalProperties", "minProperties", "maxProperties", "dependencies", "propertyNames",
+    "allOf", "anyOf", "oneOf", "not", "if", "then", "else",
+}
+
+
+def _errors_of(function: Callable, data: Any) -> list:
+    errors: list = []
+    function(data, (), errors)
+    return errors
+
+
+def compile_schema(schema: dict[str, Any]) -> str:
+    """Python source of a module whose ``validate(data)`` returns ``[(path, message), ...]``."""
+    return _Compiler(schema).compile()
+
+
+def validator_cache_dir() -> Path:
+    """Per-user folder for compiled validator bytecode."""
+    if sys.platform == "win32":
+        base = Path(os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local")
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return base / "create-elcs" / "validators"
+
+
+class CompiledSchema:
+    """A schema compiled to Python, with the bytecode cached in ``cache_dir`` when given."""
+
+    def __init__(self, name: str, schema_bytes: bytes, cache_dir: Path | None = None):
+        self.name = name
+        self.digest = hashlib.sha256(schema_bytes).hexdigest()
+        self.schema_bytes = schema_bytes
+        self._cache_dir = cache_dir
+        self._validate: Callable[[Any], list] | None = None
+
+    def _load(self) -> Callable[[Any], list]:
+        source = compile_schema(json.loads(self.schema_bytes))
+        # Everything the bytecode depends on; a file that doesn't start with
+        # this key (stale, truncated or planted) is never run
+        key = hashlib.sha256(
+            f"{sys.implementation.cache_tag}\0{self.digest}\0{source}".encode()
+        ).hexdigest().encode()
+        cache_path = None
+        code = None
+        if self._cache_dir is not None:
+            cache_path = self._cache_dir / f"{self.name}-{key[:16].decode()}.bin"
+            try:
+                data = cache_path.read_bytes()
+                if data[:len(key)] == key:
+                    code = marshal.loads(data[len(key):])
+            except (OSError, ValueError, EOFError, TypeError):
+                code = None
+        if code is None:
+            code = compile(source, f"<schema {self.name}>", "exec")
+            if cache_path is not None:
+                try:
+                    cache_path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+                    tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+                    tmp_path.write_bytes(key + marshal.dumps(code))
+                    os.replace(tmp_path, cache_path)
+                except OSError:
+                    pass  # Compiling again next time is fine
+        namespace = {"re": re, "_is_integer": _is_integer, "_json_equal": _json_equal,
+                     "_in_enum": _in_enum, "_errors_of": _errors_of}
+        exec(code, namespace)
+        return namespace["validate"]
+
+    def validate(self, data: Any) -> list[ValidationIssue]:
+        if self._validate is None:
+            self._validate = self._load()
+        return [ValidationIssue(_pointer(path), message) for path, message in self._validate(data)]
+
+
+def load_schemas(schema_dir: Path | None = None, cache_dir: Path | None = None) -> dict[str, CompiledSchema]:
+    """Every ``*.schema.json`` in schema_dir, by name (e.g. ``work-token``)."""
+    schema_dir = schema_dir or get_schema_dir()
+    return {
+        path.name[:-len(".schema.json")]: CompiledSchema(path.name[:-len(".schema.json")], path.read_bytes(), cache_dir)
+        for path in sorted(schema_dir.glob("*.schema.json"))
+    }
+
+
+# -- tree validation --------------------------------------------------------
+
+
+def schema_for(rel_path: str) -> str | None:
+    """Schema name for a path relative to elcs/, or None if it has none."""
+    for pattern, name in SCHEMA_FILES.items():
+        if fnmatch.fnmatchcase(rel_path, pattern) and rel_path.count("/") == pattern.count("/"):
+            return name
+    return None
+
+
+def _artifacts(elcs_dir: Path) -> Iterable[str]:
+    """Relative paths of every file that has a schema."""
+    folders = {pattern.rsplit("/", 1)[0] for pattern in SCHEMA_FILES}
+    for folder in sorted(folders):
+        if "*" in folder:
+            parent, _, child = folder.partition("/")
+            try:
+                subdirs = [entry.name for entry in os.scandir(elcs_dir / parent) if entry.is_dir()]
+            except FileNotFoundError:
+                continue
+            dirs = [f"{parent}/{name}" for name in sorted(subdirs) if fnmatch.fnmatchcase(name, child)]
+        else:
+            dirs = [folder]
+        for directory in dirs:
+            try:
+                names = sorted(entry.name for entry in os.scandir(elcs_dir / directory) if entry.is_file())
+            except FileNotFoundError:
+                continue
+            for name in names:
+                rel_path = f"{directory}/{name}"
+                if schema_for(rel_path):
+                    yield rel_path
+
+
+def _check_file(path: Path, schema: CompiledSchema) -> tuple[str | None, list[ValidationIssue]]:
+    try:
+        data = path.read_bytes()
+    except OSError as e:
+        return None, [ValidationIssue("", f"unreadable: {e}")]
+    digest = hashlib.sha256(data).hexdigest()
+    try:
+        document = json.loads(data)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        return digest, [ValidationIssue("", f"invalid JSON: {e}")]
+    return digest, schema.validate(document)
+
+
+# Validators of a worker process, set by _init_worker
+_worker_schemas: dict[str, CompiledSchema] = {}
+
+
+def _init_worker(schema_bytes: dict[str, bytes], cache_dir: Path | None) -> None:
+    global _worker_schemas
+    _worker_schemas = {name: CompiledSchema(name, data, cache_dir) for name, data in schema_bytes.items()}
+
+
+def _check_in_worker(item: tuple[Path, str]) -> tuple[str | None, list[ValidationIssue]]:
+    path, name = item
+    return _check_file(path, _worker_schemas[name])
+
+
+class TreeValidator:
+    """Validates an elcs/ folder, re-checking only files that changed."""
+
+    def __init__(self, elcs_dir: Path, schema_dir: Path | None = None, use_cache: bool = True):
+        self.elcs_dir = Path(elcs_dir)
+        self.results_path = self.elcs_dir / CACHE_DIR_NAME / RESULTS_FILE_NAME if use_cache else None
+        self.cache_dir = validator_cache_dir() if use_cache else None
+        self.schemas = load_schemas(schema_dir, self.cache_dir)
+        self.checked = 0  # Files validated (not served from cache) by the last run
+
+    def _load_results(self) -> dict[str, Any]:
+        if self.results_path is None:
+            return {}
+        try:
+            with open(self.results_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        return data.get("files", {}) if data.get("version") == RESULTS_VERSION else {}
+
+    def _check_all(self, todo: list[tuple[str, str]], workers: int | None) -> list[tuple[str | None, list]]:
+        """(sha256, issues) of each (rel_path, schema name), in order."""
+        workers = workers or os.cpu_count() or 1
+        if len(todo) >= PARALLEL_MIN_FILES and workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            from concurrent.futures.process import BrokenProcessPool
+
+            schema_bytes = {name: self.schemas[name].schema_bytes for name in {name for _, name in todo}}
+            workers = min(workers, -(-len(todo) // PARALLEL_CHUNK_SIZE))
+            try:
+                with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(schema_bytes, self.cache_dir)) as pool:
+                    return list(pool.map(
+                        _check_in_worker,
+                        [(self.elcs_dir / rel_path, name) for rel_path, name in todo],
+                        chunksize=PARALLEL_CHUNK_SIZE,
+                    ))
+            except (OSError, BrokenProcessPool):
+                pass  # No worker processes here (e.g. a sandbox); check them on this thread
+        return [_check_file(self.elcs_dir / rel_path, self.schemas[name]) for rel_path, name in todo]
+
+    def validate(self, rel_paths: Iterable[str] | None = None, workers: int | None = None) -> list[FileResult]:
+        """Validate the given files (default: every artifact with a schema).
+
+        ``workers`` caps the worker processes used for large batches of
+        changed files (default: the CPU count; 1 validates on this thread).
+        """
+        cached = self._load_results()
+        results: dict[str, dict[str, Any]] = {}
+        todo = []
+        for rel_path in (_artifacts(self.elcs_dir) if rel_paths is None else rel_paths):
+            name = schema_for(rel_path)
+            if name is None or name not in self.schemas:
+                continue
+            try:
+                stat = (self.elcs_dir / rel_path).stat()
+            except FileNotFoundError:
+                continue
+            entry = cached.get(rel_path)
+            if (
+                entry and entry["schema"] == self.schemas[name].digest
+                and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size
+            ):
+                results[rel_path] = entry
+            else:
+                todo.append((rel_path, name, stat))
+
+        checked = {}
+        outcomes = self._check_all([(rel_path, name) for rel_path, name, _ in todo], workers)
+        for (rel_path, name, stat), (digest, issues) in zip(todo, outcomes):
+            schema = self.schemas[name]
+            entry = cached.get(rel_path)
+            if entry and digest and entry["sha256"] == digest and entry["schema"] == schema.digest:
+                issues = [ValidationIssue(*issue) for issue in entry["issues"]]  # Touched, not changed
+            checked[rel_path] = {
+                "schema": schema.digest, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+                "sha256": digest, "issues": [list(issue) for issue in issues],
+            }
+        results.update(checked)
+        self.checked = len(checked)
+
+        if checked and self.results_path is not None:
+            saved = results if rel_paths is None else {**cached, **results}
+            try:
+                self.results_path.parent.mkdir(parents=True, exist_ok=True)
+                write_json_atomic(self.results_path, {"version": RESULTS_VERSION, "files": saved}, indent=None)
+            except OSError:
+                pass
+
+        return [
+            FileResult(self.elcs_dir / rel_path, schema_for(rel_path),
+                       [ValidationIssue(*issue) for issue in entry["issues"]])
+            for rel_path, entry in sorted(results.items())
+        ]
+
+
+def validate_tree(elcs_dir: Path, workers: int | None = None, use_cache: bool = True) -> list[FileResult]:
+    """Validate every artifact under elcs_dir against its protocol schema."""
+    return TreeValidator(elcs_dir, use_cache=use_cache).validate(workers=workers)
@@ -0,0 +1,172 @@
+"""Command-line tools for ELCS telemetry.
+
+Usage (from the folder containing elcs_telemetry/, e.g. ~/.code_puppy/plugins):
+    python -m elcs_telemetry query --event tool_call --min-duration 1000
+    python -m elcs_telemetry query --stats
+    python -m elcs_telemetry query --timeline <session_id>
+    python -m elcs_telemetry compact --keep-days 7
+    python -m elcs_telemetry bench
+    python -m elcs_telemetry budgets
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .telemetry_archive import compact
+from .telemetry_budgets import BUDGETS_FILE_NAME
+from .telemetry_encoding import benchmark
+from .telemetry_query import TelemetryQuery
+from .telemetry_writer import find_elcs_dir
+
+
+def _parse_time(value: str) -> datetime:
+    """Parse an ISO date or datetime; naive values are taken as UTC."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO date/time: {value!r}")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _telemetry_dir(args: argparse.Namespace) -> Path:
+    if args.dir:
+        return Path(args.dir)
+    elcs_dir = find_elcs_dir()
+    if elcs_dir is None:
+        raise SystemExit("Error: no elcs/ folder found; pass --dir elcs/telemetry")
+    return elcs_dir / "telemetry"
+
+
+def _cmd_query(args: argparse.Namespace) -> None:
+    query = TelemetryQuery(_telemetry_dir(args))
+    out = sys.stdout
+
+    if args.stats:
+        stats = query.duration_percentiles(since=args.since, until=args.until)
+        out.write(f"{'tool':<32} {'count':>7} {'p50':>10} {'p95':>10} {'p99':>10}\n")
+        for tool, row in stats.items():
+            out.write(
+                f"{tool:<32} {row['count']:>7} {row['p50']:>10.2f} "
+                f"{row['p95']:>10.2f} {row['p99']:>10.2f}\n"
+            )
+        return
+
+    if args.timeline:
+        for event in query.timeline(args.timeline):
+            out.write(json.dumps(event) + "\n")
+        return
+
+    lines = query.find(
+        event=args.event,
+        session_id=args.session,
+        tool=args.tool,
+        since=args.since,
+        until=args.until,
+        min_duration_ms=args.min_duration,
+    )
+    for count, line in enumerate(lines, 1):
+        out.write(line.decode("utf-8") + "\n")
+        if args.limit and count >= args.limit:
+            break
+
+
+def _cmd_compact(args: argparse.Namespace) -> None:
+    results = compact(_telemetry_dir(args), keep_days=args.keep_days, dry_run=args.dry_run)
+    if not results:
+        print("Nothing to compact.")
+        return
+
+    total_before = total_after = 0
+    for source, archive, before, after in results:
+        total_before += before
+        total_after += after
+        if args.dry_run:
+            print(f"would compact {source.name} ({before:,} bytes)")
+        else:
+            print(f"{source.name} -> {archive.name}: {before:,} -> {after:,} bytes")
+    if not args.dry_run and total_after:
+        print(f"Total: {total_before:,} -> {total_after:,} bytes ({total_before / total_after:.1f}x)")
+
+
+def _cmd_bench(args: argparse.Namespace) -> None:
+    results = benchmark(args.events)
+    baseline = results["legacy"]
+    print(f"{'path':<10} {'us/event':>10} {'speedup':>8}")
+    for name, cost in results.items():
+        print(f"{name:<10} {cost:>10.2f} {baseline / cost:>7.1f}x")
+
+
+def _cmd_budgets(args: argparse.Namespace) -> None:
+    path = _telemetry_dir(args) / BUDGETS_FILE_NAME
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        print(f"No budget totals yet ({path}).")
+        return
+    if args.json:
+        print(json.dumps(data, indent=2))
+        return
+
+    print(f"{'scope':<40} {'metric':<14} {'used':>12} {'limit':>12}")
+    for scope in ("tokens", "coalitions"):
+        for scope_id, entry in sorted((data.get(scope) or {}).items()):
+            limits = entry.get("limits") or {}
+            for metric in sorted(set(entry.get("used") or {}) | set(limits)):
+                used = (entry.get("used") or {}).get(metric, 0)
+                limit = limits.get(metric)
+                flag = "  EXCEEDED" if metric in (entry.get("exceeded") or []) else ""
+                label = f"{scope[:-1]} {scope_id}"
+                limit_text = f"{limit:>12,}" if limit is not None else f"{'-':>12}"
+                print(f"{label:<40} {metric:<14} {used:>12,.0f} {limit_text}{flag}")
+    print(f"Updated {data.get('updated_at', '?')}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="elcs-telemetry", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query = commands.add_parser("query", help="Filter and aggregate telemetry events")
+    query.add_argument("--dir", help="Telemetry directory (default: detect elcs/telemetry)")
+    query.add_argument("--event", help="Event type, e.g. tool_call")
+    query.add_argument("--session", help="session_id (also matches delegations from it)")
+    query.add_argument("--tool", help="Tool name")
+    query.add_argument("--since", type=_parse_time, help="Start time (ISO, inclusive)")
+    query.add_argument("--until", type=_parse_time, help="End time (ISO, exclusive)")
+    query.add_argument("--min-duration", type=float, help="Minimum duration_ms")
+    query.add_argument("--limit", type=int, help="Stop after this many events")
+    mode = query.add_mutually_exclusive_group()
+    mode.add_argument("--stats", action="store_true", help="Per-tool duration_ms p50/p95/p99")
+    mode.add_argument("--timeline", metavar="SESSION_ID", help="All events of a session in time order")
+    query.set_defaults(func=_cmd_query)
+
+    compact_cmd = commands.add_parser("compact", help="Compact closed-out days into columnar archives")
+    compact_cmd.add_argument("--dir", help="Telemetry directory (default: detect elcs/telemetry)")
+    compact_cmd.add_argument(
+        "--keep-days", type=int, default=1,
+        help="Days (including today) to keep as live JSONL (default: 1)",
+    )
+    compact_cmd.add_argument("--dry-run", action="store_true", help="List days without compacting")
+    compact_cmd.set_defaults(func=_cmd_compact)
+
+    bench = commands.add_parser("bench", help="Measure per-event serialization cost")
+    bench.add_argument("--events", type=int, default=100_000, help="Events per path")
+    bench.set_defaults(func=_cmd_bench)
+
+    budgets = commands.add_parser("budgets", help="Usage of claimed tokens and coalitions against their budgets")
+    budgets.add_argument("--dir", help="Telemetry directory (default: detect elcs/telemetry)")
+    budgets.add_argument("--json", action="store_true", help="Print budgets.json as is")
+    budgets.set_defaults(func=_cmd_budgets)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
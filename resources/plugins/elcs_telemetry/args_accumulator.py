@@ -0,0 +1,283 @@
+"""Streaming accumulation of tool-call argument JSON.
+
+Tool calls stream their arguments as many small JSON fragments. Instead of
+concatenating them (quadratic for large ``edit_file`` payloads) and parsing
+the whole document at the end, ``ArgsAccumulator`` parses the top-level
+object incrementally and keeps only what the telemetry summary retains:
+
+- string values: a short prefix plus their full length
+- other values (numbers, booleans, nested objects): raw text up to a cap
+
+Total argument size and delta count are always recorded, so large edits stay
+cheap to observe. Memory per call is bounded regardless of payload size.
+"""
+
+import json
+from typing import Any
+
+# Raw JSON characters kept per string value. Summaries keep the first 100
+# decoded characters of strings longer than 200, so this leaves room for
+# escapes in the prefix.
+STRING_PREFIX_CHARS = 1536
+# Raw JSON characters kept per non-string value
+MAX_RAW_VALUE_CHARS = 16384
+# Raw JSON characters kept per key, and keys kept per call
+MAX_KEY_CHARS = 256
+MAX_KEYS = 256
+# Raw characters of the whole stream kept for the malformed-JSON fallback
+HEAD_CHARS = 201
+
+_WHITESPACE = " \t\r\n"
+
+# Parser states
+_OBJECT_START = 0
+_KEY_OR_END = 1
+_KEY = 2
+_COLON = 3
+_VALUE_START = 4
+_STRING = 5
+_RAW = 6
+_COMMA_OR_END = 7
+_DONE = 8
+_ERROR = 9
+
+
+class ArgsAccumulator:
+    """Incrementally parses a streamed JSON object of tool arguments."""
+
+    __slots__ = (
+        "size",
+        "chunks",
+        "_head",
+        "_state",
+        "_key",
+        "_raw",
+        "_kept",
+        "_length",
+        "_escape",
+        "_hex",
+        "_high_surrogate",
+        "_depth",
+        "_nested_string",
+        "_values",
+        "_lengths",
+    )
+
+    def __init__(self):
+        self.size = 0  # total characters streamed
+        self.chunks = 0  # number of deltas
+        self._head = ""
+        self._state = _OBJECT_START
+        self._key = ""
+        self._raw: list[str] = []  # kept raw prefix of the current key/value
+        self._kept = 0
+        self._length = 0  # decoded length (strings) or raw length (other values)
+        self._escape = 0  # 0: none, -1: after backslash, n > 0: hex digits left
+        self._hex = ""  # digits of the current \u escape
+        self._high_surrogate = False  # the last character was a \uD800-\uDBFF escape
+        self._depth = 0
+        self._nested_string = False
+        # key -> (is_string, raw prefix, truncated)
+        self._values: dict[str, tuple[bool, str, bool]] = {}
+        self._lengths: dict[str, int] = {}
+
+    def feed(self, delta: str) -> None:
+        """Consume the next fragment of argument JSON."""
+        if not delta:
+            return
+        self.chunks += 1
+        if self.size < HEAD_CHARS:
+            self._head += delta[:HEAD_CHARS - self.size]
+        self.size += len(delta)
+
+        pos, end = 0, len(delta)
+        while pos < end and self._state != _ERROR:
+            state = self._state
+            if state == _STRING or state == _KEY:
+                pos = self._scan_string(delta, pos)
+            elif state == _RAW:
+                pos = self._scan_raw(delta, pos)
+            else:
+                char = delta[pos]
+                pos += 1
+                if char in _WHITESPACE:
+                    continue
+                if state == _OBJECT_START:
+                    self._state = _KEY_OR_END if char == "{" else _ERROR
+                elif state == _KEY_OR_END:
+                    if char == '"':
+                        self._start_token(_KEY)
+                    else:
+                        self._state = _DONE if char == "}" else _ERROR
+                elif state == _COLON:
+                    self._state = _VALUE_START if char == ":" else _ERROR
+                elif state == _VALUE_START:
+                    if char == '"':
+                        self._start_token(_STRING)
+                    else:
+                        self._start_token(_RAW)
+                        pos -= 1  # the first character belongs to the value
+                elif state == _COMMA_OR_END:
+                    if char == ",":
+                        self._state = _KEY_OR_END
+                    else:
+                        self._state = _DONE if char == "}" else _ERROR
+                elif state == _DONE:
+                    self._state = _ERROR
+
+    def result(self) -> tuple[dict[str, Any], dict[str, int]]:
+        """Return (args, full string lengths) for a completed object.
+
+        Truncated string values hold their prefix; their full length is in
+        the second dict. Oversized non-string values are replaced by a
+        placeholder string. Malformed or incomplete JSON falls back to a
+        ``_raw`` preview, and an empty stream yields no args.
+        """
+        if self.size == 0:
+            return {}, {}
+        if self._state != _DONE:
+            raw = self._head[:200] + "..." if self.size > 200 else self._head
+            return {"_raw": raw}, {}
+
+        args: dict[str, Any] = {}
+        for key, (is_string, raw, truncated) in self._values.items():
+            if is_string:
+                args[key] = _decode_string(raw)
+            elif truncated:
+                args[key] = f"[{self._lengths[key]} chars]"
+            else:
+                try:
+                    args[key] = json.loads(raw)
+                except json.JSONDecodeError:
+                    args[key] = raw
+        return args, self._lengths
+
+    def _start_token(self, state: int) -> None:
+        self._state = state
+        self._raw = []
+        self._kept = 0
+        self._length = 0
+        self._escape = 0
+        self._hex = ""
+        self._high_surrogate = False
+        self._depth = 0
+        self._nested_string = False
+
+    def _keep(self, text: str, limit: int) -> None:
+        """Append to the kept raw prefix, up to ``limit`` characters."""
+        if self._kept < limit:
+            part = text[:limit - self._kept]
+            self._raw.append(part)
+            self._kept += len(part)
+
+    def _scan_string(self, delta: str, pos: int) -> int:
+        """Scan a key or string value; returns the position after what was consumed."""
+        end = len(delta)
+        limit = MAX_KEY_CHARS if self._state == _KEY else STRING_PREFIX_CHARS
+        while pos < end:
+            if self._escape:
+                # Finish a (possibly split) escape sequence
+                char = delta[pos]
+                if self._escape == -1:
+                    self._escape = 4 if char == "u" else 0
+                    self._length += 1
+                    self._hex = ""
+                    if char != "u":
+                        self._high_surrogate = False
+                else:
+                    self._hex += char
+                    self._escape -= 1
+                    if not self._escape:
+                        self._end_unicode_escape()
+                self._keep(char, limit)
+                pos += 1
+                continue
+
+            quote = delta.find('"', pos)
+            backslash = delta.find("\\", pos, quote if quote != -1 else end)
+            if (backslash if backslash != -1 else quote if quote != -1 else end) > pos:
+                self._high_surrogate = False
+            if backslash != -1:
+                self._length += backslash - pos
+                self._keep(delta[pos:backslash + 1], limit)
+                self._escape = -1
+                pos = backslash + 1
+            elif quote != -1:
+                self._length += quote - pos
+                self._keep(delta[pos:quote], limit)
+                self._finish_string()
+                return quote + 1
+            else:
+                self._length += end - pos
+                self._keep(delta[pos:], limit)
+                return end
+        return end
+
+    def _end_unicode_escape(self) -> None:
+        """A \uD83D\uDE00 surrogate pair decodes to one character, not two."""
+        try:
+            code = int(self._hex, 16)
+        except ValueError:
+            code = 0
+        if self._high_surrogate and 0xDC00 <= code <= 0xDFFF:
+            self._length -= 1
+            self._high_surrogate = False
+        else:
+            self._high_surrogate = 0xD800 <= code <= 0xDBFF
+
+    def _finish_string(self) -> None:
+        raw = "".join(self._raw)
+        if self._state == _KEY:
+            self._key = _decode_string(raw)
+            self._state = _COLON
+            return
+        self._store(True, raw, self._kept >= STRING_PREFIX_CHARS)
+        self._state = _COMMA_OR_END
+
+    def _scan_raw(self, delta: str, pos: int) -> int:
+        """Scan a non-string value, tracking nesting; returns the new position."""
+        end = len(delta)
+        start = pos
+        while pos < end:
+            char = delta[pos]
+            if self._nested_string:
+                if self._escape:
+                    self._escape = 0
+                elif char == "\\":
+                    self._escape = -1
+                elif char == '"':
+                    self._nested_string = False
+            elif char == '"':
+                self._nested_string = True
+            elif char in "[{":
+                self._depth += 1
+            elif char in "]}" and self._depth:
+                self._depth -= 1
+            elif self._depth == 0 and (char in ",}" or char in _WHITESPACE):
+                self._length += pos - start
+                self._keep(delta[start:pos], MAX_RAW_VALUE_CHARS)
+                self._store(False, "".join(self._raw), self._length > MAX_RAW_VALUE_CHARS)
+                self._state = _COMMA_OR_END
+                return pos  # the delimiter is handled by the caller
+            pos += 1
+        self._length += end - start
+        self._keep(delta[start:], MAX_RAW_VALUE_CHARS)
+        return end
+
+    def _store(self, is_string: bool, raw: str, truncated: bool) -> None:
+        if self._key in self._values or len(self._values) < MAX_KEYS:
+            self._values[self._key] = (is_string, raw, truncated)
+            self._lengths[self._key] = self._length
+        self._raw = []
+        self._kept = 0
+
+
+def _decode_string(raw: str) -> str:
+    """Decode a raw JSON string body, tolerating a cut-off trailing escape."""
+    for cut in range(7):
+        body = raw[:len(raw) - cut] if cut else raw
+        try:
+            return json.loads(f'"{body}"')
+        except json.JSONDecodeError:
+            continue
+    return raw
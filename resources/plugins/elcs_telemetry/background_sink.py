@@ -0,0 +1,214 @@
+"""Background telemetry sink - moves serialization and disk I/O off the event loop."""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import weakref
+from typing import Any
+
+from .telemetry_budgets import BudgetAccountant
+from .telemetry_encoding import CLOCK
+from .telemetry_policy import TelemetryPolicy
+from .telemetry_writer import TelemetryWriter
+
+logger = logging.getLogger(__name__)
+
+# Back-pressure policies when the queue is full:
+# - "drop": discard the new event immediately and count it
+# - "block": wait up to BLOCK_TIMEOUT for space, then drop and count it
+POLICY_DROP = "drop"
+POLICY_BLOCK = "block"
+QUEUE_POLICIES = (POLICY_DROP, POLICY_BLOCK)
+
+DEFAULT_POLICY = os.environ.get("ELCS_TELEMETRY_QUEUE_POLICY", POLICY_DROP)
+DEFAULT_QUEUE_SIZE = int(os.environ.get("ELCS_TELEMETRY_QUEUE_SIZE", "10000"))
+# Set to 0 to turn off live budget accounting (telemetry_budgets)
+BUDGETS_ENABLED = os.environ.get("ELCS_TELEMETRY_BUDGETS", "1") != "0"
+BLOCK_TIMEOUT = 1.0  # seconds
+DRAIN_TIMEOUT = 5.0  # seconds
+
+# Sentinel telling the writer thread to stop
+_STOP = object()
+
+# Live sinks, drained once at interpreter exit (before writers are flushed)
+_live_sinks: "weakref.WeakSet[BackgroundSink]" = weakref.WeakSet()
+
+
+def _drain_all_sinks() -> None:
+    """Drain and stop every live sink (registered with atexit)."""
+    for sink in list(_live_sinks):
+        sink.close()
+
+
+atexit.register(_drain_all_sinks)
+
+
+class BackgroundSink:
+    """Queues telemetry events and writes them on a dedicated thread.
+
+    ``emit`` never touches the disk or serializes JSON; it applies the
+    project's sampling/rate-limit policy, stamps the event and puts it on a
+    bounded queue. A daemon thread feeds the queue into a ``TelemetryWriter``
+    and, when the project has work tokens, a ``BudgetAccountant``. The
+    accountant is loaded on that thread too, since it reads the claimed
+    tokens, coalitions and budgets.json.
+    """
+
+    def __init__(
+        self,
+        writer: TelemetryWriter | None = None,
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+        policy: str | None = None,
+        telemetry_policy: TelemetryPolicy | None = None,
+        budgets: BudgetAccountant | None = None,
+    ):
+        policy = policy or DEFAULT_POLICY
+        if policy not in QUEUE_POLICIES:
+            logger.warning(
+                f"ELCS Telemetry: Unknown queue policy '{policy}', using '{POLICY_DROP}'"
+            )
+            policy = POLICY_DROP
+
+        self._writer = writer if writer is not None else TelemetryWriter()
+        self._policy = policy
+        if telemetry_policy is None:
+            telemetry_policy = TelemetryPolicy.load(self._writer.telemetry_dir)
+        # A keep-everything policy is skipped entirely
+        self._telemetry_policy = None if telemetry_policy.is_passthrough else telemetry_policy
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._closed = False
+        self._thread: threading.Thread | None = None
+        self._budgets = budgets
+        # Cleared by the writer thread if the project turns out to have no tokens
+        self._accounting = budgets is not None or BUDGETS_ENABLED
+
+        if self._writer.is_active():
+            self._thread = threading.Thread(
+                target=self._run, name="elcs-telemetry-writer", daemon=True
+            )
+            self._thread.start()
+            _live_sinks.add(self)
+
+    def is_active(self) -> bool:
+        """Check if telemetry is active (ELCS project detected)."""
+        return self._writer.is_active() and not self._closed
+
+    @property
+    def dropped(self) -> int:
+        """Number of events dropped because the queue was full."""
+        return self._dropped
+
+    def emit(self, event_data: dict[str, Any]) -> None:
+        """Queue a telemetry event without blocking on I/O."""
+        if not self.is_active():
+            return
+
+        if self._telemetry_policy is not None:
+            keep = self._telemetry_policy.allow(event_data)
+            summary = self._telemetry_policy.summary()
+            if summary is not None:
+                self._enqueue(summary)
+            if not keep:
+                # Sampled-out events still count against budgets
+                if self._accounting:
+                    self._enqueue(event_data, write=False)
+                return
+        self._enqueue(event_data)
+
+    def _enqueue(self, event_data: dict[str, Any], write: bool = True) -> None:
+        item = (event_data, CLOCK.now_us(), write)
+        try:
+            if self._policy == POLICY_BLOCK:
+                self._queue.put(item, timeout=BLOCK_TIMEOUT)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+                if self._dropped == 1:
+                    logger.warning(
+                        "ELCS Telemetry: Event queue full, dropping events "
+                        f"(policy={self._policy})"
+                    )
+
+    def drain(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """Wait until queued events are written, then flush the writer."""
+        if self._thread is None:
+            return
+
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            logger.warning("ELCS Telemetry: Timed out draining event queue")
+            return
+        if not done.wait(timeout):
+            logger.warning("ELCS Telemetry: Timed out draining event queue")
+
+    def close(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """Drain the queue, record dropped events, and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        _live_sinks.discard(self)
+
+        if self._thread is not None:
+            with self._dropped_lock:
+                dropped, self._dropped = self._dropped, 0
+            try:
+                if self._telemetry_policy is not None:
+                    summary = self._telemetry_policy.summary(force=True)
+                    if summary is not None:
+                        self._queue.put((summary, CLOCK.now_us(), True), timeout=timeout)
+                if dropped:
+                    # Report back-pressure in the telemetry stream itself
+                    event = {"event": "telemetry_dropped", "count": dropped}
+                    self._queue.put((event, CLOCK.now_us(), True), timeout=timeout)
+                self._queue.put(_STOP, timeout=timeout)
+                self._thread.join(timeout)
+            except queue.Full:
+                pass
+            if self._thread.is_alive():
+                logger.warning("ELCS Telemetry: Writer thread did not stop in time")
+        self._writer.close()
+
+    def _run(self) -> None:
+        """Writer thread: serialize and write queued events, then account for them."""
+        if self._budgets is None and self._accounting:
+            try:
+                self._budgets = BudgetAccountant.load(self._writer.telemetry_dir)
+            except Exception as e:
+                logger.warning(f"ELCS Telemetry: Budget accounting unavailable: {e}")
+            self._accounting = self._budgets is not None
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            if isinstance(item, threading.Event):
+                self._sync_budgets()
+                self._writer.flush()
+                item.set()
+                continue
+            event_data, ts_us, write = item
+            try:
+                if write:
+                    self._writer.emit(event_data, ts_us=ts_us)
+                if self._budgets is not None:
+                    for exceeded in self._budgets.feed(event_data, ts_us):
+                        self._writer.emit(exceeded, ts_us=ts_us)
+            except Exception as e:
+                logger.warning(f"ELCS Telemetry: Background write failed: {e}")
+        self._sync_budgets()
+        self._writer.flush()
+
+    def _sync_budgets(self) -> None:
+        if self._budgets is None:
+            return
+        try:
+            self._budgets.sync()
+        except Exception as e:
+            logger.warning(f"ELCS Telemetry: Budget sync failed: {e}")
@@ -0,0 +1,70 @@
+"""Streaming confusion detection over response deltas.
+
+Markers are compiled once into a single alternation pattern. Each delta is
+scanned as it arrives, together with a short tail of the previous delta so
+markers split across delta boundaries are still found. Only the matched
+markers and the tail are kept, so memory is constant for any session length.
+"""
+
+import re
+
+# (marker, signal type) - signal order in the output follows this list
+CONFUSION_MARKERS = [
+    ("i'm not sure", "uncertainty"),
+    ("i'm unsure", "uncertainty"),
+    ("i don't understand", "comprehension"),
+    ("could you clarify", "clarification_needed"),
+    ("what do you mean", "clarification_needed"),
+    ("i'm confused", "confusion"),
+    ("this is unclear", "ambiguity"),
+    ("i need more information", "information_gap"),
+    ("i'm not certain", "uncertainty"),
+    ("it's ambiguous", "ambiguity"),
+    ("i apologize", "recovery"),
+    ("let me reconsider", "self_correction"),
+    ("actually,", "self_correction"),
+    ("wait,", "self_correction"),
+]
+
+_MARKER_INDEX = {marker: i for i, (marker, _) in enumerate(CONFUSION_MARKERS)}
+_PATTERN = re.compile("|".join(re.escape(marker) for marker, _ in CONFUSION_MARKERS))
+# Longest suffix of a delta that could be the start of a split marker
+_TAIL_LENGTH = max(len(marker) for marker, _ in CONFUSION_MARKERS) - 1
+_ALL_MATCHED = (1 << len(CONFUSION_MARKERS)) - 1
+
+
+class ConfusionDetector:
+    """Incrementally detects confusion markers in streamed response text."""
+
+    __slots__ = ("_matched", "_tail")
+
+    def __init__(self):
+        self._matched = 0  # bitmask over CONFUSION_MARKERS
+        self._tail = ""
+
+    def feed(self, text: str) -> None:
+        """Scan the next chunk of response text."""
+        if not text or self._matched == _ALL_MATCHED:
+            return
+
+        window = self._tail + text.lower()
+        for match in _PATTERN.finditer(window):
+            self._matched |= 1 << _MARKER_INDEX[match.group()]
+        self._tail = window[-_TAIL_LENGTH:]
+
+    def signals(self) -> list[str] | None:
+        """Signal types seen so far, or None if there were none."""
+        signals: list[str] = []
+        for i, (_, signal_type) in enumerate(CONFUSION_MARKERS):
+            if self._matched & (1 << i) and signal_type not in signals:
+                signals.append(signal_type)
+        return signals if signals else None
+
+
+def detect_confusion(text: str) -> list[str] | None:
+    """Detect confusion signals in a complete response text."""
+    if not text:
+        return None
+    detector = ConfusionDetector()
+    detector.feed(text)
+    return detector.signals()
@@ -13,48 +13,118 @@ Captures:
 OBSERVATIONAL ONLY - does not modify agent behavior.
 """
 
-import json
+import asyncio
 import logging
 import time
+from collections import OrderedDict
 from typing import Any
 
 from code_puppy.callbacks import register_callback
 
-from .telemetry_writer import TelemetryWriter
+from .args_accumulator import ArgsAccumulator
+from .background_sink import BackgroundSink
+from .confusion_detector import ConfusionDetector, detect_confusion
 
 logger = logging.getLogger(__name__)
 
-# Global writer instance (initialized lazily per-project)
-_writer: TelemetryWriter | None = None
+# Global sink instance (initialized lazily per-project). Events are queued
+# here and written on a background thread, off code-puppy's event loop.
+_writer: BackgroundSink | None = None
 
-# Current session ID (set at session_start, used by all events)
-_current_session_id: str | None = None
+# Per-session limits (keep memory bounded with many concurrent/delegated agents)
+MAX_SESSIONS = 64
+SESSION_IDLE_TIMEOUT = 3600.0  # seconds without events before a session is abandoned
+MAX_ACTIVE_TOOL_CALLS = 256
 
-# Track tool calls in progress: index -> {tool, start_time, args_json}
-_active_tool_calls: dict[int, dict] = {}
 
-# Track text/thinking accumulation per session
-_accumulated_thinking: list[str] = []
-_accumulated_response: list[str] = []
+class _SessionState:
+    """Telemetry state for one agent session."""
 
+    __slots__ = (
+        "active_tool_calls",
+        "thinking_length",
+        "response_length",
+        "confusion",
+        "last_seen",
+    )
 
-def _get_writer() -> TelemetryWriter | None:
-    """Get or create the telemetry writer for the current project."""
+    def __init__(self):
+        # Tool calls in progress: part index -> {tool, start_time, args}
+        self.active_tool_calls: dict[int, dict] = {}
+        self.thinking_length = 0
+        self.response_length = 0
+        # Scans response deltas as they arrive; only running lengths are kept
+        self.confusion = ConfusionDetector()
+        self.last_seen = time.monotonic()
+
+    def add_thinking(self, content: str) -> None:
+        self.thinking_length += len(content)
+
+    def add_response(self, content: str) -> None:
+        self.response_length += len(content)
+        self.confusion.feed(content)
+
+
+# Session state keyed by session_id, least recently used first
+_sessions: "OrderedDict[str | None, _SessionState]" = OrderedDict()
+
+# Started sessions, innermost (most recently started) last. Hooks that don't
+# receive a session_id attribute their events to the innermost session.
+_session_stack: list[str | None] = []
+
+
+def _get_writer() -> BackgroundSink | None:
+    """Get or create the telemetry sink for the current project."""
     global _writer
     if _writer is None:
-        _writer = TelemetryWriter()
+        _writer = BackgroundSink()
     return _writer if _writer.is_active() else None
 
 
-def _reset_state() -> None:
-    """Reset all state at session end."""
-    global _writer, _current_session_id, _active_tool_calls
-    global _accumulated_thinking, _accumulated_response
-    _writer = None
-    _current_session_id = None
-    _active_tool_calls = {}
-    _accumulated_thinking = []
-    _accumulated_response = []
+def _current_session_id() -> str | None:
+    """Session ID for hooks that don't receive one (innermost active session)."""
+    return _session_stack[-1] if _session_stack else None
+
+
+def _get_session(session_id: str | None) -> _SessionState:
+    """Get or create the state for a session, evicting abandoned sessions."""
+    key = session_id or _current_session_id()
+    now = time.monotonic()
+
+    state = _sessions.get(key)
+    if state is None:
+        _evict_sessions(now)
+        state = _sessions[key] = _SessionState()
+    else:
+        _sessions.move_to_end(key)
+    state.last_seen = now
+    return state
+
+
+def _evict_sessions(now: float) -> None:
+    """Drop sessions idle past SESSION_IDLE_TIMEOUT, and the oldest beyond MAX_SESSIONS."""
+    while _sessions:
+        key, state = next(iter(_sessions.items()))
+        if len(_sessions) < MAX_SESSIONS and now - state.last_seen < SESSION_IDLE_TIMEOUT:
+            break
+        logger.debug(f"ELCS Telemetry: Dropping abandoned session state {key!r}")
+        _end_session(key)
+
+
+def _end_session(session_id: str | None) -> _SessionState | None:
+    """Remove a session's state and its place in the session stack."""
+    if session_id in _session_stack:
+        _session_stack.remove(session_id)
+    return _sessions.pop(session_id, None)
+
+
+def _reset_state() -> BackgroundSink | None:
+    """Reset all state once no sessions remain. Returns the detached sink, still to be closed."""
+    global _writer
+    writer, _writer = _writer, None
+    _sessions.clear()
+    _session_stack.clear()
+    return writer
 
 
 # ============================================
@@ -63,8 +133,8 @@ def _reset_state() -> None:
 
 async def _on_session_start(agent_name: str, model_name: str, session_id: str | None = None):
     """Capture session start event."""
-    global _current_session_id
-    _current_session_id = session_id
+    _session_stack.append(session_id)
+    _get_session(session_id)
     
     writer = _get_writer()
     if writer:
@@ -86,32 +156,45 @@ async def _on_session_end(
     metadata: dict | None = None,
 ):
     """Capture session end event with confusion detection."""
+    effective_session_id = session_id or _current_session_id()
+    state = _end_session(effective_session_id) or _SessionState()
+    
     writer = _get_writer()
     if writer:
-        # Combine accumulated response for confusion detection
-        full_response = response_text or " ".join(_accumulated_response)
-        
         event_data = {
             "event": "session_end",
             "agent": agent_name,
             "model": model_name,
-            "session_id": session_id or _current_session_id,
+            "session_id": effective_session_id,
             "success": success,
             "error": str(error) if error else None,
             "tokens_used": metadata.get("tokens_used") if metadata else None,
-            "thinking_length": sum(len(t) for t in _accumulated_thinking),
-            "response_length": sum(len(r) for r in _accumulated_response),
+            "thinking_length": state.thinking_length,
+            "response_length": state.response_length,
         }
         
-        # Detect confusion signals
-        if full_response:
-            confusion_signals = _detect_confusion(full_response)
-            if confusion_signals:
-                event_data["confusion_signals"] = confusion_signals
+        # The final response text wins when given; otherwise use the signals
+        # detected while streaming
+        if response_text:
+            confusion_signals = detect_confusion(response_text)
+        else:
+            confusion_signals = state.confusion.signals()
+        if confusion_signals:
+            event_data["confusion_signals"] = confusion_signals
         
         writer.emit(event_data)
     
-    _reset_state()
+    # Draining waits on the writer thread (up to DRAIN_TIMEOUT); keep it off the event loop
+    if _sessions:
+        # Other sessions are still running; just make this one's events durable
+        if _writer is not None:
+            await asyncio.to_thread(_writer.drain)
+    else:
+        # Drain queued events, flush them and release the day's file handle.
+        # The sink is detached first, so a session starting meanwhile gets a new one.
+        finished = _reset_state()
+        if finished is not None:
+            await asyncio.to_thread(finished.close)
 
 
 # ============================================
@@ -124,7 +207,9 @@ async def _on_stream_event(event_type: str, event_data: Any, session_id: str | N
     if not writer:
         return
     
-    effective_session_id = session_id or _current_session_id
+    effective_session_id = session_id or _current_session_id()
+    state = _get_session(effective_session_id)
+    active_tool_calls = state.active_tool_calls
     
     # ===== PART START =====
     if event_type == "part_start":
@@ -135,23 +220,26 @@ async def _on_stream_event(event_type: str, event_data: Any, session_id: str | N
         # Tool call start
         if part_type == "ToolCallPart" and part is not None:
             tool_name = getattr(part, "tool_name", None) or ""
-            _active_tool_calls[index] = {
+            if len(active_tool_calls) >= MAX_ACTIVE_TOOL_CALLS and index not in active_tool_calls:
+                # Parts that never ended; forget the oldest
+                active_tool_calls.pop(next(iter(active_tool_calls)))
+            active_tool_calls[index] = {
                 "tool": tool_name,
                 "start_time": time.perf_counter(),
-                "args_json": "",
+                "args": ArgsAccumulator(),
             }
         
         # Thinking part start (capture initial content if any)
         elif part_type == "ThinkingPart" and part is not None:
             content = getattr(part, "content", "") or ""
             if content:
-                _accumulated_thinking.append(content)
+                state.add_thinking(content)
         
         # Text part start (capture initial content if any)  
         elif part_type == "TextPart" and part is not None:
             content = getattr(part, "content", "") or ""
             if content:
-                _accumulated_response.append(content)
+                state.add_response(content)
     
     # ===== PART DELTA =====
     elif event_type == "part_delta":
@@ -163,48 +251,45 @@ async def _on_stream_event(event_type: str, event_data: Any, session_id: str | N
             return
             
         # Tool call args streaming
-        if index in _active_tool_calls and delta_type == "ToolCallPartDelta":
+        if index in active_tool_calls and delta_type == "ToolCallPartDelta":
             args_delta = getattr(delta, "args_delta", "") or ""
             if args_delta:
-                _active_tool_calls[index]["args_json"] += args_delta
+                active_tool_calls[index]["args"].feed(args_delta)
             tool_name_delta = getattr(delta, "tool_name_delta", "") or ""
             if tool_name_delta:
-                _active_tool_calls[index]["tool"] += tool_name_delta
+                active_tool_calls[index]["tool"] += tool_name_delta
         
         # Thinking content streaming
         elif delta_type == "ThinkingPartDelta":
             content = getattr(delta, "content_delta", "") or ""
             if content:
-                _accumulated_thinking.append(content)
+                state.add_thinking(content)
         
         # Response content streaming
         elif delta_type == "TextPartDelta":
             content = getattr(delta, "content_delta", "") or ""
             if content:
-                _accumulated_response.append(content)
+                state.add_response(content)
     
     # ===== PART END =====
     elif event_type == "part_end":
         index = event_data.get("index")
         
         # Emit completed tool call
-        if index in _active_tool_calls:
-            tool_data = _active_tool_calls.pop(index)
+        if index in active_tool_calls:
+            tool_data = active_tool_calls.pop(index)
             duration_ms = (time.perf_counter() - tool_data["start_time"]) * 1000
             
-            # Parse accumulated args
-            args = {}
-            args_json = tool_data.get("args_json", "")
-            if args_json:
-                try:
-                    args = json.loads(args_json)
-                except json.JSONDecodeError:
-                    args = {"_raw": args_json[:200] + "..." if len(args_json) > 200 else args_json}
+            # Args were parsed while streaming; only summary prefixes were kept
+            accumulator = tool_data["args"]
+            args, lengths = accumulator.result()
             
             writer.emit({
                 "event": "tool_call",
                 "tool": tool_data["tool"],
-                "args": _summarize_args(args),
+                "args": _summarize_args(args, lengths),
+                "args_size": accumulator.size,
+                "args_chunks": accumulator.chunks,
                 "duration_ms": round(duration_ms, 2),
                 "session_id": effective_session_id,
             })
@@ -266,7 +351,7 @@ def _on_edit_file(context: Any, result: dict, payload: Any) -> None:
         "file_path": str(file_path),
         "success": success,
         "lines_changed": lines_changed,
-        "session_id": _current_session_id,
+        "session_id": _current_session_id(),
     })
     
     return None  # Don't modify the result
@@ -306,7 +391,7 @@ def _on_delete_file(context: Any, *args, **kwargs) -> None:
         "event": "file_operation",
         "operation": "delete",
         "file_path": str(file_path),
-        "session_id": _current_session_id,
+        "session_id": _current_session_id(),
     })
     
     return None
@@ -330,7 +415,7 @@ async def _on_shell_command(context: Any, command: str, cwd: str, timeout: int)
         "command": safe_command,
         "cwd": str(cwd),
         "timeout": timeout,
-        "session_id": _current_session_id,
+        "session_id": _current_session_id(),
     })
     
     return None  # Don't block the command
@@ -355,7 +440,7 @@ async def _on_invoke_agent(*args, **kwargs) -> None:
     
     writer.emit({
         "event": "agent_delegation",
-        "from_session": _current_session_id,
+        "from_session": _current_session_id(),
         "to_agent": agent_name,
         "to_session": delegated_session_id,
         "prompt_preview": prompt_preview,
@@ -378,7 +463,7 @@ async def _on_agent_exception(exception: Exception, *args, **kwargs) -> None:
         "event": "error",
         "error_type": type(exception).__name__,
         "error_message": str(exception)[:500],
-        "session_id": _current_session_id,
+        "session_id": _current_session_id(),
     })
     
     return None
@@ -388,19 +473,24 @@ async def _on_agent_exception(exception: Exception, *args, **kwargs) -> None:
 # HELPER FUNCTIONS
 # ============================================
 
-def _summarize_args(args: dict) -> dict:
-    """Summarize tool arguments, redacting sensitive data."""
+def _summarize_args(args: dict, lengths: dict[str, int] | None = None) -> dict:
+    """Summarize tool arguments, redacting sensitive data.
+    
+    ``lengths`` gives the full length of string values that were truncated
+    while streaming.
+    """
     if not args:
         return {}
     
     summary = {}
+    lengths = lengths or {}
     sensitive_keys = ['password', 'secret', 'token', 'key', 'credential', 'auth', 'api_key']
     
     for key, value in args.items():
         if any(s in key.lower() for s in sensitive_keys):
             summary[key] = "[REDACTED]"
-        elif isinstance(value, str) and len(value) > 200:
-            summary[key] = f"{value[:100]}... [{len(value)} chars]"
+        elif isinstance(value, str) and lengths.get(key, len(value)) > 200:
+            summary[key] = f"{value[:100]}... [{lengths.get(key, len(value))} chars]"
         else:
             summary[key] = value
     
@@ -424,38 +514,6 @@ def _redact_command(command: str) -> str:
     return command
 
 
-def _detect_confusion(text: str) -> list[str] | None:
-    """Detect confusion signals in response text."""
-    if not text:
-        return None
-    
-    signals = []
-    text_lower = text.lower()
-    
-    confusion_markers = [
-        ("i'm not sure", "uncertainty"),
-        ("i'm unsure", "uncertainty"),
-        ("i don't understand", "comprehension"),
-        ("could you clarify", "clarification_needed"),
-        ("what do you mean", "clarification_needed"),
-        ("i'm confused", "confusion"),
-        ("this is unclear", "ambiguity"),
-        ("i need more information", "information_gap"),
-        ("i'm not certain", "uncertainty"),
-        ("it's ambiguous", "ambiguity"),
-        ("i apologize", "recovery"),
-        ("let me reconsider", "self_correction"),
-        ("actually,", "self_correction"),
-        ("wait,", "self_correction"),
-    ]
-    
-    for marker, signal_type in confusion_markers:
-        if marker in text_lower and signal_type not in signals:
-            signals.append(signal_type)
-    
-    return signals if signals else None
-
-
 # ============================================
 # REGISTER ALL CALLBACKS
 # ============================================
@@ -0,0 +1,486 @@
+"""Columnar compaction of closed-out telemetry days.
+
+A compacted day is a zip archive in ``elcs/telemetry/archive/`` holding one
+deflate-compressed member per (event type, column), plus a manifest:
+
+    manifest.json
+    tool_call/_seq.json
+    tool_call/ts.json
+    tool_call/tool.json
+    ...
+
+Columns follow a stable per-event schema (the event reference table in
+docs/TELEMETRY.md), so repeated keys are never stored. Repetitive string
+columns such as session_id or tool are dictionary-encoded; timestamps and
+row positions are delta-encoded integers. Queries read only the partitions
+and columns they need.
+
+Compaction is lossless: every row is reconstructed and compared with its
+original line before the JSONL file is removed. Rows that don't round-trip
+exactly are kept verbatim in a ``_raw`` partition.
+"""
+
+import json
+import logging
+import os
+import zipfile
+from collections.abc import Iterator
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from .telemetry_writer import ARCHIVE_DIR_NAME, DAY_PATTERN, EVENT_FILE_GLOB, INDEX_DIR_NAME, INDEX_FILE_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_VERSION = 1
+RAW_PARTITION = "_raw"
+
+# Columns per event type, after "ts" and "event", in the order the plugin
+# emits them. Keys outside the schema are kept in the "_extra" column.
+EVENT_SCHEMA: dict[str, tuple[str, ...]] = {
+    "session_start": ("agent", "model", "session_id"),
+    "session_end": (
+        "agent", "model", "session_id", "success", "error", "tokens_used",
+        "thinking_length", "response_length", "confusion_signals",
+    ),
+    "tool_call": ("tool", "args", "args_size", "args_chunks", "duration_ms", "session_id"),
+    "file_operation": ("operation", "file_path", "success", "lines_changed", "session_id"),
+    "shell_command": ("command", "cwd", "timeout", "session_id"),
+    "agent_delegation": ("from_session", "to_agent", "to_session", "prompt_preview"),
+    "error": ("error_type", "error_message", "session_id"),
+    "telemetry_dropped": ("count",),
+    "telemetry_summary": ("interval_seconds", "kept", "dropped"),
+    "budget_exceeded": ("scope", "scope_id", "metric", "used", "limit", "agent", "session_id"),
+}
+
+_MICROSECONDS_PER_DAY = 86_400_000_000
+
+
+def archive_path(telemetry_dir: Path, day: date) -> Path:
+    """Path of the compacted archive for a day."""
+    return telemetry_dir / ARCHIVE_DIR_NAME / f"events-{day.isoformat()}.zip"
+
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def _encode_column(values: list[Any]) -> dict[str, Any]:
+    """Dictionary-encode repetitive string columns; store others as-is."""
+    if values and all(v is None or isinstance(v, str) for v in values):
+        distinct = {v for v in values if v is not None}
+        if len(distinct) * 2 <= len(values):
+            table = sorted(distinct)
+            codes = {v: i for i, v in enumerate(table)}
+            return {"dict": table, "codes": [codes[v] if v is not None else -1 for v in values]}
+    return {"values": values}
+
+
+def _decode_column(data: dict[str, Any]) -> list[Any]:
+    if "dict" in data:
+        table = data["dict"]
+        return [table[c] if c >= 0 else None for c in data["codes"]]
+    if "deltas" in data:
+        values, total = [], 0
+        for delta in data["deltas"]:
+            total += delta
+            values.append(total)
+        return values
+    return data["values"]
+
+
+def _encode_deltas(values: list[int]) -> dict[str, Any]:
+    previous, deltas = 0, []
+    for value in values:
+        deltas.append(value - previous)
+        previous = value
+    return {"deltas": deltas}
+
+
+class _Partition:
+    """Rows of one event type being built up for compaction."""
+
+    def __init__(self, event: str):
+        self.event = event
+        self.columns = EVENT_SCHEMA.get(event, ())
+        self.seq: list[int] = []
+        self.ts: list[int] = []
+        self.values: dict[str, list[Any]] = {name: [] for name in self.columns}
+        self.missing: list[list[str] | None] = []
+        self.extra: list[dict | None] = []
+
+    def add(self, seq: int, ts_us: int, event: dict[str, Any]) -> None:
+        self.seq.append(seq)
+        self.ts.append(ts_us)
+        missing = []
+        for name in self.columns:
+            if name in event:
+                self.values[name].append(event[name])
+            else:
+                self.values[name].append(None)
+                missing.append(name)
+        self.missing.append(missing or None)
+        known = {"ts", "event", *self.columns}
+        extra = {k: v for k, v in event.items() if k not in known}
+        self.extra.append(extra or None)
+
+    def members(self) -> dict[str, dict[str, Any]]:
+        members = {
+            "_seq": _encode_deltas(self.seq),
+            "ts": _encode_deltas(self.ts),
+        }
+        for name in self.columns:
+            members[name] = _encode_column(self.values[name])
+        if any(self.missing):
+            members["_missing"] = {"values": self.missing}
+        if any(self.extra):
+            members["_extra"] = {"values": self.extra}
+        return members
+
+
+def _rebuild(
+    event_type: str,
+    ts: str,
+    columns: tuple[str, ...],
+    values: dict[str, Any],
+    missing: list[str] | None,
+    extra: dict | None,
+) -> dict[str, Any]:
+    """Rebuild an event dict with the writer's key order."""
+    event: dict[str, Any] = {"ts": ts, "event": event_type}
+    for name in columns:
+        if not missing or name not in missing:
+            event[name] = values[name]
+    if extra:
+        event.update(extra)
+    return event
+
+
+def _format_ts(day_start: datetime, ts_us: int) -> str:
+    return (day_start + timedelta(microseconds=ts_us)).isoformat()
+
+
+def _encode_line(event: dict[str, Any]) -> str:
+    # Must match TelemetryWriter's serialization
+    return json.dumps(event, default=str)
+
+
+def compact_day(source: Path, day: date, destination: Path) -> int:
+    """Compact one JSONL day file into a columnar archive. Returns rows written."""
+    day_start = _day_start(day)
+    partitions: dict[str, _Partition] = {}
+    raw_seq: list[int] = []
+    raw_lines: list[str] = []
+
+    with open(source, encoding="utf-8") as f:
+        for seq, line in enumerate(f):
+            line = line.rstrip("\n")
+            try:
+                event = json.loads(line)
+                event_type = event["event"]
+                ts = datetime.fromisoformat(event["ts"])
+                ts_us = (ts - day_start) // timedelta(microseconds=1)
+                if not isinstance(event_type, str) or not 0 <= ts_us < _MICROSECONDS_PER_DAY:
+                    raise ValueError("unsupported event")
+                partition = partitions.get(event_type) or _Partition(event_type)
+                # Only store the row columnar if it reconstructs byte-for-byte
+                known = {"ts", "event", *partition.columns}
+                rebuilt = _rebuild(
+                    event_type,
+                    _format_ts(day_start, ts_us),
+                    partition.columns,
+                    {name: event.get(name) for name in partition.columns},
+                    [name for name in partition.columns if name not in event] or None,
+                    {k: v for k, v in event.items() if k not in known} or None,
+                )
+                if _encode_line(rebuilt) != line:
+                    raise ValueError("row does not round-trip")
+            except (ValueError, KeyError, TypeError, AttributeError):
+                raw_seq.append(seq)
+                raw_lines.append(line)
+                continue
+            partitions[event_type] = partition
+            partition.add(seq, ts_us, event)
+
+    manifest: dict[str, Any] = {
+        "version": ARCHIVE_VERSION,
+        "day": day.isoformat(),
+        "source_bytes": source.stat().st_size,
+        "partitions": {},
+    }
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = destination.with_suffix(".tmp")
+    rows = 0
+    with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as archive:
+        for event_type, partition in sorted(partitions.items()):
+            members = partition.members()
+            for name, data in members.items():
+                archive.writestr(f"{event_type}/{name}.json", json.dumps(data, separators=(",", ":")))
+            manifest["partitions"][event_type] = {
+                "rows": len(partition.seq),
+                "columns": list(partition.columns),
+                "members": sorted(members),
+            }
+            rows += len(partition.seq)
+        if raw_lines:
+            archive.writestr(f"{RAW_PARTITION}/_seq.json", json.dumps(_encode_deltas(raw_seq)))
+            archive.writestr(f"{RAW_PARTITION}/line.json", json.dumps({"values": raw_lines}))
+            manifest["partitions"][RAW_PARTITION] = {
+                "rows": len(raw_lines),
+                "columns": [],
+                "members": ["_seq", "line"],
+            }
+            rows += len(raw_lines)
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+    os.replace(tmp_path, destination)
+    return rows
+
+
+class ArchiveDay:
+    """Read access to one compacted day, loading columns on demand.
+
+    Offers the same query interface as the JSONL ``DayIndex``; rows are
+    (partition, row number) pairs.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.day = date.fromisoformat(path.stem[len("events-"):])
+        self._day_start = _day_start(self.day)
+        self._zip: zipfile.ZipFile | None = None
+        self._manifest: dict[str, Any] | None = None
+        self._columns: dict[tuple[str, str], list[Any]] = {}
+
+    @property
+    def manifest(self) -> dict[str, Any]:
+        if self._manifest is None:
+            self._manifest = json.loads(self._archive().read("manifest.json"))
+        return self._manifest
+
+    def _archive(self) -> zipfile.ZipFile:
+        if self._zip is None:
+            self._zip = zipfile.ZipFile(self.path)
+        return self._zip
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+    def column(self, partition: str, name: str) -> list[Any] | None:
+        """Decoded values of one column, or None if the partition lacks it."""
+        key = (partition, name)
+        if key not in self._columns:
+            info = self.manifest["partitions"].get(partition)
+            if info is None or name not in info["members"]:
+                return None
+            data = json.loads(self._archive().read(f"{partition}/{name}.json"))
+            self._columns[key] = _decode_column(data)
+        return self._columns[key]
+
+    def _partitions(self, event: str | None) -> list[str]:
+        names = [p for p in self.manifest["partitions"] if p != RAW_PARTITION]
+        return [p for p in names if p == event] if event is not None else names
+
+    def _ts_bounds(self, since: float | None, until: float | None) -> tuple[int, int]:
+        start = self._day_start.timestamp()
+        low = 0 if since is None else round((since - start) * 1_000_000)
+        high = _MICROSECONDS_PER_DAY if until is None else round((until - start) * 1_000_000)
+        return low, high
+
+    def select(
+        self,
+        event: str | None = None,
+        session_id: str | None = None,
+        tool: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        min_duration_ms: float | None = None,
+    ) -> list[tuple[str, int]]:
+        """(partition, row) pairs matching all given filters, in original order."""
+        low, high = self._ts_bounds(since, until)
+        matches = []
+        for partition in self._partitions(event):
+            filters = []
+            if session_id is not None:
+                name = "from_session" if partition == "agent_delegation" else "session_id"
+                filters.append((self.column(partition, name), session_id))
+            if tool is not None:
+                filters.append((self.column(partition, "tool"), tool))
+            if any(column is None for column, _ in filters):
+                continue
+            durations = None
+            if min_duration_ms is not None:
+                durations = self.column(partition, "duration_ms")
+                if durations is None:
+                    continue
+            ts = self.column(partition, "ts") if since is not None or until is not None else None
+            seq = self.column(partition, "_seq")
+
+            for i in range(len(seq)):
+                if any(column[i] != value for column, value in filters):
+                    continue
+                if ts is not None and not low <= ts[i] < high:
+                    continue
+                if durations is not None:
+                    duration = durations[i]
+                    if not isinstance(duration, (int, float)) or duration < min_duration_ms:
+                        continue
+                matches.append((seq[i], partition, i))
+
+        # Unparsed rows can only be filtered after decoding
+        raw = self.manifest["partitions"].get(RAW_PARTITION)
+        if raw is not None:
+            lines = self.column(RAW_PARTITION, "line")
+            for i, seq in enumerate(self.column(RAW_PARTITION, "_seq")):
+                if _raw_matches(lines[i], event, session_id, tool, since, until, min_duration_ms):
+                    matches.append((seq, RAW_PARTITION, i))
+
+        matches.sort()
+        return [(partition, i) for _, partition, i in matches]
+
+    def rows(self) -> list[tuple[str, int]]:
+        """Every stored row, including lines queries skip, in original order."""
+        rows = [
+            (seq, partition, i)
+            for partition in self.manifest["partitions"]
+            for i, seq in enumerate(self.column(partition, "_seq"))
+        ]
+        rows.sort()
+        return [(partition, i) for _, partition, i in rows]
+
+    def read_lines(self, rows: list[tuple[str, int]]) -> Iterator[bytes]:
+        """Reconstruct the original JSONL lines for the given rows."""
+        for partition, i in rows:
+            yield self.read_line(partition, i).encode("utf-8")
+
+    def read_line(self, partition: str, i: int) -> str:
+        if partition == RAW_PARTITION:
+            return self.column(RAW_PARTITION, "line")[i]
+        columns = tuple(self.manifest["partitions"][partition]["columns"])
+        missing = self.column(partition, "_missing")
+        extra = self.column(partition, "_extra")
+        event = _rebuild(
+            partition,
+            _format_ts(self._day_start, self.column(partition, "ts")[i]),
+            columns,
+            {name: self.column(partition, name)[i] for name in columns},
+            missing[i] if missing else None,
+            extra[i] if extra else None,
+        )
+        return _encode_line(event)
+
+    def tool_durations(
+        self, since: float | None = None, until: float | None = None
+    ) -> Iterator[tuple[str, float]]:
+        """(tool, duration_ms) of tool_call events, reading only those columns."""
+        rows = self.select(event="tool_call", since=since, until=until)
+        tools = self.column("tool_call", "tool") or []
+        durations = self.column("tool_call", "duration_ms") or []
+        for partition, i in rows:
+            if partition == RAW_PARTITION:
+                event = json.loads(self.read_line(partition, i))
+                tool, duration = event.get("tool"), event.get("duration_ms")
+            else:
+                tool, duration = tools[i], durations[i]
+            if isinstance(duration, (int, float)):
+                yield tool or "unknown", duration
+
+
+def _raw_matches(
+    line: str,
+    event_type: str | None,
+    session_id: str | None,
+    tool: str | None,
+    since: float | None,
+    until: float | None,
+    min_duration_ms: float | None,
+) -> bool:
+    """Apply query filters to an unparsed row.
+
+    Lines that aren't JSON objects never match, as live days skip them too.
+    """
+    try:
+        event = json.loads(line)
+    except json.JSONDecodeError:
+        return False
+    if not isinstance(event, dict):
+        return False
+    if event_type is not None and event.get("event") != event_type:
+        return False
+    if session_id is not None and (event.get("session_id") or event.get("from_session")) != session_id:
+        return False
+    if tool is not None and event.get("tool") != tool:
+        return False
+    if since is not None or until is not None:
+        try:
+            ts = datetime.fromisoformat(event.get("ts")).timestamp()
+        except (TypeError, ValueError):
+            return False
+        if (since is not None and ts < since) or (until is not None and ts >= until):
+            return False
+    if min_duration_ms is not None:
+        duration = event.get("duration_ms")
+        if not isinstance(duration, (int, float)) or duration < min_duration_ms:
+            return False
+    return True
+
+
+def compact(
+    telemetry_dir: Path,
+    keep_days: int = 1,
+    today: date | None = None,
+    dry_run: bool = False,
+) -> list[tuple[Path, Path, int, int]]:
+    """Compact closed-out days older than ``keep_days`` (today counts as one).
+
+    Returns (source, archive, source bytes, archive bytes) per compacted day.
+    The JSONL file and its query index are removed once the archive is
+    verified.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    cutoff = today - timedelta(days=max(keep_days, 1) - 1)
+    results = []
+    for source in sorted(telemetry_dir.glob(EVENT_FILE_GLOB)):
+        match = DAY_PATTERN.search(source.name)
+        if not match:
+            continue
+        day = date.fromisoformat(match.group(1))
+        if day >= cutoff:
+            continue
+
+        destination = archive_path(telemetry_dir, day)
+        source_bytes = source.stat().st_size
+        if dry_run:
+            results.append((source, destination, source_bytes, 0))
+            continue
+        if destination.exists():
+            logger.warning(f"Archive {destination} already exists; leaving {source} in place")
+            continue
+
+        rows = compact_day(source, day, destination)
+        if not _verify(source, destination):
+            destination.unlink()
+            logger.warning(f"Compaction of {source} did not verify; leaving it in place")
+            continue
+        logger.info(f"Compacted {rows} events from {source.name}")
+        source.unlink()
+        index = telemetry_dir / INDEX_DIR_NAME / f"{source.stem}{INDEX_FILE_SUFFIX}"
+        index.unlink(missing_ok=True)
+        results.append((source, destination, source_bytes, destination.stat().st_size))
+    return results
+
+
+def _verify(source: Path, destination: Path) -> bool:
+    """Check that the archive reproduces the source file line for line."""
+    archive = ArchiveDay(destination)
+    try:
+        rows = archive.rows()
+        with open(source, encoding="utf-8") as f:
+            original = [line.rstrip("\n") for line in f]
+        if len(rows) != len(original):
+            return False
+        return all(archive.read_line(p, i) == line for (p, i), line in zip(rows, original))
+    finally:
+        archive.close()
@@ -0,0 +1,416 @@
+"""Budget accounting - live usage of claimed tokens and coalitions against their budgets.
+
+Work tokens carry a ``budget`` and coalition contracts ``budgets``
+(``tool_calls``, ``tokens``, ``time_seconds``). The accountant reads the
+telemetry stream on the sink's writer thread and attributes each event to
+the token its agent has claimed (``elcs/tokens/claimed/``, matched on
+``claimed_by``) and to that token's coalition (``elcs/coalitions/``, by
+``claimed_by`` or membership):
+
+- ``tool_call`` counts one tool call
+- ``session_end`` adds ``tokens_used``, or an estimate of ~4 characters per
+  token from ``thinking_length + response_length`` when it isn't reported
+- time is the gap between consecutive events of a session, capped at
+  ``IDLE_GAP_SECONDS`` so a session left open doesn't accrue time
+
+``session_start`` maps a session to its agent. A session started through
+``agent_delegation`` works for its parent's token unless its own agent has
+claimed one. The first time a total goes over a limit, a
+``budget_exceeded`` event is written to the telemetry stream.
+
+Totals are kept only for claimed tokens and active coalitions, so memory
+doesn't grow with the number of events. Every ``SYNC_INTERVAL`` seconds and
+whenever the sink drains, local increments are merged into
+``elcs/telemetry/budgets.json``, so agents in several processes count
+against one set of totals. Entries for closed or released tokens stay in
+the file with their final totals.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+BUDGETS_FILE_NAME = "budgets.json"
+BUDGET_FIELDS = ("tool_calls", "tokens", "time_seconds")
+
+# Coalitions whose budgets are enforced
+ACTIVE_COALITION_STATUSES = ("forming", "active")
+
+SYNC_INTERVAL = 5.0  # seconds between merges into budgets.json
+REFRESH_INTERVAL = 2.0  # seconds between checks for new claims and coalitions
+IDLE_GAP_SECONDS = 300.0  # longest gap between events counted as working time
+CHARS_PER_TOKEN = 4  # estimate when session_end has no tokens_used
+LOCK_TIMEOUT = 1.0  # seconds to wait for budgets.json; the merge is retried later
+STALE_LOCK_SECONDS = 30.0
+
+# Same bounds as the callbacks' per-session state
+MAX_SESSIONS = 64
+MAX_DELEGATION_DEPTH = 8
+
+
+def _read_json(path: Path) -> Any:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def _limits(budget: Any) -> dict[str, float]:
+    if not isinstance(budget, dict):
+        return {}
+    return {
+        field: budget[field] for field in BUDGET_FIELDS
+        if isinstance(budget.get(field), (int, float)) and not isinstance(budget.get(field), bool)
+    }
+
+
+class _FileLock:
+    """Cross-platform lock file (O_EXCL create); stale locks are broken."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def acquire(self, timeout: float = LOCK_TIMEOUT) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                if self._break_stale():
+                    continue
+            except OSError:
+                return False
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def _break_stale(self) -> bool:
+        """Remove the lock file if it is stale. Returns True if it is gone."""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+        if time.time() - stat.st_mtime <= STALE_LOCK_SECONDS:
+            return False
+        # Move it aside rather than unlinking it: if another process broke it
+        # first and took a new lock since the stat above, the file moved is that
+        # new lock, which the identity check catches and puts back (the mtime
+        # is compared too, as a freed inode number is soon reused)
+        aside = self.path.with_name(f"{self.path.name}.{os.getpid()}.{id(self)}.stale")
+        try:
+            os.rename(self.path, aside)
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+        try:
+            moved = os.stat(aside)
+            if (moved.st_dev, moved.st_ino, moved.st_mtime_ns) != (stat.st_dev, stat.st_ino, stat.st_mtime_ns):
+                try:
+                    os.link(aside, self.path)
+                except FileExistsError:
+                    pass  # Yet another process holds the lock now
+            os.unlink(aside)
+        except OSError as e:
+            logger.warning(f"ELCS Telemetry: Could not break stale lock {self.path}: {e}")
+        return True
+
+    def release(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class BudgetAccountant:
+    """Streaming attribution of telemetry events to token and coalition budgets."""
+
+    def __init__(self, elcs_dir: Path, sync_interval: float = SYNC_INTERVAL):
+        self.elcs_dir = Path(elcs_dir)
+        self.path = self.elcs_dir / "telemetry" / BUDGETS_FILE_NAME
+        self._lock = _FileLock(self.path.with_name(f".{BUDGETS_FILE_NAME}.lock"))
+        self.sync_interval = sync_interval
+
+        # session_id -> [agent, parent session_id, last event time (us)], least recent first
+        self._sessions: "OrderedDict[str | None, list]" = OrderedDict()
+        # Delegations waiting for their session_start: to_session or ("agent", name) -> from_session
+        self._delegations: "OrderedDict[Any, str | None]" = OrderedDict()
+
+        # Claims and coalitions, re-read when their folders change
+        self._claims: dict[str, dict[str, Any]] = {}  # agent -> {"token_id", "limits", "coalition"}
+        self._coalitions: dict[str, dict[str, float]] = {}  # coalition_id -> limits
+        self._member_of: dict[str, str] = {}  # agent -> coalition_id
+        self._dir_mtimes: dict[str, int | None] = {}
+        self._live: dict[tuple[str, str], dict[str, float]] = {}  # scope -> limits
+        self._last_refresh = float("-inf")
+
+        # Totals per scope ("token", id) / ("coalition", id): merged file totals + local increments
+        self._base: dict[tuple[str, str], dict[str, float]] = {}
+        self._pending: dict[tuple[str, str], dict[str, float]] = {}
+        self._reported: set[tuple[str, str, str]] = set()
+        self._last_sync = time.monotonic()
+
+    @classmethod
+    def load(cls, telemetry_dir: Path | None) -> "BudgetAccountant | None":
+        """An accountant for the project owning ``telemetry_dir``, if it has work tokens."""
+        if telemetry_dir is None or not (telemetry_dir.parent / "tokens").is_dir():
+            return None
+        accountant = cls(telemetry_dir.parent)
+        accountant.sync()
+        return accountant
+
+    # -- claims ------------------------------------------------------------
+
+    def _changed(self, folder: Path) -> bool:
+        try:
+            mtime = folder.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        changed = self._dir_mtimes.get(str(folder), -1) != mtime
+        self._dir_mtimes[str(folder)] = mtime
+        return changed
+
+    def _refresh(self) -> None:
+        """Re-read claimed tokens and coalitions if their folders changed."""
+        self._last_refresh = time.monotonic()
+        coalitions_dir = self.elcs_dir / "coalitions"
+        claimed_dir = self.elcs_dir / "tokens" / "claimed"
+        coalitions_changed = self._changed(coalitions_dir)
+        if coalitions_changed:
+            self._coalitions, self._member_of = {}, {}
+            for path in sorted(coalitions_dir.glob("*.json")) if coalitions_dir.is_dir() else []:
+                contract = _read_json(path)
+                if not isinstance(contract, dict) or contract.get("status", "forming") not in ACTIVE_COALITION_STATUSES:
+                    continue
+                coalition_id = str(contract.get("coalition_id") or path.stem)
+                self._coalitions[coalition_id] = _limits(contract.get("budgets"))
+                for member in contract.get("members") or []:
+                    self._member_of.setdefault(str(member), coalition_id)
+        if self._changed(claimed_dir) or coalitions_changed:
+            claims: dict[str, tuple[str, dict[str, Any]]] = {}
+            for path in claimed_dir.glob("*.json") if claimed_dir.is_dir() else []:
+                token = _read_json(path)
+                if not isinstance(token, dict) or not token.get("claimed_by"):
+                    continue
+                claimer = str(token["claimed_by"])
+                claim = {
+                    "token_id": str(token.get("token_id") or path.stem),
+                    "limits": _limits(token.get("budget")),
+                    # claimed_by may name a coalition rather than an agent
+                    "coalition": claimer if claimer in self._coalitions else self._member_of.get(claimer),
+                }
+                # An agent holding several claims is working on the latest one
+                claimed_at = str(token.get("claimed_at") or "")
+                if claimer not in claims or claimed_at >= claims[claimer][0]:
+                    claims[claimer] = (claimed_at, claim)
+            self._claims = {claimer: claim for claimer, (_, claim) in claims.items()}
+            self._live = self._live_scopes()
+
+    def _live_scopes(self) -> dict[tuple[str, str], dict[str, float]]:
+        scopes = {("token", claim["token_id"]): claim["limits"] for claim in self._claims.values()}
+        scopes.update((("coalition", coalition_id), limits) for coalition_id, limits in self._coalitions.items())
+        return scopes
+
+    def _scopes_of(self, session_id: str | None) -> list[tuple[str, str]]:
+        """The token (and its coalition) a session's work counts against.
+
+        Without a claimed token up the delegation chain, a coalition member's
+        work still counts against its coalition.
+        """
+        agent = self._sessions[session_id][0] if session_id in self._sessions else None
+        for _ in range(MAX_DELEGATION_DEPTH):
+            session = self._sessions.get(session_id)
+            if session is None:
+                break
+            claim = self._claims.get(session[0])
+            if claim is not None:
+                scopes = [("token", claim["token_id"])]
+                if claim["coalition"] is not None:
+                    scopes.append(("coalition", claim["coalition"]))
+                return scopes
+            session_id = session[1]
+        coalition_id = self._member_of.get(agent)
+        return [("coalition", coalition_id)] if coalition_id is not None else []
+
+    # -- events ------------------------------------------------------------
+
+    def feed(self, event_data: dict[str, Any], ts_us: int) -> list[dict[str, Any]]:
+        """Account for one event. Returns ``budget_exceeded`` events to write."""
+        kind = event_data.get("event")
+        now = time.monotonic()
+        if now - self._last_refresh >= REFRESH_INTERVAL:
+            self._refresh()
+
+        if kind == "agent_delegation":
+            key = event_data.get("to_session") or ("agent", event_data.get("to_agent"))
+            self._delegations[key] = event_data.get("from_session")
+            while len(self._delegations) > MAX_SESSIONS:
+                self._delegations.popitem(last=False)
+            return []
+
+        session_id = event_data.get("session_id")
+        if kind == "session_start":
+            agent = event_data.get("agent")
+            parent = self._delegations.pop(session_id, None) if session_id is not None else None
+            if parent is None:
+                parent = self._delegations.pop(("agent", agent), None)
+            self._sessions[session_id] = [agent, parent, ts_us]
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+            return []
+
+        session = self._sessions.get(session_id)
+        if session is None:
+            return []  # Started before this process, or not a session event
+        usage: dict[str, float] = {}
+        gap_us = ts_us - session[2]
+        session[2] = max(session[2], ts_us)
+        if gap_us > 0:
+            usage["time_seconds"] = min(gap_us / 1_000_000, IDLE_GAP_SECONDS)
+        if kind == "tool_call":
+            usage["tool_calls"] = 1
+        elif kind == "session_end":
+            tokens = event_data.get("tokens_used")
+            if not isinstance(tokens, (int, float)) or isinstance(tokens, bool):
+                chars = (event_data.get("thinking_length") or 0) + (event_data.get("response_length") or 0)
+                tokens = chars // CHARS_PER_TOKEN
+            if tokens:
+                usage["tokens"] = tokens
+
+        exceeded = self._add(self._scopes_of(session_id), usage, session[0], session_id)
+        if kind == "session_end":
+            self._sessions.pop(session_id, None)
+        if now - self._last_sync >= self.sync_interval:
+            self.sync()
+        return exceeded
+
+    def _add(
+        self, scopes: list[tuple[str, str]], usage: dict[str, float], agent: str | None, session_id: str | None,
+    ) -> list[dict[str, Any]]:
+        if not scopes or not usage:
+            return []
+        exceeded = []
+        for scope in scopes:
+            pending = self._pending.setdefault(scope, {})
+            for metric, amount in usage.items():
+                pending[metric] = pending.get(metric, 0) + amount
+            base = self._base.get(scope, {})
+            for metric, limit in self._live.get(scope, {}).items():
+                used = base.get(metric, 0) + pending.get(metric, 0)
+                if used > limit and (scope[0], scope[1], metric) not in self._reported:
+                    self._reported.add((scope[0], scope[1], metric))
+                    exceeded.append({
+                        "event": "budget_exceeded",
+                        "scope": scope[0],
+                        "scope_id": scope[1],
+                        "metric": metric,
+                        "used": round(used, 2),
+                        "limit": limit,
+                        "agent": agent,
+                        "session_id": session_id,
+                    })
+        return exceeded
+
+    def totals(self) -> dict[tuple[str, str], dict[str, float]]:
+        """Current usage per live scope (last merged totals plus local increments)."""
+        totals = {}
+        for scope in self._live:
+            base, pending = self._base.get(scope, {}), self._pending.get(scope, {})
+            totals[scope] = {m: base.get(m, 0) + pending.get(m, 0) for m in set(base) | set(pending)}
+        return totals
+
+    # -- persistence -------------------------------------------------------
+
+    def sync(self) -> bool:
+        """Merge local increments into budgets.json and pick up other processes' totals.
+
+        With no local increments the file is only read, not locked or
+        rewritten. Returns False (keeping the increments) when the file is
+        locked too long.
+        """
+        self._last_sync = time.monotonic()
+        self._refresh()
+        if not any(self._pending.values()):
+            self._adopt(self._merge(_read_json(self.path)))
+            return True
+        if not self._lock.acquire():
+            return False
+        try:
+            merged = self._merge(_read_json(self.path))
+            document = {
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+                "tokens": merged["token"],
+                "coalitions": merged["coalition"],
+            }
+            tmp_path = self.path.with_name(f".{BUDGETS_FILE_NAME}.{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(document, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"ELCS Telemetry: Could not update {self.path}: {e}")
+            return False
+        finally:
+            self._lock.release()
+        self._adopt(merged)
+        return True
+
+    def _merge(self, data: Any) -> dict[str, dict[str, Any]]:
+        """budgets.json entries with local increments added.
+
+        Live scopes get their current limits. Entries for other scopes (closed
+        or released tokens, claims only other processes know about) are
+        carried over as they are, so their totals survive the rewrite.
+        """
+        data = data if isinstance(data, dict) else {}
+        merged: dict[str, dict[str, Any]] = {"token": {}, "coalition": {}}
+        for scope in merged:
+            entries = data.get(f"{scope}s")
+            entries = entries if isinstance(entries, dict) else {}
+            scope_ids = set(entries)
+            scope_ids.update(scope_id for s, scope_id in (*self._live, *self._pending) if s == scope)
+            for scope_id in sorted(scope_ids):
+                entry = entries.get(scope_id)
+                entry = entry if isinstance(entry, dict) else {}
+                file_used = entry.get("used")
+                used = {
+                    m: v for m, v in file_used.items() if isinstance(v, (int, float))
+                } if isinstance(file_used, dict) else {}
+                for metric, amount in self._pending.get((scope, scope_id), {}).items():
+                    used[metric] = used.get(metric, 0) + amount
+                limits = self._live.get((scope, scope_id))
+                if limits is None:
+                    limits = entry.get("limits") if isinstance(entry.get("limits"), dict) else {}
+                exceeded = entry.get("exceeded")
+                reported = {m for m in exceeded if isinstance(m, str)} if isinstance(exceeded, list) else set()
+                reported.update(m for s, i, m in self._reported if (s, i) == (scope, scope_id))
+                merged[scope][scope_id] = {
+                    "used": {m: round(v, 3) for m, v in sorted(used.items())},
+                    "limits": limits,
+                    "exceeded": sorted(reported),
+                }
+        return merged
+
+    def _adopt(self, merged: dict[str, dict[str, Any]]) -> None:
+        """Take merged totals of the live scopes as the new base; local increments are now in them."""
+        self._pending = {}
+        live = [
+            (scope, scope_id, entry)
+            for scope in ("token", "coalition") for scope_id, entry in merged[scope].items()
+            if (scope, scope_id) in self._live
+        ]
+        self._base = {(scope, scope_id): dict(entry["used"]) for scope, scope_id, entry in live}
+        self._reported = {
+            (scope, scope_id, metric) for scope, scope_id, entry in live for metric in entry["exceeded"]
+        }
@@ -0,0 +1,177 @@
+"""Event encoding - timestamps and JSON serialization for the telemetry writer.
+
+Encoders turn an event into one JSONL line with its ``ts`` first:
+
+- ``stdlib`` (default): the standard library's C encoder, built once rather
+  than per call. Output is byte-identical to ``json.dumps(event, default=str)``.
+- ``orjson``: faster, but writes compact separators (``{"a":1}``) and raw
+  UTF-8, so lines are equivalent JSON but not byte-identical.
+
+Select with ``ELCS_TELEMETRY_ENCODER`` = ``stdlib`` | ``orjson`` | ``auto``
+(``auto`` uses orjson when it is installed).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+# c_make_encoder is None on interpreters without the C accelerator
+from json.encoder import c_make_encoder, encode_basestring_ascii
+
+logger = logging.getLogger(__name__)
+
+ENCODER_STDLIB = "stdlib"
+ENCODER_ORJSON = "orjson"
+ENCODER_AUTO = "auto"
+
+# Re-sync the monotonic clock with the wall clock this often
+REANCHOR_NS = 3600 * 1_000_000_000
+
+
+class EventClock:
+    """Cheap event timestamps: a wall-clock anchor plus monotonic offsets.
+
+    ``now_us`` costs one monotonic clock read. Within an anchor period time
+    never jumps backwards; the anchor is refreshed hourly so timestamps track
+    the wall clock. ``isoformat`` reuses the formatted date/time prefix for
+    every event within the same second.
+    """
+
+    def __init__(self):
+        self._anchor = (time.time_ns() // 1000, time.monotonic_ns())
+        self._lock = threading.Lock()
+        self._second: int | None = None
+        self._prefix = ""
+
+    def now_us(self) -> int:
+        """Current time as integer microseconds since the epoch (UTC)."""
+        epoch_us, mono_ns = self._anchor
+        now_ns = time.monotonic_ns()
+        if now_ns - mono_ns > REANCHOR_NS:
+            self._anchor = (time.time_ns() // 1000, time.monotonic_ns())
+            epoch_us, mono_ns = self._anchor
+            now_ns = mono_ns
+        return epoch_us + (now_ns - mono_ns) // 1000
+
+    def isoformat(self, ts_us: int) -> str:
+        """Format like ``datetime.isoformat()`` for an aware UTC datetime."""
+        second, micros = divmod(ts_us, 1_000_000)
+        with self._lock:
+            if second != self._second:
+                stamp = datetime.fromtimestamp(second, timezone.utc)
+                self._prefix = stamp.strftime("%Y-%m-%dT%H:%M:%S")
+                self._second = second
+            prefix = self._prefix
+        if micros:
+            return f"{prefix}.{micros:06d}+00:00"
+        return f"{prefix}+00:00"
+
+
+# Shared by all writers and sinks in the process
+CLOCK = EventClock()
+
+
+class StdlibEncoder:
+    """Standard-library JSON, byte-identical to ``json.dumps(..., default=str)``."""
+
+    name = ENCODER_STDLIB
+    # Splice points for a leading "ts" key (ts is plain ASCII, no escaping)
+    _ts_open = '{"ts": "'
+    _ts_close = '", '
+
+    def __init__(self):
+        if c_make_encoder is not None:
+            # markers=None skips the circular-reference bookkeeping; events
+            # are plain trees and a cycle still fails with RecursionError
+            c_encoder = c_make_encoder(
+                None, str, encode_basestring_ascii, None, ": ", ", ", False, False, True
+            )
+            self._encode = lambda obj: "".join(c_encoder(obj, 0))
+        else:
+            self._encode = json.JSONEncoder(default=str).encode
+
+    def encode(self, obj: Any) -> str:
+        return self._encode(obj)
+
+    def encode_event(self, ts: str, event_data: dict[str, Any]) -> str:
+        """Encode ``{"ts": ts, **event_data}`` as one JSONL line."""
+        if "ts" in event_data:
+            return self.encode({"ts": ts, **event_data}) + "\n"
+        body = self.encode(event_data)
+        if body == "{}":
+            return self.encode({"ts": ts}) + "\n"
+        return f"{self._ts_open}{ts}{self._ts_close}{body[1:]}\n"
+
+
+class OrjsonEncoder(StdlibEncoder):
+    """orjson-backed encoder (compact separators, UTF-8 output)."""
+
+    name = ENCODER_ORJSON
+    _ts_open = '{"ts":"'
+    _ts_close = '",'
+
+    def __init__(self):
+        import orjson
+
+        option = orjson.OPT_NON_STR_KEYS
+        self._encode = lambda obj: orjson.dumps(obj, default=str, option=option).decode()
+
+
+def get_encoder(name: str | None = None) -> StdlibEncoder:
+    """Create the encoder named by ``name`` or ELCS_TELEMETRY_ENCODER."""
+    name = name or os.environ.get("ELCS_TELEMETRY_ENCODER", ENCODER_STDLIB)
+    if name in (ENCODER_ORJSON, ENCODER_AUTO):
+        try:
+            return OrjsonEncoder()
+        except ImportError:
+            if name == ENCODER_ORJSON:
+                logger.warning("ELCS Telemetry: orjson is not installed, using stdlib encoder")
+    elif name != ENCODER_STDLIB:
+        logger.warning(f"ELCS Telemetry: Unknown encoder '{name}', using stdlib encoder")
+    return StdlibEncoder()
+
+
+# Representative tool_call event for benchmarks
+_SAMPLE_EVENT = {
+    "event": "tool_call",
+    "tool": "read_file",
+    "args": {"file_path": "src/app/main.py", "start_line": 1, "num_lines": 200},
+    "args_size": 64,
+    "args_chunks": 9,
+    "duration_ms": 12.34,
+    "session_id": "3f1c2a7e-1111-2222-3333-444455556666",
+}
+
+
+def benchmark(events: int = 100_000) -> dict[str, float]:
+    """Per-event timestamp + serialization cost in microseconds, by path.
+
+    "legacy" is the original emit path: a merged dict, ``datetime.now()``
+    and ``json.dumps(..., default=str)`` per event.
+    """
+    def legacy() -> str:
+        event = {"ts": datetime.now(timezone.utc).isoformat(), **_SAMPLE_EVENT}
+        return json.dumps(event, default=str) + "\n"
+
+    paths = {"legacy": legacy}
+    encoders = [StdlibEncoder()]
+    try:
+        encoders.append(OrjsonEncoder())
+    except ImportError:
+        pass
+    for encoder in encoders:
+        paths[encoder.name] = (
+            lambda encoder=encoder: encoder.encode_event(CLOCK.isoformat(CLOCK.now_us()), _SAMPLE_EVENT)
+        )
+
+    results = {}
+    for name, path in paths.items():
+        start = time.perf_counter()
+        for _ in range(events):
+            path()
+        results[name] = (time.perf_counter() - start) / events * 1_000_000
+    return results
@@ -0,0 +1,159 @@
+"""Telemetry policy - sampling and rate limiting in front of the writer.
+
+Configured per project in ``elcs/telemetry/policy.json``; without that file
+every event is kept. Example:
+
+    {
+      "sample_rates": {"tool_call": 0.25, "file_operation": 0.5},
+      "rate_limits": {"shell_command": {"per_second": 5, "burst": 20}},
+      "always_keep": {
+        "events": ["session_start", "session_end", "agent_delegation", "error"],
+        "min_duration_ms": 1000
+      },
+      "summary_interval_seconds": 60
+    }
+
+Errors (``error`` events and events carrying an ``error`` or
+``success: false``) and calls at or above ``min_duration_ms`` are always
+kept. Dropped events are counted per event type and reported in periodic
+``telemetry_summary`` events.
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+POLICY_FILE_NAME = "policy.json"
+
+DEFAULT_ALWAYS_KEEP_EVENTS = ("session_start", "session_end", "agent_delegation", "error")
+DEFAULT_SUMMARY_INTERVAL = 60.0  # seconds
+
+
+class TokenBucket:
+    """Classic token bucket: ``per_second`` refill, up to ``burst`` tokens."""
+
+    __slots__ = ("per_second", "burst", "tokens", "updated")
+
+    def __init__(self, per_second: float, burst: float):
+        self.per_second = per_second
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> bool:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.per_second)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class TelemetryPolicy:
+    """Decides which events are written, and counts the ones that aren't."""
+
+    def __init__(self, config: dict[str, Any] | None = None):
+        config = config or {}
+        self.sample_rates: dict[str, float] = {
+            event: min(max(float(rate), 0.0), 1.0)
+            for event, rate in config.get("sample_rates", {}).items()
+        }
+        self.buckets: dict[str, TokenBucket] = {
+            event: TokenBucket(float(limit["per_second"]), float(limit.get("burst", limit["per_second"])))
+            for event, limit in config.get("rate_limits", {}).items()
+        }
+        always_keep = config.get("always_keep", {})
+        self.always_keep_events = frozenset(always_keep.get("events", DEFAULT_ALWAYS_KEEP_EVENTS))
+        self.min_duration_ms: float | None = always_keep.get("min_duration_ms")
+        self.summary_interval = float(config.get("summary_interval_seconds", DEFAULT_SUMMARY_INTERVAL))
+
+        self._lock = threading.Lock()
+        self._kept: dict[str, int] = {}
+        self._dropped: dict[str, dict[str, int]] = {}
+        self._last_summary = time.monotonic()
+
+    @property
+    def is_passthrough(self) -> bool:
+        """True when the policy can never drop an event."""
+        return not self.sample_rates and not self.buckets
+
+    @classmethod
+    def load(cls, telemetry_dir: Path | None) -> "TelemetryPolicy":
+        """Load ``policy.json`` from the telemetry directory (keep-all if absent)."""
+        if telemetry_dir is None:
+            return cls()
+        path = telemetry_dir / POLICY_FILE_NAME
+        try:
+            with open(path, encoding="utf-8") as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            return cls()
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"ELCS Telemetry: Ignoring unreadable {path}: {e}")
+            return cls()
+        try:
+            return cls(config)
+        except (AttributeError, KeyError, TypeError, ValueError) as e:
+            logger.warning(f"ELCS Telemetry: Ignoring invalid {path}: {e}")
+            return cls()
+
+    def allow(self, event_data: dict[str, Any]) -> bool:
+        """Return True if the event should be written, counting it either way."""
+        event = event_data.get("event") or "unknown"
+        with self._lock:
+            reason = None
+            if not self._must_keep(event, event_data):
+                rate = self.sample_rates.get(event)
+                if rate is not None and random.random() >= rate:
+                    reason = "sampled"
+                else:
+                    bucket = self.buckets.get(event)
+                    if bucket is not None and not bucket.take(time.monotonic()):
+                        reason = "rate_limited"
+
+            if reason is None:
+                self._kept[event] = self._kept.get(event, 0) + 1
+                return True
+            dropped = self._dropped.setdefault(event, {})
+            dropped[reason] = dropped.get(reason, 0) + 1
+            return False
+
+    def _must_keep(self, event: str, event_data: dict[str, Any]) -> bool:
+        if event in self.always_keep_events:
+            return True
+        if event_data.get("error") or event_data.get("success") is False:
+            return True
+        if self.min_duration_ms is not None:
+            duration = event_data.get("duration_ms")
+            if isinstance(duration, (int, float)) and duration >= self.min_duration_ms:
+                return True
+        return False
+
+    def summary(self, force: bool = False) -> dict[str, Any] | None:
+        """A ``telemetry_summary`` event if one is due and anything was dropped.
+
+        Counters reset after each summary. ``force`` ignores the interval.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_summary < self.summary_interval:
+            return None
+        with self._lock:
+            interval = now - self._last_summary
+            self._last_summary = now
+            kept, dropped = self._kept, self._dropped
+            self._kept, self._dropped = {}, {}
+        if not dropped:
+            return None
+
+        return {
+            "event": "telemetry_summary",
+            "interval_seconds": round(interval, 1),
+            "kept": kept,
+            "dropped": dropped,
+        }
@@ -0,0 +1,424 @@
+"""Telemetry query engine - answers questions over events-*.jsonl via sidecar indexes.
+
+Each daily file gets a sidecar index in ``elcs/telemetry/.index/`` holding,
+per event, its byte offset and length plus the fields queries filter on:
+event type, session_id, tool, timestamp and duration_ms, with a posting list
+per value of the string fields. Indexes are extended incrementally as files
+grow, and the sidecar is appended to rather than rewritten, so a query parses
+only newly appended lines and then reads just the lines that match. Aggregates such as duration
+percentiles are answered from the index alone.
+
+Days compacted by ``telemetry_archive`` are read from their columnar
+archives through the same interface.
+"""
+
+import json
+import logging
+import os
+from collections.abc import Iterator
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from .telemetry_archive import ArchiveDay
+from .telemetry_writer import ARCHIVE_DIR_NAME, DAY_PATTERN, EVENT_FILE_GLOB, INDEX_DIR_NAME, INDEX_FILE_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+# Bytes at the start of a file used to detect that it was replaced
+FINGERPRINT_BYTES = 64
+
+
+def _parse_ts(value: Any) -> float | None:
+    """Convert an event's ISO timestamp to epoch seconds."""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _to_epoch(value: datetime | date | float | None) -> float | None:
+    """Normalize a time bound (datetime, date or epoch seconds) to epoch seconds."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Linearly interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        raise ValueError("percentile of empty list")
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+class DayIndex:
+    """Sidecar index for one events-YYYY-MM-DD.jsonl file.
+
+    String columns (event, session_id, tool) are dictionary-encoded into a
+    shared string table; -1 means the field was absent. Each string column
+    also keeps a posting list per code (the rows holding it, in file order),
+    so equality filters only visit the rows that can match.
+
+    On disk the index is JSON Lines: a header, then one segment per update
+    with the rows and strings it added. Updates append a segment instead of
+    rewriting the file; a segment applies only if it starts where the
+    previous one ended, so segments left by concurrent writers or a
+    torn write are ignored and the file is rewritten on the next save.
+    """
+
+    def __init__(self, source: Path, index_path: Path):
+        self.source = source
+        self.index_path = index_path
+        match = DAY_PATTERN.search(source.name)
+        self.day = date.fromisoformat(match.group(1)) if match else None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.indexed_bytes = 0
+        self.fingerprint = ""
+        self.strings: list[str] = []
+        self._codes: dict[str, int] = {}
+        self.offsets: list[int] = []
+        self.lengths: list[int] = []
+        self.events: list[int] = []
+        self.sessions: list[int] = []
+        self.tools: list[int] = []
+        self.ts: list[float | None] = []
+        self.durations: list[float | None] = []
+        # code -> rows, per string column
+        self.postings: dict[str, dict[int, list[int]]] = {"event": {}, "session": {}, "tool": {}}
+        # What the index file already holds; save() appends the rest
+        self._saved = (0, 0, 0)  # indexed_bytes, rows, strings
+        self._rewrite = True
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def _code(self, value: Any) -> int:
+        if value is None:
+            return -1
+        value = str(value)
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def string(self, code: int) -> str | None:
+        return self.strings[code] if code >= 0 else None
+
+    def load(self) -> None:
+        """Load the sidecar index from disk, if present and current."""
+        try:
+            with open(self.index_path, "rb") as f:
+                lines = f.read().split(b"\n")
+        except OSError:
+            return
+        try:
+            header = json.loads(lines[0])
+        except json.JSONDecodeError:
+            return
+        if not isinstance(header, dict) or header.get("version") != INDEX_VERSION:
+            return
+
+        self._rewrite = False
+        # The last element is what follows the final newline: empty unless a write was torn
+        for line in lines[1:-1]:
+            try:
+                segment = json.loads(line)
+                start, end, fingerprint = segment["start"], segment["end"], segment["fingerprint"]
+                strings, rows = segment["strings"], segment["rows"]
+                if not isinstance(strings, list) or not all(isinstance(r, list) and len(r) == 7 for r in rows):
+                    raise ValueError("malformed segment")
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                self._rewrite = True
+                continue
+            if start != self.indexed_bytes:
+                # Written by another process from an older state
+                self._rewrite = True
+                continue
+            self.strings.extend(strings)
+            for row in rows:
+                self._add_row(*row)
+            self.indexed_bytes = end
+            self.fingerprint = fingerprint
+        if lines[-1]:
+            self._rewrite = True
+        self._codes = {s: i for i, s in enumerate(self.strings)}
+        self._saved = (self.indexed_bytes, len(self.offsets), len(self.strings))
+
+    def save(self) -> None:
+        """Append the rows indexed since the last save, or rewrite the file if it can't be extended."""
+        saved_bytes, saved_rows, saved_strings = (0, 0, 0) if self._rewrite else self._saved
+        segment = {
+            "start": saved_bytes,
+            "end": self.indexed_bytes,
+            "fingerprint": self.fingerprint,
+            "strings": self.strings[saved_strings:],
+            "rows": [
+                [self.offsets[i], self.lengths[i], self.events[i], self.sessions[i], self.tools[i],
+                 self.ts[i], self.durations[i]]
+                for i in range(saved_rows, len(self.offsets))
+            ],
+        }
+        line = json.dumps(segment, separators=(",", ":")) + "\n"
+        self.index_path.parent.mkdir(exist_ok=True)
+        if self._rewrite:
+            header = {"version": INDEX_VERSION, "source": self.source.name}
+            tmp_path = self.index_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(header) + "\n" + line)
+            os.replace(tmp_path, self.index_path)
+        else:
+            # One write call, so concurrent appends don't interleave
+            with open(self.index_path, "ab") as f:
+                f.write(line.encode("utf-8"))
+        self._saved = (self.indexed_bytes, len(self.offsets), len(self.strings))
+        self._rewrite = False
+
+    def update(self) -> bool:
+        """Index lines appended since the last update. Returns True if changed."""
+        try:
+            size = self.source.stat().st_size
+        except OSError:
+            return False
+
+        with open(self.source, "rb") as f:
+            fingerprint = f.read(FINGERPRINT_BYTES).hex()
+            if size < self.indexed_bytes or (
+                self.fingerprint and not fingerprint.startswith(self.fingerprint)
+            ):
+                # File was truncated or replaced; start over
+                self._reset()
+            if size == self.indexed_bytes:
+                return False
+
+            f.seek(self.indexed_bytes)
+            data = f.read(size - self.indexed_bytes)
+
+        # Only index complete lines; a partial last line waits for the next update
+        end = data.rfind(b"\n") + 1
+        offset = self.indexed_bytes
+        for raw in data[:end].splitlines(keepends=True):
+            line = raw.strip()
+            if line:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.debug(f"Skipping malformed line at {self.source}:{offset}")
+                    event = None
+                if isinstance(event, dict):
+                    self._append(offset, len(raw), event)
+            offset += len(raw)
+
+        self.indexed_bytes = offset
+        self.fingerprint = fingerprint[:FINGERPRINT_BYTES * 2] if offset else ""
+        return end > 0
+
+    def _append(self, offset: int, length: int, event: dict) -> None:
+        duration = event.get("duration_ms")
+        self._add_row(
+            offset,
+            length,
+            self._code(event.get("event")),
+            self._code(event.get("session_id") or event.get("from_session")),
+            self._code(event.get("tool")),
+            _parse_ts(event.get("ts")),
+            duration if isinstance(duration, (int, float)) else None,
+        )
+
+    def _add_row(
+        self,
+        offset: int,
+        length: int,
+        event: int,
+        session: int,
+        tool: int,
+        ts: float | None,
+        duration: float | None,
+    ) -> None:
+        row = len(self.offsets)
+        self.offsets.append(offset)
+        self.lengths.append(length)
+        self.events.append(event)
+        self.sessions.append(session)
+        self.tools.append(tool)
+        self.ts.append(ts)
+        self.durations.append(duration)
+        for field, code in (("event", event), ("session", session), ("tool", tool)):
+            if code >= 0:
+                self.postings[field].setdefault(code, []).append(row)
+
+    def select(
+        self,
+        event: str | None = None,
+        session_id: str | None = None,
+        tool: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        min_duration_ms: float | None = None,
+    ) -> list[int]:
+        """Row numbers matching all given filters."""
+        # Walk the shortest posting list and check the other fields per row
+        filters = []
+        for field, column, value in (
+            ("event", self.events, event),
+            ("session", self.sessions, session_id),
+            ("tool", self.tools, tool),
+        ):
+            if value is not None:
+                code = self._codes.get(value)
+                rows = self.postings[field].get(code) if code is not None else None
+                if not rows:
+                    return []  # Values never seen in this file can't match
+                filters.append((rows, column, code))
+        filters.sort(key=lambda f: len(f[0]))
+        candidates = filters[0][0] if filters else range(len(self.offsets))
+        codes = [(column, code) for _, column, code in filters[1:]]
+
+        rows = []
+        for i in candidates:
+            if any(column[i] != code for column, code in codes):
+                continue
+            if since is not None or until is not None:
+                ts = self.ts[i]
+                if ts is None or (since is not None and ts < since) or (until is not None and ts >= until):
+                    continue
+            if min_duration_ms is not None:
+                duration = self.durations[i]
+                if duration is None or duration < min_duration_ms:
+                    continue
+            rows.append(i)
+        return rows
+
+    def read_lines(self, rows: list[int]) -> Iterator[bytes]:
+        """Read the raw JSONL lines for the given rows."""
+        if not rows:
+            return
+        with open(self.source, "rb") as f:
+            for i in rows:
+                f.seek(self.offsets[i])
+                yield f.read(self.lengths[i]).rstrip(b"\r\n")
+
+    def tool_durations(
+        self, since: float | None = None, until: float | None = None
+    ) -> Iterator[tuple[str, float]]:
+        """(tool, duration_ms) of tool_call events, from the index alone."""
+        for i in self.select(event="tool_call", since=since, until=until):
+            duration = self.durations[i]
+            if duration is not None:
+                yield self.string(self.tools[i]) or "unknown", duration
+
+
+class TelemetryQuery:
+    """Query events across a telemetry directory.
+
+    Live JSONL days (through their sidecar index) and compacted archive days
+    are presented as one stream, ordered by day.
+    """
+
+    def __init__(self, telemetry_dir: Path):
+        self.telemetry_dir = Path(telemetry_dir)
+        self.index_dir = self.telemetry_dir / INDEX_DIR_NAME
+        self.archive_dir = self.telemetry_dir / ARCHIVE_DIR_NAME
+
+    def days(
+        self,
+        since: datetime | date | float | None = None,
+        until: datetime | date | float | None = None,
+    ) -> Iterator["DayIndex | ArchiveDay"]:
+        """Up-to-date readers for each day overlapping [since, until).
+
+        A live JSONL file takes precedence over an archive of the same day.
+        """
+        since, until = _to_epoch(since), _to_epoch(until)
+        days: dict[str, Path] = {}
+        for source in self.archive_dir.glob("events-*.zip"):
+            days[source.stem] = source
+        for source in self.telemetry_dir.glob(EVENT_FILE_GLOB):
+            days[source.stem] = source
+
+        for stem, source in sorted(days.items()):
+            if source.suffix == ".zip":
+                index = ArchiveDay(source)
+            else:
+                index = DayIndex(source, self.index_dir / f"{stem}{INDEX_FILE_SUFFIX}")
+            if index.day is not None:
+                # Skip whole days outside the range without touching the file
+                day_start = _to_epoch(index.day)
+                if (until is not None and day_start >= until) or (
+                    since is not None and day_start + 86400 <= since
+                ):
+                    continue
+            if isinstance(index, ArchiveDay):
+                try:
+                    yield index
+                finally:
+                    index.close()
+                continue
+            index.load()
+            if index.update():
+                try:
+                    index.save()
+                except OSError as e:
+                    logger.warning(f"Could not save telemetry index {index.index_path}: {e}")
+            yield index
+
+    def find(
+        self,
+        event: str | None = None,
+        session_id: str | None = None,
+        tool: str | None = None,
+        since: datetime | date | float | None = None,
+        until: datetime | date | float | None = None,
+        min_duration_ms: float | None = None,
+    ) -> Iterator[bytes]:
+        """Raw JSONL lines of events matching all given filters, in file order."""
+        since, until = _to_epoch(since), _to_epoch(until)
+        for index in self.days(since, until):
+            rows = index.select(event, session_id, tool, since, until, min_duration_ms)
+            yield from index.read_lines(rows)
+
+    def duration_percentiles(
+        self,
+        percentiles: tuple[float, ...] = (50, 95, 99),
+        since: datetime | date | float | None = None,
+        until: datetime | date | float | None = None,
+    ) -> dict[str, dict[str, float]]:
+        """Per-tool count and duration_ms percentiles of tool_call events.
+
+        Answered from the indexes and archive columns only; no event lines
+        are read.
+        """
+        since, until = _to_epoch(since), _to_epoch(until)
+        by_tool: dict[str, list[float]] = {}
+        for index in self.days(since, until):
+            for tool, duration in index.tool_durations(since, until):
+                by_tool.setdefault(tool, []).append(duration)
+
+        stats = {}
+        for tool, durations in sorted(by_tool.items()):
+            durations.sort()
+            stats[tool] = {"count": len(durations)}
+            for pct in percentiles:
+                stats[tool][f"p{pct:g}"] = round(percentile(durations, pct), 2)
+        return stats
+
+    def timeline(self, session_id: str) -> list[dict[str, Any]]:
+        """All events of a session (including delegations from it), ordered by time."""
+        events = [json.loads(line) for line in self.find(session_id=session_id)]
+        events.sort(key=lambda e: e.get("ts") or "")
+        return events
@@ -1,73 +1,268 @@
 """Telemetry writer - handles JSONL output to elcs/telemetry/."""
 
-import json
+import atexit
 import logging
+import os
+import re
+import threading
+import time
+import weakref
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
+
+from .telemetry_encoding import CLOCK, StdlibEncoder, get_encoder
 
 logger = logging.getLogger(__name__)
 
+# Durability modes:
+# - "event": flush every event to the OS as soon as it is emitted
+# - "batch": buffer events in memory and flush on size/interval/session end
+# - "fsync": like "batch", but fsync the file after every flushed batch
+DURABILITY_EVENT = "event"
+DURABILITY_BATCH = "batch"
+DURABILITY_FSYNC = "fsync"
+DURABILITY_MODES = (DURABILITY_EVENT, DURABILITY_BATCH, DURABILITY_FSYNC)
+
+# Layout of elcs/telemetry/
+EVENT_FILE_GLOB = "events-*.jsonl"
+DAY_PATTERN = re.compile(r"events-(\d{4}-\d{2}-\d{2})\.jsonl$")
+INDEX_DIR_NAME = ".index"  # query indexes (telemetry_query)
+INDEX_FILE_SUFFIX = ".idx.jsonl"
+ARCHIVE_DIR_NAME = "archive"  # compacted days (telemetry_archive)
+
+DEFAULT_DURABILITY = os.environ.get("ELCS_TELEMETRY_DURABILITY", DURABILITY_BATCH)
+DEFAULT_MAX_BATCH = 64
+DEFAULT_FLUSH_INTERVAL = 2.0  # seconds
+
+# How long a "no ELCS project here" result is trusted before re-checking
+NEGATIVE_CACHE_SECONDS = 30.0
+
+# Project detection cache: cwd -> (telemetry dir or None, monotonic check time)
+_project_cache: dict[Path, tuple[Path | None, float]] = {}
+
+_DAY_US = 86_400 * 1_000_000
+
+# Live writers, flushed once at interpreter exit
+_live_writers: "weakref.WeakSet[TelemetryWriter]" = weakref.WeakSet()
+
+
+def _flush_all_writers() -> None:
+    """Flush and close every live writer (registered with atexit)."""
+    for writer in list(_live_writers):
+        writer.close()
+
+
+atexit.register(_flush_all_writers)
+
+
+def find_elcs_dir(start: Path | None = None) -> Path | None:
+    """Find the elcs/ folder in ``start`` (default: cwd) or up to 3 parent levels."""
+    cwd = start or Path.cwd()
+
+    # Check current directory and up to 3 parent levels
+    for _ in range(4):
+        elcs_dir = cwd / "elcs"
+        if elcs_dir.is_dir():
+            return elcs_dir
+
+        parent = cwd.parent
+        if parent == cwd:  # Reached root
+            break
+        cwd = parent
+
+    return None
+
+
+def detect_telemetry_dir() -> Path | None:
+    """Get elcs/telemetry/ for the current working directory, creating it if needed.
+
+    Results are cached per cwd for the life of the process, so only a change
+    of working directory triggers a new walk. A negative result is re-checked
+    after NEGATIVE_CACHE_SECONDS in case elcs/ is created later.
+    """
+    cwd = Path.cwd()
+    now = time.monotonic()
+    cached = _project_cache.get(cwd)
+    if cached is not None and (cached[0] is not None or now - cached[1] < NEGATIVE_CACHE_SECONDS):
+        return cached[0]
+
+    telemetry_dir = None
+    elcs_dir = find_elcs_dir(cwd)
+    if elcs_dir is not None:
+        telemetry_dir = elcs_dir / "telemetry"
+        telemetry_dir.mkdir(exist_ok=True)
+        logger.info(f"ELCS Telemetry: Writing to {telemetry_dir}")
+    else:
+        logger.debug("ELCS Telemetry: No elcs/ folder found, telemetry disabled")
+    _project_cache[cwd] = (telemetry_dir, now)
+    return telemetry_dir
+
+
+def clear_project_cache() -> None:
+    """Forget cached project detection results."""
+    _project_cache.clear()
+
 
 class TelemetryWriter:
-    """Writes telemetry events to JSONL files in elcs/telemetry/."""
-    
-    def __init__(self):
+    """Writes telemetry events to JSONL files in elcs/telemetry/.
+
+    The day's file is kept open between events. Serialized lines are queued
+    in memory and written in batches according to the durability mode.
+    """
+
+    def __init__(
+        self,
+        durability: str | None = None,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        encoder: StdlibEncoder | None = None,
+    ):
         """Initialize writer, detecting ELCS project in current directory."""
+        durability = durability or DEFAULT_DURABILITY
+        if durability not in DURABILITY_MODES:
+            logger.warning(
+                f"ELCS Telemetry: Unknown durability '{durability}', "
+                f"using '{DURABILITY_BATCH}'"
+            )
+            durability = DURABILITY_BATCH
+
         self._telemetry_dir: Path | None = None
         self._current_file: Path | None = None
+        # Day file cache, valid for day_start <= ts_us < day_end (epoch microseconds)
+        self._day_start = 0
+        self._day_end = 0
+        self._day_file: Path | None = None
+        self._durability = durability
+        self._max_batch = max(1, max_batch)
+        self._flush_interval = flush_interval
+        self._encoder = encoder or get_encoder()
+
+        self._lock = threading.Lock()
+        self._handle: IO[str] | None = None
+        self._buffer: list[str] = []
+        self._last_flush = time.monotonic()
+        self._flush_timer: threading.Timer | None = None
+
         self._detect_elcs_project()
-    
+        if self.is_active():
+            _live_writers.add(self)
+
     def _detect_elcs_project(self) -> None:
-        """Detect if current directory is an ELCS project."""
-        cwd = Path.cwd()
-        
-        # Check current directory and up to 3 parent levels
-        for _ in range(4):
-            elcs_dir = cwd / "elcs"
-            if elcs_dir.is_dir():
-                self._telemetry_dir = elcs_dir / "telemetry"
-                self._telemetry_dir.mkdir(exist_ok=True)
-                logger.info(f"ELCS Telemetry: Writing to {self._telemetry_dir}")
-                return
-            
-            parent = cwd.parent
-            if parent == cwd:  # Reached root
-                break
-            cwd = parent
-        
-        logger.debug("ELCS Telemetry: No elcs/ folder found, telemetry disabled")
-    
+        """Detect if current directory is an ELCS project (cached per cwd)."""
+        self._telemetry_dir = detect_telemetry_dir()
+
     def is_active(self) -> bool:
         """Check if telemetry is active (ELCS project detected)."""
         return self._telemetry_dir is not None
-    
-    def _get_current_file(self) -> Path | None:
-        """Get the current day's telemetry file."""
+
+    @property
+    def telemetry_dir(self) -> Path | None:
+        """The elcs/telemetry/ directory events are written to."""
+        return self._telemetry_dir
+
+    @property
+    def durability(self) -> str:
+        """The durability mode this writer flushes with."""
+        return self._durability
+
+    def _get_current_file(self, ts_us: int | None = None) -> Path | None:
+        """Get the telemetry file for the UTC day of ``ts_us`` (default: today)."""
         if not self._telemetry_dir:
             return None
-        
-        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        return self._telemetry_dir / f"events-{today}.jsonl"
-    
-    def emit(self, event_data: dict[str, Any]) -> None:
-        """Emit a telemetry event to the JSONL file."""
+
+        ts_us = CLOCK.now_us() if ts_us is None else ts_us
+        if self._day_start <= ts_us < self._day_end:
+            return self._day_file
+
+        # Cache the path until the next UTC midnight
+        day = datetime.fromtimestamp(ts_us // 1_000_000, timezone.utc)
+        self._day_start = ts_us - ts_us % _DAY_US
+        self._day_end = self._day_start + _DAY_US
+        self._day_file = self._telemetry_dir / f"events-{day:%Y-%m-%d}.jsonl"
+        return self._day_file
+
+    def emit(self, event_data: dict[str, Any], ts_us: int | None = None) -> None:
+        """Emit a telemetry event to the JSONL file.
+
+        ``ts_us`` (epoch microseconds from ``CLOCK.now_us()``) lets queued
+        callers stamp the event when it happened rather than when it is
+        written.
+        """
         if not self.is_active():
             return
-        
-        file_path = self._get_current_file()
+
+        ts_us = CLOCK.now_us() if ts_us is None else ts_us
+        file_path = self._get_current_file(ts_us)
         if not file_path:
             return
-        
-        # Add timestamp
-        event = {
-            "ts": datetime.now(timezone.utc).isoformat(),
-            **event_data,
-        }
-        
+
         try:
-            # Append to file (JSONL format - one JSON object per line)
-            with open(file_path, "a", encoding="utf-8") as f:
-                f.write(json.dumps(event, default=str) + "\n")
+            # Add timestamp as the first key
+            line = self._encoder.encode_event(CLOCK.isoformat(ts_us), event_data)
         except Exception as e:
-            logger.warning(f"ELCS Telemetry: Failed to write event: {e}")
+            logger.warning(f"ELCS Telemetry: Failed to serialize event: {e}")
+            return
+
+        with self._lock:
+            # Day rollover: drain the old day's buffer before switching files
+            if file_path != self._current_file:
+                self._flush_locked()
+                self._close_handle_locked()
+                self._current_file = file_path
+
+            self._buffer.append(line)
+            if (
+                self._durability == DURABILITY_EVENT
+                or len(self._buffer) >= self._max_batch
+                or time.monotonic() - self._last_flush >= self._flush_interval
+            ):
+                self._flush_locked()
+            elif self._flush_timer is None:
+                # Make sure a quiet period doesn't strand buffered events
+                self._flush_timer = threading.Timer(self._flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def flush(self) -> None:
+        """Write all buffered events to disk."""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        """Flush buffered events and release the file handle."""
+        with self._lock:
+            self._flush_locked()
+            self._close_handle_locked()
+        _live_writers.discard(self)
+
+    def _flush_locked(self) -> None:
+        """Write the buffer to the current file. Caller must hold the lock."""
+        self._last_flush = time.monotonic()
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._buffer or self._current_file is None:
+            return
+
+        lines, self._buffer = self._buffer, []
+        try:
+            if self._handle is None:
+                # Append mode, JSONL format - one JSON object per line
+                self._handle = open(self._current_file, "a", encoding="utf-8")
+            self._handle.write("".join(lines))
+            self._handle.flush()
+            if self._durability == DURABILITY_FSYNC:
+                os.fsync(self._handle.fileno())
+        except Exception as e:
+            logger.warning(f"ELCS Telemetry: Failed to write {len(lines)} event(s): {e}")
+            self._close_handle_locked()
+
+    def _close_handle_locked(self) -> None:
+        """Close the open file handle, if any. Caller must hold the lock."""
+        if self._handle is not None:
+            try:
+                self._handle.close()
+            except Exception as e:
+                logger.debug(f"ELCS Telemetry: Failed to close telemetry file: {e}")
+            self._handle = None
@@ -0,0 +1,12 @@
+"""Shared pytest setup: import the generator package and the telemetry plugin from the tree."""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# create_elcs (generator/src) and elcs_telemetry (resources/plugins) are
+# tested from source; the plugin's callbacks need code-puppy and aren't imported
+for path in (ROOT / "generator" / "src", ROOT / "resources" / "plugins"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,100 @@
+"""The streaming args parser must agree with json.loads on what the summary keeps."""
+
+import json
+import random
+
+from elcs_telemetry.args_accumulator import MAX_RAW_VALUE_CHARS, ArgsAccumulator
+
+# Summaries keep the first 100 characters of strings longer than 200
+SUMMARY_PREFIX = 100
+SUMMARY_LIMIT = 200
+
+
+def _feed(text: str, rng: random.Random) -> ArgsAccumulator:
+    accumulator = ArgsAccumulator()
+    pos = 0
+    while pos < len(text):
+        step = rng.choice((1, 2, 3, 7, 64, 1000))
+        accumulator.feed(text[pos:pos + step])
+        pos += step
+    return accumulator
+
+
+def _random_string(rng: random.Random) -> str:
+    alphabet = 'ab "\\\n\t/é€\U0001F600\x01'
+    return "".join(rng.choice(alphabet) for _ in range(rng.choice((0, 5, 150, 250, 3000))))
+
+
+def _random_value(rng: random.Random, depth: int = 0):
+    kind = rng.randrange(6 if depth < 2 else 4)
+    if kind == 0:
+        return _random_string(rng)
+    if kind == 1:
+        return rng.choice((0, -3, 2.5, 1e21))
+    if kind == 2:
+        return rng.choice((True, False))
+    if kind == 3:
+        return None
+    if kind == 4:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {f"k{i}": _random_value(rng, depth + 1) for i in range(rng.randint(0, 4))}
+
+
+def _assert_summary_equivalent(args: dict, lengths: dict, expected: dict) -> None:
+    assert args.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, str):
+            assert lengths[key] == len(value)
+            if len(value) > SUMMARY_LIMIT:
+                assert args[key][:SUMMARY_PREFIX] == value[:SUMMARY_PREFIX]
+            else:
+                assert args[key] == value
+        elif len(json.dumps(value)) <= MAX_RAW_VALUE_CHARS:
+            assert args[key] == value
+
+
+def test_random_documents_and_chunking_match_json_loads():
+    rng = random.Random(5)
+    for _ in range(500):
+        document = {f"key{i}": _random_value(rng) for i in range(rng.randint(0, 6))}
+        text = json.dumps(document, ensure_ascii=rng.random() < 0.5, indent=rng.choice((None, 1)))
+        accumulator = _feed(text, rng)
+        args, lengths = accumulator.result()
+        _assert_summary_equivalent(args, lengths, document)
+        assert accumulator.size == len(text)
+
+
+def test_escape_split_across_deltas():
+    text = json.dumps({"content": "é\n\"quoted\""})
+    for cut in range(len(text) + 1):
+        accumulator = ArgsAccumulator()
+        accumulator.feed(text[:cut])
+        accumulator.feed(text[cut:])
+        assert accumulator.result()[0] == json.loads(text)
+
+
+def test_oversized_raw_value_becomes_placeholder():
+    text = json.dumps({"items": list(range(10_000))})
+    args, _ = _feed(text, random.Random(1)).result()
+    assert args["items"].startswith("[") and args["items"].endswith(" chars]")
+
+
+def test_malformed_json_falls_back_to_raw_preview():
+    accumulator = ArgsAccumulator()
+    accumulator.feed('{"path": "a.txt", oops')
+    assert accumulator.result() == ({"_raw": '{"path": "a.txt", oops'}, {})
+
+
+def test_empty_stream_has_no_args():
+    assert ArgsAccumulator().result() == ({}, {})
+
+
+def test_memory_stays_bounded_for_large_payloads():
+    accumulator = ArgsAccumulator()
+    accumulator.feed('{"content": "')
+    for _ in range(1000):
+        accumulator.feed("x" * 1000)
+    accumulator.feed('"}')
+    args, lengths = accumulator.result()
+    assert lengths["content"] == 1_000_000
+    assert len(args["content"]) < 2000
@@ -0,0 +1,66 @@
+"""Batch files must only ever describe projects inside their target folders."""
+
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from create_elcs.batch import load_batch
+from create_elcs.cli import main
+
+
+def _write(tmp_path, entries):
+    batch_file = tmp_path / "projects.json"
+    batch_file.write_text(json.dumps(entries))
+    return batch_file
+
+
+def test_entries_resolve_against_the_batch_file(tmp_path):
+    batch_file = _write(tmp_path, [
+        "alpha",
+        {"name": "beta", "path": "services", "objective": "Ship beta", "values": {"persona": "reviewer", "LEVEL": 3}},
+    ])
+    alpha, beta = load_batch(batch_file, tmp_path / "out", objective="Default", extra={"TEAM": "core"})
+
+    assert alpha.target_dir == tmp_path / "out" / "alpha"
+    assert alpha.values["PROJECT_OBJECTIVE"] == "Default"
+    assert beta.target_dir == (tmp_path / "services" / "beta").resolve()
+    assert beta.values["PROJECT_OBJECTIVE"] == "Ship beta"
+    assert {beta.values[name] for name in ("TEAM", "PERSONA", "LEVEL")} == {"core", "reviewer", "3"}
+
+
+@pytest.mark.parametrize("entry", [
+    "../escape",
+    "..",
+    ".",
+    "nested/name",
+    "back\\slash",
+    "/absolute",
+    {"name": "ok", "values": 3},
+    {"name": "ok", "values": ["A=1"]},
+    {"name": "ok", "values": {"1BAD": "x"}},
+    {"name": "ok", "values": {"HAS SPACE": "x"}},
+    {"name": "ok", "path": 7},
+    {"name": "ok", "objective": ["x"]},
+    {"name": ""},
+    7,
+])
+def test_invalid_entries_are_rejected(tmp_path, entry):
+    with pytest.raises(ValueError, match="invalid batch entry"):
+        load_batch(_write(tmp_path, [entry]), tmp_path / "out")
+
+
+def test_invalid_text_batch_is_rejected(tmp_path):
+    batch_file = tmp_path / "projects.txt"
+    batch_file.write_text("alpha  # first\n../beta\n")
+    with pytest.raises(ValueError, match="invalid batch entry"):
+        load_batch(batch_file, tmp_path / "out")
+
+
+def test_cli_reports_invalid_entries_without_writing(tmp_path):
+    batch_file = _write(tmp_path, ["fine", {"name": "other", "values": 3}])
+    result = CliRunner().invoke(main, ["--batch", str(batch_file), "--path", str(tmp_path / "out"), "--quiet"])
+
+    assert result.exit_code == 1
+    assert "invalid batch entry" in result.output
+    assert not (tmp_path / "out").exists()
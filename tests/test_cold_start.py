@@ -0,0 +1,87 @@
+"""``create-elcs NAME --quiet`` must not import click or rich, and must create what the full CLI creates."""
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from conftest import ROOT
+
+TIMESTAMP = re.compile(rb"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(\.\d+)?")
+
+
+def _run(*args: str, cwd: Path) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(ROOT / "generator" / "src"), env.get("PYTHONPATH")])
+    )
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "create_elcs", *args],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+
+
+def _imported(stderr: str) -> set[str]:
+    # -X importtime lines: "import time: self [us] | cumulative | module"
+    return {
+        line.rsplit("|", 1)[1].strip()
+        for line in stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+def _tree(root: Path) -> dict[str, bytes]:
+    # CREATED_DATE is the only value that differs between two runs
+    return {
+        path.relative_to(root).as_posix(): TIMESTAMP.sub(b"<created>", path.read_bytes())
+        for path in sorted(root.rglob("*")) if path.is_file()
+    }
+
+
+def test_quiet_run_imports_neither_click_nor_rich(tmp_path):
+    result = _run("demo", "--path", str(tmp_path), "--quiet", "--set", "PERSONA=reviewer", cwd=tmp_path)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == str(tmp_path / "demo")
+    assert (tmp_path / "demo" / "elcs").is_dir()
+    imported = {module.split(".")[0] for module in _imported(result.stderr)}
+    assert "click" not in imported
+    assert "rich" not in imported
+
+
+def test_quiet_fast_path_matches_click_cli(tmp_path):
+    pytest.importorskip("click")
+    from click.testing import CliRunner
+
+    from create_elcs.cli import main
+
+    fast = _run("demo", "-p", str(tmp_path / "fast"), "-q", "-o", "Ship it", "--verify", cwd=tmp_path)
+    assert fast.returncode == 0, fast.stderr
+
+    slow = CliRunner().invoke(main, ["demo", "-p", str(tmp_path / "slow"), "-q", "-o", "Ship it", "--verify"])
+    assert slow.exit_code == 0, slow.output
+
+    fast_tree = _tree(tmp_path / "fast" / "demo")
+    assert fast_tree
+    assert fast_tree == _tree(tmp_path / "slow" / "demo")
+
+
+@pytest.mark.parametrize("args", [
+    ["demo", "--quiet", "--batch", "missing.txt"],
+    ["demo", "--quiet", "--set", "not-a-pair"],
+    ["demo", "--quiet", "--jobs", "0"],
+    ["demo", "--quiet", "--verif"],
+    ["exists", "--quiet"],
+])
+def test_quiet_fast_path_leaves_errors_to_click(tmp_path, args):
+    pytest.importorskip("click")
+    (tmp_path / "exists").mkdir()
+
+    result = _run(*args, cwd=tmp_path)
+
+    assert result.returncode != 0
+    assert "click" in {module.split(".")[0] for module in _imported(result.stderr)}
+    assert not (tmp_path / "demo").exists()
@@ -0,0 +1,134 @@
+"""The incrementally matched cone router must route like one built from scratch."""
+
+import json
+import os
+import random
+
+from create_elcs.runtime import write_json_atomic
+from create_elcs.runtime.cones import ConeRouter
+from create_elcs.runtime.tokens import CLAIMED, OPEN, TokenStore
+
+AGENTS = ["a1", "a2", "a3", "a4"]
+CAPABILITIES = ["python", "sql", "web"]
+TOOLS = ["grep", "edit_file"]
+SPACES = ["code", "docs"]
+TAGS = ["task", "review", "python", "security", "sql"]
+
+
+def _subset(rng, items):
+    return [item for item in items if rng.random() < 0.5]
+
+
+def _cone(rng, agent_id):
+    cone = {
+        "agent_id": agent_id,
+        "capabilities": _subset(rng, CAPABILITIES),
+        "tools_allowed": _subset(rng, TOOLS),
+        "advocacies": _subset(rng, TAGS),
+        "aversions": _subset(rng, TAGS),
+        "interaction_threshold": rng.choice([0.0, 0.5, 0.9]),
+        "cone": {"spaces": _subset(rng, SPACES), "horizon": {"time_scale": rng.choice(["immediate", "short", None])}},
+    }
+    if rng.random() < 0.5:
+        cone["cone"]["budgets"] = {"tool_calls": rng.choice([5, 50]), "time_seconds": rng.choice([600, 7200])}
+    return cone
+
+
+def _token(rng, token_id):
+    token = {
+        "token_id": token_id,
+        "type": rng.choice(["task", "review"]),
+        "priority": rng.choice([0.2, 0.5, 0.95]),
+        "requires": {"capabilities": _subset(rng, CAPABILITIES)[:1], "tools": _subset(rng, TOOLS)[:1]},
+    }
+    if rng.random() < 0.3:
+        token["requires"]["spaces"] = [rng.choice(SPACES)]
+    if rng.random() < 0.5:
+        token["budget"] = {"tool_calls": rng.choice([3, 20]), "time_seconds": rng.choice([300, 3600])}
+    if rng.random() < 0.3:
+        token["created_by"] = {"agent": rng.choice(AGENTS), "lens": rng.choice(["security", "python"])}
+    return token
+
+
+def _routing(router):
+    router.refresh()
+    ready = sorted(token["token_id"] for token in router.scheduler.ready())
+    return {
+        "candidates": {token_id: router.candidates(token_id) for token_id in ready},
+        "best": {token_id: router.best_agent(token_id) for token_id in ready},
+        "next": {agent: (router.next_for(agent) or {}).get("token_id") for agent in AGENTS},
+        "unroutable": sorted(token["token_id"] for token in router.unroutable()),
+        "assign": [(plan.agent_id, [t["token_id"] for t in plan.tokens]) for plan in router.assign(max_tokens=2)],
+    }
+
+
+def test_incremental_router_matches_fresh_router(tmp_path):
+    rng = random.Random(25)
+    elcs_dir = tmp_path / "elcs"
+    cones_dir = elcs_dir / "cones"
+    cones_dir.mkdir(parents=True)
+    store = TokenStore.for_project(elcs_dir)
+    router = ConeRouter(elcs_dir, store)
+    created = 0
+
+    def in_folder(folder):
+        return sorted(path.stem for path in (elcs_dir / "tokens" / folder).glob("*.json"))
+
+    for step in range(250):
+        op = rng.random()
+        opened, claimed = in_folder(OPEN), in_folder(CLAIMED)
+        if op < 0.25:
+            # A cone written or rewritten, possibly twice within one mtime tick
+            agent = rng.choice(AGENTS)
+            write_json_atomic(cones_dir / f"{agent}.json", _cone(rng, agent))
+        elif op < 0.3 and list(cones_dir.glob("*.json")):
+            os.remove(rng.choice(sorted(cones_dir.glob("*.json"))))
+        elif op < 0.55:
+            store.create(_token(rng, f"WT-{created}"))
+            created += 1
+        elif op < 0.65 and opened:
+            # Requirements edited in place
+            path = elcs_dir / "tokens" / OPEN / f"{rng.choice(opened)}.json"
+            document = json.loads(path.read_text())
+            document["requires"] = _token(rng, document["token_id"])["requires"]
+            write_json_atomic(path, document)
+        elif op < 0.75:
+            router.claim_next(rng.choice(AGENTS))
+        elif op < 0.85 and opened:
+            store.claim(rng.choice(opened), "someone-else")
+        elif op < 0.95 and claimed:
+            store.close(rng.choice(claimed), "done")
+        elif claimed:
+            store.release(rng.choice(claimed))
+
+        fresh = ConeRouter(elcs_dir)
+        assert _routing(router) == _routing(fresh), f"step {step}"
+
+
+def test_routing_respects_cones(tmp_path):
+    elcs_dir = tmp_path / "elcs"
+    (elcs_dir / "cones").mkdir(parents=True)
+    write_json_atomic(elcs_dir / "cones" / "sql.json", {
+        "agent_id": "sql", "capabilities": ["sql"], "tools_allowed": ["grep"], "advocacies": ["review"],
+        "cone": {"budgets": {"tool_calls": 10}},
+    })
+    write_json_atomic(elcs_dir / "cones" / "generalist.json", {
+        "agent_id": "generalist", "capabilities": ["sql", "python", "web"], "tools_allowed": ["grep", "edit_file"],
+        "interaction_threshold": 0.9,
+    })
+    store = TokenStore.for_project(elcs_dir)
+    store.create_many([
+        {"token_id": "query", "type": "review", "priority": 0.5, "requires": {"capabilities": ["sql"]}},
+        {"token_id": "big-query", "priority": 0.5, "requires": {"capabilities": ["sql"]}, "budget": {"tool_calls": 40}},
+        {"token_id": "handoff", "priority": 0.5, "requires": {"capabilities": ["python"]}, "created_by": {"agent": "sql"}},
+        {"token_id": "css", "priority": 0.5, "requires": {"capabilities": ["css"]}},
+    ])
+    router = ConeRouter(elcs_dir, store)
+
+    assert [agent for agent, _ in router.candidates("query")] == ["sql", "generalist"]
+    assert router.best_agent("big-query") == "generalist"  # Over the sql agent's budget
+    assert router.best_agent("handoff") is None  # Below the generalist's interaction threshold
+    assert sorted(token["token_id"] for token in router.unroutable()) == ["css", "handoff"]
+    assert router.claim_next("sql")["token_id"] == "query"
+    assert router.claim_next("sql") is None
+    assert store.folder("query") == CLAIMED
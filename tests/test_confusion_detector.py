@@ -0,0 +1,47 @@
+"""Streaming confusion detection must match a scan of the whole response."""
+
+import random
+
+import pytest
+
+from elcs_telemetry.confusion_detector import CONFUSION_MARKERS, ConfusionDetector, detect_confusion
+
+WORDS = ["the", "code", "Actually,", "I'm not sure", "WAIT,", "could you clarify", "ok", "I'm", "not", "sure"]
+
+
+def _chunks(text: str, rng: random.Random) -> list[str]:
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, 20)))) if len(text) > 1 else []
+    return [text[start:end] for start, end in zip([0, *cuts], [*cuts, len(text)])]
+
+
+def test_no_signals():
+    assert detect_confusion("All tests pass.") is None
+    assert detect_confusion("") is None
+
+
+def test_signal_order_follows_markers():
+    assert detect_confusion("Wait, I'm not sure. Actually, could you clarify?") == [
+        "uncertainty", "clarification_needed", "self_correction",
+    ]
+
+
+@pytest.mark.parametrize("marker", [marker for marker, _ in CONFUSION_MARKERS])
+def test_marker_split_at_every_position(marker):
+    text = f"prefix {marker.upper()} suffix"
+    expected = detect_confusion(text)
+    start = text.lower().index(marker)
+    for cut in range(start, start + len(marker) + 1):
+        detector = ConfusionDetector()
+        detector.feed(text[:cut])
+        detector.feed(text[cut:])
+        assert detector.signals() == expected
+
+
+def test_random_chunking_matches_whole_text():
+    rng = random.Random(4)
+    for _ in range(300):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 30)))
+        detector = ConfusionDetector()
+        for chunk in _chunks(text, rng):
+            detector.feed(chunk)
+        assert detector.signals() == detect_confusion(text)
@@ -0,0 +1,183 @@
+"""The distance vector must count each source correctly and re-read only the groups whose files changed."""
+
+import json
+import os
+
+import pytest
+
+from create_elcs.runtime import write_json_atomic
+from create_elcs.runtime.distance import VECTOR_FILE, DistanceEngine
+from create_elcs.runtime.tokens import TokenStore
+
+JUNIT = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest">
+  <testcase classname="tests.test_api" name="test_ok"/>
+  <testcase classname="tests.test_api" name="test_broken"><failure message="assert"/></testcase>
+  <testcase classname="tests.test_db" name="test_setup"><error message="boom"/></testcase>
+  <testcase classname="tests.test_db" name="test_skipped"><skipped/></testcase>
+</testsuite></testsuites>
+"""
+
+CRITERIA_MD = """# Success Criteria
+
+| ID | Criterion | Status |
+|----|-----------|--------|
+| SC1 | Users can sign up | ✅ Met |
+| SC2 | p95 under 200 ms | ⏳ Pending |
+| SC3 | Docs published | Not started |
+
+```
+| SC9 | An example inside a code block | Pending |
+```
+"""
+
+HYPOTHESES_MD = """| ID | Hypothesis | Status |
+|----|------------|--------|
+| H1 | Already tracked in current.json | Pending |
+| H7 | Caching halves latency | ✅ Confirmed |
+| H8 | Users want exports | Untested |
+"""
+
+
+class Project:
+    """An elcs/ folder whose writes always move the file's mtime forward."""
+
+    def __init__(self, elcs_dir):
+        self.elcs_dir = elcs_dir
+        self._tick = 1_700_000_000_000_000_000
+
+    def write(self, rel_path, content):
+        path = self.elcs_dir / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, str):
+            path.write_text(content, encoding="utf-8")
+        else:
+            write_json_atomic(path, content)
+        self._tick += 1_000_000_000
+        os.utime(path, ns=(self._tick, self._tick))
+
+
+@pytest.fixture
+def project(tmp_path):
+    elcs_dir = tmp_path / "elcs"
+    for folder in ("open", "claimed", "closed"):
+        (elcs_dir / "tokens" / folder).mkdir(parents=True)
+    project = Project(elcs_dir)
+    project.write("spec/spec.json", {"spec_id": "SPEC-1", "success_criteria": [
+        {"id": "SC1", "status": "met"}, {"id": "SC2", "status": "pending"}, {"id": "SC3"},
+    ]})
+    project.write("state/current.json", {
+        "risks": [
+            {"id": "R1", "severity": "critical", "status": "open"},
+            {"id": "R2", "severity": "high", "status": "mitigated"},
+            {"id": "R3", "severity": "high"},
+            {"id": "R4", "severity": "low", "status": "open"},
+        ],
+        "hypotheses": [
+            {"id": "H1", "status": "untested"},
+            {"id": "H2", "status": "untested", "evidence_for": ["E1"]},
+            {"id": "H3", "status": "rejected"},
+        ],
+    })
+    project.write("lenses/spec.safety.json", {"lens_id": "safety", "risk_flags": [
+        {"text": "No rate limiting", "severity": "critical"},
+        {"text": "Secrets in logs", "severity": "high", "mitigation": "Scrub them"},
+        {"text": "Weak passwords", "severity": "high"},
+    ]})
+    project.write("state/hypotheses.md", HYPOTHESES_MD)
+    project.write("state/junit.xml", JUNIT)
+    TokenStore.for_project(elcs_dir).create_many([
+        {"token_id": "WT-1", "priority": 0.5},
+        {"token_id": "WT-2", "priority": 0.5, "dependencies": ["WT-1"]},
+    ])
+    return project
+
+
+def test_components_count_every_source(project):
+    engine = DistanceEngine(project.elcs_dir)
+    details = engine.details()
+
+    assert details["success_criteria_remaining"] == ["SC2", "SC3"]
+    assert details["critical_risks"] == ["R1", "safety: No rate limiting"]
+    assert details["high_risks"] == ["R3", "safety: Weak passwords"]
+    assert details["evidence_gaps"] == ["H1", "H8"]
+    assert details["failing_tests"] == ["tests.test_api::test_broken", "tests.test_db::test_setup"]
+    assert sorted(details["open_tokens"]) == ["WT-1", "WT-2"]
+    assert details["blocked_tokens"] == ["WT-2"]
+    assert engine.compute()["components"] == {
+        "success_criteria_remaining": 2, "critical_risks": 2, "high_risks": 2, "evidence_gaps": 2,
+        "failing_tests": 2, "open_tokens": 2, "blocked_tokens": 1,
+    }
+
+
+def test_markdown_criteria_are_the_fallback(project):
+    project.write("spec/spec.json", {"spec_id": "SPEC-1", "success_criteria": []})
+    project.write("spec/success-criteria.md", CRITERIA_MD)
+
+    assert DistanceEngine(project.elcs_dir).details()["success_criteria_remaining"] == ["SC2", "SC3"]
+
+
+def test_only_changed_groups_are_recomputed(project):
+    engine = DistanceEngine(project.elcs_dir)
+    engine.details()
+    assert engine.recomputed == ["criteria", "risks", "evidence", "tests"]
+
+    engine.details()
+    assert engine.recomputed == []
+    # A fresh engine starts from elcs/.cache/distance.json
+    fresh = DistanceEngine(project.elcs_dir)
+    fresh.details()
+    assert fresh.recomputed == []
+
+    project.write("state/junit.xml", JUNIT.replace('<failure message="assert"/>', ""))
+    assert engine.details()["failing_tests"] == ["tests.test_db::test_setup"]
+    assert engine.recomputed == ["tests"]
+
+    # current.json feeds both risks and evidence
+    state = json.loads((project.elcs_dir / "state/current.json").read_text())
+    state["risks"][0]["status"] = "mitigated"
+    project.write("state/current.json", state)
+    details = engine.details()
+    assert engine.recomputed == ["risks", "evidence"]
+    assert details["critical_risks"] == ["safety: No rate limiting"]
+
+    # A new lens output is picked up by the risks group alone
+    project.write("lenses/spec.topology.json", {"lens_id": "topology", "risk_flags": [
+        {"text": "Single point of failure", "severity": "high"},
+    ]})
+    assert "topology: Single point of failure" in engine.details()["high_risks"]
+    assert engine.recomputed == ["risks"]
+
+
+def test_hotspots_rank_by_weighted_contribution(project):
+    engine = DistanceEngine(project.elcs_dir)
+    vector, written = engine.update()
+    assert written
+    project.write(VECTOR_FILE, {**vector, "weights": {**vector["weights"], "failing_tests": 3, "open_tokens": 0.5}})
+
+    vector = engine.compute()
+    assert vector["total_distance"] == 2 + 2 + 2 + 2 + 2 * 3 + 2 * 0.5 + 1
+    assert [hotspot["component"] for hotspot in vector["hotspots"]] == [
+        "failing_tests",
+        "critical_risks", "evidence_gaps", "high_risks", "success_criteria_remaining",  # Ties by name
+        "blocked_tokens", "open_tokens",
+    ]
+    assert vector["hotspots"][0]["reason"].startswith("2 (6 of 16): ")
+
+
+def test_update_only_writes_when_the_vector_changes(project):
+    engine = DistanceEngine(project.elcs_dir)
+    first, written = engine.update()
+    assert written and first["trend"] == "unknown"
+    path = project.elcs_dir / VECTOR_FILE
+    before = path.read_bytes(), path.stat().st_mtime_ns
+
+    vector, written = engine.update()
+    assert not written and vector == first
+    assert (path.read_bytes(), path.stat().st_mtime_ns) == before
+
+    project.write("spec/spec.json", {"spec_id": "SPEC-1", "success_criteria": [{"id": "SC1", "status": "met"}]})
+    vector, written = engine.update()
+    assert written
+    assert vector["trend"] == "decreasing" and vector["previous_total"] == first["total_distance"]
+    assert vector["vector_id"].endswith("-002")
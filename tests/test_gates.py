@@ -0,0 +1,202 @@
+"""Each gate rule must pass and fail where protocol/gates.md says, and re-gating must only re-run what changed."""
+
+import json
+import os
+
+import pytest
+
+from create_elcs.runtime import write_json_atomic
+from create_elcs.runtime.__main__ import main
+from create_elcs.runtime.gates import GATES, RULES, GateEngine, _write_markers
+
+_tick = [1_700_000_000_000_000_000]
+
+
+def _write(path, document):
+    """Write JSON and move the file's mtime forward, so stat signatures always see the change."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_json_atomic(path, document)
+    _tick[0] += 1_000_000_000
+    os.utime(path, ns=(_tick[0], _tick[0]))
+
+
+GOOD_CRITERION = {"id": "SC1", "observable": "p95 latency", "target": "< 200 ms", "method": "Load test in CI"}
+VOTES = {"philosophy": "approve", "data_science": "approve", "safety_risk": "conditional_approve", "topology": "abstain"}
+
+
+@pytest.mark.parametrize("gate, inputs, passed, reason", [
+    ("observables", {"criteria": [("SC1", GOOD_CRITERION)]}, True, "1 observable criteria"),
+    ("observables", {"criteria": []}, False, "No success criteria linked"),
+    ("observables", {"criteria": [("SC9", None)]}, False, "Unknown success criteria: SC9"),
+    ("observables", {"criteria": [("SC1", {**GOOD_CRITERION, "target": "{{TARGET}}"})]}, False,
+     "SC1 has no observable or target"),
+    ("observables", {"criteria": [("SC1", {**GOOD_CRITERION, "target": "Feels fast"})]}, False,
+     "SC1 target is subjective (Feels fast)"),
+    ("testability", {"criteria": [("SC1", GOOD_CRITERION)]}, True, "Every criterion has a method and a threshold"),
+    ("testability", {"criteria": [("SC1", {**GOOD_CRITERION, "method": "TBD"})]}, False, "SC1 has no test method"),
+    ("testability", {"criteria": [("SC1", {**GOOD_CRITERION, "target": "Snappy"})]}, False,
+     "SC1 target has no threshold or pass/fail condition"),
+    ("testability", {"criteria": [("SC9", None)]}, False, "No success criteria to test"),
+    ("reversibility", {"reversibility": {"category": "easy", "rollback_plan": "Revert the flag"}, "require_human": True},
+     True, "Easy to undo"),
+    ("reversibility", {"reversibility": {"category": "hard", "rollback_plan": ""}, "require_human": True}, False,
+     "No rollback plan for a hard change"),
+    ("reversibility", {"reversibility": None, "require_human": True}, False,
+     "No reversibility category (trivial, easy, hard or irreversible)"),
+    ("reversibility", {"reversibility": {"category": "irreversible"}, "require_human": True}, False,
+     "Irreversible and not approved by a human"),
+    ("reversibility", {"reversibility": {"category": "irreversible", "human_approved": True}, "require_human": True},
+     True, "Irreversible, approved"),
+    ("reversibility", {"reversibility": {"category": "irreversible"}, "require_human": False}, True,
+     "Irreversible, approved"),
+    ("confidence", {"confidence": 0.7, "hypotheses": [], "threshold": 0.6}, True, "Confidence 0.7 (objective) at least 0.6"),
+    ("confidence", {"confidence": 0.5, "hypotheses": [0.9], "threshold": 0.6}, False,
+     "Confidence 0.5 (objective) below 0.6"),
+    ("confidence", {"confidence": None, "hypotheses": [0.9, 0.4, None], "threshold": 0.6}, False,
+     "Confidence 0.4 (lowest linked hypothesis) below 0.6"),
+    ("confidence", {"confidence": None, "hypotheses": [None], "threshold": 0.6}, False,
+     "No confidence score (objective or linked hypotheses)"),
+    ("lens_agreement", {"votes": VOTES, "critical": [], "conditions": [], "min_approval": 3, "safety_veto": True},
+     True, "3 lenses approve"),
+    ("lens_agreement", {"votes": VOTES, "critical": [], "conditions": [], "min_approval": 4, "safety_veto": True},
+     False, "3 of 4 required lens approvals"),
+    ("lens_agreement", {"votes": {**VOTES, "safety_risk": "reject"}, "critical": [], "conditions": [],
+                        "min_approval": 2, "safety_veto": True}, False, "Safety/Risk lens rejects (veto)"),
+    ("lens_agreement", {"votes": {**VOTES, "safety_risk": "reject"}, "critical": [], "conditions": [],
+                        "min_approval": 2, "safety_veto": False}, True, "2 lenses approve"),
+    ("lens_agreement", {"votes": {**VOTES, "topology": "reject"}, "critical": ["topology"], "conditions": [],
+                        "min_approval": 2, "safety_veto": True}, False, "Critical rejection by topology"),
+    ("lens_agreement", {"votes": {"philosophy": "approve", "topology": "abstain", "product_ux": "abstain"},
+                        "critical": [], "conditions": [], "min_approval": 1, "safety_veto": True}, False,
+     "Majority abstain: evaluate with more lenses"),
+    ("lens_agreement", {"votes": {}, "critical": [], "conditions": [], "min_approval": 1, "safety_veto": True}, False,
+     "No lens votes (add lens_votes or run the lenses on the spec)"),
+    ("evidence_grounding", {"refs": ["E1", "E9"], "known": ["E1"]}, True, "1 of 2 evidence items found"),
+    ("evidence_grounding", {"refs": ["E9"], "known": []}, False, "Evidence not found in the epistemic state: E9"),
+    ("evidence_grounding", {"refs": [], "known": []}, False, "No linked evidence"),
+])
+def test_rules(gate, inputs, passed, reason):
+    result = RULES[gate](inputs)
+    assert (result["passed"], result["reason"]) == (passed, reason)
+
+
+def _objective(n, **overrides):
+    return {
+        "id": f"G{n}",
+        "statement": f"Goal {n}",
+        "success_criteria": ["SC1", f"SC{n + 1}"] if n % 2 else ["SC1"],
+        "hypotheses": ["H1"],
+        "reversibility": {"category": "easy", "rollback_plan": "Revert the release"},
+        "confidence": 0.8,
+        "evidence": ["E1"],
+        "lens_votes": {"philosophy": "approve", "data_science": "approve", "product_ux": "approve"},
+        **overrides,
+    }
+
+
+@pytest.fixture
+def elcs_dir(tmp_path):
+    elcs_dir = tmp_path / "elcs"
+    criteria = [{**GOOD_CRITERION, "id": f"SC{n}"} for n in range(1, 52)]
+    _write(elcs_dir / "spec" / "spec.json", {
+        "spec_id": "SPEC-1", "version": 1, "success_criteria": criteria,
+        "hypotheses": [{"id": "H1", "confidence": 0.7}],
+        "objectives": [_objective(n) for n in range(1, 51)],
+    })
+    _write(elcs_dir / "state" / "current.json", {
+        "hypotheses": [{"id": "H1", "evidence_for": ["E2"]}], "evidence": [{"id": "E1"}, {"id": "E2"}],
+    })
+    return elcs_dir
+
+
+def _edit_spec(elcs_dir, edit):
+    spec = json.loads((elcs_dir / "spec" / "spec.json").read_text())
+    edit(spec)
+    _write(elcs_dir / "spec" / "spec.json", spec)
+
+
+def test_only_changed_objective_gate_pairs_are_evaluated(elcs_dir):
+    engine = GateEngine(elcs_dir)
+    report = engine.evaluate()
+    assert engine.evaluated == 50 * len(GATES)
+    assert {objective["overall"] for objective in report["objectives"]} == {"PASSED"}
+
+    assert engine.evaluate() is report and engine.evaluated == 0
+    fresh = GateEngine(elcs_dir)
+    assert fresh.evaluate() == report and fresh.evaluated == 0  # From elcs/.cache/gates.json
+
+    # One objective's rollback plan: one pair
+    _edit_spec(elcs_dir, lambda spec: spec["objectives"][6]["reversibility"].update(rollback_plan="TBD"))
+    report = engine.evaluate()
+    assert engine.evaluated == 1
+    assert report["objectives"][6]["failed_gates"] == ["reversibility"]
+    assert [o["overall"] for o in report["objectives"]].count("FAILED") == 1
+
+    # A criterion only G3 links: its observables and testability
+    _edit_spec(elcs_dir, lambda spec: spec["success_criteria"][3].update(method=""))
+    report = engine.evaluate()
+    assert engine.evaluated == 2
+    assert report["objectives"][2]["failed_gates"] == ["testability"]
+
+    # A hypothesis every objective links: its confidence, then its evidence
+    _edit_spec(elcs_dir, lambda spec: spec["hypotheses"][0].update(confidence=0.1))
+    report = engine.evaluate()
+    assert engine.evaluated == 50
+    assert report["objectives"][0]["gates"]["confidence"]["passed"]  # The objective's own score wins
+    _write(elcs_dir / "state" / "current.json", {
+        "hypotheses": [{"id": "H1", "evidence_for": ["E2", "E3"]}], "evidence": [{"id": "E1"}, {"id": "E2"}],
+    })
+    engine.evaluate()
+    assert engine.evaluated == 50
+
+    # A config change reaches every pair that reads it
+    _edit_spec(elcs_dir, lambda spec: spec.update(gate_config={"confidence_threshold": 0.9}))
+    report = engine.evaluate()
+    assert engine.evaluated == 50
+    assert report["config"]["confidence_threshold"] == 0.9
+    assert all("confidence" in o["failed_gates"] for o in report["objectives"])
+
+
+@pytest.mark.parametrize("gate_config, message", [
+    ({"confidence_threshold": "0.9"}, "gate_config.confidence_threshold must be a number, got '0.9'"),
+    ({"min_lens_approval": 2.5}, "gate_config.min_lens_approval must be an integer"),
+    ({"safety_lens_veto": "yes"}, "gate_config.safety_lens_veto must be true or false"),
+    (["confidence_threshold"], "gate_config must be an object"),
+])
+def test_bad_gate_config_is_rejected(elcs_dir, gate_config, message):
+    _edit_spec(elcs_dir, lambda spec: spec.update(gate_config=gate_config))
+    with pytest.raises(ValueError, match=message):
+        GateEngine(elcs_dir).evaluate()
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--elcs", str(elcs_dir), "gates"])
+    assert str(exit_info.value).startswith("Error: spec.json gate_config")
+
+
+def test_integer_threshold_is_accepted(elcs_dir):
+    _edit_spec(elcs_dir, lambda spec: spec.update(gate_config={"confidence_threshold": 1, "min_lens_approval": 1}))
+    report = GateEngine(elcs_dir).evaluate()
+    assert report["config"]["confidence_threshold"] == 1.0
+    assert report["objectives"][0]["gates"]["confidence"]["reason"] == "Confidence 0.8 (objective) below 1"
+
+
+def _stages(*blockers):
+    return [{"stage": n, "name": f"Stage {n}", "complete": False, "blocker": blocker} for n, blocker in enumerate(blockers)]
+
+
+def test_markers_are_written_in_stage_order(tmp_path):
+    stages = _stages(None, None, "2 of 5 lens evaluations", None, None)
+    assert _write_markers(tmp_path, stages) == [0, 1]
+    assert sorted(path.name for path in (tmp_path / ".gates").iterdir()) == ["stage-0.complete", "stage-1.complete"]
+    assert [stage["complete"] for stage in stages] == [True, True, False, False, False]
+
+    # A marker written by hand counts as complete and unblocks what follows
+    (tmp_path / ".gates" / "stage-2.complete").write_text("Done by a human\n")
+    stages = _stages(None, None, "2 of 5 lens evaluations", None, "no objective passes all 6 gates")
+    assert _write_markers(tmp_path, stages) == [3]
+    assert (tmp_path / ".gates" / "stage-2.complete").read_text() == "Done by a human\n"
+    assert [stage["complete"] for stage in stages] == [True, True, True, True, False]
+
+    # Markers are never removed, even when a stage's check fails again
+    stages = _stages("PROTOCOL.md or state/current.json missing", None, None, None, None)
+    assert _write_markers(tmp_path, stages) == [4]
+    assert len(list((tmp_path / ".gates").iterdir())) == 5
@@ -0,0 +1,141 @@
+"""The lens runner must produce valid outputs, re-evaluate only lenses whose inputs changed, and file findings once."""
+
+import json
+
+import pytest
+
+from create_elcs.runtime import write_json_atomic
+from create_elcs.runtime.lenses import (
+    LENS_IDS,
+    LENSES,
+    LensRunner,
+    StubEvaluator,
+    file_tokens,
+    findings_to_tokens,
+    load_target,
+)
+from create_elcs.runtime.tokens import TokenStore
+from create_elcs.runtime.validation import load_schemas
+
+SPEC = {
+    "spec_id": "SPEC-1",
+    "title": "Billing",
+    "objective": "A fast and secure billing API",
+    "version": 1,
+    "success_criteria": [
+        {"id": "SC1", "observable": "p95 latency", "target": "< 200 ms"},
+        {"id": "SC2", "observable": "Invoices sent", "target": "100%", "method": "Count in the ledger"},
+    ],
+    "phases": [
+        {"id": "P1", "name": "Foundation", "status": "blocked", "tasks": [{"id": "T1", "text": "Schema", "status": "blocked"}]},
+        {"id": "P2", "name": "Rollout", "tasks": []},
+    ],
+    "constraints": [
+        {"id": "C1", "text": "No card data at rest", "type": "hard"},
+        {"id": "C2", "text": "no card data at rest", "type": "soft"},
+    ],
+    "open_questions": [{"id": "Q1", "text": "Which currencies first?", "status": "open"}],
+    "hypotheses": [{"id": "H1", "claim": "Customers want monthly invoices", "status": "untested", "confidence": 1}],
+}
+
+
+@pytest.fixture
+def elcs_dir(tmp_path):
+    elcs_dir = tmp_path / "elcs"
+    for folder in ("open", "claimed", "closed"):
+        (elcs_dir / "tokens" / folder).mkdir(parents=True)
+    (elcs_dir / "spec").mkdir()
+    write_json_atomic(elcs_dir / "spec" / "spec.json", SPEC)
+    return elcs_dir
+
+
+def test_every_lens_writes_a_valid_output(elcs_dir):
+    results = LensRunner(elcs_dir).run(load_target(elcs_dir))
+    schema = load_schemas()["lens-output"]
+
+    assert [result.lens_id for result in results] == list(LENS_IDS)
+    for result in results:
+        assert result.error is None and not result.cached
+        written = json.loads((elcs_dir / "lenses" / f"spec.{result.lens_id}.json").read_text())
+        assert written == result.output
+        assert schema.validate(written) == [], result.lens_id
+        assert written["target"] == {"type": "spec", "id": "SPEC-1"}
+    # The stub's rules found something for each lens on this spec
+    assert all(any(result.output[field] for field in ("risk_flags", "questions", "tests_requested", "evidence_gaps"))
+               for result in results)
+
+
+def test_second_run_is_served_from_cache(elcs_dir):
+    runner = LensRunner(elcs_dir)
+    first = runner.run(load_target(elcs_dir))
+    outputs = {path.name: path.stat().st_mtime_ns for path in (elcs_dir / "lenses").iterdir()}
+
+    second = LensRunner(elcs_dir).run(load_target(elcs_dir))
+    assert all(result.cached for result in second)
+    assert [result.output for result in second] == [result.output for result in first]
+    # Unchanged outputs aren't rewritten
+    assert {path.name: path.stat().st_mtime_ns for path in (elcs_dir / "lenses").iterdir()} == outputs
+
+
+@pytest.mark.parametrize("field", ["phases", "success_criteria", "open_questions", "title"])
+def test_an_edit_re_evaluates_only_the_lenses_that_attend_to_it(elcs_dir, field):
+    runner = LensRunner(elcs_dir)
+    runner.run(load_target(elcs_dir))
+    spec = json.loads((elcs_dir / "spec" / "spec.json").read_text())
+    if field == "title":
+        spec[field] = "Billing v2"
+    else:
+        spec[field].append({"id": "X1", "name": "Added", "text": "Added"})
+    write_json_atomic(elcs_dir / "spec" / "spec.json", spec)
+
+    results = runner.run(load_target(elcs_dir))
+    expected = [lens.lens_id for lens in LENSES if field in lens.attends["spec"]]
+    assert expected
+    assert [result.lens_id for result in results if not result.cached] == expected
+
+
+def test_findings_are_filed_once(elcs_dir):
+    target = load_target(elcs_dir)
+    tokens = findings_to_tokens(target, LensRunner(elcs_dir).run(target))
+    assert tokens
+    assert {token["type"] for token in tokens} == {"subtask", "question", "test", "evidence_gap"}
+    assert len({token["token_id"] for token in tokens}) == len(tokens)
+
+    assert len(file_tokens(elcs_dir, tokens)) == len(tokens)
+    # Re-running the lenses maps the same findings to the same ids
+    again = findings_to_tokens(target, LensRunner(elcs_dir).run(target))
+    assert [token["token_id"] for token in again] == [token["token_id"] for token in tokens]
+    assert file_tokens(elcs_dir, again) == []
+
+    store = TokenStore.for_project(elcs_dir)
+    claimed = store.claim(tokens[0]["token_id"], "agent-a")
+    assert claimed is not None
+    assert file_tokens(elcs_dir, again) == []  # Found in claimed/ too
+    assert len(list((elcs_dir / "tokens").glob("*/*.json"))) == len(tokens)
+
+
+class FlakyEvaluator(StubEvaluator):
+    name = "flaky"
+
+    def evaluate(self, lens, target):
+        if lens.lens_id == "topology":
+            raise RuntimeError("model unavailable")
+        if lens.lens_id == "product_ux":
+            return {"risk_flags": [{"severity": "dire", "text": "Not a severity"}]}
+        return super().evaluate(lens, target)
+
+
+def test_a_failing_evaluator_fails_only_its_lens(elcs_dir):
+    results = {result.lens_id: result for result in LensRunner(elcs_dir, FlakyEvaluator()).run(load_target(elcs_dir))}
+
+    assert results["topology"].error == "RuntimeError: model unavailable"
+    assert results["product_ux"].error.startswith("ValueError: ")  # Rejected by the lens-output schema
+    for lens_id in ("topology", "product_ux"):
+        assert results[lens_id].output is None
+        assert not (elcs_dir / "lenses" / f"spec.{lens_id}.json").exists()
+    others = [result for lens_id, result in results.items() if lens_id not in ("topology", "product_ux")]
+    assert len(others) == 5 and all(result.output is not None and result.error is None for result in others)
+
+    # Failures aren't cached; the next run tries them again
+    retry = LensRunner(elcs_dir, FlakyEvaluator()).run(load_target(elcs_dir), lens_ids=["topology", "philosophy"])
+    assert [(result.lens_id, result.cached) for result in retry] == [("philosophy", True), ("topology", False)]
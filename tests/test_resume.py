@@ -0,0 +1,165 @@
+"""The resume bundle must come from the newest checkpoint, reuse unchanged sections and stay bounded."""
+
+import json
+import os
+
+import pytest
+
+from create_elcs.runtime import write_json_atomic
+from create_elcs.runtime.resume import ResumeBuilder, render
+from create_elcs.runtime.state_store import StateStore
+from create_elcs.runtime.tokens import TokenStore
+
+_tick = [1_700_000_000_000_000_000]
+
+
+def _write(path, document):
+    """Write JSON and move the file's mtime forward, so stat signatures always see the change."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_json_atomic(path, document)
+    _tick[0] += 1_000_000_000
+    os.utime(path, ns=(_tick[0], _tick[0]))
+
+
+def _checkpoint(elcs_dir, number, state_version=1, **fields):
+    _write(elcs_dir / "journal" / f"checkpoint-{number:03d}.json", {
+        "checkpoint_id": f"CP-{number:03d}", "title": f"Checkpoint {number}",
+        "created_at": f"2026-01-{1 + number % 28:02d}T00:00:00Z", "state_version": state_version, **fields,
+    })
+
+
+def _codec(elcs_dir, name, checkpoint_ref, instructions):
+    _write(elcs_dir / "journal" / f"codec-{name}.json", {
+        "codec_id": name, "schema_version": "1.0", "created_at": "2026-01-01T00:00:00Z",
+        "checkpoint_ref": checkpoint_ref, "resumption_instructions": instructions,
+        "decompression_hints": {
+            "glossary": [{"term": "WT", "definition": "work token"}],
+            "artifact_index": [
+                {"path": "spec/spec.json", "importance": "critical"},
+                {"path": "archives/old.md", "importance": "background"},
+            ],
+            "retrieval_queries": [{"query": "not loaded up front"}],
+        },
+    })
+
+
+@pytest.fixture
+def elcs_dir(tmp_path):
+    elcs_dir = tmp_path / "elcs"
+    for folder in ("open", "claimed", "closed"):
+        (elcs_dir / "tokens" / folder).mkdir(parents=True)
+    (elcs_dir / "journal").mkdir()
+    (elcs_dir / "journal" / "checkpoint-000-template.md").write_text("# Checkpoint 000: Template\n")
+    _write(elcs_dir / "state" / "current.json", {"version": 1, "assumptions": [], "hypotheses": []})
+    _write(elcs_dir / "spec" / "spec.json", {"version": 1, "objective": "Ship it", "success_criteria": []})
+    return elcs_dir
+
+
+def test_latest_checkpoint_and_its_codec(elcs_dir):
+    for number in range(1, 41):
+        _checkpoint(elcs_dir, number, summary=f"summary {number}")
+        _codec(elcs_dir, f"{number:03d}", f"journal/checkpoint-{number:03d}.json", f"resume from {number}")
+    (elcs_dir / "journal" / "checkpoint-040.md").write_text("# Checkpoint 40 in Markdown\n")
+    (elcs_dir / "journal" / "checkpoint-007.md").write_text("# An old Markdown checkpoint\n")
+    # Newest by mtime, but for an older checkpoint
+    _codec(elcs_dir, "stray", "checkpoint-012", "resume from 12 again")
+
+    bundle = ResumeBuilder(elcs_dir).build()
+    checkpoint = bundle["checkpoint"]
+    assert checkpoint["path"] == "journal/checkpoint-040.json"  # JSON preferred at the same number
+    assert checkpoint["checkpoint"]["summary"] == "summary 40"
+    assert checkpoint["codec"]["path"] == "journal/codec-040.json"
+    assert checkpoint["codec"]["resumption_instructions"] == "resume from 40"
+    hints = checkpoint["codec"]["decompression_hints"]
+    assert hints["artifact_index"] == [{"path": "spec/spec.json", "importance": "critical"}]
+    assert "retrieval_queries" not in hints
+
+    (elcs_dir / "journal" / "checkpoint-041.md").write_text(
+        "# Checkpoint 041: Markdown wins when newer\n\n**State Version**: 1\n\n"
+        "## Next Priorities\n\n1. Finish the API\n2. Write docs\n"
+    )
+    checkpoint = ResumeBuilder(elcs_dir).build()["checkpoint"]
+    assert checkpoint["path"] == "journal/checkpoint-041.md"
+    assert checkpoint["checkpoint"]["next_priorities"] == ["Finish the API", "Write docs"]
+    # No codec names it, so the newest codec is used
+    assert checkpoint["codec"]["path"] == "journal/codec-stray.json"
+
+
+def test_sections_are_rebuilt_only_when_their_inputs_change(elcs_dir):
+    _checkpoint(elcs_dir, 1)
+    builder = ResumeBuilder(elcs_dir)
+    first = builder.build()
+    assert builder.rebuilt == ["checkpoint", "state", "tokens", "project"]
+    assert builder.build() == first and builder.rebuilt == []
+    fresh = ResumeBuilder(elcs_dir)
+    assert fresh.build() == first and fresh.rebuilt == []  # From elcs/.cache/resume.json
+
+    TokenStore.for_project(elcs_dir).create({"token_id": "WT-1", "priority": 0.5, "summary": "New work"})
+    bundle = builder.build()
+    assert builder.rebuilt == ["tokens"]
+    assert [token["token_id"] for token in bundle["tokens"]["ready"]["items"]] == ["WT-1"]
+
+    _write(elcs_dir / "spec" / "spec.json", {"version": 2, "objective": "Ship it sooner", "success_criteria": []})
+    assert builder.build()["project"]["objective"] == "Ship it sooner"
+    assert builder.rebuilt == ["project"]
+
+    # A new checkpoint moves the token and spec "since"; its state_version is unchanged
+    _checkpoint(elcs_dir, 2, spec_version=2)
+    builder.build()
+    assert builder.rebuilt == ["checkpoint", "tokens", "project"]
+    # A different --max-items doesn't reuse capped sections
+    other = ResumeBuilder(elcs_dir, max_items=1)
+    other.build()
+    assert other.rebuilt == ["checkpoint", "state", "tokens", "project"]
+
+
+def test_state_changes_since_the_checkpoint_are_capped(elcs_dir):
+    store = StateStore.for_project(elcs_dir)
+    store.record(author="agent")
+    document = store.head()
+    document["assumptions"] = [{"id": f"A{n}", "text": f"assumption {n}"} for n in range(30)]
+    document["hypotheses"] = [{"id": f"H{n}", "text": f"hypothesis {n}"} for n in range(5)]
+    document["constraints"] = ["budget"]
+    version = store.commit(document, author="agent")
+    _checkpoint(elcs_dir, 1, state_version=1)
+
+    full = ResumeBuilder(elcs_dir, max_items=100, use_cache=False).build()["state"]
+    patch = store.diff(1, version)
+    assert full["version"] == version and full["checkpoint_version"] == 1
+    assert full["changes"] == {"count": len(patch), "items": patch, "remaining_by_key": {}}
+
+    state = ResumeBuilder(elcs_dir, max_items=4, use_cache=False).build()["state"]
+    changes = state["changes"]
+    assert changes["count"] == len(patch) and changes["items"] == patch[:4]
+    assert sum(changes["remaining_by_key"].values()) == len(patch) - 4
+    assert set(changes["remaining_by_key"]) <= {"assumptions", "hypotheses", "constraints", "last_updated",
+                                                  "version", "parent_version"}
+    text = render(ResumeBuilder(elcs_dir, max_items=4, use_cache=False).build())
+    assert f"showing 4 of {len(patch)}" in text and "Not shown: " in text
+    assert text.count('"op"') == 4
+
+    # Nothing changed since the checkpoint
+    _checkpoint(elcs_dir, 2, state_version=version)
+    state = ResumeBuilder(elcs_dir, use_cache=False).build()["state"]
+    assert state["changes"]["count"] == 0
+    assert "Unchanged since the checkpoint." in render(ResumeBuilder(elcs_dir, use_cache=False).build())
+
+
+def test_state_without_history_is_capped(elcs_dir):
+    document = {
+        "version": 7,
+        "assumptions": [{"id": f"A{n}"} for n in range(50)],
+        "hypotheses": [{"id": "H1"}],
+        "evidence": [],
+    }
+    _write(elcs_dir / "state" / "current.json", document)
+    _checkpoint(elcs_dir, 1, state_version=3)  # Never recorded
+
+    state = ResumeBuilder(elcs_dir, max_items=5, use_cache=False).build()["state"]
+    assert "changes" not in state
+    assert state["state"]["assumptions"] == {"count": 50, "items": document["assumptions"][:5]}
+    assert state["state"]["hypotheses"] == {"count": 1, "items": [{"id": "H1"}]}
+    assert state["state"]["constraints"] is None
+    text = render(ResumeBuilder(elcs_dir, max_items=5, use_cache=False).build())
+    assert "assumptions: 50 (showing 5)" in text
+    assert json.dumps({"id": "A5"}) not in text
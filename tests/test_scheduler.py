@@ -0,0 +1,145 @@
+"""The incrementally maintained scheduler must agree with one rebuilt from the token files."""
+
+import json
+import os
+import random
+
+import pytest
+
+from create_elcs.runtime import write_json_atomic
+from create_elcs.runtime.scheduler import Scheduler
+from create_elcs.runtime.tokens import CLAIMED, CLOSED, OPEN, TokenStore
+
+
+def _state(scheduler: Scheduler) -> dict:
+    ready = [token["token_id"] for token in scheduler.ready()]
+    tokens = [token["token_id"] for token in scheduler.store.tokens()]
+    path = scheduler.critical_path()
+    return {
+        "ready": ready,
+        "tails": {token_id: pytest.approx(scheduler.tail(token_id)) for token_id in tokens},
+        "cycles": sorted(scheduler.cycles()),
+        "missing": scheduler.missing(),
+        "critical": pytest.approx(scheduler.tail(path[0])) if path else None,
+    }
+
+
+def _token(token_id, cost=None, dependencies=(), blocks=(), status="open", priority=0.5):
+    return {
+        "token_id": token_id, "status": status, "priority": priority,
+        "dependencies": list(dependencies), "blocks": list(blocks),
+        "budget": {"time_seconds": cost} if cost else None,
+    }
+
+
+def test_incremental_scheduler_matches_rebuild(tmp_path):
+    rng = random.Random(17)
+    tokens_dir = tmp_path / "tokens"
+    scheduler = Scheduler(TokenStore(tokens_dir), default_cost=60)
+    ids = []
+
+    def in_folder(folder):
+        return sorted(path.stem for path in (tokens_dir / folder).glob("*.json"))
+
+    def some(count):
+        # Mostly existing tokens, now and then one that doesn't exist (yet)
+        pool = ids + [f"t{len(ids) + 3}"]
+        return rng.sample(pool, min(len(pool), count))
+
+    for step in range(250):
+        op = rng.random()
+        opened, claimed, closed = in_folder(OPEN), in_folder(CLAIMED), in_folder(CLOSED)
+        if op < 0.3 or not ids:
+            token_id = f"t{len(ids)}"
+            ids.append(token_id)
+            scheduler.store.create(_token(
+                token_id,
+                cost=rng.choice([None, 30, 120, 600]),
+                dependencies=some(rng.randint(0, 2)),
+                blocks=some(rng.randint(0, 1)) if rng.random() < 0.3 else (),
+                status=rng.choice(["open", "open", "open", "blocked"]),
+                priority=rng.choice([0.2, 0.5, 0.8]),
+            ))
+        elif op < 0.45 and opened:
+            scheduler.store.claim(rng.choice(opened), "a")
+        elif op < 0.6 and claimed:
+            scheduler.store.close(rng.choice(claimed), "done")
+        elif op < 0.65 and claimed:
+            scheduler.store.release(rng.choice(claimed))
+        elif op < 0.7 and closed:
+            # Reopened by hand
+            token_id = rng.choice(closed)
+            os.rename(tokens_dir / CLOSED / f"{token_id}.json", tokens_dir / OPEN / f"{token_id}.json")
+        elif op < 0.85 and opened:
+            # Edges and cost edited in place, which may close a cycle
+            path = tokens_dir / OPEN / f"{rng.choice(opened)}.json"
+            document = json.loads(path.read_text())
+            document["dependencies"] = some(rng.randint(0, 3))
+            document["blocks"] = some(1) if rng.random() < 0.2 else []
+            document["budget"] = {"time_seconds": rng.choice([10, 300])}
+            write_json_atomic(path, document)
+        elif op < 0.95 and opened:
+            os.remove(tokens_dir / OPEN / f"{rng.choice(opened)}.json")
+        else:
+            # Queries in between must not disturb the incremental state
+            scheduler.ready_tokens()
+            scheduler.assign({"x": {}, "y": {"time_seconds": 200}})
+
+        rebuilt = Scheduler(TokenStore(tokens_dir), default_cost=60)
+        assert _state(scheduler) == _state(rebuilt), f"step {step}"
+
+    assert any(_state(scheduler)["cycles"]) or any(_state(scheduler)["missing"])
+
+
+def test_cycles_never_become_ready(tmp_path):
+    store = TokenStore(tmp_path / "tokens")
+    store.create_many([
+        _token("a", dependencies=["c"]),
+        _token("b", dependencies=["a"]),
+        _token("c", dependencies=["b"]),
+        _token("d", dependencies=["c"]),
+        _token("self", dependencies=["self"]),
+        _token("free"),
+    ])
+    scheduler = Scheduler(store)
+
+    assert sorted(scheduler.cycles()) == [["a", "b", "c"], ["self"]]
+    assert [token["token_id"] for token in scheduler.ready()] == ["free"]
+
+    # Breaking the cycle by hand frees the rest in order
+    store.claim("c", "a")
+    store.close("c", "cut")
+    assert sorted(scheduler.cycles()) == [["self"]]
+    assert {token["token_id"] for token in scheduler.ready()} == {"a", "d", "free"}
+
+
+def test_critical_path_follows_longest_tail(tmp_path):
+    store = TokenStore(tmp_path / "tokens")
+    store.create_many([
+        _token("design", cost=100),
+        _token("api", cost=300, dependencies=["design"]),
+        _token("ui", cost=50, dependencies=["design"]),
+        _token("docs", cost=20, dependencies=["api", "ui"]),
+        _token("side", cost=200),
+        _token("gate", cost=10, blocks=["ui"]),
+    ])
+    scheduler = Scheduler(store)
+
+    assert scheduler.critical_path() == ["design", "api", "docs"]
+    assert scheduler.tail("design") == 420
+    assert scheduler.tail("gate") == 80
+    assert [token["token_id"] for token in scheduler.ready()] == ["design", "side", "gate"]
+    assert scheduler.missing() == {}
+
+    store.claim("design", "a")
+    store.close("design", "done")
+    assert scheduler.critical_path() == ["api", "docs"]
+    assert [token["token_id"] for token in scheduler.ready()] == ["api", "side", "gate"]
+
+    # A slower UI moves the critical path without anything else changing
+    path = store.path("ui")
+    document = json.loads(path.read_text())
+    document["budget"] = {"time_seconds": 1000}
+    write_json_atomic(path, document)
+    assert scheduler.critical_path() == ["gate", "ui", "docs"]
+    assert scheduler.tail("gate") == 1030
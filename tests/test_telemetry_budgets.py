@@ -0,0 +1,205 @@
+"""Budget accounting runs on the sink's writer thread and only rewrites budgets.json when usage changed."""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from elcs_telemetry import background_sink
+from elcs_telemetry.__main__ import main as telemetry_main
+from elcs_telemetry.background_sink import BackgroundSink
+from elcs_telemetry import telemetry_budgets
+from elcs_telemetry.telemetry_budgets import BUDGETS_FILE_NAME, STALE_LOCK_SECONDS, BudgetAccountant, _FileLock
+from elcs_telemetry.telemetry_policy import TelemetryPolicy
+from elcs_telemetry.telemetry_writer import TelemetryWriter, clear_project_cache
+
+
+@pytest.fixture
+def elcs_dir(tmp_path, monkeypatch):
+    elcs_dir = tmp_path / "elcs"
+    (elcs_dir / "tokens" / "claimed").mkdir(parents=True)
+    (elcs_dir / "telemetry").mkdir()
+    (elcs_dir / "tokens" / "claimed" / "WT-1.json").write_text(json.dumps(
+        {"token_id": "WT-1", "claimed_by": "agent-a", "budget": {"tool_calls": 2}}
+    ))
+    monkeypatch.chdir(tmp_path)
+    clear_project_cache()
+    yield elcs_dir
+    clear_project_cache()
+
+
+def _session(accountant, calls, session_id="s1", start_us=1_000_000):
+    accountant.feed({"event": "session_start", "session_id": session_id, "agent": "agent-a"}, start_us)
+    exceeded = []
+    for n in range(calls):
+        exceeded += accountant.feed({"event": "tool_call", "session_id": session_id}, start_us + n + 1)
+    return exceeded
+
+
+def test_sink_loads_and_feeds_budgets_on_writer_thread(elcs_dir, monkeypatch):
+    loaded_on = []
+    load = BudgetAccountant.load.__func__
+
+    def recording_load(cls, telemetry_dir):
+        loaded_on.append(threading.current_thread().name)
+        return load(cls, telemetry_dir)
+
+    monkeypatch.setattr(background_sink.BudgetAccountant, "load", classmethod(recording_load))
+    sink = BackgroundSink(TelemetryWriter(), telemetry_policy=TelemetryPolicy())
+    sink.emit({"event": "session_start", "session_id": "s1", "agent": "agent-a"})
+    for _ in range(3):
+        sink.emit({"event": "tool_call", "session_id": "s1", "tool": "grep"})
+    sink.close()
+
+    assert loaded_on == ["elcs-telemetry-writer"]
+    budgets = json.loads((elcs_dir / "telemetry" / BUDGETS_FILE_NAME).read_text())
+    assert budgets["tokens"]["WT-1"]["used"]["tool_calls"] == 3
+    assert budgets["tokens"]["WT-1"]["exceeded"] == ["tool_calls"]
+    events = [
+        json.loads(line)
+        for path in (elcs_dir / "telemetry").glob("events-*.jsonl")
+        for line in path.read_text().splitlines()
+    ]
+    assert [event["metric"] for event in events if event["event"] == "budget_exceeded"] == ["tool_calls"]
+
+
+def test_sampled_out_events_still_count(elcs_dir):
+    policy = TelemetryPolicy({"sample_rates": {"tool_call": 0.0}})
+    sink = BackgroundSink(TelemetryWriter(), telemetry_policy=policy)
+    sink.emit({"event": "session_start", "session_id": "s1", "agent": "agent-a"})
+    sink.emit({"event": "tool_call", "session_id": "s1", "tool": "grep"})
+    sink.close()
+
+    budgets = json.loads((elcs_dir / "telemetry" / BUDGETS_FILE_NAME).read_text())
+    assert budgets["tokens"]["WT-1"]["used"]["tool_calls"] == 1
+    written = [
+        json.loads(line)["event"]
+        for path in (elcs_dir / "telemetry").glob("events-*.jsonl")
+        for line in path.read_text().splitlines()
+    ]
+    assert "session_start" in written and "tool_call" not in written
+
+
+def test_sink_without_tokens_stops_accounting(elcs_dir):
+    for path in (elcs_dir / "tokens" / "claimed").iterdir():
+        path.unlink()
+    (elcs_dir / "tokens" / "claimed").rmdir()
+    (elcs_dir / "tokens").rmdir()
+
+    sink = BackgroundSink(TelemetryWriter(), telemetry_policy=TelemetryPolicy())
+    sink.drain()
+    assert sink._budgets is None and not sink._accounting
+    sink.close()
+    assert not (elcs_dir / "telemetry" / BUDGETS_FILE_NAME).exists()
+
+
+def test_sync_only_writes_when_there_is_usage(elcs_dir, monkeypatch):
+    path = elcs_dir / "telemetry" / BUDGETS_FILE_NAME
+    accountant = BudgetAccountant.load(elcs_dir / "telemetry")
+    assert accountant.sync()
+    assert not path.exists()
+
+    _session(accountant, 1)
+    assert accountant.sync()
+    written = path.read_bytes()
+    mtime_ns = path.stat().st_mtime_ns
+
+    locks = []
+    monkeypatch.setattr(accountant._lock, "acquire", lambda *args: locks.append(args) or True)
+    for _ in range(3):
+        assert accountant.sync()
+    assert not locks
+    assert path.read_bytes() == written and path.stat().st_mtime_ns == mtime_ns
+    assert accountant.totals()[("token", "WT-1")]["tool_calls"] == 1
+
+
+def test_processes_count_against_one_total(elcs_dir):
+    first = BudgetAccountant.load(elcs_dir / "telemetry")
+    second = BudgetAccountant.load(elcs_dir / "telemetry")
+
+    assert _session(first, 2, "s1") == []
+    assert _session(second, 1, "s2") == []
+    first.sync()
+    second.sync()
+    first.sync()  # Read-only: picks up the second process's call
+
+    assert first.totals()[("token", "WT-1")]["tool_calls"] == 3
+    assert second.totals()[("token", "WT-1")]["tool_calls"] == 3
+    # Over the limit across processes: reported once, by whoever crosses it next
+    exceeded = first.feed({"event": "tool_call", "session_id": "s1"}, 2_000_000)
+    assert [event["used"] for event in exceeded] == [4]
+
+
+
+def test_totals_of_scopes_no_longer_live_are_kept(elcs_dir):
+    path = elcs_dir / "telemetry" / BUDGETS_FILE_NAME
+    path.write_text(json.dumps({
+        "tokens": {"WT-0": {"used": {"tool_calls": 9}, "limits": {"tool_calls": 5}, "exceeded": ["tool_calls"]}},
+        "coalitions": {"C-elsewhere": {"used": {"tokens": 120}, "limits": {}, "exceeded": []}},
+    }))
+    accountant = BudgetAccountant.load(elcs_dir / "telemetry")
+    _session(accountant, 1)
+    assert accountant.sync()
+    budgets = json.loads(path.read_text())
+    assert budgets["tokens"]["WT-0"] == {"used": {"tool_calls": 9}, "limits": {"tool_calls": 5}, "exceeded": ["tool_calls"]}
+    assert budgets["coalitions"]["C-elsewhere"]["used"] == {"tokens": 120}
+    assert budgets["tokens"]["WT-1"]["used"]["tool_calls"] == 1
+
+    # The token is closed before its last increment is synced
+    accountant.feed({"event": "tool_call", "session_id": "s1"}, 2_000_000)
+    (elcs_dir / "tokens" / "closed").mkdir()
+    os.replace(elcs_dir / "tokens" / "claimed" / "WT-1.json", elcs_dir / "tokens" / "closed" / "WT-1.json")
+    assert accountant.sync()
+    budgets = json.loads(path.read_text())
+    assert budgets["tokens"]["WT-1"]["used"]["tool_calls"] == 2
+    assert budgets["tokens"]["WT-1"]["limits"] == {"tool_calls": 2}
+    assert set(budgets["tokens"]) == {"WT-0", "WT-1"}
+    assert accountant.totals() == {}
+
+
+def _lock(tmp_path, age):
+    path = tmp_path / ".budgets.json.lock"
+    path.write_text("held")
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_stale_lock_is_broken(tmp_path):
+    path = _lock(tmp_path, STALE_LOCK_SECONDS + 5)
+    assert _FileLock(path).acquire(timeout=0.05)
+    assert path.read_text() == ""
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
+
+    path = _lock(tmp_path, 0)
+    assert not _FileLock(path).acquire(timeout=0.05)
+    assert path.read_text() == "held"
+
+
+def test_breaking_a_stale_lock_keeps_a_new_one(tmp_path, monkeypatch):
+    path = _lock(tmp_path, STALE_LOCK_SECONDS + 5)
+    rename = os.rename
+
+    def someone_else_first(src, dst):
+        # Another process breaks the stale lock and takes a new one between our stat and rename
+        monkeypatch.setattr(telemetry_budgets.os, "rename", rename)
+        path.unlink()
+        path.write_text("new owner")
+        rename(src, dst)
+
+    monkeypatch.setattr(telemetry_budgets.os, "rename", someone_else_first)
+    assert not _FileLock(path).acquire(timeout=0.05)
+    assert path.read_text() == "new owner"
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
+
+def test_budgets_command_tolerates_entries_without_usage(elcs_dir, capsys):
+    (elcs_dir / "telemetry" / BUDGETS_FILE_NAME).write_text(json.dumps({
+        "tokens": {"WT-1": {"limits": {"tool_calls": 2}}, "WT-2": {"used": None, "limits": {"tool_calls": 5}}},
+        "updated_at": "2026-01-02T00:00:00Z",
+    }))
+    telemetry_main(["budgets", "--dir", str(elcs_dir / "telemetry")])
+
+    rows = [line.split() for line in capsys.readouterr().out.splitlines()[1:-1]]
+    assert rows == [["token", "WT-1", "tool_calls", "0", "2"], ["token", "WT-2", "tool_calls", "0", "5"]]
@@ -0,0 +1,189 @@
+"""Sidecar-indexed queries and columnar archives must answer like a scan of the JSONL."""
+
+import json
+import random
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from elcs_telemetry.telemetry_archive import archive_path, compact
+from elcs_telemetry.telemetry_query import TelemetryQuery
+
+DAY = date(2026, 1, 2)
+SESSIONS = ["s1", "s2", "s3"]
+TOOLS = ["read_file", "edit_file", "grep"]
+
+
+def _random_line(rng: random.Random, ts: datetime) -> str:
+    kind = rng.random()
+    if kind < 0.03:
+        return "{not json"
+    if kind < 0.05:
+        return json.dumps(["not", "an", "object"])
+    if kind < 0.06:
+        return ""
+    if kind < 0.08:
+        return json.dumps({"ts": ts.replace(tzinfo=None).isoformat(), "event": "tool_call", "tool": "grep", "duration_ms": 5})
+    event = {"ts": ts.isoformat(), "event": rng.choice(["tool_call", "session_start", "agent_delegation", "error"])}
+    if event["event"] == "tool_call":
+        event.update(tool=rng.choice(TOOLS), duration_ms=rng.choice([0.5, 12, 1500.25, None]), session_id=rng.choice(SESSIONS))
+        if rng.random() < 0.2:
+            del event["duration_ms"]
+    elif event["event"] == "agent_delegation":
+        event.update(from_session=rng.choice(SESSIONS), to_agent="helper", to_session=None, prompt_preview="go")
+    else:
+        event.update(session_id=rng.choice(SESSIONS), agent="a", model="m")
+    if rng.random() < 0.1:
+        event["extra"] = {"nested": [1, 2]}
+    return json.dumps(event)
+
+
+def _scan(lines: list[str], event=None, session_id=None, tool=None, since=None, until=None, min_duration_ms=None):
+    """Reference answer: parse every line and filter it."""
+    matches = []
+    for line in lines:
+        try:
+            parsed = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(parsed, dict):
+            continue
+        if event is not None and parsed.get("event") != event:
+            continue
+        if session_id is not None and (parsed.get("session_id") or parsed.get("from_session")) != session_id:
+            continue
+        if tool is not None and parsed.get("tool") != tool:
+            continue
+        if since is not None or until is not None:
+            ts = datetime.fromisoformat(parsed["ts"])
+            ts = (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)).timestamp()
+            if (since is not None and ts < since) or (until is not None and ts >= until):
+                continue
+        if min_duration_ms is not None:
+            duration = parsed.get("duration_ms")
+            if not isinstance(duration, (int, float)) or duration < min_duration_ms:
+                continue
+        matches.append(line.encode("utf-8"))
+    return matches
+
+
+@pytest.fixture
+def telemetry_day(tmp_path):
+    rng = random.Random(6)
+    start = datetime(DAY.year, DAY.month, DAY.day, tzinfo=timezone.utc)
+    lines = [_random_line(rng, start + timedelta(seconds=20 * i, microseconds=rng.randrange(1_000_000))) for i in range(2000)]
+    (tmp_path / f"events-{DAY.isoformat()}.jsonl").write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return tmp_path, lines
+
+
+def _queries():
+    noon = datetime(DAY.year, DAY.month, DAY.day, 12, tzinfo=timezone.utc).timestamp()
+    return [
+        {},
+        {"event": "tool_call"},
+        {"event": "tool_call", "tool": "grep"},
+        {"session_id": "s2"},
+        {"min_duration_ms": 10},
+        {"since": noon},
+        {"until": noon, "event": "error"},
+        {"event": "missing"},
+        {"tool": "edit_file", "session_id": "s1", "min_duration_ms": 1000, "since": noon - 3600},
+    ]
+
+
+def test_indexed_queries_match_a_full_scan(telemetry_day):
+    telemetry_dir, lines = telemetry_day
+    query = TelemetryQuery(telemetry_dir)
+    for filters in _queries():
+        assert list(query.find(**filters)) == _scan(lines, **filters), filters
+
+
+def test_index_extends_as_the_file_grows(telemetry_day):
+    telemetry_dir, lines = telemetry_day
+    query = TelemetryQuery(telemetry_dir)
+    assert list(query.find(event="error")) == _scan(lines, event="error")
+    extra = [json.dumps({"ts": f"{DAY.isoformat()}T23:59:00+00:00", "event": "error", "session_id": "s9"})]
+    with open(telemetry_dir / f"events-{DAY.isoformat()}.jsonl", "a", encoding="utf-8") as f:
+        f.write(extra[0] + "\n" + '{"ts": "partial')
+    assert list(TelemetryQuery(telemetry_dir).find(event="error")) == _scan(lines + extra, event="error")
+
+
+def test_compaction_does_not_change_query_results(telemetry_day):
+    telemetry_dir, lines = telemetry_day
+    query = TelemetryQuery(telemetry_dir)
+    before = {json.dumps(filters): list(query.find(**filters)) for filters in _queries()}
+    stats_before = query.duration_percentiles()
+
+    results = compact(telemetry_dir, keep_days=1, today=DAY + timedelta(days=3))
+    assert [source.name for source, *_ in results] == [f"events-{DAY.isoformat()}.jsonl"]
+    assert archive_path(telemetry_dir, DAY).exists()
+    assert not list(telemetry_dir.glob("events-*.jsonl"))
+
+    query = TelemetryQuery(telemetry_dir)
+    for filters in _queries():
+        assert list(query.find(**filters)) == before[json.dumps(filters)], filters
+    assert query.duration_percentiles() == stats_before
+
+
+def test_timeline_orders_a_sessions_events(telemetry_day):
+    telemetry_dir, _ = telemetry_day
+    timeline = TelemetryQuery(telemetry_dir).timeline("s3")
+    assert timeline
+    assert all((event.get("session_id") or event.get("from_session")) == "s3" for event in timeline)
+    assert [event["ts"] for event in timeline] == sorted(event["ts"] for event in timeline)
+
+
+def _sidecar(telemetry_dir):
+    (path,) = (telemetry_dir / ".index").iterdir()
+    return path
+
+
+def test_sidecar_is_appended_to_not_rewritten(telemetry_day):
+    telemetry_dir, lines = telemetry_day
+    source = telemetry_dir / f"events-{DAY.isoformat()}.jsonl"
+    list(TelemetryQuery(telemetry_dir).find(event="error"))
+    first = _sidecar(telemetry_dir).read_bytes()
+    inode = _sidecar(telemetry_dir).stat().st_ino
+
+    extra = [json.dumps({"ts": f"{DAY.isoformat()}T23:0{n}:00+00:00", "event": "error", "session_id": "s9"})
+             for n in range(3)]
+    for n, line in enumerate(extra, 1):
+        with open(source, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+        assert list(TelemetryQuery(telemetry_dir).find(session_id="s9")) == _scan(lines + extra[:n], session_id="s9")
+
+    sidecar = _sidecar(telemetry_dir)
+    assert sidecar.stat().st_ino == inode
+    assert sidecar.read_bytes().startswith(first)
+    assert sidecar.read_bytes().count(b"\n") == first.count(b"\n") + 3
+
+
+def test_stale_and_torn_segments_are_ignored(telemetry_day):
+    telemetry_dir, lines = telemetry_day
+    source = telemetry_dir / f"events-{DAY.isoformat()}.jsonl"
+    list(TelemetryQuery(telemetry_dir).find())
+    sidecar = _sidecar(telemetry_dir)
+    header, segment = sidecar.read_bytes().splitlines()
+
+    # A second process appends the same rows from the same starting point, then a write is torn
+    extra = json.dumps({"ts": f"{DAY.isoformat()}T23:59:00+00:00", "event": "error", "session_id": "s9"})
+    with open(source, "a", encoding="utf-8") as f:
+        f.write(extra + "\n")
+    with open(sidecar, "ab") as f:
+        f.write(segment + b"\n" + segment[: len(segment) // 2])
+
+    query = TelemetryQuery(telemetry_dir)
+    for filters in _queries():
+        assert list(query.find(**filters)) == _scan(lines + [extra], **filters), filters
+    # Rewritten clean on the next save
+    assert sidecar.read_bytes().count(b"\n") == 2
+    assert list(TelemetryQuery(telemetry_dir).find(event="error")) == _scan(lines + [extra], event="error")
+
+
+def test_posting_lists_cover_every_row(telemetry_day):
+    telemetry_dir, _ = telemetry_day
+    (index,) = TelemetryQuery(telemetry_dir).days()
+    for field, column in (("event", index.events), ("session", index.sessions), ("tool", index.tools)):
+        rows = sorted(row for postings in index.postings[field].values() for row in postings)
+        assert rows == [i for i, code in enumerate(column) if code >= 0], field
+        assert all(postings == sorted(postings) for postings in index.postings[field].values())
@@ -0,0 +1,46 @@
+"""The runtime's machine-local caches must be ignored in a generated project."""
+
+import shutil
+import subprocess
+
+import pytest
+
+from conftest import ROOT
+
+from create_elcs.runtime import validation
+from create_elcs.runtime.__main__ import main
+
+COMMANDS = [
+    ["tokens", "list"], ["schedule", "status"], ["validate"], ["distance"], ["state", "record"],
+    ["resume"], ["lenses"], ["gates"],
+]
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+def test_runtime_caches_are_ignored(tmp_path, monkeypatch):
+    project = tmp_path / "project"
+    shutil.copytree(ROOT / "template", project)
+    subprocess.run(["git", "init", "-q"], cwd=project, check=True)
+    monkeypatch.chdir(project)
+    monkeypatch.setattr(validation, "validator_cache_dir", lambda: tmp_path / "user-cache")
+    for command in COMMANDS:
+        try:
+            main(command)
+        except SystemExit as e:
+            assert not e.code or e.code == 1, command
+
+    untracked = subprocess.run(
+        ["git", "status", "--porcelain", "--untracked-files=all"],
+        cwd=project, capture_output=True, text=True, check=True,
+    ).stdout.splitlines()
+    ignored = subprocess.run(
+        ["git", "status", "--porcelain", "--ignored", "--untracked-files=all"],
+        cwd=project, capture_output=True, text=True, check=True,
+    ).stdout.splitlines()
+    ignored = sorted(line[3:] for line in ignored if line.startswith("!! "))
+
+    assert not any("/.cache/" in line or line.endswith((".index.json", ".lock")) for line in untracked)
+    assert "elcs/tokens/.index.json" in ignored and "elcs/state/history/.lock" in ignored
+    assert any(path.startswith("elcs/.cache/lenses/") for path in ignored)
+    assert {"elcs/.cache/validation.json", "elcs/.cache/distance.json", "elcs/.cache/gates.json",
+            "elcs/.cache/resume.json"} <= set(ignored)
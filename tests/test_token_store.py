@@ -0,0 +1,183 @@
+"""Token claims are exclusive across processes, and the incremental index agrees with a fresh scan."""
+
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+
+from conftest import ROOT
+
+from create_elcs.runtime import write_json_atomic
+from create_elcs.runtime.tokens import CLAIMED, CLOSED, INDEX_FILE_NAME, OPEN, TokenStore, priority_key
+
+CLAIMER = """
+import json, sys
+from pathlib import Path
+from create_elcs.runtime.tokens import TokenStore
+
+store = TokenStore(Path(sys.argv[1]))
+sys.stdin.readline()  # start together
+claimed = []
+while (token := store.claim_next(sys.argv[2])) is not None:
+    claimed.append(token["token_id"])
+print(json.dumps(claimed))
+"""
+
+
+def _snapshot(store: TokenStore) -> list:
+    return sorted((folder, json.dumps(token, sort_keys=True)) for folder, token in store.entries())
+
+
+def _fresh(tokens_dir, tmp_path) -> TokenStore:
+    copy = tmp_path / "fresh"
+    shutil.rmtree(copy, ignore_errors=True)
+    shutil.copytree(tokens_dir, copy, ignore=shutil.ignore_patterns(INDEX_FILE_NAME))
+    return TokenStore(copy)
+
+
+def test_concurrent_claims_across_processes(tmp_path):
+    tokens_dir = tmp_path / "tokens"
+    store = TokenStore(tokens_dir)
+    created = store.create_many(
+        {"token_id": f"t{i:03d}", "priority": (i % 7) / 7, "type": "task"} for i in range(120)
+    )
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT / "generator" / "src"), env.get("PYTHONPATH")]))
+
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-c", CLAIMER, str(tokens_dir), f"agent-{n}"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, env=env,
+        )
+        for n in range(6)
+    ]
+    for worker in workers:
+        worker.stdin.write("go\n")
+        worker.stdin.flush()
+    claims = {}
+    for n, worker in enumerate(workers):
+        out, _ = worker.communicate(timeout=60)
+        assert worker.returncode == 0
+        for token_id in json.loads(out):
+            assert token_id not in claims, f"{token_id} claimed twice"
+            claims[token_id] = f"agent-{n}"
+
+    assert set(claims) == {token["token_id"] for token in created}
+    assert not list((tokens_dir / OPEN).glob("*.json"))
+    for token_id, agent in claims.items():
+        document = json.loads((tokens_dir / CLAIMED / f"{token_id}.json").read_text())
+        assert document["claimed_by"] == agent
+
+
+def test_claim_next_honours_readiness_type_and_priority(tmp_path):
+    store = TokenStore(tmp_path / "tokens")
+    store.create_many([
+        {"token_id": "low", "priority": 0.1, "type": "task"},
+        {"token_id": "high", "priority": 0.9, "type": "task"},
+        {"token_id": "review", "priority": 0.8, "type": "review"},
+        {"token_id": "waits", "priority": 1.0, "type": "task", "dependencies": ["high"]},
+        {"token_id": "held", "priority": 1.0, "type": "task", "status": "blocked"},
+        {"token_id": "gated", "priority": 0.95, "type": "task"},
+        {"token_id": "gate", "priority": 0.05, "type": "task", "blocks": ["gated"]},
+    ])
+
+    assert store.claim_next("a", token_type="review")["token_id"] == "review"
+    assert store.claim_next("a")["token_id"] == "high"
+    assert store.claim_next("a")["token_id"] == "low"
+    store.close("high", "done")
+    assert store.claim_next("a")["token_id"] == "waits"
+    assert store.claim_next("a")["token_id"] == "gate"
+    store.close("gate", "done")
+    assert store.claim_next("a")["token_id"] == "gated"
+    assert store.claim_next("a") is None
+    assert [token["token_id"] for token in store.blocked()] == ["held"]
+
+    store.release("low")
+    assert store.folder("low") == OPEN
+    assert store.claim_next("b")["token_id"] == "low"
+
+
+def test_hand_written_fields_of_any_type_still_order(tmp_path):
+    tokens_dir = tmp_path / "tokens"
+    for folder in (OPEN, CLAIMED, CLOSED):
+        (tokens_dir / folder).mkdir(parents=True)
+    for token in [
+        {"token_id": "dated", "priority": 0.5, "deadline": "2026-01-01", "created_at": "2026-01-01T00:00:00Z"},
+        {"token_id": "numeric-deadline", "priority": 0.5, "deadline": 20250101, "created_at": 1700000000},
+        {"token_id": "null-priority", "priority": None, "deadline": None},
+        {"token_id": "text-priority", "priority": "high", "deadline": {"at": "soon"}},
+        {"token_id": "bool-priority", "priority": True},
+        {"token_id": 7, "priority": 0.9},
+    ]:
+        write_json_atomic(tokens_dir / OPEN / f"{token['token_id']}.json", token)
+    store = TokenStore(tokens_dir)
+
+    ready = store.ready()
+    assert [token["token_id"] for token in ready] == [
+        "7", "numeric-deadline", "dated", "text-priority", "bool-priority", "null-priority",
+    ]
+    assert {token["priority"] for token in ready} == {0.9, 0.5}
+    claimed = [str(store.claim_next("a")["token_id"]) for _ in ready]  # The file as written
+    assert claimed == [token["token_id"] for token in ready]
+
+
+def test_incremental_index_matches_fresh_store(tmp_path):
+    rng = random.Random(16)
+    tokens_dir = tmp_path / "tokens"
+    store = TokenStore(tokens_dir)
+    ids = []
+
+    def in_folder(folder):
+        return sorted(path.stem for path in (tokens_dir / folder).glob("t*.json"))
+
+    for step in range(300):
+        op = rng.random()
+        opened, claimed = in_folder(OPEN), in_folder(CLAIMED)
+        if op < 0.3 or not ids:
+            token_id = f"t{step}"
+            ids.append(token_id)
+            store.create({
+                "token_id": token_id,
+                "priority": rng.choice([0.1, 0.5, 0.9, 1]),
+                "deadline": rng.choice([None, "2026-03-01", "2026-02-01"]),
+                "type": rng.choice(["task", "review"]),
+                "status": rng.choice(["open", "open", "blocked"]),
+                "dependencies": rng.sample(ids[:-1], min(len(ids) - 1, rng.randint(0, 2))),
+                "blocks": rng.sample(ids[:-1], min(len(ids) - 1, rng.randint(0, 1))),
+            })
+        elif op < 0.45 and opened:
+            store.claim(rng.choice(opened), "a")
+        elif op < 0.55 and claimed:
+            store.release(rng.choice(claimed))
+        elif op < 0.65 and claimed:
+            store.close(rng.choice(claimed), "done")
+        elif op < 0.75 and opened:
+            # Another agent re-prioritises a token
+            path = tokens_dir / OPEN / f"{rng.choice(opened)}.json"
+            document = json.loads(path.read_text())
+            document["priority"] = rng.random()
+            write_json_atomic(path, document)
+        elif op < 0.85 and opened:
+            # Another agent claims a token behind this store's back
+            token_id = rng.choice(opened)
+            os.rename(tokens_dir / OPEN / f"{token_id}.json", tokens_dir / CLAIMED / f"{token_id}.json")
+        elif op < 0.9:
+            (tokens_dir / OPEN / f"junk{step}.json").write_text(rng.choice(["{bad", "[1, 2]"]))
+        elif op < 0.95 and claimed:
+            os.remove(tokens_dir / CLAIMED / f"{rng.choice(claimed)}.json")
+        else:
+            store.save()
+            store = TokenStore(tokens_dir)  # restart from the saved index
+
+        fresh = _fresh(tokens_dir, tmp_path)
+        assert _snapshot(store) == _snapshot(fresh), f"step {step}"
+        assert {t["token_id"] for t in store.ready()} == {t["token_id"] for t in fresh.ready()}
+
+    expected = sorted(fresh.ready(), key=lambda token: (*priority_key(token), token["token_id"]))
+    drained = []
+    while (token := store.claim_next("z")) is not None:
+        drained.append(token["token_id"])
+    assert drained == [token["token_id"] for token in expected]
+    assert set(in_folder(CLOSED)) == {token["token_id"] for token in store.tokens(CLOSED)}
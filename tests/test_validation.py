@@ -0,0 +1,184 @@
+"""Compiled validators must agree with jsonschema, and their bytecode cache must never run foreign code."""
+
+import json
+import marshal
+import random
+import re
+import shutil
+
+import pytest
+
+from conftest import ROOT
+
+from create_elcs.runtime import validation
+from create_elcs.runtime.validation import TreeValidator, get_schema_dir, load_schemas
+
+SCHEMA_NAMES = sorted(path.name[:-len(".schema.json")] for path in get_schema_dir().glob("*.schema.json"))
+
+
+def _deref(schema, root):
+    while isinstance(schema, dict) and "$ref" in schema:
+        target = root
+        for part in schema["$ref"].lstrip("#").split("/")[1:]:
+            target = target[part]
+        schema = target
+    return schema
+
+
+def _string(rng, schema):
+    pattern = schema.get("pattern")
+    if pattern:
+        prefix = re.fullmatch(r"\^([A-Z]*)\[0-9\]\+\$", pattern)
+        if prefix:
+            return f"{prefix.group(1)}{rng.randint(0, 999)}"
+        if pattern == r"^[0-9]+\.[0-9]+$":
+            return f"{rng.randint(0, 9)}.{rng.randint(0, 9)}"
+    return rng.choice(["", "x", "some text", "2026-01-02T03:04:05Z", "{{PROJECT_NAME}}"])
+
+
+def _instance(rng, schema, root, depth=0):
+    """A random document that mostly satisfies ``schema``."""
+    schema = _deref(schema, root)
+    if schema is True or not isinstance(schema, dict):
+        return rng.choice([None, 1, "x"])
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+    for combinator in ("oneOf", "anyOf"):
+        if combinator in schema:
+            return _instance(rng, rng.choice(schema[combinator]), root, depth + 1)
+    kind = schema.get("type", "object" if "properties" in schema else "string")
+    if isinstance(kind, list):
+        kind = rng.choice(kind)
+    if kind == "object":
+        properties = schema.get("properties", {})
+        required = set(schema.get("required", []))
+        return {
+            name: _instance(rng, subschema, root, depth + 1)
+            for name, subschema in properties.items()
+            if name in required or (depth < 4 and rng.random() < 0.5)
+        }
+    if kind == "array":
+        low = schema.get("minItems", 0)
+        high = min(schema.get("maxItems", low + 3), low + 3)
+        count = rng.randint(low, high) if depth < 4 else low
+        return [_instance(rng, schema.get("items", {}), root, depth + 1) for _ in range(count)]
+    if kind in ("number", "integer"):
+        low, high = schema.get("minimum", 0), schema.get("maximum", 100)
+        return rng.randint(int(low), int(high)) if kind == "integer" else rng.uniform(low, high)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    if kind == "null":
+        return None
+    return _string(rng, schema)
+
+
+def _random_value(rng):
+    return rng.choice([
+        None, True, False, 0, 1, -1, 1.0, 2.5, 1e308, -0.5, "", "x", "P1", "1.0",
+        [], [1, 1], ["a"], {}, {"extra": 1},
+    ])
+
+
+def _mutate(rng, document):
+    """Change one node somewhere in a copy of ``document``."""
+    document = json.loads(json.dumps(document))
+    holders = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            holders.append(node)
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            holders.append(node)
+            for value in node:
+                walk(value)
+
+    walk(document)
+    if not holders:
+        return _random_value(rng)
+    holder = rng.choice(holders)
+    op = rng.random()
+    if isinstance(holder, dict):
+        if holder and op < 0.3:
+            del holder[rng.choice(list(holder))]
+        elif holder and op < 0.8:
+            holder[rng.choice(list(holder))] = _random_value(rng)
+        else:
+            holder[rng.choice(["extra", "token_id", "status", "id", "version"])] = _random_value(rng)
+    else:
+        if holder and op < 0.3:
+            holder.pop(rng.randrange(len(holder)))
+        elif holder and op < 0.6:
+            holder.append(json.loads(json.dumps(rng.choice(holder))))  # Duplicate for uniqueItems
+        elif holder and op < 0.8:
+            holder[rng.randrange(len(holder))] = _random_value(rng)
+        else:
+            holder.append(_random_value(rng))
+    return document
+
+
+@pytest.mark.parametrize("name", SCHEMA_NAMES)
+def test_compiled_validator_agrees_with_jsonschema(name):
+    jsonschema = pytest.importorskip("jsonschema")
+    schema = json.loads((get_schema_dir() / f"{name}.schema.json").read_text())
+    reference = jsonschema.Draft7Validator(schema)
+    compiled = load_schemas()[name]
+    rng = random.Random(name)
+
+    valid = invalid = 0
+    for _ in range(400):
+        document = _instance(rng, schema, schema)
+        for _ in range(rng.randint(0, 3)):
+            document = _mutate(rng, document)
+        expected = reference.is_valid(document)
+        issues = compiled.validate(document)
+        assert (not issues) == expected, (json.dumps(document), issues, [e.message for e in reference.iter_errors(document)])
+        valid += expected
+        invalid += not expected
+    # The generator must exercise both outcomes to mean anything
+    assert valid > 20 and invalid > 20
+
+
+def test_bytecode_cache_is_per_user_and_keyed(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "user-cache"
+    monkeypatch.setattr(validation, "validator_cache_dir", lambda: cache_dir)
+    elcs_dir = tmp_path / "project" / "elcs"
+    shutil.copytree(ROOT / "template" / "elcs", elcs_dir)
+
+    first = TreeValidator(elcs_dir).validate()
+    cached = sorted(cache_dir.glob("*.bin"))
+    assert cached
+    assert not (elcs_dir / ".cache" / "validators").exists()
+
+    # Bytecode without the matching key is never run, and is replaced
+    planted = marshal.dumps(compile("raise SystemExit('planted')", "<planted>", "exec"))
+    for path in cached:
+        path.write_bytes(b"0" * 64 + planted)
+    (elcs_dir / ".cache" / "validation.json").unlink()
+    assert TreeValidator(elcs_dir).validate() == first
+    assert sorted(cache_dir.glob("*.bin")) == cached
+    assert not any(path.read_bytes().startswith(b"0" * 64) for path in cached)
+
+
+def test_worker_processes_match_serial_validation(tmp_path, monkeypatch):
+    monkeypatch.setattr(validation, "validator_cache_dir", lambda: tmp_path / "user-cache")
+    monkeypatch.setattr(validation, "PARALLEL_MIN_FILES", 1)
+    monkeypatch.setattr(validation, "PARALLEL_CHUNK_SIZE", 4)
+    elcs_dir = tmp_path / "elcs"
+    shutil.copytree(ROOT / "template" / "elcs", elcs_dir)
+    rng = random.Random(18)
+    schema = json.loads((get_schema_dir() / "work-token.schema.json").read_text())
+    (elcs_dir / "tokens" / "open").mkdir(parents=True, exist_ok=True)
+    for n in range(40):
+        token = _mutate(rng, _instance(rng, schema, schema)) if n % 3 else _instance(rng, schema, schema)
+        (elcs_dir / "tokens" / "open" / f"WT-{n}.json").write_text(json.dumps(token))
+    (elcs_dir / "tokens" / "open" / "broken.json").write_text("{")
+
+    serial = TreeValidator(elcs_dir, use_cache=False).validate(workers=1)
+    parallel = TreeValidator(elcs_dir).validate(workers=2)
+    assert parallel == serial
+    assert any(result.issues for result in serial) and any(not result.issues for result in serial)
+    assert TreeValidator(elcs_dir).validate(workers=2) == serial  # From validation.json